@@ -196,10 +196,118 @@ if not DEBUG:
     SECURE_HSTS_INCLUDE_SUBDOMAINS = True
     SECURE_SSL_REDIRECT = True
 
+# PDF ingest: write an optimized (garbage-collected, compressed) copy on upload, in background threads
+PDF_OPTIMIZE_ON_UPLOAD = config('PDF_OPTIMIZE_ON_UPLOAD', default=False, cast=bool)
+PDF_OPTIMIZE_WORKERS = config('PDF_OPTIMIZE_WORKERS', default=1, cast=int)
+
+# Per-process cache of open PyMuPDF documents
+PDF_CACHE_MAX_DOCUMENTS = config('PDF_CACHE_MAX_DOCUMENTS', default=16, cast=int)
+PDF_CACHE_MAX_BYTES = config('PDF_CACHE_MAX_BYTES', default=256 * 1024 * 1024, cast=int)
+
+# Extracted text: files this large are extracted through a memory map with
+# bounded memory, and stored text this large is streamed to the client
+PDF_BOUNDED_EXTRACTION_MIN_BYTES = config('PDF_BOUNDED_EXTRACTION_MIN_BYTES', default=50 * 1024 * 1024, cast=int)
+EXTRACTED_TEXT_STREAM_MIN_BYTES = config('EXTRACTED_TEXT_STREAM_MIN_BYTES', default=8 * 1024 * 1024, cast=int)
+
+# Strip running headers, footers and page numbers from stored extracted text.
+# Off by default: annotation offsets point into the extracted text, and
+# stripping would move every existing highlight.
+PDF_STRIP_BOILERPLATE = config('PDF_STRIP_BOILERPLATE', default=False, cast=bool)
+
+# Content-addressed cache of synthesized TTS audio (defaults to MEDIA_ROOT/tts_cache)
+TTS_CACHE_DIR = config('TTS_CACHE_DIR', default='')
+TTS_CACHE_MAX_BYTES = config('TTS_CACHE_MAX_BYTES', default=512 * 1024 * 1024, cast=int)
+
+# Streaming TTS: sentences synthesized ahead of playback and worker threads per process
+TTS_STREAM_LOOKAHEAD = config('TTS_STREAM_LOOKAHEAD', default=2, cast=int)
+TTS_STREAM_WORKERS = config('TTS_STREAM_WORKERS', default=4, cast=int)
+TTS_STREAM_SEGMENT_CHARS = config('TTS_STREAM_SEGMENT_CHARS', default=300, cast=int)
+
+# Longest range of stored document text a TTS request may reference by offsets or page
+TTS_REFERENCE_MAX_CHARS = config('TTS_REFERENCE_MAX_CHARS', default=50000, cast=int)
+
+# Batch TTS: snippets synthesized concurrently per process, and limits per batch request
+TTS_BATCH_WORKERS = config('TTS_BATCH_WORKERS', default=4, cast=int)
+TTS_BATCH_MAX_SNIPPETS = config('TTS_BATCH_MAX_SNIPPETS', default=100, cast=int)
+TTS_BATCH_MAX_CHARS = config('TTS_BATCH_MAX_CHARS', default=50000, cast=int)
+
+# Offline (pyttsx3) synthesis runs in a pool of worker processes; 0 disables the pool
+TTS_WORKER_POOL_SIZE = config('TTS_WORKER_POOL_SIZE', default=2, cast=int)
+TTS_WORKER_JOB_TIMEOUT = config('TTS_WORKER_JOB_TIMEOUT', default=60, cast=int)
+TTS_WORKER_MAX_JOBS = config('TTS_WORKER_MAX_JOBS', default=200, cast=int)
+
+# TTS engine circuit breaker: consecutive failures that disable an engine, and for how long (seconds)
+TTS_BREAKER_FAILURES = config('TTS_BREAKER_FAILURES', default=3, cast=int)
+TTS_BREAKER_COOLDOWN = config('TTS_BREAKER_COOLDOWN', default=30, cast=int)
+
+# Time budget of one synthesis across all engine attempts, in seconds
+TTS_REQUEST_DEADLINE = config('TTS_REQUEST_DEADLINE', default=60, cast=float)
+
+# Client-side rate limits of online TTS providers: requests per second (0 = unlimited) and burst size.
+# Requests over the limit queue (readers first, then audiobooks, then prefetching) for up to
+# TTS_RATE_LIMIT_MAX_WAIT seconds. gTTS requests are 100-character chunks.
+TTS_VOICERSS_RATE = config('TTS_VOICERSS_RATE', default=2.0, cast=float)
+TTS_VOICERSS_BURST = config('TTS_VOICERSS_BURST', default=5, cast=int)
+TTS_GTTS_RATE = config('TTS_GTTS_RATE', default=10.0, cast=float)
+TTS_GTTS_BURST = config('TTS_GTTS_BURST', default=20, cast=int)
+TTS_RATE_LIMIT_MAX_WAIT = config('TTS_RATE_LIMIT_MAX_WAIT', default=30, cast=float)
+
+# Shared HTTP client of online TTS engines: keep-alive pool, timeouts (seconds), concurrency and retries
+TTS_HTTP_POOL_SIZE = config('TTS_HTTP_POOL_SIZE', default=10, cast=int)
+TTS_HTTP_CONNECT_TIMEOUT = config('TTS_HTTP_CONNECT_TIMEOUT', default=5, cast=float)
+TTS_HTTP_READ_TIMEOUT = config('TTS_HTTP_READ_TIMEOUT', default=30, cast=float)
+TTS_HTTP_MAX_CONCURRENCY = config('TTS_HTTP_MAX_CONCURRENCY', default=10, cast=int)
+TTS_HTTP_RETRIES = config('TTS_HTTP_RETRIES', default=3, cast=int)
+# Requests with longer URLs send their parameters as a POST body
+TTS_HTTP_MAX_URL_LENGTH = config('TTS_HTTP_MAX_URL_LENGTH', default=2000, cast=int)
+
+# Voice catalog: built on first use, rebuilt in the background after TTL seconds (0: never),
+# and cacheable by clients for MAX_AGE seconds
+TTS_VOICE_CATALOG_TTL = config('TTS_VOICE_CATALOG_TTL', default=3600, cast=int)
+TTS_VOICE_CATALOG_MAX_AGE = config('TTS_VOICE_CATALOG_MAX_AGE', default=300, cast=int)
+
+# Asynchronous TTS jobs: run on job threads of the web process ('thread') or by
+# `manage.py runttsjobs` workers ('external'); event streams end after TIMEOUT seconds
+TTS_JOB_RUNNER = config('TTS_JOB_RUNNER', default='thread')
+TTS_JOB_WORKERS = config('TTS_JOB_WORKERS', default=4, cast=int)
+TTS_JOB_EVENTS_TIMEOUT = config('TTS_JOB_EVENTS_TIMEOUT', default=300, cast=int)
+# Jobs running longer than this are taken to be lost with their worker and requeued
+TTS_JOB_STALE_AFTER = config('TTS_JOB_STALE_AFTER', default=600, cast=int)
+TTS_JOB_RECOVERY_INTERVAL = config('TTS_JOB_RECOVERY_INTERVAL', default=60, cast=int)
+
+# Compact TTS output: ffmpeg transcodes to mono 24 kHz Opus or MP3 when a request asks for it
+# (audio_format or Accept header); TTS_DEFAULT_FORMAT applies when it doesn't ('' keeps the engine's format)
+FFMPEG_BINARY = config('FFMPEG_BINARY', default='')
+TTS_DEFAULT_FORMAT = config('TTS_DEFAULT_FORMAT', default='')
+TTS_OPUS_BITRATE = config('TTS_OPUS_BITRATE', default='24k')
+TTS_MP3_BITRATE = config('TTS_MP3_BITRATE', default='48k')
+
+# Speculative prefetch: after a TTS request for document text, the text that follows is synthesized
+# into the audio cache in the background, within a per-user budget
+TTS_PREFETCH_ENABLED = config('TTS_PREFETCH_ENABLED', default=True, cast=bool)
+TTS_PREFETCH_WORKERS = config('TTS_PREFETCH_WORKERS', default=1, cast=int)
+TTS_PREFETCH_LOOKAHEAD = config('TTS_PREFETCH_LOOKAHEAD', default=1, cast=int)
+TTS_PREFETCH_USER_PENDING = config('TTS_PREFETCH_USER_PENDING', default=2, cast=int)
+TTS_PREFETCH_USER_CHARS_PER_HOUR = config('TTS_PREFETCH_USER_CHARS_PER_HOUR', default=20000, cast=int)
+
+# Direct espeak-ng engine (used for offline TTS when installed)
+ESPEAK_BINARY = config('ESPEAK_BINARY', default='')
+ESPEAK_MAX_PROCESSES = config('ESPEAK_MAX_PROCESSES', default=0, cast=int)
+
+# Audiobook rendering: background jobs per process and synthesis workers per job
+AUDIOBOOK_CONCURRENT_JOBS = config('AUDIOBOOK_CONCURRENT_JOBS', default=1, cast=int)
+AUDIOBOOK_WORKERS = config('AUDIOBOOK_WORKERS', default=4, cast=int)
+
 # External API Configuration
 OPENAI_API_KEY = config('OPENAI_API_KEY', default='')
 AZURE_SPEECH_KEY = config('AZURE_SPEECH_KEY', default='')
 AZURE_SPEECH_REGION = config('AZURE_SPEECH_REGION', default='eastus')
+VOICERSS_API_KEY = config('VOICERSS_API_KEY', default='')
+VOICERSS_API_URL = config('VOICERSS_API_URL', default='https://api.voicerss.org/')
+VOICERSS_AUDIO_FORMAT = config('VOICERSS_AUDIO_FORMAT', default='16khz_16bit_mono')
+GTTS_API_URL = config('GTTS_API_URL', default='https://translate.google.{tld}/_/TranslateWebserverUi/data/batchexecute')
+# gTTS chunk requests (100 characters each) in flight per synthesis
+TTS_GTTS_PARALLEL = config('TTS_GTTS_PARALLEL', default=4, cast=int)
 
 # Debug logging
 LOGGING = {
@@ -0,0 +1,84 @@
+"""
+Peak-RSS benchmark for bounded-memory text extraction.
+
+Uses the synthetic 2,000-page text document from the benchmark corpus
+(see corpus.py) and extracts it once with the
+in-memory extract_text_from_pdf() and once with the bounded-memory
+extract_text_to_store(), each in a fresh process so the peak RSS
+(ru_maxrss) of one run does not leak into the other.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_bounded_extraction [--pages 2000] [--output results.json]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import multiprocessing
+
+from benchmarks import corpus
+
+
+def _max_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def _run(mode, pdf_path, store_root, queue):
+    from documents.pdf_utils import extract_text_from_pdf, extract_text_to_store
+    from documents.extraction_store import ExtractionStore
+
+    baseline = _max_rss_mb()
+    start = time.perf_counter()
+    if mode == 'in_memory':
+        text = extract_text_from_pdf(pdf_path)
+        size = len(text.encode('utf-8'))
+    else:
+        meta = extract_text_to_store(pdf_path, 'bench', ExtractionStore(store_root), bounded=True)
+        size = meta['text_bytes']
+    elapsed = time.perf_counter() - start
+
+    queue.put({
+        'mode': mode,
+        'seconds': elapsed,
+        'text_bytes': size,
+        'baseline_rss_mb': baseline,
+        'peak_rss_mb': _max_rss_mb(),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--pages', type=int, default=2000)
+    parser.add_argument('--corpus-dir', default=corpus.DEFAULT_DIR)
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as workdir:
+        pdf_path = corpus.ensure('text', args.pages, args.corpus_dir)
+        print(f"PDF size: {os.path.getsize(pdf_path) / (1024 * 1024):.1f} MB")
+
+        results = []
+        for mode in ('in_memory', 'bounded'):
+            queue = ctx.Queue()
+            process = ctx.Process(target=_run, args=(mode, pdf_path, os.path.join(workdir, 'store'), queue))
+            process.start()
+            result = queue.get()
+            process.join()
+            result['pages'] = args.pages
+            results.append(result)
+            print(f"{mode:>10}: {result['seconds']:.2f}s, peak RSS {result['peak_rss_mb']:.1f} MB "
+                  f"(+{result['peak_rss_mb'] - result['baseline_rss_mb']:.1f} MB over baseline)")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'benchmark': 'bounded_extraction', 'pages': args.pages, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
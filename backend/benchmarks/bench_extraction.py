@@ -0,0 +1,213 @@
+"""
+Extraction benchmark suite.
+
+Runs every extraction path over the synthetic corpus (see corpus.py) and
+records throughput (pages/sec), latency percentiles over repeated runs and
+peak memory. Each (path, document) pair runs in a fresh process so peak
+RSS is not polluted by earlier runs. Results are written as JSON together
+with the commit they were measured on; compare two result files with
+benchmarks/compare.py.
+
+Paths:
+    pdf_utils           pdf_utils.extract_text_from_pdf
+    bounded             pdf_utils.extract_text_to_store in bounded-memory mode
+    stripped            pdf_utils.extract_text_to_store with header/footer stripping
+    smart               EnhancedPDFProcessor.smart_extract_text
+    ocr                 EnhancedPDFProcessor.extract_with_ocr (needs Tesseract)
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_extraction [--pages 10 100] [--kinds text mixed]
+                                         [--paths pdf_utils smart] [--repeat 5]
+                                         [--output results.json]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+import multiprocessing
+from datetime import datetime, timezone
+
+from benchmarks import corpus
+
+PATHS = ('pdf_utils', 'bounded', 'stripped', 'smart', 'ocr')
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def _max_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    index = (len(ordered) - 1) * percent / 100
+    lower = int(index)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (index - lower)
+
+
+def _load_path(name, store_root):
+    """Return a callable running one extraction path and returning the number of characters extracted."""
+    if name == 'pdf_utils':
+        from documents.pdf_utils import extract_text_from_pdf
+        return lambda pdf_path: len(extract_text_from_pdf(pdf_path))
+
+    if name in ('bounded', 'stripped'):
+        from documents.pdf_utils import extract_text_to_store
+        from documents.extraction_store import ExtractionStore
+        store = ExtractionStore(store_root)
+        options = {'bounded': True} if name == 'bounded' else {'strip_boilerplate': True}
+
+        def run(pdf_path):
+            meta = extract_text_to_store(pdf_path, f'bench-{name}', store, **options)
+            return meta['text_bytes']
+        return run
+
+    from documents.enhanced_pdf_utils import EnhancedPDFProcessor
+    processor = EnhancedPDFProcessor()
+
+    if name == 'smart':
+        def run(pdf_path):
+            result = processor.smart_extract_text(pdf_path)
+            if 'error' in result:
+                raise Exception(result['error'])
+            return sum(
+                len(page.get('text', '')) + sum(len(b.get('text', '')) for b in page.get('blocks', []))
+                for page in result.get('pages', [])
+            )
+        return run
+
+    if name == 'ocr':
+        if not processor.ocr_available:
+            raise RuntimeError("Tesseract OCR not available")
+
+        def run(pdf_path):
+            result = processor.extract_with_ocr(pdf_path)
+            if 'error' in result:
+                raise Exception(result['error'])
+            return sum(len(page['text']) for page in result['pages'])
+        return run
+
+    raise ValueError(f"Unknown extraction path: {name}")
+
+
+def _run_case(path_name, pdf_path, pages, repeat, store_root, queue):
+    try:
+        from documents.pdf_cache import pdf_document_cache
+
+        run = _load_path(path_name, store_root)
+        baseline = _max_rss_mb()
+        latencies = []
+        chars = 0
+        for _ in range(repeat):
+            # Measure cold opens; the handle cache would otherwise hide parse time
+            pdf_document_cache.clear()
+            start = time.perf_counter()
+            chars = run(pdf_path)
+            latencies.append(time.perf_counter() - start)
+
+        median = _percentile(latencies, 50)
+        queue.put({
+            'status': 'ok',
+            'chars': chars,
+            'runs': repeat,
+            'pages_per_sec': pages / median if median else None,
+            'latency_s': {
+                'min': min(latencies),
+                'p50': median,
+                'p90': _percentile(latencies, 90),
+                'p99': _percentile(latencies, 99),
+                'max': max(latencies),
+            },
+            'baseline_rss_mb': baseline,
+            'peak_rss_mb': _max_rss_mb(),
+        })
+    except ImportError as e:
+        queue.put({'status': 'skipped', 'reason': f"missing dependency: {e}"})
+    except RuntimeError as e:
+        queue.put({'status': 'skipped', 'reason': str(e)})
+    except Exception as e:
+        queue.put({'status': 'error', 'reason': str(e)})
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL,
+        ).decode().strip()
+    except Exception:
+        return 'unknown'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the PDF extraction paths")
+    parser.add_argument('--pages', type=int, nargs='+', default=list(corpus.DEFAULT_PAGES))
+    parser.add_argument('--kinds', nargs='+', default=list(corpus.KINDS), choices=corpus.KINDS)
+    parser.add_argument('--paths', nargs='+', default=list(PATHS), choices=PATHS)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--ocr-max-pages', type=int, default=100,
+                        help='Skip OCR on larger documents (OCR runs at a few pages/sec)')
+    parser.add_argument('--corpus-dir', default=corpus.DEFAULT_DIR)
+    parser.add_argument('--output', help='Result file (default: benchmarks/results/extraction-<commit>.json)')
+    args = parser.parse_args()
+
+    import fitz
+    commit = _git_commit()
+    report = {
+        'benchmark': 'extraction',
+        'commit': commit,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'pymupdf': fitz.VersionBind,
+        'platform': platform.platform(),
+        'repeat': args.repeat,
+        'results': [],
+    }
+
+    ctx = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as store_root:
+        for kind in args.kinds:
+            for pages in args.pages:
+                pdf_path = corpus.ensure(kind, pages, args.corpus_dir)
+                for path_name in args.paths:
+                    case = {'path': path_name, 'kind': kind, 'pages': pages,
+                            'file_bytes': os.path.getsize(pdf_path)}
+                    if path_name == 'ocr' and pages > args.ocr_max_pages:
+                        case.update({'status': 'skipped', 'reason': f'more than {args.ocr_max_pages} pages'})
+                    else:
+                        queue = ctx.Queue()
+                        process = ctx.Process(
+                            target=_run_case,
+                            args=(path_name, pdf_path, pages, args.repeat, store_root, queue),
+                        )
+                        process.start()
+                        case.update(queue.get())
+                        process.join()
+
+                    report['results'].append(case)
+                    if case['status'] == 'ok':
+                        print(f"{path_name:>10} {kind:>13} {pages:>5}p: "
+                              f"{case['pages_per_sec']:8.1f} pages/s, "
+                              f"p50 {case['latency_s']['p50'] * 1000:8.1f} ms, "
+                              f"p90 {case['latency_s']['p90'] * 1000:8.1f} ms, "
+                              f"peak RSS {case['peak_rss_mb']:.1f} MB")
+                    else:
+                        print(f"{path_name:>10} {kind:>13} {pages:>5}p: {case['status']} ({case['reason']})")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"extraction-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+gTTS synthesis time: stock gTTS against the parallel chunk fetch.
+
+Google's TTS takes at most 100 characters per request, so a page of text
+is dozens of requests. Runs against the local stub server
+(benchmarks.tts_stub_server), so no network access is needed:
+
+  - gtts:     stock gTTS, one request after another, a new connection each
+  - pooled-1: tts_engines.GTTSEngine with one request in flight (keep-alive only)
+  - pooled-N: GTTSEngine with N requests in flight
+
+for texts of increasing length, and checks that every path produces the
+same audio.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_gtts_parallel [--chars 200 1000 3000]
+                                             [--parallel 2 4 8] [--latency-ms 80]
+                                             [--repeat 3]
+"""
+import os
+import io
+import json
+import time
+import argparse
+
+from benchmarks.bench_extraction import _percentile, _git_commit, RESULTS_DIR
+from benchmarks.bench_tts_streaming import SAMPLE_TEXT
+from benchmarks.tts_stub_server import StubServer
+
+
+def make_text(chars):
+    text = ''
+    i = 0
+    while len(text) < chars:
+        text += f"{i + 1}. {SAMPLE_TEXT[i % len(SAMPLE_TEXT)]} "
+        i += 1
+    return text.strip()
+
+
+def run_stock(text, url):
+    import gtts.tts
+    # Send stock gTTS to the stub instead of Google
+    gtts.tts._translate_url = lambda tld='com', path='': url
+    f = io.BytesIO()
+    start = time.perf_counter()
+    gtts.tts.gTTS(text=text, lang='en').write_to_fp(f)
+    return time.perf_counter() - start, f.getvalue()
+
+
+def run_engine(text, url, parallel):
+    from documents.tts_engines import GTTSEngine
+    f = io.BytesIO()
+    start = time.perf_counter()
+    GTTSEngine(url=url, parallel=parallel).write(f, text, 'en')
+    return time.perf_counter() - start, f.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parallel gTTS chunk fetching")
+    parser.add_argument('--chars', type=int, nargs='+', default=[200, 1000, 3000])
+    parser.add_argument('--parallel', type=int, nargs='+', default=[2, 4, 8])
+    parser.add_argument('--latency-ms', type=float, default=80.0, help='Stub latency per request')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='Result file (default: benchmarks/results/gtts-parallel-<commit>.json)')
+    args = parser.parse_args()
+
+    commit = _git_commit()
+    report = {
+        'benchmark': 'gtts_parallel',
+        'commit': commit,
+        'latency_ms': args.latency_ms,
+        'repeat': args.repeat,
+        'results': [],
+    }
+
+    modes = [('gtts', run_stock), ('pooled-1', lambda text, url: run_engine(text, url, 1))]
+    modes += [(f'pooled-{n}', lambda text, url, n=n: run_engine(text, url, n)) for n in args.parallel if n != 1]
+
+    with StubServer(latency=args.latency_ms / 1000, per_char=0) as server:
+        url = server.url + 'batchexecute'
+        for chars in args.chars:
+            text = make_text(chars)
+            reference = None
+            for mode, run in modes:
+                requests_before = server.config.requests
+                times = []
+                for _ in range(args.repeat):
+                    elapsed, audio = run(text, url)
+                    times.append(elapsed)
+                if reference is None:
+                    reference = audio
+                case = {
+                    'mode': mode,
+                    'chars': len(text),
+                    'requests': (server.config.requests - requests_before) // args.repeat,
+                    'audio_bytes': len(audio),
+                    'same_audio': audio == reference,
+                    'p50_s': _percentile(times, 50),
+                    'p90_s': _percentile(times, 90),
+                }
+                report['results'].append(case)
+                print(f"{mode:>9} {len(text):>5} chars ({case['requests']:>3} requests): "
+                      f"{case['p50_s'] * 1000:8.1f} ms"
+                      f"{'' if case['same_audio'] else '  AUDIO DIFFERS'}")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"gtts-parallel-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == '__main__':
+    main()
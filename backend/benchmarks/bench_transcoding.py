@@ -0,0 +1,131 @@
+"""
+Size and CPU benchmark for compact TTS audio formats.
+
+Transcodes speech-like audio in the engines' formats (44.1 kHz stereo WAV
+as produced by VoiceRSS' old setting, 22 kHz mono WAV as produced by SAPI
+and espeak) to each format of documents.transcoding.FORMATS at a few
+bitrates, and reports the output size, the compression ratio, and the
+ffmpeg CPU time per second of audio.
+
+The input is synthetic (harmonic tones with a syllable-rate envelope and
+pauses), so no TTS engine is needed; pass --input to use a real recording.
+Requires ffmpeg.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_transcoding [--seconds 30] [--input speech.wav]
+                                           [--bitrates opus=16k,24k,32k mp3=32k,48k,64k]
+"""
+import os
+import io
+import json
+import wave
+import time
+import argparse
+import resource
+import tempfile
+
+import numpy as np
+
+from benchmarks.bench_extraction import _git_commit, RESULTS_DIR
+
+DEFAULT_BITRATES = {'opus': ['16k', '24k', '32k'], 'mp3': ['32k', '48k', '64k']}
+
+
+def speech_like_wav(seconds, sample_rate, channels):
+    """Synthesize speech-like audio: voiced syllables at ~4 Hz with pauses between phrases."""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    pitch = 120 + 30 * np.sin(2 * np.pi * 0.5 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+    voice = sum(np.sin(k * phase) / k for k in range(1, 12))
+    envelope = np.clip(np.sin(2 * np.pi * 4 * t), 0, None) * (np.sin(2 * np.pi * 0.25 * t) > -0.6)
+    noise = np.random.default_rng(0).normal(0, 0.02, t.size)
+    signal = (voice * envelope * 0.25 + noise).clip(-1, 1)
+    pcm = (signal * 32767).astype('<i2')
+    if channels == 2:
+        pcm = np.repeat(pcm, 2)
+
+    buf = io.BytesIO()
+    with wave.open(buf, 'wb') as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(pcm.tobytes())
+    return buf.getvalue()
+
+
+def _children_cpu():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def run_case(data, fmt, bitrate):
+    from documents.transcoding import transcode
+
+    with tempfile.TemporaryFile() as source, tempfile.TemporaryFile() as destination:
+        source.write(data)
+        source.flush()
+        source.seek(0)
+        cpu = _children_cpu()
+        start = time.perf_counter()
+        transcode(source, destination, fmt, bitrate=bitrate)
+        return {
+            'bytes': destination.tell(),
+            'wall_s': time.perf_counter() - start,
+            'cpu_s': _children_cpu() - cpu,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark compact TTS audio formats")
+    parser.add_argument('--seconds', type=float, default=30, help='Length of the synthetic input')
+    parser.add_argument('--input', help='WAV or MP3 file to use instead of synthetic audio')
+    parser.add_argument('--bitrates', nargs='*', help='Per-format bitrates, e.g. opus=16k,24k mp3=48k')
+    parser.add_argument('--output', help='Result file (default: benchmarks/results/transcoding-<commit>.json)')
+    args = parser.parse_args()
+
+    from documents.transcoding import FORMATS, ffmpeg_binary
+    from documents.audio_utils import audio_duration
+
+    if ffmpeg_binary() is None:
+        parser.error("ffmpeg is required (install it or set FFMPEG_BINARY)")
+
+    bitrates = dict(DEFAULT_BITRATES)
+    for item in args.bitrates or []:
+        fmt, _, values = item.partition('=')
+        bitrates[fmt] = values.split(',')
+
+    if args.input:
+        with open(args.input, 'rb') as f:
+            data = f.read()
+        content_type = 'audio/mpeg' if args.input.lower().endswith('.mp3') else 'audio/wav'
+        inputs = [(os.path.basename(args.input), data, audio_duration(data, content_type))]
+    else:
+        inputs = [
+            ('wav-44khz-stereo', speech_like_wav(args.seconds, 44100, 2), args.seconds),
+            ('wav-22khz-mono', speech_like_wav(args.seconds, 22050, 1), args.seconds),
+        ]
+
+    commit = _git_commit()
+    report = {'benchmark': 'transcoding', 'commit': commit, 'results': []}
+    for name, data, seconds in inputs:
+        print(f"{name}: {len(data) / 1024:.0f} KiB, {seconds:.1f} s")
+        for fmt in FORMATS:
+            for bitrate in bitrates.get(fmt, [FORMATS[fmt]['bitrate']]):
+                case = {'input': name, 'input_bytes': len(data), 'format': fmt, 'bitrate': bitrate}
+                case.update(run_case(data, fmt, bitrate))
+                case['ratio'] = len(data) / case['bytes'] if case['bytes'] else None
+                case['cpu_ms_per_audio_s'] = case['cpu_s'] * 1000 / seconds if seconds else None
+                report['results'].append(case)
+                print(f"  {fmt:>4} {bitrate:>4}: {case['bytes'] / 1024:7.1f} KiB "
+                      f"({case['ratio'] or 0:5.1f}x smaller), "
+                      f"{case['cpu_ms_per_audio_s'] or 0:6.1f} ms CPU per audio second")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"transcoding-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == '__main__':
+    main()
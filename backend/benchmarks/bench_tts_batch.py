@@ -0,0 +1,136 @@
+"""
+Throughput benchmark for batch TTS.
+
+Synthesizes N short snippets (highlight-sized) two ways:
+
+    per-snippet   tts_pipeline.synthesize for one snippet after another,
+                  as a client calling the tts endpoint once per snippet does
+    batch-W       tts_batch.SpeechBatch with W workers, building the zip archive
+
+and reports the total time, snippets per second and time to the first
+archive chunk. The audio cache is emptied before each run.
+
+By default a simulated engine is used (see bench_tts_streaming.fake_engine),
+so results are reproducible and no TTS engine or network access is needed.
+Pass --engine real to measure the configured engines instead.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_tts_batch [--snippets 10 50] [--workers 2 4 8]
+                                         [--overhead-ms 150] [--per-char-ms 2]
+                                         [--repeat 3] [--engine fake|real]
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.bench_extraction import _percentile, _git_commit, RESULTS_DIR
+from benchmarks.bench_tts_streaming import SAMPLE_TEXT, fake_engine
+
+
+def make_snippets(count):
+    # Numbered so that no snippet is served from the cache of an earlier one
+    return [f"Highlight {i + 1}: {SAMPLE_TEXT[i % len(SAMPLE_TEXT)]}" for i in range(count)]
+
+
+def run_per_snippet(snippets, language):
+    from documents import tts_pipeline
+    start = time.perf_counter()
+    first = None
+    size = 0
+    for text in snippets:
+        result = tts_pipeline.synthesize(text, language)
+        with result.file as f:
+            size += len(f.read())
+        if first is None:
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start, size
+
+
+def run_batch(snippets, language, workers):
+    from documents import tts_batch
+    tts_batch._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tts-batch')
+    try:
+        start = time.perf_counter()
+        first = None
+        size = 0
+        batch = tts_batch.SpeechBatch([{'text': text} for text in snippets], language, window=2 * workers)
+        for chunk in batch:
+            if first is None:
+                first = time.perf_counter() - start
+            size += len(chunk)
+        return first, time.perf_counter() - start, size
+    finally:
+        tts_batch._executor.shutdown()
+        tts_batch._executor = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batch TTS throughput")
+    parser.add_argument('--snippets', type=int, nargs='+', default=[10, 50])
+    parser.add_argument('--workers', type=int, nargs='+', default=[2, 4, 8])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--engine', choices=('fake', 'real'), default='fake')
+    parser.add_argument('--overhead-ms', type=float, default=150.0)
+    parser.add_argument('--per-char-ms', type=float, default=2.0)
+    parser.add_argument('--language', default='en')
+    parser.add_argument('--output', help='Result file (default: benchmarks/results/tts-batch-<commit>.json)')
+    args = parser.parse_args()
+
+    from documents import tts_pipeline
+    from documents.tts_cache import tts_audio_cache
+
+    if args.engine == 'fake':
+        tts_pipeline.write_uncached = fake_engine(args.overhead_ms / 1000, args.per_char_ms / 1000)
+
+    commit = _git_commit()
+    report = {
+        'benchmark': 'tts_batch',
+        'commit': commit,
+        'engine': args.engine,
+        'repeat': args.repeat,
+        'results': [],
+    }
+    if args.engine == 'fake':
+        report['latency_model'] = {'overhead_ms': args.overhead_ms, 'per_char_ms': args.per_char_ms}
+
+    modes = [('per-snippet', run_per_snippet)]
+    modes += [(f'batch-{w}', lambda snippets, language, w=w: run_batch(snippets, language, w))
+              for w in args.workers]
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        tts_audio_cache._root = cache_dir
+        for count in args.snippets:
+            snippets = make_snippets(count)
+            for mode, run in modes:
+                firsts, totals = [], []
+                for _ in range(args.repeat):
+                    tts_audio_cache.clear()
+                    first, total, size = run(snippets, args.language)
+                    firsts.append(first)
+                    totals.append(total)
+                case = {
+                    'mode': mode,
+                    'snippets': count,
+                    'chars': sum(len(text) for text in snippets),
+                    'bytes': size,
+                    'p50_first': _percentile(firsts, 50),
+                    'p50_total': _percentile(totals, 50),
+                    'p90_total': _percentile(totals, 90),
+                    'snippets_per_s': count / _percentile(totals, 50),
+                }
+                report['results'].append(case)
+                print(f"{mode:>11} {count:>4} snippets: total {case['p50_total'] * 1000:8.1f} ms "
+                      f"({case['snippets_per_s']:6.1f}/s), first chunk {case['p50_first'] * 1000:7.1f} ms")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"tts-batch-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == '__main__':
+    main()
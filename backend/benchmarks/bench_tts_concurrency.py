@@ -0,0 +1,159 @@
+"""
+Concurrency benchmark for offline TTS.
+
+Sends N simultaneous synthesis requests and reports throughput and latency
+percentiles for:
+
+    shared      one engine per process (the services' in-process pyttsx3 path)
+    pool        documents.tts_worker_pool.TTSWorkerPool with one worker per request
+
+By default a simulated engine is used (a fixed per-call overhead plus a
+per-character cost, held for the whole synthesis like runAndWait), so the
+benchmark runs without speech drivers. Pass --engine real to drive pyttsx3.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_tts_concurrency [--concurrency 1 2 4 8] [--requests 32]
+                                              [--engine fake|real] [--pool-size N]
+"""
+import os
+import json
+import time
+import wave
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.bench_extraction import _percentile, _git_commit, RESULTS_DIR
+from benchmarks.bench_tts_streaming import make_text
+
+OVERHEAD_S = 0.1
+PER_CHAR_S = 0.002
+
+
+def _fake_synthesize(text, output_file):
+    time.sleep(OVERHEAD_S + PER_CHAR_S * len(text))
+    with wave.open(output_file, 'wb') as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(22050)
+        w.writeframes(b'\x00\x00' * 22050)
+
+
+def _fake_worker(conn):
+    """Worker process main function with the same protocol as tts_worker_pool._pyttsx3_worker."""
+    conn.send(('ready', os.getpid()))
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            break
+        if job is None:
+            break
+        text, language, voice_name, rate, output_file = job
+        _fake_synthesize(text, output_file)
+        conn.send(('ok', output_file))
+
+
+def _shared_engine(engine):
+    """Build the single-engine-per-process path."""
+    if engine == 'real':
+        from documents import tts_engines
+        from documents.enhanced_tts_service import enhanced_tts_service
+        # Bypass the worker pool so the engine plugin uses its in-process engine
+        tts_engines.get_worker_pool = lambda: None
+        return lambda text: enhanced_tts_service.text_to_speech_pyttsx3(text)
+
+    lock = threading.Lock()
+
+    def synthesize(text):
+        fd, path = tempfile.mkstemp(suffix='.wav')
+        os.close(fd)
+        # One engine: runAndWait holds it for the whole synthesis
+        with lock:
+            _fake_synthesize(text, path)
+        return path
+    return synthesize
+
+
+def _run(synthesize, texts, concurrency):
+    latencies = []
+    errors = 0
+
+    def one(text):
+        start = time.perf_counter()
+        path = synthesize(text)
+        latency = time.perf_counter() - start
+        os.remove(path)
+        return latency
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(one, text) for text in texts]:
+            try:
+                latencies.append(future.result())
+            except Exception:
+                errors += 1
+    elapsed = time.perf_counter() - start
+    return {
+        'requests_per_sec': len(latencies) / elapsed if elapsed else None,
+        'p50_latency': _percentile(latencies, 50) if latencies else None,
+        'p90_latency': _percentile(latencies, 90) if latencies else None,
+        'errors': errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent offline TTS")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--requests', type=int, default=32)
+    parser.add_argument('--sentences', type=int, default=2, help='Sentences per request')
+    parser.add_argument('--engine', choices=('fake', 'real'), default='fake')
+    parser.add_argument('--pool-size', type=int, help='Worker processes (default: the concurrency level)')
+    parser.add_argument('--output', help='Result file (default: benchmarks/results/tts-concurrency-<commit>.json)')
+    args = parser.parse_args()
+
+    from documents.tts_worker_pool import TTSWorkerPool, _pyttsx3_worker
+
+    texts = [make_text(args.sentences) for _ in range(args.requests)]
+    commit = _git_commit()
+    report = {
+        'benchmark': 'tts_concurrency',
+        'commit': commit,
+        'engine': args.engine,
+        'requests': args.requests,
+        'results': [],
+    }
+
+    shared = _shared_engine(args.engine)
+    for concurrency in args.concurrency:
+        cases = [('shared', shared, None)]
+        pool = TTSWorkerPool(
+            size=args.pool_size or concurrency,
+            target=_pyttsx3_worker if args.engine == 'real' else _fake_worker,
+        )
+        cases.append(('pool', lambda text: pool.synthesize(text), pool))
+
+        for mode, synthesize, owner in cases:
+            if owner is not None:
+                # Start the workers before timing; startup is paid once per process lifetime
+                _run(synthesize, texts[:owner.size], owner.size)
+            case = {'mode': mode, 'concurrency': concurrency}
+            case.update(_run(synthesize, texts, concurrency))
+            report['results'].append(case)
+            print(f"{mode:>7} concurrency {concurrency:>3}: "
+                  f"{case['requests_per_sec'] or 0:7.2f} req/s, "
+                  f"p50 {(case['p50_latency'] or 0) * 1000:8.1f} ms, "
+                  f"p90 {(case['p90_latency'] or 0) * 1000:8.1f} ms, "
+                  f"{case['errors']} errors")
+        pool.close()
+
+    output = args.output or os.path.join(RESULTS_DIR, f"tts-concurrency-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+Time-to-first-audio benchmark for streaming TTS.
+
+Compares the buffered path (tts_pipeline.synthesize: the whole selection
+is synthesized before the response starts) with the streaming path
+(tts_streaming.SpeechStream: audio starts after the first sentence) for
+selections of increasing length. Reports time to first byte and total
+time; the audio cache is emptied before each run.
+
+By default a simulated engine is used whose latency is a fixed per-call
+overhead plus a per-character cost, so results are reproducible and no
+TTS engine or network access is needed. Pass --engine real to measure the
+configured engines instead.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_tts_streaming [--sentences 1 5 20 50]
+                                             [--overhead-ms 150] [--per-char-ms 2]
+                                             [--repeat 3] [--engine fake|real]
+"""
+import os
+import json
+import time
+import wave
+import argparse
+import tempfile
+
+from benchmarks.bench_extraction import _percentile, _git_commit, RESULTS_DIR
+
+SAMPLE_TEXT = (
+    "The quick brown fox jumps over the lazy dog near the riverbank.",
+    "Reading aloud helps listeners follow long documents without strain.",
+    "Each chapter builds on the arguments made in the previous one.",
+    "Figures and tables are described in the surrounding paragraphs.",
+)
+
+
+def make_text(sentences):
+    # Numbered so that no sentence is served from the cache of an earlier one
+    return ' '.join(f"{i + 1}. {SAMPLE_TEXT[i % len(SAMPLE_TEXT)]}" for i in range(sentences))
+
+
+def fake_engine(overhead_s, per_char_s, sample_rate=22050):
+    """Build a write_uncached replacement with a linear latency model."""
+    def write_uncached(fp, text, language, prefer_offline=True, voice_name=None):
+        time.sleep(overhead_s + per_char_s * len(text))
+        frames = int(sample_rate * 0.06 * len(text))  # ~60 ms of audio per character
+        with wave.open(fp, 'wb') as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(sample_rate)
+            w.writeframes(b'\x00\x00' * frames)
+        return '.wav'
+    return write_uncached
+
+
+def run_buffered(text, language):
+    from documents import tts_pipeline
+    start = time.perf_counter()
+    result = tts_pipeline.synthesize(text, language)
+    with result.file as f:
+        first = f.read(64 * 1024)
+        ttfb = time.perf_counter() - start
+        size = len(first) + len(f.read())
+    return ttfb, time.perf_counter() - start, size
+
+
+def run_streaming(text, language):
+    from documents.tts_streaming import SpeechStream
+    start = time.perf_counter()
+    ttfb = None
+    size = 0
+    for chunk in SpeechStream(text, language).start():
+        if ttfb is None:
+            ttfb = time.perf_counter() - start
+        size += len(chunk)
+    return ttfb, time.perf_counter() - start, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark TTS time to first audio")
+    parser.add_argument('--sentences', type=int, nargs='+', default=[1, 5, 20, 50])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--engine', choices=('fake', 'real'), default='fake')
+    parser.add_argument('--overhead-ms', type=float, default=150.0)
+    parser.add_argument('--per-char-ms', type=float, default=2.0)
+    parser.add_argument('--language', default='en')
+    parser.add_argument('--output', help='Result file (default: benchmarks/results/tts-streaming-<commit>.json)')
+    args = parser.parse_args()
+
+    from documents import tts_pipeline
+    from documents.tts_cache import tts_audio_cache
+
+    if args.engine == 'fake':
+        tts_pipeline.write_uncached = fake_engine(args.overhead_ms / 1000, args.per_char_ms / 1000)
+
+    commit = _git_commit()
+    report = {
+        'benchmark': 'tts_streaming',
+        'commit': commit,
+        'engine': args.engine,
+        'repeat': args.repeat,
+        'results': [],
+    }
+    if args.engine == 'fake':
+        report['latency_model'] = {'overhead_ms': args.overhead_ms, 'per_char_ms': args.per_char_ms}
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        tts_audio_cache._root = cache_dir
+        for sentences in args.sentences:
+            text = make_text(sentences)
+            for mode, run in (('buffered', run_buffered), ('streaming', run_streaming)):
+                ttfbs, totals = [], []
+                for _ in range(args.repeat):
+                    tts_audio_cache.clear()
+                    ttfb, total, size = run(text, args.language)
+                    ttfbs.append(ttfb)
+                    totals.append(total)
+                case = {
+                    'mode': mode,
+                    'sentences': sentences,
+                    'chars': len(text),
+                    'audio_bytes': size,
+                    'p50_ttfb': _percentile(ttfbs, 50),
+                    'p90_ttfb': _percentile(ttfbs, 90),
+                    'p50_total': _percentile(totals, 50),
+                }
+                report['results'].append(case)
+                print(f"{mode:>9} {sentences:>4} sentences ({len(text):>5} chars): "
+                      f"first byte {case['p50_ttfb'] * 1000:8.1f} ms, "
+                      f"total {case['p50_total'] * 1000:8.1f} ms")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"tts-streaming-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Compare two benchmark result files.
+
+Matches cases by every key that identifies them (path, kind, pages, ...)
+and prints the relative change of the main metrics. Throughput going down
+or latency/memory going up by more than the threshold is flagged.
+
+Usage (from the backend directory):
+    python -m benchmarks.compare base.json new.json [--threshold 0.1]
+"""
+import json
+import argparse
+
+# Metric name -> (getter, True if higher is better)
+METRICS = {
+    'pages_per_sec': (lambda case: case.get('pages_per_sec'), True),
+    'p50_latency': (lambda case: case.get('latency_s', {}).get('p50'), False),
+    'p90_latency': (lambda case: case.get('latency_s', {}).get('p90'), False),
+    'peak_rss_mb': (lambda case: case.get('peak_rss_mb'), False),
+}
+ID_KEYS = ('path', 'kind', 'pages', 'engine', 'format', 'concurrency', 'mode')
+
+
+def _case_id(case):
+    return tuple((key, case[key]) for key in ID_KEYS if key in case)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument('base')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='Relative change flagged as a regression (default: 0.1 = 10%%)')
+    args = parser.parse_args()
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    print(f"{base.get('commit', '?')} -> {new.get('commit', '?')}")
+    base_cases = {_case_id(case): case for case in base['results'] if case.get('status', 'ok') == 'ok'}
+    regressions = 0
+
+    for case in new['results']:
+        if case.get('status', 'ok') != 'ok':
+            continue
+        case_id = _case_id(case)
+        old = base_cases.get(case_id)
+        if old is None:
+            continue
+
+        changes = []
+        for name, (getter, higher_is_better) in METRICS.items():
+            before, after = getter(old), getter(case)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            worse = -change if higher_is_better else change
+            flag = ' !' if worse > args.threshold else ''
+            regressions += bool(flag)
+            changes.append(f"{name} {change:+.1%}{flag}")
+
+        label = " ".join(str(value) for _, value in case_id)
+        print(f"{label:<40} {', '.join(changes)}")
+
+    print(f"{regressions} regression(s) above {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,161 @@
+"""
+Reproducible synthetic PDF corpus for the extraction benchmarks.
+
+Every document is generated with PyMuPDF from a seeded random generator
+and fixed metadata, so the same name always produces the same file.
+
+Kinds:
+    text          plain single-column text pages
+    image_heavy   short captions with several embedded raster images per page
+    scanned       text pages rasterized into image-only pages (needs OCR)
+    mixed         alternating text, image-heavy and scanned pages
+    multi_column  three-column text with running header and footer
+
+Usage (from the backend directory):
+    python -m benchmarks.corpus [--dir DIR] [--pages 10 100 500 2000] [--kinds text scanned]
+"""
+import os
+import random
+import argparse
+
+import fitz  # PyMuPDF
+
+KINDS = ('text', 'image_heavy', 'scanned', 'mixed', 'multi_column')
+DEFAULT_PAGES = (10, 100, 500, 2000)
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.corpus')
+SEED = 20240501
+
+WORDS = (
+    "reader document page chapter audio voice listen text book note highlight "
+    "summary paragraph sentence engine speech offline online language library "
+    "the a of and to in is that for on with as by at from it this be are was"
+).split()
+
+FIXED_METADATA = {
+    'creator': 'AuraRead benchmark corpus',
+    'producer': 'PyMuPDF',
+    'creationDate': "D:20240101000000+00'00'",
+    'modDate': "D:20240101000000+00'00'",
+}
+
+
+def _paragraph(rng, words=80):
+    text = " ".join(rng.choice(WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + "."
+
+
+def _text_page(doc, rng, page_num):
+    page = doc.new_page()
+    body = "\n\n".join(_paragraph(rng) for _ in range(6))
+    page.insert_textbox(page.rect + (50, 50, -50, -50), f"Section {page_num + 1}\n\n{body}", fontsize=10)
+    return page
+
+
+def _image_page(doc, rng, page_num):
+    page = doc.new_page()
+    page.insert_textbox(fitz.Rect(50, 40, page.rect.width - 50, 90),
+                        f"Figure page {page_num + 1}. {_paragraph(rng, 20)}", fontsize=9)
+    for row in range(3):
+        for col in range(2):
+            # Random RGB noise compresses poorly, like photographs do
+            pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 160, 120), False)
+            pix.set_rect(pix.irect, (rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+            for _ in range(200):
+                x, y = rng.randrange(160), rng.randrange(120)
+                pix.set_pixel(x, y, (rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+            rect = fitz.Rect(60 + col * 250, 110 + row * 230, 290 + col * 250, 310 + row * 230)
+            page.insert_image(rect, pixmap=pix)
+    return page
+
+
+def _scanned_page(doc, rng, page_num):
+    # Render a text page and embed it as a grayscale image, leaving no text layer
+    source = fitz.open()
+    _text_page(source, rng, page_num)
+    pix = source[0].get_pixmap(matrix=fitz.Matrix(1.5, 1.5), colorspace=fitz.csGRAY)
+    source.close()
+    page = doc.new_page()
+    page.insert_image(page.rect, pixmap=pix)
+    return page
+
+
+def _multi_column_page(doc, rng, page_num):
+    page = doc.new_page()
+    width = page.rect.width
+    page.insert_text((50, 35), "AuraRead Benchmark Journal - Volume 1", fontsize=8)
+    column_width = (width - 100 - 2 * 20) / 3
+    for col in range(3):
+        x0 = 50 + col * (column_width + 20)
+        body = "\n\n".join(_paragraph(rng, 40) for _ in range(5))
+        page.insert_textbox(fitz.Rect(x0, 50, x0 + column_width, page.rect.height - 50), body, fontsize=8)
+    page.insert_text((width / 2 - 20, page.rect.height - 25), f"Page {page_num + 1}", fontsize=8)
+    return page
+
+
+PAGE_BUILDERS = {
+    'text': _text_page,
+    'image_heavy': _image_page,
+    'scanned': _scanned_page,
+    'multi_column': _multi_column_page,
+}
+
+
+def generate(kind, pages, path):
+    """
+    Generate one corpus document.
+
+    Args:
+        kind (str): One of KINDS
+        pages (int): Number of pages
+        path (str): Output path
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Unknown corpus kind: {kind}")
+
+    rng = random.Random(f"{SEED}-{kind}-{pages}")
+    doc = fitz.open()
+    mixed_cycle = ('text', 'image_heavy', 'scanned')
+    for page_num in range(pages):
+        page_kind = mixed_cycle[page_num % 3] if kind == 'mixed' else kind
+        PAGE_BUILDERS[page_kind](doc, rng, page_num)
+
+    doc.set_metadata(dict(FIXED_METADATA, title=f"Synthetic {kind} ({pages} pages)"))
+    doc.save(path, garbage=4, deflate=True, no_new_id=True)
+    doc.close()
+
+
+def corpus_path(kind, pages, directory=DEFAULT_DIR):
+    return os.path.join(directory, f"{kind}_{pages}.pdf")
+
+
+def ensure(kind, pages, directory=DEFAULT_DIR):
+    """
+    Get the path of a corpus document, generating it if needed.
+
+    Returns:
+        str: Path to the PDF
+    """
+    path = corpus_path(kind, pages, directory)
+    if not os.path.exists(path):
+        os.makedirs(directory, exist_ok=True)
+        temp_path = path + '.tmp'
+        generate(kind, pages, temp_path)
+        os.replace(temp_path, path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the synthetic benchmark corpus")
+    parser.add_argument('--dir', default=DEFAULT_DIR)
+    parser.add_argument('--pages', type=int, nargs='+', default=list(DEFAULT_PAGES))
+    parser.add_argument('--kinds', nargs='+', default=list(KINDS), choices=KINDS)
+    args = parser.parse_args()
+
+    for kind in args.kinds:
+        for pages in args.pages:
+            path = ensure(kind, pages, args.dir)
+            print(f"{path}: {os.path.getsize(path) / 1024:.0f} KB")
+
+
+if __name__ == '__main__':
+    main()
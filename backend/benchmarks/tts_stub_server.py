@@ -0,0 +1,189 @@
+"""
+Local stand-in for the online TTS providers.
+
+Serves the VoiceRSS API (GET query or POST form, `src` and `hl`
+parameters) and Google Translate's TTS RPC as used by gTTS (POST to any
+path ending in `batchexecute`, audio returned base64 in the RPC response)
+with silent MP3 audio whose length follows the text, after a
+configurable latency. Failures can be injected to exercise the client's
+timeouts and retries: a fraction of requests answered with 503 or 429
+(with Retry-After), or with a VoiceRSS "ERROR" body.
+
+Point the application at it with VOICERSS_API_URL=http://127.0.0.1:8765/
+and GTTS_API_URL=http://127.0.0.1:8765/batchexecute for load runs, or
+start it in-process with StubServer for tests.
+
+Usage (from the backend directory):
+    python -m benchmarks.tts_stub_server [--port 8765] [--latency-ms 100]
+                                         [--per-char-ms 0.5] [--error-rate 0]
+                                         [--rate-limit-rate 0] [--bad-request-rate 0]
+"""
+import json
+import time
+import base64
+import random
+import argparse
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# MPEG-1 Layer III, 128 kbit/s, 44.1 kHz, stereo: 417-byte frames of 1152 samples
+MP3_FRAME = b'\xff\xfb\x90\x00' + b'\x00' * 413
+MP3_FRAME_SECONDS = 1152 / 44100
+
+
+def silent_mp3(seconds):
+    """Build a silent MP3 of about the given duration."""
+    return MP3_FRAME * max(1, int(seconds / MP3_FRAME_SECONDS))
+
+
+class StubConfig:
+    """Behaviour of the stub server."""
+
+    def __init__(self, latency=0.1, per_char=0.0005, error_rate=0.0, rate_limit_rate=0.0,
+                 bad_request_rate=0.0, seconds_per_char=0.06):
+        self.latency = latency
+        self.per_char = per_char
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.bad_request_rate = bad_request_rate
+        self.seconds_per_char = seconds_per_char
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.methods = {}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real providers
+    # Headers and body are written separately; without this, delayed ACKs stall keep-alive clients
+    disable_nagle_algorithm = True
+    config = StubConfig()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _params(self):
+        params = parse_qs(urlparse(self.path).query)
+        if self.command == 'POST':
+            length = int(self.headers.get('Content-Length') or 0)
+            params.update(parse_qs(self.rfile.read(length).decode('utf-8')))
+        return {name: values[0] for name, values in params.items()}
+
+    @staticmethod
+    def _rpc_text(params):
+        """Text of a gTTS RPC request: f.req=[[["jQ1olc", "[text, lang, speed, null]", ...]]]."""
+        try:
+            return json.loads(json.loads(params.get('f.req', ''))[0][0][1])[0]
+        except (ValueError, IndexError, TypeError):
+            return ''
+
+    def _send(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self):
+        config = self.config
+        params = self._params()
+        with config.lock:
+            config.requests += 1
+            config.methods[self.command] = config.methods.get(self.command, 0) + 1
+
+        rpc = urlparse(self.path).path.endswith('batchexecute')
+        text = self._rpc_text(params) if rpc else params.get('src', '')
+        roll = random.random()
+        if roll < config.error_rate:
+            self._send(503, b'Service Unavailable', 'text/plain')
+            return
+        roll -= config.error_rate
+        if roll < config.rate_limit_rate:
+            self._send(429, b'Too Many Requests', 'text/plain', {'Retry-After': '1'})
+            return
+        roll -= config.rate_limit_rate
+        if roll < config.bad_request_rate or not text:
+            if rpc:
+                self._send(400, b'Bad Request', 'text/plain')
+            else:
+                self._send(200, b'ERROR: The text is not specified!', 'text/plain')
+            return
+
+        time.sleep(config.latency + config.per_char * len(text))
+        audio = silent_mp3(config.seconds_per_char * len(text))
+        if rpc:
+            payload = json.dumps([base64.b64encode(audio).decode('ascii')])
+            line = json.dumps([['wrb.fr', 'jQ1olc', payload, None, None, None, 'generic']], separators=(',', ':'))
+            self._send(200, f")]}}'\n\n{len(line)}\n{line}\n".encode('utf-8'), 'application/json; charset=utf-8')
+        else:
+            self._send(200, audio, 'audio/mpeg')
+
+    do_GET = _handle
+    do_POST = _handle
+
+
+class StubServer:
+    """
+    Stub server running in a background thread.
+
+    Usage:
+        with StubServer(latency=0.05) as server:
+            settings.VOICERSS_API_URL = server.url
+    """
+
+    def __init__(self, port=0, **config):
+        handler = type('Handler', (StubHandler,), {'config': StubConfig(**config)})
+        self.config = handler.config
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/"
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub online TTS provider")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=100)
+    parser.add_argument('--per-char-ms', type=float, default=0.5)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction answered with 503')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Fraction answered with 429')
+    parser.add_argument('--bad-request-rate', type=float, default=0.0, help='Fraction answered with an ERROR body')
+    args = parser.parse_args()
+
+    server = StubServer(
+        port=args.port,
+        latency=args.latency_ms / 1000,
+        per_char=args.per_char_ms / 1000,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        bad_request_rate=args.bad_request_rate,
+    )
+    print(f"TTS stub server listening on {server.url} "
+          f"(VOICERSS_API_URL={server.url}, GTTS_API_URL={server.url}batchexecute)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,22 @@
 from django.contrib import admin
-from .models import Document
+from .models import Document, Audiobook, TTSJob
 
 @admin.register(Document)
 class DocumentAdmin(admin.ModelAdmin):
     list_display = ('title', 'user', 'uploaded_at')
     search_fields = ('title',)
     list_filter = ('uploaded_at',)
+
+
+@admin.register(Audiobook)
+class AudiobookAdmin(admin.ModelAdmin):
+    list_display = ('document', 'status', 'segments_done', 'segments_total', 'duration', 'completed_at')
+    list_filter = ('status',)
+    readonly_fields = ('audio_file', 'index_file', 'source', 'error')
+
+
+@admin.register(TTSJob)
+class TTSJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'document', 'status', 'language', 'size', 'cache_hit', 'created_at', 'completed_at')
+    list_filter = ('status',)
+    readonly_fields = ('cache_key', 'error')
@@ -1,13 +1,18 @@
 from rest_framework import serializers
-from documents.models import Document
+from documents.models import Document, Audiobook, TTSJob
+
+# Language codes such as 'en', 'pt-BR' or 'zh_Hant_TW'
+LANGUAGE_CODE = r'^[A-Za-z]{2,3}([-_][A-Za-z0-9]{2,8})*$'
 
 class DocumentSerializer(serializers.ModelSerializer):
     file_url = serializers.SerializerMethodField()
     
     class Meta:
         model = Document
-        fields = ['id', 'title', 'file', 'file_url', 'uploaded_at', 'language']
-        read_only_fields = ['uploaded_at', 'file_url']
+        fields = ['id', 'title', 'file', 'file_url', 'uploaded_at', 'language',
+                  'original_size', 'optimized_size', 'original_open_ms', 'optimized_open_ms', 'optimized_at']
+        read_only_fields = ['uploaded_at', 'file_url',
+                            'original_size', 'optimized_size', 'original_open_ms', 'optimized_open_ms', 'optimized_at']
 
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
@@ -19,3 +24,40 @@ class DocumentSerializer(serializers.ModelSerializer):
             if request:
                 return request.build_absolute_uri(obj.file.url)
         return None
+
+
+class AudiobookSerializer(serializers.ModelSerializer):
+    progress = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = Audiobook
+        fields = ['id', 'document', 'status', 'language', 'voice_name', 'prefer_offline',
+                  'content_type', 'duration', 'segments_total', 'segments_done', 'progress',
+                  'error', 'created_at', 'updated_at', 'completed_at']
+        read_only_fields = fields
+
+
+class AudiobookRequestSerializer(serializers.Serializer):
+    """Options of an audiobook render request."""
+    language = serializers.RegexField(LANGUAGE_CODE, max_length=10, required=False, allow_blank=True)
+    voice_name = serializers.CharField(max_length=255, required=False, allow_blank=True)
+    prefer_offline = serializers.BooleanField(required=False, default=True)
+    force = serializers.BooleanField(required=False, default=False)
+
+
+class TTSJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TTSJob
+        fields = ['id', 'document', 'status', 'text', 'language', 'voice_name', 'prefer_offline', 'audio_format',
+                  'content_type', 'size', 'cache_hit', 'error', 'created_at', 'started_at', 'completed_at']
+        read_only_fields = ['status', 'content_type', 'size', 'cache_hit', 'error',
+                            'created_at', 'started_at', 'completed_at']
+
+
+class TTSJobRequestSerializer(serializers.Serializer):
+    """Options of a TTS job request; the text itself is resolved by the view."""
+    document = serializers.IntegerField()
+    language = serializers.RegexField(LANGUAGE_CODE, max_length=10, required=False, allow_blank=True)
+    voice_name = serializers.CharField(max_length=255, required=False, allow_blank=True)
+    prefer_offline = serializers.BooleanField(required=False, default=True)
+    audio_format = serializers.CharField(max_length=10, required=False, allow_blank=True)
@@ -1,9 +1,10 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from documents.api.views import DocumentViewSet
+from documents.api.views import DocumentViewSet, TTSJobViewSet
 
 router = DefaultRouter()
 router.register(r'documents', DocumentViewSet, basename='document')
+router.register(r'tts-jobs', TTSJobViewSet, basename='tts-job')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -1,18 +1,45 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from django.http import HttpResponse, FileResponse
+from django.http import FileResponse, StreamingHttpResponse
 from django.conf import settings
-from gtts import gTTS
+from django.utils.cache import patch_vary_headers
+from django.utils.http import urlencode
+from django.urls import reverse
 import os
-import tempfile
+import re
+import json
 import logging
 
-from documents.models import Document
-from documents.api.serializers import DocumentSerializer
-from documents.pdf_utils import extract_text_from_pdf, get_pdf_info
-from documents.tts_service import tts_service
+from documents.models import Document, Audiobook, TTSJob
+from ai_features.models import ReadingAnalytics
+from documents.api.serializers import (
+    DocumentSerializer, AudiobookSerializer, AudiobookRequestSerializer, TTSJobSerializer,
+    TTSJobRequestSerializer,
+)
+from documents.pdf_utils import get_pdf_info, ensure_extracted_text
+from documents.extraction_store import extraction_store
 from documents.enhanced_tts_service import enhanced_tts_service
+from documents.tts_engines import TTSDeadlineExceeded
+from documents.tts_health import tts_health
+from documents.tts_http import tts_http
+from documents.tts_rate_limit import tts_rate_limiter
+from documents.pdf_optimizer import start_optimize
+from documents.pdf_cache import pdf_document_cache
+from documents.tts_cache import tts_audio_cache
+from documents import tts_pipeline
+from documents.tts_streaming import stream_speech
+from documents.tts_jobs import submit_job, open_result, job_events
+from documents.tts_marks import synthesize_with_marks, load_marks, marks_token, check_marks_token
+from documents.tts_prefetch import tts_prefetcher
+from documents.tts_text import has_text_reference, resolve_text_reference
+from documents.tts_batch import SpeechBatch
+from documents.time_stretch import normalize_speed
+from documents.transcoding import negotiate_format
+from documents.audiobook import request_audiobook, delete_audiobook, locate, is_stale
+from documents.http_utils import ranged_file_response
+from documents.tts_worker_pool import get_worker_pool
+from documents.conf import get_setting
 
 # Get an instance of a logger
 logger = logging.getLogger(__name__)
@@ -25,6 +52,10 @@ class DocumentViewSet(viewsets.ModelViewSet):
         logger.debug("Getting queryset for user: %s", self.request.user)
         return Document.objects.filter(user=self.request.user)
 
+    def perform_content_negotiation(self, request, force=False):
+        # The tts action negotiates audio formats itself (Accept: audio/ogg, ...)
+        return super().perform_content_negotiation(request, force=force or self.action == 'tts')
+
     def list(self, request, *args, **kwargs):
         try:
             logger.debug("Listing documents for user: %s", request.user)
@@ -54,6 +85,11 @@ class DocumentViewSet(viewsets.ModelViewSet):
             logger.debug("Creating document for user: %s", self.request.user)
             document = serializer.save(user=self.request.user)
             logger.debug("Document created with ID: %s", document.id)
+
+            # Optional ingest stage: write an optimized copy for faster reads, after the response
+            if getattr(settings, 'PDF_OPTIMIZE_ON_UPLOAD', False):
+                start_optimize(document)
+
             return document
         except Exception as e:
             logger.error("Error creating document: %s", str(e), exc_info=True)
@@ -63,6 +99,10 @@ class DocumentViewSet(viewsets.ModelViewSet):
     def extract_text(self, request, pk=None):
         """
         Extract text from a PDF document on demand.
+
+        With the PDF_STRIP_BOILERPLATE setting on, running headers, footers
+        and page numbers are stripped from the returned text; pass ?raw=true
+        to get the text as originally extracted.
         """
         try:
             logger.debug("Extracting text from document with pk: %s", pk)
@@ -75,13 +115,29 @@ class DocumentViewSet(viewsets.ModelViewSet):
                     'error': 'PDF file not found or could not be accessed'
                 }, status=status.HTTP_404_NOT_FOUND)
 
-            # Extract text from the PDF
-            logger.debug("Extracting text from file: %s", document.file.path)
-            extracted_text = extract_text_from_pdf(document.file.path)
+            # Extract text from the PDF into the extraction store (no-op if already stored)
+            logger.debug("Extracting text from file: %s", document.pdf_path)
+            key = str(document.id)
+            meta = ensure_extracted_text(document.pdf_path, key)
+
+            removed_chars = meta.get('boilerplate', {}).get('removed_chars', 0)
+            if request.query_params.get('raw', '').lower() == 'true':
+                return Response({
+                    'text': extraction_store.read_raw(key),
+                    'boilerplate_removed_chars': 0,
+                })
+
+            # Stream very large texts instead of building the whole response in memory
+            if meta['text_bytes'] >= getattr(settings, 'EXTRACTED_TEXT_STREAM_MIN_BYTES', 8 * 1024 * 1024):
+                return StreamingHttpResponse(
+                    self._stream_text_json(key, removed_chars),
+                    content_type='application/json'
+                )
 
             # Return the extracted text
             return Response({
-                'text': extracted_text
+                'text': extraction_store.read(key),
+                'boilerplate_removed_chars': removed_chars,
             })
         except Exception as e:
             logger.error("Error extracting text: %s", str(e), exc_info=True)
@@ -89,32 +145,174 @@ class DocumentViewSet(viewsets.ModelViewSet):
                 'error': f'Error extracting text: {str(e)}'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @staticmethod
+    def _stream_text_json(key, removed_chars=0, chunk_size=64 * 1024):
+        """
+        Yield a {"text": ..., "boilerplate_removed_chars": ...} JSON document
+        from the extraction store in chunks.
+        """
+        yield '{"text": "'
+        with extraction_store.open(key) as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield json.dumps(chunk)[1:-1]
+        yield f'", "boilerplate_removed_chars": {removed_chars}}}'
+
+    @action(detail=True, methods=['get', 'post', 'delete'])
+    def audiobook(self, request, pk=None):
+        """
+        Pre-render the whole document as an audiobook.
+
+        POST queues a background render (optional language, voice_name,
+        prefer_offline and force parameters). GET returns the render status;
+        with ?offset=<char offset into the extracted text> it also returns
+        the audio time and byte offset to start playback from. DELETE
+        removes the audiobook.
+        """
+        try:
+            document = self.get_object()
+
+            if request.method == 'POST':
+                options = AudiobookRequestSerializer(data=request.data)
+                if not options.is_valid():
+                    return Response(options.errors, status=status.HTTP_400_BAD_REQUEST)
+                options = options.validated_data
+                audiobook, queued = request_audiobook(
+                    document,
+                    language=options.get('language', ''),
+                    voice_name=options.get('voice_name', ''),
+                    prefer_offline=options['prefer_offline'],
+                    force=options['force'],
+                )
+                data = AudiobookSerializer(audiobook).data
+                data['queued'] = queued
+                return Response(data, status=status.HTTP_202_ACCEPTED if queued else status.HTTP_200_OK)
+
+            try:
+                audiobook = document.audiobook
+            except Audiobook.DoesNotExist:
+                return Response({'error': 'No audiobook for this document'}, status=status.HTTP_404_NOT_FOUND)
+
+            if request.method == 'DELETE':
+                delete_audiobook(audiobook)
+                return Response(status=status.HTTP_204_NO_CONTENT)
+
+            data = AudiobookSerializer(audiobook).data
+            if audiobook.status == Audiobook.STATUS_COMPLETE:
+                data['stale'] = is_stale(audiobook)
+                offset = request.query_params.get('offset')
+                if offset is not None:
+                    try:
+                        offset = int(offset)
+                    except ValueError:
+                        return Response({'error': 'offset must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+                    data['position'] = locate(audiobook, offset)
+            return Response(data)
+        except Exception as e:
+            logger.error("Error handling audiobook: %s", str(e), exc_info=True)
+            return Response({
+                'error': f'Error handling audiobook: {str(e)}'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=True, methods=['get'])
+    def audiobook_audio(self, request, pk=None):
+        """
+        Serve the rendered audiobook audio. Supports Range requests for seeking.
+        """
+        document = self.get_object()
+        audiobook = Audiobook.objects.filter(document=document, status=Audiobook.STATUS_COMPLETE).first()
+        if audiobook is None or not audiobook.audio_file or not os.path.exists(audiobook.audio_file.path):
+            return Response({'error': 'Audiobook not rendered yet'}, status=status.HTTP_404_NOT_FOUND)
+
+        return ranged_file_response(
+            request,
+            audiobook.audio_file.path,
+            audiobook.content_type,
+            filename=os.path.basename(audiobook.audio_file.name),
+        )
+
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser])
+    def pdf_cache_stats(self, request):
+        """
+        Get hit/miss/eviction metrics of the open-document cache for this process.
+        """
+        return Response(pdf_document_cache.stats())
+
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser])
+    def tts_stats(self, request):
+        """
+        Get TTS performance metrics for this process (audio cache hit rate,
+        bytes saved, offline worker pool utilization, per-engine health,
+        online engine HTTP client and rate limit queues, coalesced identical
+        requests, speculative prefetching).
+        """
+        pool = get_worker_pool()
+        return Response({
+            'cache': tts_audio_cache.stats(),
+            'worker_pool': pool.stats() if pool is not None else None,
+            'engines': tts_health.stats(),
+            'http': tts_http.stats(),
+            'rate_limits': tts_rate_limiter.stats(),
+            'coalescing': tts_pipeline.synthesis_flights.stats(),
+            'prefetch': tts_prefetcher.stats(),
+        })
+
+    @action(detail=False, methods=['get'])
+    def tts_marks(self, request):
+        """
+        Get the timing track of a clip synthesized with marks=true: sentence
+        and word [char start, char end, time start, time end] entries. The
+        track is addressed by content, so it never changes for a key; the
+        token in the X-TTS-Marks link restricts it to the user it was sent to.
+        """
+        key = request.query_params.get('key', '')
+        if not re.fullmatch(r'[0-9a-f]{64}', key):
+            return Response({'error': 'Invalid key'}, status=status.HTTP_400_BAD_REQUEST)
+        if not check_marks_token(key, request.user.pk, request.query_params.get('token')):
+            return Response({'error': 'Timing marks not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        etag = f'"{key}"'
+        if etag in request.headers.get('If-None-Match', ''):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            marks = load_marks(key)
+            if marks is None:
+                return Response({'error': 'Timing marks not found, synthesize the text again'},
+                                status=status.HTTP_404_NOT_FOUND)
+            response = Response(marks)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, max-age=31536000, immutable'
+        return response
+
     @action(detail=False, methods=['get'])
     def available_voices(self, request):
         """
         Get a list of available TTS voices from all engines.
+
+        The list comes from the per-process voice catalog and carries an
+        ETag; a request with a matching If-None-Match gets 304 Not Modified.
+        Staff can pass refresh=true to re-enumerate the installed voices.
         """
         try:
             logger.info("Getting available TTS voices")
 
-            # Try to get voices from the enhanced TTS service first
-            try:
-                voices = enhanced_tts_service.get_available_voices()
-                # Add online voices
-                voices['online'] = [
-                    {'id': 'voicerss_en-us', 'name': 'English (US)', 'language': 'en-us'},
-                    {'id': 'voicerss_en-gb', 'name': 'English (UK)', 'language': 'en-gb'},
-                    {'id': 'voicerss_fr-fr', 'name': 'French', 'language': 'fr-fr'},
-                    {'id': 'voicerss_de-de', 'name': 'German', 'language': 'de-de'},
-                    {'id': 'voicerss_es-es', 'name': 'Spanish', 'language': 'es-es'},
-                    {'id': 'voicerss_it-it', 'name': 'Italian', 'language': 'it-it'},
-                ]
-                logger.info(f"Found {len(voices['windows_sapi'])} Windows SAPI voices, {len(voices['pyttsx3'])} pyttsx3 voices, and {len(voices['online'])} online voices")
-            except Exception as e:
-                logger.warning(f"Enhanced TTS service failed to get voices: {str(e)}, falling back to original TTS service")
-                voices = tts_service.get_available_voices()
+            refresh = request.query_params.get('refresh', '').lower() in ('1', 'true', 'yes')
+            if refresh and request.user.is_staff:
+                catalog = enhanced_tts_service.voice_catalog.refresh()
+            else:
+                catalog = enhanced_tts_service.voice_catalog.get()
 
-            return Response(voices)
+            if_none_match = request.headers.get('If-None-Match', '')
+            etags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+            if catalog.etag in etags or if_none_match.strip() == '*':
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                response = Response(catalog.voices)
+            response['ETag'] = catalog.etag
+            response['Cache-Control'] = f"private, max-age={get_setting('TTS_VOICE_CATALOG_MAX_AGE', 300)}"
+            return response
         except Exception as e:
             logger.error("Error getting available voices: %s", str(e), exc_info=True)
             return Response({
@@ -126,6 +324,29 @@ class DocumentViewSet(viewsets.ModelViewSet):
         """
         Endpoint to convert text to speech.
         Expects 'text' parameter in the request data.
+
+        With stream=true the text is synthesized sentence by sentence and
+        the audio is streamed as each sentence completes, so playback of
+        long selections can start after the first sentence.
+
+        With marks=true the audio is one clip and the X-TTS-Marks header
+        links to its sentence and word timing track (see tts_marks).
+
+        audio_format=opus|mp3 (or an Accept header such as audio/ogg)
+        returns compact mono speech audio instead of the engine's format.
+
+        Instead of 'text', a request can reference the document's extracted
+        text with start_offset/end_offset, or page and optionally
+        sentence_start/sentence_end (see tts_text). The range read is
+        returned in the X-TTS-Text-Start and X-TTS-Text-End headers.
+
+        speed=0.75..2 returns a pitch-preserving speed variant time-stretched
+        from the cached audio (the reader's preferred speed for the document
+        by default); X-TTS-Speed reports the speed served. Marked audio is
+        always at normal speed and in the engine's format, since its timing
+        track is, so marks=true with speed or audio_format is a 400.
+        Streamed audio is joined in the engine's format too, so stream=true
+        with audio_format is a 400 and Accept is ignored for it.
         """
         try:
             logger.info("Converting text to speech for document with pk: %s", pk)
@@ -151,6 +372,42 @@ class DocumentViewSet(viewsets.ModelViewSet):
                 if isinstance(prefer_offline, str):
                     prefer_offline = prefer_offline.lower() == 'true'
 
+            stream = request.data.get('stream', False)
+            if isinstance(stream, str):
+                stream = stream.lower() == 'true'
+
+            marks = request.data.get('marks', False)
+            if isinstance(marks, str):
+                marks = marks.lower() == 'true'
+
+            # Compact output format, by name or from the Accept header
+            audio_format = negotiate_format(request.data.get('audio_format'), request.headers.get('Accept', ''))
+
+            if marks and (request.data.get('speed') not in (None, '') or request.data.get('audio_format')):
+                return Response({'error': 'marks=true returns normal speed audio in the engine format; '
+                                          'speed and audio_format are not supported with it'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            if stream and request.data.get('audio_format'):
+                return Response({'error': 'stream=true returns audio in the engine format; '
+                                          'audio_format is not supported with it'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            if stream or marks:
+                # Sentences are joined in the engine's format, whatever Accept prefers
+                audio_format = None
+
+            try:
+                speed = None if marks else self._requested_speed(request, document)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            # Read referenced text from the stored extraction instead of the request
+            text_range = None
+            if has_text_reference(request.data):
+                try:
+                    text, *text_range = resolve_text_reference(document, request.data)
+                except ValueError as e:
+                    return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
             logger.info("Received text for TTS: %s (length: %d chars)",
                        text[:50] + "..." if len(text) > 50 else text,
                        len(text))
@@ -165,70 +422,82 @@ class DocumentViewSet(viewsets.ModelViewSet):
             logger.info("Using voice name: %s", voice_name)
             logger.info("Prefer offline TTS: %s", prefer_offline)
 
-            # Create a temporary file for the audio
-            temp_filename = None
             try:
                 logger.info("Starting TTS conversion with service...")
 
-                # Try the enhanced TTS service first, fall back to the original if it fails
-                try:
-                    logger.info("Using enhanced TTS service...")
-                    temp_filename = enhanced_tts_service.text_to_speech(
+                # Readers usually continue where this request ends; synthesize the
+                # following text in the background so the next request is a cache hit
+                if get_setting('TTS_PREFETCH_ENABLED', True):
+                    tts_prefetcher.after_request(
+                        request.user.pk, document.pk, text, tts_language, prefer_offline, voice_name,
+                        audio_format=audio_format, per_sentence=stream or marks,
+                    )
+
+                if stream:
+                    # Returns once the first sentence is ready
+                    speech = stream_speech(
                         text=text,
                         language=tts_language,
                         prefer_offline=prefer_offline,
-                        voice_name=voice_name
+                        voice_name=voice_name,
+                        speed=speed
                     )
-                    logger.info("Enhanced TTS conversion successful, generated file: %s", temp_filename)
-                except Exception as e:
-                    logger.warning(f"Enhanced TTS service failed: {str(e)}, falling back to original TTS service")
-                    # Fall back to the original TTS service
-                    temp_filename = tts_service.text_to_speech(
+                    response = StreamingHttpResponse(speech, content_type=speech.content_type)
+                    response['Content-Disposition'] = f'attachment; filename="speech.{speech.extension}"'
+                    response['X-TTS-Segments'] = len(speech.segments)
+                    response['X-TTS-First-Audio-Ms'] = round(speech.time_to_first_audio * 1000)
+                    response['X-TTS-Speed'] = speed or 1.0
+                    self._set_text_range(response, text_range)
+                    return response
+
+                if marks:
+                    # One clip for the whole text, with a sentence and word timing sidecar
+                    result, marks_key = synthesize_with_marks(
                         text=text,
                         language=tts_language,
                         prefer_offline=prefer_offline,
                         voice_name=voice_name
                     )
-                    logger.info("Original TTS conversion successful, generated file: %s", temp_filename)
-
-                # Check that the file exists and has content
-                if not os.path.exists(temp_filename) or os.path.getsize(temp_filename) == 0:
-                    raise Exception("Generated audio file is empty or does not exist")
-
-                # Read the file content
-                with open(temp_filename, 'rb') as f:
-                    file_content = f.read()
-
-                # Clean up the temporary file
-                try:
-                    os.remove(temp_filename)
-                except:
-                    pass
-
-                # Determine content type based on file extension
-                content_type = 'audio/mpeg'
-                if temp_filename.endswith('.wav'):
-                    content_type = 'audio/wav'
-
-                # Return the file content directly
-                response = HttpResponse(
-                    content=file_content,
-                    content_type=content_type
+                    response = FileResponse(result.file, content_type=result.content_type)
+                    response['Content-Length'] = result.size
+                    response['Content-Disposition'] = f'attachment; filename="speech.{result.extension}"'
+                    response['X-TTS-Cache'] = 'hit' if result.cache_hit else ('coalesced' if result.coalesced else 'miss')
+                    response['X-TTS-Marks'] = request.build_absolute_uri(
+                        reverse('document-tts-marks') + '?' + urlencode({
+                            'key': marks_key,
+                            'token': marks_token(marks_key, request.user.pk),
+                        }))
+                    self._set_text_range(response, text_range)
+                    return response
+
+                # Served from the audio cache when the same request was synthesized before
+                result = tts_pipeline.synthesize(
+                    text=text,
+                    language=tts_language,
+                    prefer_offline=prefer_offline,
+                    voice_name=voice_name,
+                    audio_format=audio_format,
+                    speed=speed
                 )
-
-                # Set filename based on content type
-                filename = "speech.mp3" if content_type == 'audio/mpeg' else "speech.wav"
-                response['Content-Disposition'] = f'attachment; filename="{filename}"'
+                logger.info("TTS audio ready (cache %s): %s", 'hit' if result.cache_hit else 'miss', result.key)
+
+                # Stream the cached file; FileResponse closes it when done
+                response = FileResponse(result.file, content_type=result.content_type)
+                response['Content-Length'] = result.size
+                response['Content-Disposition'] = f'attachment; filename="speech.{result.extension}"'
+                response['X-TTS-Cache'] = 'hit' if result.cache_hit else ('coalesced' if result.coalesced else 'miss')
+                response['X-TTS-Speed'] = result.speed or 1.0
+                patch_vary_headers(response, ['Accept'])
+                self._set_text_range(response, text_range)
                 return response
 
             except Exception as e:
                 logger.error("Error in TTS file generation: %s", str(e), exc_info=True)
-                if temp_filename and os.path.exists(temp_filename):
-                    try:
-                        os.remove(temp_filename)
-                        logger.info("Cleaned up temporary file after error: %s", temp_filename)
-                    except Exception as cleanup_error:
-                        logger.error("Failed to clean up temporary file: %s", str(cleanup_error))
+
+                if isinstance(e, TTSDeadlineExceeded):
+                    return Response({
+                        'error': 'Speech generation took too long. Please try again or with a smaller text selection.'
+                    }, status=status.HTTP_504_GATEWAY_TIMEOUT)
 
                 # Check if it's a rate limiting error
                 error_message = str(e)
@@ -256,3 +525,205 @@ class DocumentViewSet(viewsets.ModelViewSet):
                 return Response({
                     'error': f'Error generating speech: {error_message}'
                 }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=True, methods=['post'])
+    def tts_batch(self, request, pk=None):
+        """
+        Convert many snippets to speech in one call.
+
+        Expects 'snippets', a list of texts, and/or 'annotations', a list of
+        annotation ids of this document ("all" for every annotation of the
+        user, in document order). Returns a zip archive with one audio file
+        per snippet and a manifest.json listing each snippet's file, cache
+        status or error (see tts_batch). 'speed' works as for tts.
+        """
+        try:
+            document = self.get_object()
+
+            snippets = request.data.get('snippets') or []
+            annotation_ids = request.data.get('annotations') or []
+            if isinstance(snippets, str) or not isinstance(snippets, list):
+                return Response({'error': 'snippets must be a list of texts'}, status=status.HTTP_400_BAD_REQUEST)
+
+            items = [{'text': str(text)} for text in snippets]
+            annotations = document.annotations.filter(user=request.user)
+            if annotation_ids == 'all':
+                items += [{'text': a.selected_text, 'annotation': a.pk}
+                          for a in annotations.order_by('start_offset', 'pk')]
+            elif annotation_ids:
+                try:
+                    annotation_ids = [int(pk) for pk in annotation_ids]
+                except (TypeError, ValueError):
+                    return Response({'error': 'annotations must be a list of ids or "all"'},
+                                    status=status.HTTP_400_BAD_REQUEST)
+                found = annotations.in_bulk(annotation_ids)
+                missing = [pk for pk in annotation_ids if pk not in found]
+                if missing:
+                    return Response({'error': f'Annotations not found: {missing}'}, status=status.HTTP_404_NOT_FOUND)
+                items += [{'text': found[pk].selected_text, 'annotation': pk} for pk in annotation_ids]
+
+            if not items:
+                return Response({'error': 'No snippets provided'}, status=status.HTTP_400_BAD_REQUEST)
+            max_snippets = get_setting('TTS_BATCH_MAX_SNIPPETS', 100)
+            if len(items) > max_snippets:
+                return Response({'error': f'Too many snippets: {len(items)}, the limit is {max_snippets}'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            max_chars = get_setting('TTS_BATCH_MAX_CHARS', 50000)
+            total_chars = sum(len(item['text']) for item in items)
+            if total_chars > max_chars:
+                return Response({'error': f'The snippets are {total_chars} characters, the limit is {max_chars}'},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+            prefer_offline = request.data.get('prefer_offline', True)
+            if isinstance(prefer_offline, str):
+                prefer_offline = prefer_offline.lower() == 'true'
+
+            try:
+                speed = self._requested_speed(request, document)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            batch = SpeechBatch(
+                items,
+                language=request.data.get('language') or document.language,
+                prefer_offline=prefer_offline,
+                voice_name=request.data.get('voice_name') or None,
+                audio_format=negotiate_format(request.data.get('audio_format')),
+                speed=speed,
+            )
+            logger.info("Batch TTS for document %s: %d snippets, %d chars", document.pk, len(items), total_chars)
+            response = StreamingHttpResponse(batch, content_type='application/zip')
+            response['Content-Disposition'] = 'attachment; filename="speech-batch.zip"'
+            response['X-TTS-Snippets'] = len(items)
+            return response
+        except Exception as e:
+            logger.error("Error in batch TTS: %s", str(e), exc_info=True)
+            return Response({
+                'error': f'Error generating speech: {str(e)}'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @staticmethod
+    def _requested_speed(request, document):
+        """
+        Playback speed of a TTS request: the 'speed' parameter, or the
+        reader's preferred speed for the document.
+
+        Raises:
+            ValueError: If the speed is out of range
+        """
+        speed = request.data.get('speed')
+        if speed in (None, ''):
+            speed = ReadingAnalytics.objects.filter(
+                user=request.user, document=document).values_list('preferred_speed', flat=True).first()
+            try:
+                return normalize_speed(speed)
+            except ValueError:
+                # A stored preference outside the supported range isn't the request's fault
+                return None
+        return normalize_speed(speed)
+
+    @staticmethod
+    def _set_text_range(response, text_range):
+        """Report the stored text range a referenced request read."""
+        if text_range:
+            response['X-TTS-Text-Start'], response['X-TTS-Text-End'] = text_range
+
+
+class TTSJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Asynchronous TTS: POST returns a job id at once (202), then poll the
+    job, or follow its server-sent events, and download the audio.
+    """
+    serializer_class = TTSJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return TTSJob.objects.filter(user=self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        options = TTSJobRequestSerializer(data=request.data)
+        if not options.is_valid():
+            return Response(options.errors, status=status.HTTP_400_BAD_REQUEST)
+        options = options.validated_data
+        try:
+            document = Document.objects.filter(user=request.user, pk=options['document']).first()
+            if document is None:
+                return Response({'error': 'Document not found'}, status=status.HTTP_404_NOT_FOUND)
+
+            text = request.data.get('text', '')
+            if has_text_reference(request.data):
+                try:
+                    text, _, _ = resolve_text_reference(document, request.data)
+                except ValueError as e:
+                    return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            if not text:
+                return Response({'error': 'No text provided'}, status=status.HTTP_400_BAD_REQUEST)
+
+            job = submit_job(
+                user=request.user,
+                document=document,
+                text=text,
+                language=options.get('language') or document.language,
+                prefer_offline=options['prefer_offline'],
+                voice_name=options.get('voice_name') or None,
+                audio_format=negotiate_format(options.get('audio_format')),
+            )
+            logger.info("TTS job %s submitted (%s)", job.pk, job.status)
+            if get_setting('TTS_PREFETCH_ENABLED', True):
+                tts_prefetcher.after_request(
+                    request.user.pk, document.pk, job.text, job.language, job.prefer_offline,
+                    job.voice_name or None, audio_format=job.audio_format or None,
+                )
+            response = Response(self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED)
+            response['Location'] = request.build_absolute_uri(f'{job.pk}/')
+            return response
+        except Exception as e:
+            logger.error("Error submitting TTS job: %s", str(e), exc_info=True)
+            return Response({'error': f'Error submitting TTS job: {str(e)}'},
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    def destroy(self, request, pk=None):
+        """Cancel a job that hasn't started."""
+        job = self.get_object()
+        # Only delete it if no worker has claimed it in the meantime
+        deleted, _ = TTSJob.objects.filter(pk=job.pk, status=TTSJob.STATUS_PENDING).delete()
+        if not deleted:
+            job.refresh_from_db()
+            return Response({'error': f'Job is {job.status}, only pending jobs can be cancelled',
+                             'status': job.status},
+                            status=status.HTTP_409_CONFLICT)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=True, methods=['get'])
+    def events(self, request, pk=None):
+        """
+        Server-sent events for a job: 'status' on each change, then
+        'complete' or 'failed'.
+        """
+        job = self.get_object()
+        response = StreamingHttpResponse(job_events(job), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # don't let a proxy hold back events
+        return response
+
+    @action(detail=True, methods=['get'])
+    def audio(self, request, pk=None):
+        """
+        Download the audio of a completed job.
+        """
+        job = self.get_object()
+        if job.status != TTSJob.STATUS_COMPLETE:
+            return Response({'error': f'Job is {job.status}', 'status': job.status},
+                            status=status.HTTP_409_CONFLICT)
+
+        cached = open_result(job)
+        if cached is None:
+            return Response({'error': 'The audio has expired, submit the job again'},
+                            status=status.HTTP_410_GONE)
+
+        f, content_type, size = cached
+        extension = tts_pipeline.extension_for(content_type)
+        response = FileResponse(f, content_type=content_type)
+        response['Content-Length'] = size
+        response['Content-Disposition'] = f'attachment; filename="speech.{extension}"'
+        return response
@@ -1,6 +1,17 @@
+import os
+import sys
+
 from django.apps import AppConfig
 
 
 class DocumentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'documents'
+
+    def ready(self):
+        import documents.signals  # noqa: F401 (connects the receivers)
+
+        # Servers run jobs queued before a restart; other management commands don't
+        if os.path.basename(sys.argv[0]) != 'manage.py' or sys.argv[1:2] == ['runserver']:
+            from documents.tts_jobs import start_runner
+            start_runner()
@@ -0,0 +1,244 @@
+"""
+Helpers for working with the audio formats produced by the TTS engines
+(WAV from SAPI/pyttsx3/espeak, MP3 from gTTS/VoiceRSS).
+"""
+import struct
+
+
+class AudioFormatError(Exception):
+    """Raised when audio data cannot be parsed."""
+
+
+def parse_wav(data):
+    """
+    Split a RIFF/WAVE file into its format parameters and PCM data.
+
+    Args:
+        data (bytes): WAV file contents
+
+    Returns:
+        tuple: (format dict with channels, sample_rate, bits_per_sample,
+                block_align, byte_rate, audio_format; PCM data as bytes)
+
+    Raises:
+        AudioFormatError: If the data is not a WAV file
+    """
+    if len(data) < 12 or data[:4] != b'RIFF' or data[8:12] != b'WAVE':
+        raise AudioFormatError("Not a WAV file")
+
+    fmt = None
+    pos = 12
+    while pos + 8 <= len(data):
+        chunk_id = data[pos:pos + 4]
+        chunk_size = struct.unpack('<I', data[pos + 4:pos + 8])[0]
+        body = pos + 8
+        if chunk_id == b'fmt ':
+            audio_format, channels, sample_rate, byte_rate, block_align, bits = struct.unpack(
+                '<HHIIHH', data[body:body + 16])
+            fmt = {
+                'audio_format': audio_format,
+                'channels': channels,
+                'sample_rate': sample_rate,
+                'byte_rate': byte_rate,
+                'block_align': block_align,
+                'bits_per_sample': bits,
+            }
+        elif chunk_id == b'data':
+            if fmt is None:
+                raise AudioFormatError("WAV data chunk before fmt chunk")
+            # Streamed WAVs (e.g. espeak writing to a pipe) carry a placeholder size
+            end = len(data) if chunk_size in (0, 0xFFFFFFFF) else min(body + chunk_size, len(data))
+            return fmt, data[body:end]
+        pos = body + chunk_size + (chunk_size & 1)
+
+    raise AudioFormatError("WAV file has no data chunk")
+
+
+def wav_header(fmt, data_size=None):
+    """
+    Build a canonical 44-byte WAV header.
+
+    Args:
+        fmt (dict): Format parameters as returned by parse_wav()
+        data_size (int, optional): PCM data size. When unknown (streaming),
+                                   the maximum size is written, which players
+                                   treat as "read until end of stream".
+
+    Returns:
+        bytes: The header
+    """
+    if data_size is None:
+        riff_size = data_size = 0xFFFFFFFF
+    else:
+        riff_size = 36 + data_size
+    return b'RIFF' + struct.pack('<I', min(riff_size, 0xFFFFFFFF)) + b'WAVE' + b'fmt ' + struct.pack(
+        '<IHHIIHH', 16, fmt['audio_format'], fmt['channels'], fmt['sample_rate'],
+        fmt['byte_rate'], fmt['block_align'], fmt['bits_per_sample'],
+    ) + b'data' + struct.pack('<I', data_size)
+
+
+def same_wav_format(a, b):
+    """Check whether two WAV formats can be concatenated."""
+    keys = ('audio_format', 'channels', 'sample_rate', 'bits_per_sample')
+    return all(a[k] == b[k] for k in keys)
+
+
+def strip_id3(data):
+    """
+    Remove a leading ID3v2 tag from MP3 data, so MP3 segments can be concatenated.
+
+    Args:
+        data (bytes): MP3 data
+
+    Returns:
+        bytes: The MP3 frames
+    """
+    if len(data) >= 10 and data[:3] == b'ID3':
+        size = 0
+        for byte in data[6:10]:
+            size = (size << 7) | (byte & 0x7F)
+        footer = 10 if data[5] & 0x10 else 0
+        return data[10 + size + footer:]
+    return data
+
+
+_MP3_SAMPLE_RATES = {
+    3: (44100, 48000, 32000),  # MPEG 1
+    2: (22050, 24000, 16000),  # MPEG 2
+    0: (11025, 12000, 8000),   # MPEG 2.5
+}
+_MP3_BITRATES = {
+    (True, 3): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 1): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 3): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 1): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+
+
+def _mp3_frame(data, pos):
+    """Parse the MPEG audio frame header at pos; returns (frame length, samples, sample rate) or None."""
+    if pos + 4 > len(data) or data[pos] != 0xFF or (data[pos + 1] & 0xE0) != 0xE0:
+        return None
+    version = (data[pos + 1] >> 3) & 3
+    layer = (data[pos + 1] >> 1) & 3
+    bitrate_index = data[pos + 2] >> 4
+    rate_index = (data[pos + 2] >> 2) & 3
+    padding = (data[pos + 2] >> 1) & 1
+    if version == 1 or layer == 0 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    mpeg1 = version == 3
+    bitrate = _MP3_BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+    sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+    if layer == 3:  # Layer I
+        return (12 * bitrate // sample_rate + padding) * 4, 384, sample_rate
+    samples = 1152 if (layer == 2 or mpeg1) else 576
+    return samples // 8 * bitrate // sample_rate + padding, samples, sample_rate
+
+
+def mp3_duration(data):
+    """
+    Compute the playing time of MP3 data by walking its frames.
+
+    Args:
+        data (bytes): MP3 data, optionally starting with an ID3v2 tag
+
+    Returns:
+        float: Duration in seconds
+    """
+    data = strip_id3(data)
+    duration = 0.0
+    pos = 0
+    while pos + 4 <= len(data):
+        frame = _mp3_frame(data, pos)
+        if frame is None:
+            pos += 1  # resynchronize
+            continue
+        length, samples, sample_rate = frame
+        duration += samples / sample_rate
+        pos += length
+    return duration
+
+
+def audio_duration(data, content_type):
+    """
+    Get the playing time of WAV or MP3 data.
+
+    Args:
+        data (bytes): Audio data
+        content_type (str): 'audio/wav' or 'audio/mpeg'
+
+    Returns:
+        float: Duration in seconds
+    """
+    if content_type == 'audio/wav':
+        fmt, pcm = parse_wav(data)
+        return len(pcm) / fmt['byte_rate'] if fmt['byte_rate'] else 0.0
+    return mp3_duration(data)
+
+
+def patch_wav_sizes(f, start=0):
+    """
+    Fix the size fields of a canonical WAV header written with placeholder sizes.
+
+    Streamed WAV output (e.g. espeak writing to a pipe) cannot fill in the
+    sizes; once all data is in a seekable file they can be patched in place.
+
+    Args:
+        f: Seekable binary file positioned at the end of the WAV data
+        start (int): Offset of the WAV header in the file
+    """
+    end = f.tell()
+    f.seek(start)
+    header = f.read(44)
+    if len(header) == 44 and header[:4] == b'RIFF' and header[8:12] == b'WAVE' and header[36:40] == b'data':
+        size = end - start
+        f.seek(start + 4)
+        f.write(struct.pack('<I', min(size - 8, 0xFFFFFFFF)))
+        f.seek(start + 40)
+        f.write(struct.pack('<I', min(size - 44, 0xFFFFFFFF)))
+    f.seek(end)
+
+
+class AudioWriter:
+    """Appends synthesized segments to one WAV or MP3 file, tracking time and byte offsets."""
+
+    def __init__(self, f):
+        self.f = f
+        self.start = f.tell()
+        self.content_type = None
+        self.wav_format = None
+        self.data_size = 0
+        self.duration = 0.0
+
+    def append(self, content_type, data):
+        """Append a segment; returns the byte offset it starts at."""
+        if self.content_type is None:
+            self.content_type = content_type
+        elif content_type != self.content_type:
+            raise Exception(f"Segment audio is {content_type}, previous segments are {self.content_type}")
+
+        if content_type == 'audio/wav':
+            fmt, pcm = parse_wav(data)
+            if self.wav_format is None:
+                self.wav_format = fmt
+                self.f.write(wav_header(fmt, 0))  # sizes are patched in finish()
+            elif not same_wav_format(fmt, self.wav_format):
+                raise Exception("Segment WAV format differs from the previous segments")
+            offset = self.f.tell()
+            self.f.write(pcm)
+            self.data_size += len(pcm)
+            self.duration += len(pcm) / fmt['byte_rate']
+        else:
+            frames = strip_id3(data)
+            offset = self.f.tell()
+            self.f.write(frames)
+            self.duration += mp3_duration(frames)
+        return offset
+
+    def finish(self):
+        if self.wav_format is not None:
+            self.f.seek(self.start)
+            self.f.write(wav_header(self.wav_format, self.data_size))
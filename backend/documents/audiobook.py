@@ -0,0 +1,345 @@
+"""
+Whole-document audiobook rendering.
+
+A background job reads a document's extracted text from the extraction
+store, splits it into sentences, synthesizes them in parallel through the
+cached TTS pipeline and writes them, in order, into a single audio file.
+Alongside the audio it writes an index mapping character offsets of the
+extracted text to audio time and byte offsets, so playback can start at
+any position with a plain (ranged) file read.
+"""
+import os
+import json
+import time
+import bisect
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from documents import tts_pipeline
+from documents.conf import get_setting
+from documents.models import Audiobook
+from documents.audio_utils import AudioWriter
+from documents.extraction_store import extraction_store
+from documents.pdf_utils import ensure_extracted_text, PAGE_MARKER
+from documents.text_segmentation import split_sentences
+from documents.tts_rate_limit import tts_priority, PRIORITY_BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+_job_executor = None
+_job_lock = threading.Lock()
+
+
+def segment_document(text, max_chars=300):
+    """
+    Split extracted document text into sentence segments, skipping page markers.
+
+    Args:
+        text (str): Extracted text
+        max_chars (int): Maximum segment length
+
+    Returns:
+        list: (start, end) character offsets into text
+    """
+    spans = []
+    start = 0
+    for marker in list(PAGE_MARKER.finditer(text)) + [None]:
+        end = marker.start() if marker else len(text)
+        spans.extend((start + s, start + e) for s, e in split_sentences(text[start:end], max_chars))
+        if marker:
+            start = marker.end()
+    return spans
+
+
+def _audiobook_dir():
+    return os.path.join(settings.MEDIA_ROOT, 'audiobooks')
+
+
+def render_audiobook(audiobook, workers=None):
+    """
+    Render the audio and index of an audiobook.
+
+    Segments are synthesized by a pool of workers but written in document
+    order; at most a few segments per worker are held in memory.
+
+    Args:
+        audiobook (Audiobook): The audiobook to render
+        workers (int, optional): Number of parallel synthesis workers.
+                                 Defaults to the AUDIOBOOK_WORKERS setting.
+
+    Returns:
+        Audiobook: The completed audiobook
+
+    Raises:
+        Exception: If the document has no text or synthesis fails
+    """
+    workers = workers or get_setting('AUDIOBOOK_WORKERS', 4)
+    document = audiobook.document
+    key = str(document.id)
+
+    meta = ensure_extracted_text(document.pdf_path, key)
+    text = extraction_store.read(key)
+    spans = segment_document(text, get_setting('TTS_STREAM_SEGMENT_CHARS', 300))
+    if not spans:
+        raise Exception("Document has no text to render")
+
+    Audiobook.objects.filter(pk=audiobook.pk).update(
+        status=Audiobook.STATUS_RUNNING, segments_total=len(spans), segments_done=0, error='')
+    logger.info(f"Rendering audiobook for document {document.id}: {len(spans)} segments, {workers} workers")
+
+    directory = _audiobook_dir()
+    os.makedirs(directory, exist_ok=True)
+    temp_path = os.path.join(directory, f"{key}.{os.getpid()}.{threading.get_ident()}.part")
+    index = []
+    started = time.perf_counter()
+    last_progress = started
+
+    def synthesize(span):
+        # Online providers serve interactive requests first
+        with tts_priority(PRIORITY_BACKGROUND):
+            return tts_pipeline.synthesize_bytes(
+                text[span[0]:span[1]], audiobook.language, audiobook.prefer_offline, audiobook.voice_name or None)
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='audiobook-segment')
+    try:
+        with open(temp_path, 'wb') as f:
+            writer = AudioWriter(f)
+            window = workers * 2
+            futures = [executor.submit(synthesize, span) for span in spans[:window]]
+            for i, (start, end) in enumerate(spans):
+                if i + window < len(spans):
+                    futures.append(executor.submit(synthesize, spans[i + window]))
+                content_type, data, _ = futures[i].result()
+                futures[i] = None
+
+                time_start = writer.duration
+                byte_start = writer.append(content_type, data)
+                index.append([start, end, round(time_start, 3), round(writer.duration, 3), byte_start])
+
+                now = time.perf_counter()
+                if now - last_progress >= 2:
+                    Audiobook.objects.filter(pk=audiobook.pk).update(segments_done=i + 1)
+                    last_progress = now
+            writer.finish()
+
+        ext = 'wav' if writer.content_type == 'audio/wav' else 'mp3'
+        audio_name = f"audiobooks/{key}.{ext}"
+        index_name = f"audiobooks/{key}.index.json"
+        os.replace(temp_path, os.path.join(settings.MEDIA_ROOT, audio_name))
+
+        index_data = {
+            'content_type': writer.content_type,
+            'duration': writer.duration,
+            'segments': index,  # [char start, char end, time start, time end, byte start]
+        }
+        if writer.wav_format is not None:
+            index_data['wav'] = {
+                'data_offset': 44,
+                'byte_rate': writer.wav_format['byte_rate'],
+                'block_align': writer.wav_format['block_align'],
+            }
+        index_path = os.path.join(settings.MEDIA_ROOT, index_name)
+        with open(index_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(index_data, f)
+        os.replace(index_path + '.tmp', index_path)
+    finally:
+        # Don't synthesize the rest of the book after a failure
+        executor.shutdown(wait=True, cancel_futures=True)
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    # Remove audio of a previous render in the other format
+    if audiobook.audio_file and audiobook.audio_file.name != audio_name:
+        try:
+            os.remove(audiobook.audio_file.path)
+        except OSError:
+            pass
+
+    audiobook.audio_file.name = audio_name
+    audiobook.index_file.name = index_name
+    audiobook.content_type = writer.content_type
+    audiobook.duration = writer.duration
+    audiobook.source = {'source': meta.get('source'), 'text_bytes': meta.get('text_bytes')}
+    audiobook.segments_total = len(spans)
+    audiobook.segments_done = len(spans)
+    audiobook.status = Audiobook.STATUS_COMPLETE
+    audiobook.error = ''
+    audiobook.completed_at = timezone.now()
+    audiobook.save()
+
+    logger.info(f"Audiobook for document {document.id} rendered in {time.perf_counter() - started:.1f} s "
+                f"({writer.duration:.0f} s of audio)")
+    return audiobook
+
+
+def _run_job(audiobook_id):
+    """Render an audiobook in a background thread, recording failures on the model."""
+    close_old_connections()
+    try:
+        audiobook = Audiobook.objects.select_related('document').get(pk=audiobook_id)
+        render_audiobook(audiobook)
+    except Exception as e:
+        logger.error(f"Audiobook rendering failed for {audiobook_id}: {str(e)}", exc_info=True)
+        Audiobook.objects.filter(pk=audiobook_id).update(status=Audiobook.STATUS_FAILED, error=str(e))
+    finally:
+        close_old_connections()
+
+
+def start_render(audiobook):
+    """
+    Queue an audiobook for rendering in a background thread of this process.
+
+    Args:
+        audiobook (Audiobook): A saved audiobook
+    """
+    global _job_executor
+    with _job_lock:
+        if _job_executor is None:
+            _job_executor = ThreadPoolExecutor(
+                max_workers=get_setting('AUDIOBOOK_CONCURRENT_JOBS', 1),
+                thread_name_prefix='audiobook',
+            )
+    _job_executor.submit(_run_job, audiobook.pk)
+
+
+def is_stale(audiobook):
+    """Check whether the document text changed since the audiobook was rendered."""
+    meta = extraction_store.get_meta(str(audiobook.document_id))
+    if meta is None:
+        return False  # not extracted in this store yet; nothing to compare against
+    return audiobook.source != {'source': meta.get('source'), 'text_bytes': meta.get('text_bytes')}
+
+
+def request_audiobook(document, language=None, voice_name='', prefer_offline=True, force=False):
+    """
+    Get the audiobook of a document, queueing a render if needed.
+
+    A render is queued when there is no audiobook yet, when the previous
+    render failed, when the voice settings changed or when force is set.
+
+    Args:
+        document (Document): The document
+        language (str, optional): Language code. Defaults to the document language.
+        voice_name (str): Specific voice id
+        prefer_offline (bool): Whether to prefer offline TTS engines
+        force (bool): Re-render a complete audiobook
+
+    Returns:
+        tuple: (Audiobook, whether a render was queued)
+    """
+    language = language or document.language
+    voice_name = voice_name or ''
+    audiobook, created = Audiobook.objects.get_or_create(
+        document=document,
+        defaults={'language': language, 'voice_name': voice_name, 'prefer_offline': prefer_offline},
+    )
+    if not created:
+        if audiobook.status in (Audiobook.STATUS_PENDING, Audiobook.STATUS_RUNNING) and not force:
+            return audiobook, False
+        same_voice = (audiobook.language, audiobook.voice_name, audiobook.prefer_offline) == \
+            (language, voice_name, prefer_offline)
+        if audiobook.status == Audiobook.STATUS_COMPLETE and same_voice and not force:
+            return audiobook, False
+        audiobook.language = language
+        audiobook.voice_name = voice_name
+        audiobook.prefer_offline = prefer_offline
+        audiobook.status = Audiobook.STATUS_PENDING
+        audiobook.segments_done = 0
+        audiobook.error = ''
+        audiobook.save()
+
+    start_render(audiobook)
+    return audiobook, True
+
+
+def remove_audiobook_files(audiobook):
+    """Remove the rendered audio and offset index of an audiobook from disk."""
+    for field in (audiobook.audio_file, audiobook.index_file):
+        if field:
+            try:
+                os.remove(field.path)
+            except OSError:
+                pass
+
+
+def delete_audiobook(audiobook):
+    """Delete an audiobook and its rendered files (removed by the post_delete receiver)."""
+    audiobook.delete()
+
+
+_index_cache = {}
+_index_cache_lock = threading.Lock()
+
+
+def load_index(audiobook):
+    """
+    Load the offset index of a rendered audiobook.
+
+    Returns:
+        dict: The index, or None if the audiobook has not been rendered
+    """
+    if not audiobook.index_file:
+        return None
+    path = audiobook.index_file.path
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+
+    with _index_cache_lock:
+        cached = _index_cache.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+    with open(path, 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    index['starts'] = [segment[0] for segment in index['segments']]
+    with _index_cache_lock:
+        if len(_index_cache) >= 64:
+            _index_cache.clear()
+        _index_cache[path] = (mtime, index)
+    return index
+
+
+def locate(audiobook, offset):
+    """
+    Find the audio position of a character offset in the extracted text.
+
+    Within a segment the time is interpolated linearly. For WAV the byte
+    offset is exact; for MP3 it is the start of the segment's first frame.
+
+    Args:
+        audiobook (Audiobook): A rendered audiobook
+        offset (int): Character offset into the extracted text
+
+    Returns:
+        dict: time (seconds), byte_offset and the [start, end] offsets of the
+              segment, or None if the audiobook has not been rendered
+    """
+    index = load_index(audiobook)
+    if not index or not index['segments']:
+        return None
+
+    position = max(bisect.bisect_right(index['starts'], offset) - 1, 0)
+    char_start, char_end, time_start, time_end, byte_start = index['segments'][position]
+    fraction = 0.0
+    if char_end > char_start:
+        fraction = min(max((offset - char_start) / (char_end - char_start), 0.0), 1.0)
+    seconds = time_start + (time_end - time_start) * fraction
+
+    byte_offset = byte_start
+    wav = index.get('wav')
+    if wav:
+        blocks = int((seconds - time_start) * wav['byte_rate']) // wav['block_align']
+        byte_offset = byte_start + blocks * wav['block_align']
+
+    return {
+        'time': round(seconds, 3),
+        'byte_offset': byte_offset,
+        'segment': [char_start, char_end],
+    }
@@ -0,0 +1,241 @@
+"""
+Detection and removal of running headers, footers and page numbers.
+
+Lines near the top or bottom of a page that repeat, at the same position,
+on a large share of the pages are treated as boilerplate. Lines are compared
+by a normalized signature (case-folded, digits replaced by '#', so that
+"Chapter 3 - page 47" matches "Chapter 3 - page 48") embedded as hashed
+character trigram vectors, so near-identical variants are matched with
+one matrix product instead of pairwise string comparisons.
+"""
+import re
+import bisect
+import logging
+import zlib
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_DIGITS = re.compile(r'\d+')
+_SPACES = re.compile(r'\s+')
+
+
+def line_signature(line):
+    """Normalize a line for cross-page comparison."""
+    return _SPACES.sub(' ', _DIGITS.sub('#', line)).strip().lower()
+
+
+def _trigram_vectors(signatures, dims):
+    """Embed signatures as L2-normalized hashed character trigram count vectors."""
+    vectors = np.zeros((len(signatures), dims), dtype=np.float32)
+    for row, signature in enumerate(signatures):
+        padded = f"  {signature} "
+        for i in range(len(padded) - 2):
+            vectors[row, zlib.crc32(padded[i:i + 3].encode('utf-8')) % dims] += 1.0
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class BoilerplateDetector:
+    """
+    Collects the top and bottom lines of every page and finds the repeated ones.
+
+    Feed pages with add_page() while extracting, then call detect().
+    """
+
+    def __init__(self, zone_fraction=0.1, zone_lines=2, min_page_fraction=0.3, min_pages=3,
+                 similarity=0.85, y_tolerance=0.02, dims=256, chunk_size=1024):
+        """
+        Initialize the detector.
+
+        Args:
+            zone_fraction (float): Height of the top/bottom zones as a fraction of the page
+            zone_lines (int): Number of lines per zone considered on each page
+            min_page_fraction (float): Share of pages a line must repeat on
+            min_pages (int): Minimum number of pages a line must repeat on
+            similarity (float): Cosine similarity above which two lines match
+            y_tolerance (float): Allowed vertical position difference, as a fraction of the page
+            dims (int): Size of the hashed trigram vectors
+            chunk_size (int): Rows of the similarity matrix computed at once
+        """
+        self.zone_fraction = zone_fraction
+        self.zone_lines = zone_lines
+        self.min_page_fraction = min_page_fraction
+        self.min_pages = min_pages
+        self.similarity = similarity
+        self.y_tolerance = y_tolerance
+        self.dims = dims
+        self.chunk_size = chunk_size
+
+        self.page_count = 0
+        # Candidate lines: (page, zone, line text, normalized y position)
+        self._candidates = []
+
+    def add_page(self, page_num, page_height, blocks):
+        """
+        Record the candidate lines of a page.
+
+        Args:
+            page_num (int): Zero-based page index
+            page_height (float): Page height
+            blocks (list): Output of page.get_text("blocks")
+        """
+        self.page_count = max(self.page_count, page_num + 1)
+        if not page_height:
+            return
+
+        top, bottom = [], []
+        for x0, y0, x1, y1, text, block_no, block_type in blocks:
+            if block_type != 0:
+                continue
+            lines = [line for line in text.split('\n') if line.strip()]
+            if not lines:
+                continue
+            if y0 / page_height <= self.zone_fraction:
+                top.extend((line, y0 / page_height) for line in lines)
+            elif y1 / page_height >= 1 - self.zone_fraction:
+                bottom.extend((line, y1 / page_height) for line in lines)
+
+        for line, y in top[:self.zone_lines]:
+            self._candidates.append((page_num, 'top', line, y))
+        for line, y in bottom[-self.zone_lines:]:
+            self._candidates.append((page_num, 'bottom', line, y))
+
+    def detect(self):
+        """
+        Find the boilerplate lines.
+
+        Returns:
+            dict: Page index -> list of (zone, line text) to remove
+        """
+        result = {}
+        if self.page_count < self.min_pages or not self._candidates:
+            return result
+
+        threshold = max(self.min_pages, self.min_page_fraction * self.page_count)
+
+        for zone in ('top', 'bottom'):
+            candidates = [c for c in self._candidates if c[1] == zone and line_signature(c[2])]
+            if not candidates:
+                continue
+
+            # Group identical (signature, position bucket) pairs into units
+            keys = [(line_signature(c[2]), int(round(c[3] / self.y_tolerance))) for c in candidates]
+            unit_index = {}
+            unit_of = np.empty(len(candidates), dtype=np.int64)
+            for i, key in enumerate(keys):
+                unit_of[i] = unit_index.setdefault(key, len(unit_index))
+            units = list(unit_index)
+
+            # Number of distinct pages each unit appears on
+            pages = np.array([c[0] for c in candidates], dtype=np.int64)
+            unique_pairs = np.unique(np.stack([unit_of, pages], axis=1), axis=0)
+            page_counts = np.bincount(unique_pairs[:, 0], minlength=len(units)).astype(np.float32)
+
+            vectors = _trigram_vectors([u[0] for u in units], self.dims)
+            buckets = np.array([u[1] for u in units], dtype=np.int64)
+
+            # Support of a unit = pages carrying any similar unit at a similar height
+            support = np.empty(len(units), dtype=np.float32)
+            for start in range(0, len(units), self.chunk_size):
+                end = start + self.chunk_size
+                similar = vectors[start:end] @ vectors.T >= self.similarity
+                similar &= np.abs(buckets[start:end, None] - buckets[None, :]) <= 1
+                support[start:end] = similar.astype(np.float32) @ page_counts
+
+            is_boilerplate = support >= threshold
+            for i, candidate in enumerate(candidates):
+                if is_boilerplate[unit_of[i]]:
+                    result.setdefault(candidate[0], []).append((zone, candidate[2]))
+
+        logger.debug(f"Boilerplate detected on {len(result)} of {self.page_count} pages")
+        return result
+
+
+def strip_lines(text, lines):
+    """
+    Remove boilerplate lines from a page's text.
+
+    Top-zone lines are matched from the start of the page and bottom-zone
+    lines from the end; each match is removed with its line break.
+
+    Args:
+        text (str): Page text
+        lines (list): (zone, line text) pairs from BoilerplateDetector.detect()
+
+    Returns:
+        tuple: (stripped text, list of (offset in the original text, removed text))
+    """
+    parts = text.split('\n')
+    remove = set()
+    for zone, line in lines:
+        indices = range(len(parts)) if zone == 'top' else range(len(parts) - 1, -1, -1)
+        for i in indices:
+            if i not in remove and parts[i] == line:
+                remove.add(i)
+                break
+
+    kept = []
+    removed = []
+    pos = 0
+    for i, part in enumerate(parts):
+        chunk = part + '\n' if i < len(parts) - 1 else part
+        if i in remove:
+            removed.append((pos, chunk))
+        else:
+            kept.append(chunk)
+        pos += len(chunk)
+    return "".join(kept), removed
+
+
+class OffsetMap:
+    """
+    Maps offsets in stripped text back to the raw extracted text and vice versa.
+    """
+
+    def __init__(self, spans):
+        """
+        Args:
+            spans (list): Sorted [raw offset, removed text] pairs
+        """
+        self.spans = spans
+        self._raw_starts = []
+        self._clean_starts = []
+        self._removed_before = [0]
+        removed = 0
+        for raw_start, chunk in spans:
+            self._raw_starts.append(raw_start)
+            self._clean_starts.append(raw_start - removed)
+            removed += len(chunk)
+            self._removed_before.append(removed)
+
+    @property
+    def removed_chars(self):
+        return self._removed_before[-1]
+
+    def to_raw(self, offset):
+        """Convert an offset in the stripped text to an offset in the raw text."""
+        return offset + self._removed_before[bisect.bisect_right(self._clean_starts, offset)]
+
+    def to_clean(self, offset):
+        """Convert an offset in the raw text to an offset in the stripped text."""
+        index = bisect.bisect_right(self._raw_starts, offset) - 1
+        if index < 0:
+            return offset
+        raw_start, chunk = self.spans[index]
+        # Offsets inside a removed span map to where the span was removed
+        if offset < raw_start + len(chunk):
+            return self._clean_starts[index]
+        return offset - self._removed_before[index + 1]
+
+    def restore(self, text):
+        """Rebuild the raw text from the stripped text."""
+        parts = []
+        last = 0
+        for clean_start, (raw_start, chunk) in zip(self._clean_starts, self.spans):
+            parts.append(text[last:clean_start])
+            parts.append(chunk)
+            last = clean_start
+        parts.append(text[last:])
+        return "".join(parts)
@@ -0,0 +1,25 @@
+"""
+Access to the documents app's settings.
+"""
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+
+def get_setting(name, default):
+    """
+    Read a Django setting, falling back to the default.
+
+    Also works outside a configured Django project (e.g. in the benchmark
+    scripts), where every setting takes its default value.
+
+    Args:
+        name (str): Setting name
+        default: Value to use when the setting is missing
+
+    Returns:
+        The setting value or the default
+    """
+    try:
+        return getattr(settings, name, default)
+    except ImproperlyConfigured:
+        return default
@@ -11,6 +11,8 @@ import cv2
 import numpy as np
 from typing import Dict, List, Tuple, Optional
 
+from documents.pdf_cache import pdf_document_cache
+
 logger = logging.getLogger(__name__)
 
 
@@ -32,44 +34,43 @@ class EnhancedPDFProcessor:
     def extract_text_with_coordinates(self, pdf_path: str) -> Dict:
         """Extract text with coordinate information for better positioning"""
         try:
-            doc = fitz.open(pdf_path)
-            pages_data = []
+            with pdf_document_cache.open(pdf_path) as doc:
+                pages_data = []
 
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
+                for page_num in range(len(doc)):
+                    page = doc.load_page(page_num)
                 
-                # Get text with coordinates
-                text_dict = page.get_text("dict")
-                blocks = []
+                    # Get text with coordinates
+                    text_dict = page.get_text("dict")
+                    blocks = []
                 
-                for block in text_dict["blocks"]:
-                    if "lines" in block:  # Text block
-                        block_text = ""
-                        for line in block["lines"]:
-                            for span in line["spans"]:
-                                block_text += span["text"]
+                    for block in text_dict["blocks"]:
+                        if "lines" in block:  # Text block
+                            block_text = ""
+                            for line in block["lines"]:
+                                for span in line["spans"]:
+                                    block_text += span["text"]
                         
-                        blocks.append({
-                            "text": block_text,
-                            "bbox": block["bbox"],  # [x0, y0, x1, y1]
-                            "type": "text"
-                        })
-                    else:  # Image block
-                        blocks.append({
-                            "bbox": block["bbox"],
-                            "type": "image"
-                        })
-
-                pages_data.append({
-                    "page_number": page_num + 1,
-                    "blocks": blocks,
-                    "page_size": page.rect
-                })
-
-            doc.close()
+                            blocks.append({
+                                "text": block_text,
+                                "bbox": block["bbox"],  # [x0, y0, x1, y1]
+                                "type": "text"
+                            })
+                        else:  # Image block
+                            blocks.append({
+                                "bbox": block["bbox"],
+                                "type": "image"
+                            })
+
+                    pages_data.append({
+                        "page_number": page_num + 1,
+                        "blocks": blocks,
+                        "page_size": page.rect
+                    })
+
             return {
                 "pages": pages_data,
-                "total_pages": len(doc),
+                "total_pages": len(pages_data),
                 "extraction_method": "pymupdf_with_coordinates"
             }
 
@@ -83,47 +84,46 @@ class EnhancedPDFProcessor:
             return {"error": "OCR not available"}
 
         try:
-            doc = fitz.open(pdf_path)
-            pages_text = []
+            with pdf_document_cache.open(pdf_path) as doc:
+                pages_text = []
 
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
+                for page_num in range(len(doc)):
+                    page = doc.load_page(page_num)
                 
-                # Convert page to image
-                mat = fitz.Matrix(2, 2)  # 2x zoom for better OCR
-                pix = page.get_pixmap(matrix=mat)
-                img_data = pix.tobytes("png")
+                    # Convert page to image
+                    mat = fitz.Matrix(2, 2)  # 2x zoom for better OCR
+                    pix = page.get_pixmap(matrix=mat)
+                    img_data = pix.tobytes("png")
                 
-                # OCR with PIL and pytesseract
-                img = Image.open(io.BytesIO(img_data))
+                    # OCR with PIL and pytesseract
+                    img = Image.open(io.BytesIO(img_data))
                 
-                # Enhance image for better OCR
-                img_cv = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
-                gray = cv2.cvtColor(img_cv, cv2.COLOR_BGR2GRAY)
+                    # Enhance image for better OCR
+                    img_cv = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
+                    gray = cv2.cvtColor(img_cv, cv2.COLOR_BGR2GRAY)
                 
-                # Apply image preprocessing
-                _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+                    # Apply image preprocessing
+                    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
                 
-                # OCR configuration
-                config = '--oem 3 --psm 6'  # Use LSTM OCR Engine Mode with uniform text block
+                    # OCR configuration
+                    config = '--oem 3 --psm 6'  # Use LSTM OCR Engine Mode with uniform text block
                 
-                # Extract text
-                ocr_text = pytesseract.image_to_string(
-                    Image.fromarray(binary), 
-                    lang=lang, 
-                    config=config
-                )
-
-                pages_text.append({
-                    "page_number": page_num + 1,
-                    "text": ocr_text,
-                    "confidence": self._calculate_ocr_confidence(binary, lang, config)
-                })
-
-            doc.close()
+                    # Extract text
+                    ocr_text = pytesseract.image_to_string(
+                        Image.fromarray(binary), 
+                        lang=lang, 
+                        config=config
+                    )
+
+                    pages_text.append({
+                        "page_number": page_num + 1,
+                        "text": ocr_text,
+                        "confidence": self._calculate_ocr_confidence(binary, lang, config)
+                    })
+
             return {
                 "pages": pages_text,
-                "total_pages": len(doc),
+                "total_pages": len(pages_text),
                 "extraction_method": "ocr",
                 "language": lang
             }
@@ -151,23 +151,22 @@ class EnhancedPDFProcessor:
     def detect_document_type(self, pdf_path: str) -> str:
         """Detect if document is text-based or scanned"""
         try:
-            doc = fitz.open(pdf_path)
+            with pdf_document_cache.open(pdf_path) as doc:
             
-            # Check first few pages
-            text_ratio = 0
-            pages_to_check = min(3, len(doc))
+                # Check first few pages
+                text_ratio = 0
+                pages_to_check = min(3, len(doc))
             
-            for i in range(pages_to_check):
-                page = doc.load_page(i)
-                text = page.get_text().strip()
-                images = page.get_images()
+                for i in range(pages_to_check):
+                    page = doc.load_page(i)
+                    text = page.get_text().strip()
+                    images = page.get_images()
                 
-                if len(text) > 500:  # Substantial text content
-                    text_ratio += 1
-                elif len(images) > 0:  # Has images, likely scanned
-                    text_ratio -= 0.5
+                    if len(text) > 500:  # Substantial text content
+                        text_ratio += 1
+                    elif len(images) > 0:  # Has images, likely scanned
+                        text_ratio -= 0.5
 
-            doc.close()
             
             if text_ratio > pages_to_check * 0.5:
                 return "text_based"
@@ -0,0 +1,222 @@
+"""
+Direct espeak-ng text-to-speech engine.
+
+On Linux pyttsx3 is a wrapper around espeak that renders to a temporary
+file. This engine runs the espeak-ng (or espeak) binary directly and reads
+the WAV data from its stdout, so audio goes into the cache or the response
+without touching a temporary file. Each synthesis is its own process, so
+any number can run concurrently (bounded by ESPEAK_MAX_PROCESSES).
+"""
+import os
+import shutil
+import logging
+import threading
+import subprocess
+
+from documents.conf import get_setting
+
+logger = logging.getLogger(__name__)
+
+
+class EspeakEngine:
+    """
+    Runs espeak-ng as a subprocess per synthesis.
+    """
+
+    def __init__(self, binary=None, max_processes=None, timeout=60):
+        """
+        Initialize the engine.
+
+        Args:
+            binary (str, optional): espeak-ng executable. Defaults to espeak-ng
+                                    (or espeak) found on the PATH.
+            max_processes (int, optional): Maximum concurrent espeak processes.
+                                           Defaults to the number of CPUs.
+            timeout (float): Seconds a synthesis may take
+        """
+        self.binary = binary or shutil.which('espeak-ng') or shutil.which('espeak')
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_processes or os.cpu_count() or 2)
+        self._voices = None
+        self._voices_lock = threading.Lock()
+
+    @property
+    def available(self):
+        return self.binary is not None
+
+    def get_voices(self):
+        """
+        List the installed espeak voices.
+
+        Returns:
+            list: Voice dicts with id, name, language and gender
+        """
+        if not self.available:
+            return []
+        with self._voices_lock:
+            if self._voices is None:
+                voices = []
+                try:
+                    output = subprocess.run(
+                        [self.binary, '--voices'], capture_output=True, timeout=10, check=True,
+                    ).stdout.decode('utf-8', errors='replace')
+                    # Pty Language Age/Gender VoiceName File Other Languages
+                    for line in output.splitlines()[1:]:
+                        parts = line.split()
+                        if len(parts) < 5:
+                            continue
+                        voices.append({
+                            'id': parts[4],
+                            'name': parts[3].replace('_', ' '),
+                            'language': parts[1].lower(),
+                            'gender': parts[2].split('/')[-1],
+                        })
+                except (OSError, subprocess.SubprocessError) as e:
+                    logger.error(f"Error listing espeak voices: {str(e)}")
+                self._voices = voices
+            return self._voices
+
+    def resolve_voice(self, language=None, voice_name=None):
+        """
+        Pick the espeak voice for a request.
+
+        A voice_name that is an espeak voice (file, name or language) wins;
+        otherwise the language code is used, falling back to a voice of the
+        same base language (e.g. 'pt' for 'pt-br') and then to English.
+
+        Returns:
+            str: Value for espeak's -v option
+        """
+        voices = self.get_voices()
+        if voice_name:
+            for voice in voices:
+                if voice_name in (voice['id'], voice['name'], voice['language']):
+                    return voice['id']
+
+        languages = {voice['language'] for voice in voices}
+        language = (language or 'en').lower().replace('_', '-')
+        if not languages or language in languages:
+            return language
+        base = language.split('-')[0]
+        if base in languages:
+            return base
+        for candidate in sorted(languages):
+            if candidate.split('-')[0] == base:
+                return candidate
+        return 'en'
+
+    def _command(self, language, voice_name, rate):
+        command = [self.binary, '--stdout', '--stdin', '-b', '1',
+                   '-v', self.resolve_voice(language, voice_name)]
+        if rate:
+            command += ['-s', str(int(rate))]
+        return command
+
+    def synthesize(self, text, language=None, voice_name=None, rate=None):
+        """
+        Synthesize text to WAV bytes.
+
+        Args:
+            text (str): The text to convert to speech
+            language (str, optional): Language code
+            voice_name (str, optional): espeak voice
+            rate (int, optional): Words per minute (espeak default is 175)
+
+        Returns:
+            bytes: WAV data
+
+        Raises:
+            Exception: If espeak is not installed or fails
+        """
+        if not self.available:
+            raise Exception("espeak-ng is not installed")
+
+        with self._slots:
+            try:
+                result = subprocess.run(
+                    self._command(language, voice_name, rate),
+                    input=text.encode('utf-8'),
+                    capture_output=True,
+                    timeout=self.timeout,
+                )
+            except subprocess.TimeoutExpired:
+                raise Exception(f"espeak timed out after {self.timeout} s")
+
+        if result.returncode != 0 or not result.stdout:
+            error = result.stderr.decode('utf-8', errors='replace').strip()
+            raise Exception(f"espeak failed (exit code {result.returncode}): {error}")
+        return result.stdout
+
+    def iter_synthesize(self, text, language=None, voice_name=None, rate=None, chunk_size=16 * 1024,
+                        timeout=None):
+        """
+        Synthesize text, yielding WAV data as espeak produces it.
+
+        The WAV header comes first and carries a placeholder size, as
+        espeak cannot seek on a pipe. espeak is killed if it runs longer
+        than the timeout (the engine's timeout by default).
+
+        Yields:
+            bytes: Chunks of WAV data
+
+        Raises:
+            Exception: If espeak is not installed or fails
+        """
+        if not self.available:
+            raise Exception("espeak-ng is not installed")
+        if timeout is None:
+            timeout = self.timeout
+
+        with self._slots:
+            process = subprocess.Popen(
+                self._command(language, voice_name, rate),
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            )
+
+            # Feed stdin from a thread so a long text can't deadlock against a full stdout pipe
+            def feed():
+                try:
+                    process.stdin.write(text.encode('utf-8'))
+                    process.stdin.close()
+                except OSError:
+                    pass
+            threading.Thread(target=feed, daemon=True).start()
+            timed_out = threading.Event()
+
+            def kill():
+                timed_out.set()
+                process.kill()
+            killer = threading.Timer(timeout, kill)
+            killer.daemon = True
+            killer.start()
+
+            produced = False
+            try:
+                while True:
+                    chunk = process.stdout.read1(chunk_size)
+                    if not chunk:
+                        break
+                    produced = True
+                    yield chunk
+                process.wait(timeout=timeout)
+            finally:
+                killer.cancel()
+                if process.poll() is None:
+                    process.kill()
+                    process.wait()
+                process.stdout.close()
+                stderr = process.stderr.read()
+                process.stderr.close()
+
+        if timed_out.is_set():
+            raise Exception(f"espeak timed out after {timeout:.1f} s")
+        if process.returncode != 0 or not produced:
+            error = stderr.decode('utf-8', errors='replace').strip()
+            raise Exception(f"espeak failed (exit code {process.returncode}): {error}")
+
+
+# Create a singleton instance
+espeak_engine = EspeakEngine(
+    binary=get_setting('ESPEAK_BINARY', '') or None,
+    max_processes=get_setting('ESPEAK_MAX_PROCESSES', 0) or None,
+)
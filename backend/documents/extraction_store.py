@@ -0,0 +1,186 @@
+"""
+On-disk store for extracted document text.
+
+Extracted text is written once per source file and served from disk on
+later requests instead of re-running extraction. Each entry is a UTF-8
+text file plus a small JSON sidecar recording the source file it was
+extracted from, so that a replaced or re-optimized PDF is re-extracted.
+"""
+import os
+import json
+import logging
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from documents.boilerplate import OffsetMap
+
+logger = logging.getLogger(__name__)
+
+
+def source_fingerprint(pdf_path):
+    """
+    Identify a version of a source file.
+
+    Args:
+        pdf_path (str): Path to the source PDF
+
+    Returns:
+        dict: Modification time and size of the file
+    """
+    stat = os.stat(pdf_path)
+    return {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+
+class ExtractionStore:
+    """
+    File-based store of extracted text, keyed by an arbitrary string (the document id).
+    """
+
+    def __init__(self, root=None):
+        """
+        Initialize the store.
+
+        Args:
+            root (str, optional): Directory for stored text.
+                                  Defaults to MEDIA_ROOT/extracted.
+        """
+        self._root = root
+
+    @property
+    def root(self):
+        if self._root is None:
+            self._root = os.path.join(settings.MEDIA_ROOT, 'extracted')
+        return self._root
+
+    def text_path(self, key):
+        return os.path.join(self.root, f"{key}.txt")
+
+    def meta_path(self, key):
+        return os.path.join(self.root, f"{key}.json")
+
+    def get_meta(self, key):
+        """
+        Get the metadata of a stored entry.
+
+        Returns:
+            dict: Entry metadata, or None if there is no entry
+        """
+        try:
+            with open(self.meta_path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def is_fresh(self, key, pdf_path, **expected):
+        """
+        Check whether the stored entry was extracted from the current version of the source file.
+
+        Args:
+            key (str): Entry key
+            pdf_path (str): Source file
+            **expected: Metadata values the entry must have (e.g. extraction options)
+        """
+        meta = self.get_meta(key)
+        if meta is None or not os.path.exists(self.text_path(key)):
+            return False
+        if any(meta.get(name) != value for name, value in expected.items()):
+            return False
+        return meta.get('source') == source_fingerprint(pdf_path)
+
+    def read(self, key):
+        """
+        Read the stored text.
+
+        Returns:
+            str: The stored text, or None if there is no entry
+        """
+        try:
+            with open(self.text_path(key), 'r', encoding='utf-8', newline='') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def open(self, key):
+        """Open the stored text for incremental reading."""
+        return open(self.text_path(key), 'r', encoding='utf-8', newline='')
+
+    def offset_map(self, key):
+        """
+        Get the mapping between the stored text and the raw extracted text.
+
+        Returns:
+            OffsetMap: Mapping built from the removed boilerplate spans
+        """
+        meta = self.get_meta(key) or {}
+        return OffsetMap(meta.get('boilerplate', {}).get('spans', []))
+
+    def read_raw(self, key):
+        """
+        Read the text as originally extracted, with any stripped boilerplate restored.
+
+        Returns:
+            str: The raw text, or None if there is no entry
+        """
+        text = self.read(key)
+        if text is None:
+            return None
+        return self.offset_map(key).restore(text)
+
+    @contextmanager
+    def writer(self, key, pdf_path, **meta):
+        """
+        Context manager yielding a text file to write an entry incrementally.
+
+        The entry only becomes visible when the with-block completes without
+        error; a failed extraction leaves any previous entry in place.
+
+        Args:
+            key (str): Entry key
+            pdf_path (str): Source file the text is extracted from
+            **meta: Extra metadata to record in the sidecar
+
+        Yields:
+            file: Text file opened for writing
+        """
+        os.makedirs(self.root, exist_ok=True)
+        text_path = self.text_path(key)
+        temp_path = f"{text_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        source = source_fingerprint(pdf_path)
+
+        try:
+            with open(temp_path, 'w', encoding='utf-8', newline='') as f:
+                yield f
+            os.replace(temp_path, text_path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+        meta.update({
+            'source': source,
+            'text_bytes': os.path.getsize(text_path),
+        })
+        self.write_meta(key, meta)
+        logger.debug(f"Stored extracted text for {key}: {meta['text_bytes']} bytes")
+
+    def write_meta(self, key, meta):
+        temp_path = f"{self.meta_path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(temp_path, self.meta_path(key))
+
+    def delete(self, key):
+        """Remove a stored entry."""
+        for path in (self.text_path(key), self.meta_path(key)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+# Create a singleton instance
+extraction_store = ExtractionStore()
@@ -0,0 +1,68 @@
+"""
+HTTP helpers for serving media files.
+"""
+import os
+import re
+
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _iter_file_range(path, start, length, chunk_size=64 * 1024):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def ranged_file_response(request, path, content_type, filename=None):
+    """
+    Serve a file, honouring a single-range Range header so players can seek.
+
+    Args:
+        request: The request
+        path (str): File to serve
+        content_type (str): Content type of the file
+        filename (str, optional): Download name for Content-Disposition
+
+    Returns:
+        HttpResponse: 200 with the whole file, 206 with the requested range,
+                      or 416 if the range cannot be satisfied
+    """
+    size = os.path.getsize(path)
+    match = _RANGE.match(request.META.get('HTTP_RANGE', '').strip())
+
+    if match is None or match.groups() == ('', ''):
+        # No range, or one we don't support (multiple ranges): send the whole file
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+        response['Content-Length'] = size
+    else:
+        first, last = match.groups()
+        if first == '':
+            # Suffix range: the last N bytes
+            start = max(size - int(last), 0)
+            end = size - 1
+        else:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+
+        if start >= size or start > end:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+        length = end - start + 1
+        response = StreamingHttpResponse(
+            _iter_file_range(path, start, length), status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = length
+
+    response['Accept-Ranges'] = 'bytes'
+    if filename:
+        response['Content-Disposition'] = f'inline; filename="{filename}"'
+    return response
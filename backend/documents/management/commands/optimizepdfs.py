@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from documents.models import Document
+from documents.pdf_optimizer import optimize_document
+
+class Command(BaseCommand):
+    help = 'Writes optimized copies of uploaded PDFs and records the size and open-time savings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('ids', nargs='*', type=int, help='Document IDs (default: all not yet optimized)')
+        parser.add_argument('--force', action='store_true', help='Re-optimize documents that already have a copy')
+
+    def handle(self, *args, **options):
+        documents = Document.objects.all()
+        if options['ids']:
+            documents = documents.filter(id__in=options['ids'])
+        elif not options['force']:
+            documents = documents.filter(optimized_at__isnull=True)
+
+        for document in documents:
+            try:
+                result = optimize_document(document)
+                saved = result['original_size'] - result['optimized_size']
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"[OK] {document.title}: {saved} bytes saved, "
+                        f"open {result['original_open_ms']:.1f} -> {result['optimized_open_ms']:.1f} ms"
+                    )
+                )
+            except Exception as e:
+                self.stdout.write(
+                    self.style.ERROR(f'[ERROR] {document.title}: {e}')
+                )
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from documents.models import Document, Audiobook
+from documents.audiobook import render_audiobook
+
+class Command(BaseCommand):
+    help = 'Renders whole documents as audiobooks with a character offset to audio time index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('ids', nargs='*', type=int, help='Document IDs (default: all pending or failed audiobooks)')
+        parser.add_argument('--force', action='store_true', help='Re-render audiobooks that are already complete')
+        parser.add_argument('--workers', type=int, help='Parallel synthesis workers')
+        parser.add_argument('--language', help='Language code (default: the document language)')
+        parser.add_argument('--voice', default='', help='Voice id')
+        parser.add_argument('--online', action='store_true', help='Prefer online TTS engines')
+
+    def handle(self, *args, **options):
+        if options['ids']:
+            for document in Document.objects.filter(id__in=options['ids']):
+                audiobook, created = Audiobook.objects.get_or_create(document=document)
+                if created or options['force'] or audiobook.status != Audiobook.STATUS_COMPLETE:
+                    audiobook.language = options['language'] or document.language
+                    audiobook.voice_name = options['voice']
+                    audiobook.prefer_offline = not options['online']
+                    audiobook.status = Audiobook.STATUS_PENDING
+                    audiobook.save()
+            audiobooks = Audiobook.objects.filter(document_id__in=options['ids'])
+        else:
+            # Includes renders interrupted by a server restart
+            audiobooks = Audiobook.objects.exclude(status=Audiobook.STATUS_COMPLETE)
+
+        if not options['force']:
+            audiobooks = audiobooks.exclude(status=Audiobook.STATUS_COMPLETE)
+
+        for audiobook in audiobooks.select_related('document'):
+            title = audiobook.document.title
+            try:
+                render_audiobook(audiobook, workers=options['workers'])
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"[OK] {title}: {audiobook.segments_total} segments, {audiobook.duration:.0f} s of audio"
+                    )
+                )
+            except Exception as e:
+                Audiobook.objects.filter(pk=audiobook.pk).update(status=Audiobook.STATUS_FAILED, error=str(e))
+                self.stdout.write(
+                    self.style.ERROR(f'[ERROR] {title}: {e}')
+                )
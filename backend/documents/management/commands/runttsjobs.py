@@ -0,0 +1,53 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from documents.conf import get_setting
+from documents.models import TTSJob
+from documents.tts_jobs import run_job, requeue_stale_jobs
+
+class Command(BaseCommand):
+    help = 'Runs queued TTS jobs (use with TTS_JOB_RUNNER=external; start as many workers as needed)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Jobs synthesized in parallel by this process')
+        parser.add_argument('--poll', type=float, default=0.5, help='Seconds between checks for new jobs')
+        parser.add_argument('--stale-after', type=int, default=get_setting('TTS_JOB_STALE_AFTER', 600),
+                            help='Requeue jobs left running this many seconds (e.g. by a killed worker)')
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty')
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        self.stdout.write(f"Running TTS jobs with {workers} workers")
+
+        def run(job_id):
+            close_old_connections()
+            try:
+                run_job(job_id)
+            finally:
+                close_old_connections()
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tts-job') as executor:
+            running = set()
+            while True:
+                running = {future for future in running if not future.done()}
+
+                requeued = requeue_stale_jobs(options['stale_after'])
+                if requeued:
+                    self.stdout.write(self.style.WARNING(f"Requeued {requeued} stale jobs"))
+
+                free = workers - len(running)
+                job_ids = []
+                if free > 0:
+                    job_ids = list(TTSJob.objects.filter(status=TTSJob.STATUS_PENDING)
+                                   .order_by('created_at').values_list('id', flat=True)[:free])
+                for job_id in job_ids:
+                    # run_job claims the job, so several worker processes can share the queue
+                    running.add(executor.submit(run, job_id))
+
+                if not job_ids:
+                    if options['once'] and not running:
+                        break
+                    time.sleep(options['poll'])
@@ -0,0 +1,43 @@
+# Generated by Django 5.0.3 on 2026-10-19 13:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0002_remove_document_extracted_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='optimized_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='optimized_file',
+            field=models.FileField(blank=True, null=True, upload_to='documents/optimized/'),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='optimized_open_ms',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='optimized_size',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='original_open_ms',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='original_size',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
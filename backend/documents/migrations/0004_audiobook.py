@@ -0,0 +1,36 @@
+# Generated by Django 5.0.3 on 2026-10-19 14:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0003_document_optimized_file'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Audiobook',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('complete', 'Complete'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('language', models.CharField(default='en', max_length=10)),
+                ('voice_name', models.CharField(blank=True, max_length=255)),
+                ('prefer_offline', models.BooleanField(default=True)),
+                ('audio_file', models.FileField(blank=True, null=True, upload_to='audiobooks/')),
+                ('index_file', models.FileField(blank=True, null=True, upload_to='audiobooks/')),
+                ('content_type', models.CharField(blank=True, max_length=50)),
+                ('duration', models.FloatField(blank=True, null=True)),
+                ('source', models.JSONField(blank=True, default=dict)),
+                ('segments_total', models.IntegerField(default=0)),
+                ('segments_done', models.IntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('document', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='audiobook', to='documents.document')),
+            ],
+        ),
+    ]
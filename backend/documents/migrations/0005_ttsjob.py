@@ -0,0 +1,40 @@
+# Generated by Django 5.0.3 on 2026-10-19 14:18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0004_audiobook'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TTSJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('complete', 'Complete'), ('failed', 'Failed')], db_index=True, default='pending', max_length=10)),
+                ('text', models.TextField()),
+                ('language', models.CharField(default='en', max_length=10)),
+                ('voice_name', models.CharField(blank=True, max_length=255)),
+                ('prefer_offline', models.BooleanField(default=True)),
+                ('cache_key', models.CharField(db_index=True, max_length=64)),
+                ('content_type', models.CharField(blank=True, max_length=50)),
+                ('size', models.BigIntegerField(blank=True, null=True)),
+                ('cache_hit', models.BooleanField(default=False)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tts_jobs', to='documents.document')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tts_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.3 on 2026-10-19 14:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0005_ttsjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ttsjob',
+            name='audio_format',
+            field=models.CharField(blank=True, max_length=10),
+        ),
+    ]
@@ -1,3 +1,4 @@
+import os
 from django.db import models
 from django.contrib.auth.models import User
 
@@ -8,5 +9,111 @@ class Document(models.Model):
     uploaded_at = models.DateTimeField(auto_now_add=True)
     language = models.CharField(max_length=10, default='en')
 
+    # Optimized (garbage-collected, compressed) copy used for server-side reads.
+    # The original upload in `file` is kept untouched for download.
+    optimized_file = models.FileField(upload_to='documents/optimized/', blank=True, null=True)
+    original_size = models.BigIntegerField(null=True, blank=True)
+    optimized_size = models.BigIntegerField(null=True, blank=True)
+    original_open_ms = models.FloatField(null=True, blank=True)
+    optimized_open_ms = models.FloatField(null=True, blank=True)
+    optimized_at = models.DateTimeField(null=True, blank=True)
+
     def __str__(self):
         return self.title
+
+    @property
+    def pdf_path(self):
+        """Path of the file to read from: the optimized copy if present, else the original."""
+        if self.optimized_file and os.path.exists(self.optimized_file.path):
+            return self.optimized_file.path
+        return self.file.path
+
+
+class Audiobook(models.Model):
+    """Pre-rendered audio of a whole document, with an index from text offsets to audio time."""
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETE = 'complete'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_COMPLETE, 'Complete'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    document = models.OneToOneField(Document, on_delete=models.CASCADE, related_name='audiobook')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    language = models.CharField(max_length=10, default='en')
+    voice_name = models.CharField(max_length=255, blank=True)
+    prefer_offline = models.BooleanField(default=True)
+
+    # Rendered audio and its index (JSON: segment char offsets -> audio time and byte offsets)
+    audio_file = models.FileField(upload_to='audiobooks/', blank=True, null=True)
+    index_file = models.FileField(upload_to='audiobooks/', blank=True, null=True)
+    content_type = models.CharField(max_length=50, blank=True)
+    duration = models.FloatField(null=True, blank=True)
+
+    # Extraction store entry the audio was rendered from
+    source = models.JSONField(default=dict, blank=True)
+
+    segments_total = models.IntegerField(default=0)
+    segments_done = models.IntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Audiobook for {self.document.title} ({self.status})"
+
+    @property
+    def progress(self):
+        """Fraction of segments synthesized."""
+        if not self.segments_total:
+            return 1.0 if self.status == self.STATUS_COMPLETE else 0.0
+        return self.segments_done / self.segments_total
+
+
+class TTSJob(models.Model):
+    """A text-to-speech request synthesized in the background; the audio lives in the TTS cache."""
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETE = 'complete'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_COMPLETE, 'Complete'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tts_jobs')
+    document = models.ForeignKey(Document, on_delete=models.CASCADE, related_name='tts_jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True)
+    text = models.TextField()
+    language = models.CharField(max_length=10, default='en')
+    voice_name = models.CharField(max_length=255, blank=True)
+    prefer_offline = models.BooleanField(default=True)
+    audio_format = models.CharField(max_length=10, blank=True)  # compact format, or blank for the engine's
+
+    # Audio cache entry holding the result
+    cache_key = models.CharField(max_length=64, db_index=True)
+    content_type = models.CharField(max_length=50, blank=True)
+    size = models.BigIntegerField(null=True, blank=True)
+    cache_hit = models.BooleanField(default=False)
+
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"TTS job {self.pk} ({self.status})"
+
+    @property
+    def finished(self):
+        return self.status in (self.STATUS_COMPLETE, self.STATUS_FAILED)
@@ -0,0 +1,212 @@
+"""
+Per-process cache of open PyMuPDF documents.
+
+Opening a PDF parses its xref table, which is wasted work when a reader is
+paging through the same book and every request re-opens the file. This
+module keeps recently used fitz.Document handles open, keyed by path,
+modification time and size so that a replaced file is never served stale.
+"""
+import os
+import threading
+import logging
+from collections import OrderedDict
+from contextlib import contextmanager
+import fitz  # PyMuPDF
+
+from documents.conf import get_setting
+
+logger = logging.getLogger(__name__)
+
+
+class _CacheEntry:
+    """An open document plus the bookkeeping needed to share it between threads."""
+
+    def __init__(self, key, doc, size):
+        self.key = key
+        self.doc = doc
+        self.size = size
+        # fitz.Document is not thread-safe, so callers using the same
+        # document take turns; different documents are used concurrently.
+        self.lock = threading.RLock()
+        self.users = 0
+        self.evicted = False
+
+
+class PDFDocumentCache:
+    """
+    Thread-safe LRU cache of open fitz.Document handles.
+
+    The cache is bounded both by the number of open documents and by an
+    estimate of their memory use (the file size). Documents that are still
+    in use when evicted are closed once the last user releases them.
+    """
+
+    def __init__(self, max_documents=16, max_bytes=256 * 1024 * 1024):
+        """
+        Initialize the cache.
+
+        Args:
+            max_documents (int): Maximum number of open documents
+            max_bytes (int): Maximum total size of the open documents
+        """
+        self.max_documents = max_documents
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._total_bytes = 0
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _make_key(pdf_path):
+        path = os.path.abspath(pdf_path)
+        stat = os.stat(path)
+        return (path, stat.st_mtime_ns, stat.st_size)
+
+    @contextmanager
+    def open(self, pdf_path):
+        """
+        Context manager yielding an open fitz.Document for the given path.
+
+        The document must not be closed by the caller and must not be used
+        outside the with-block.
+
+        Args:
+            pdf_path (str): Path to the PDF file
+
+        Yields:
+            fitz.Document: The open document
+        """
+        key = self._make_key(pdf_path)
+
+        # Documents larger than the whole budget are opened without caching
+        if key[2] > self.max_bytes:
+            doc = fitz.open(key[0])
+            try:
+                yield doc
+            finally:
+                doc.close()
+            return
+
+        entry = self._acquire(key)
+        try:
+            with entry.lock:
+                yield entry.doc
+        finally:
+            self._release(entry)
+
+    def _acquire(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                entry.users += 1
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        # Open outside the lock so a slow parse doesn't block other documents
+        doc = fitz.open(key[0])
+        new_entry = _CacheEntry(key, doc, key[2])
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                # Another thread opened the same file meanwhile; use theirs
+                doc.close()
+                self._entries.move_to_end(key)
+                entry.users += 1
+                return entry
+
+            # Drop handles for older versions of the same file
+            for stale_key in [k for k in self._entries if k[0] == key[0]]:
+                self._remove(stale_key)
+                self.invalidations += 1
+
+            new_entry.users = 1
+            self._entries[key] = new_entry
+            self._total_bytes += new_entry.size
+            self._evict()
+            return new_entry
+
+    def _release(self, entry):
+        with self._lock:
+            entry.users -= 1
+            close = entry.evicted and entry.users == 0
+        if close:
+            self._close(entry)
+
+    def _evict(self):
+        """Evict least recently used documents until the cache is within bounds. Caller holds the lock."""
+        while self._entries and (len(self._entries) > self.max_documents
+                                 or self._total_bytes > self.max_bytes):
+            key = next(iter(self._entries))
+            entry = self._entries[key]
+            self.evictions += 1
+            self.evicted_bytes += entry.size
+            logger.debug(f"Evicting cached PDF handle: {key[0]}")
+            self._remove(key)
+
+    def _remove(self, key):
+        """Remove an entry, closing it now or when its last user releases it. Caller holds the lock."""
+        entry = self._entries.pop(key)
+        self._total_bytes -= entry.size
+        entry.evicted = True
+        if entry.users == 0:
+            self._close(entry)
+
+    @staticmethod
+    def _close(entry):
+        with entry.lock:
+            try:
+                entry.doc.close()
+            except Exception as e:
+                logger.warning(f"Error closing cached PDF {entry.key[0]}: {str(e)}")
+
+    def invalidate(self, pdf_path):
+        """Drop any cached handle for the given path (e.g. before deleting the file)."""
+        path = os.path.abspath(pdf_path)
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == path]:
+                self._remove(key)
+                self.invalidations += 1
+
+    def clear(self):
+        """Close all cached documents."""
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+    def stats(self):
+        """
+        Get cache metrics.
+
+        Returns:
+            dict: Hit/miss/eviction counters and current occupancy
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'documents': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_documents': self.max_documents,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'evicted_bytes': self.evicted_bytes,
+                'invalidations': self.invalidations,
+            }
+
+
+# Create a singleton instance
+pdf_document_cache = PDFDocumentCache(
+    max_documents=get_setting('PDF_CACHE_MAX_DOCUMENTS', 16),
+    max_bytes=get_setting('PDF_CACHE_MAX_BYTES', 256 * 1024 * 1024),
+)
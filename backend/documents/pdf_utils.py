@@ -3,14 +3,75 @@ Utility functions for working with PDF files.
 """
 import os
 import io
+import re
+import mmap
 import subprocess
 import tempfile
 import fitz  # PyMuPDF
 import logging
+from contextlib import contextmanager
+
+from documents.conf import get_setting
+from documents.pdf_cache import pdf_document_cache
+from documents.extraction_store import extraction_store
+from documents.boilerplate import BoilerplateDetector, strip_lines
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# Lines of the extracted text that iter_pdf_text() writes around the page texts:
+# "--- Page N ---" separators (PAGE_HEADER captures N) and an empty title line.
+# They are not read aloud.
+PAGE_MARKER = re.compile(r'^(?:--- Page \d+ ---|Title:[ \t]*)$', re.MULTILINE)
+PAGE_HEADER = re.compile(r'--- Page (\d+) ---')
+
+def iter_pdf_text(doc, pdf_path, detector=None):
+    """
+    Yield the extracted text of an open PDF piece by piece.
+
+    The pieces joined together form the text returned by
+    extract_text_from_pdf(): a title line followed by every page's text
+    under a "--- Page N ---" marker. Annotation offsets refer to this
+    layout, so every extraction path must produce it unchanged.
+
+    Args:
+        doc (fitz.Document): The open PDF document
+        pdf_path (str): Path to the PDF file (used for the fallback title)
+        detector (BoilerplateDetector, optional): Fed with each page's text blocks
+
+    Yields:
+        str: Consecutive pieces of the extracted text
+    """
+    # Extract metadata
+    metadata = doc.metadata
+    title = metadata.get('title', os.path.basename(pdf_path))
+
+    # Start with the title
+    yield f"Title: {title}\n\n"
+
+    # Extract text from each page
+    for page_num in range(len(doc)):
+        page = doc.load_page(page_num)
+
+        # Get text with layout preservation, then drop the page so it can be freed
+        if detector is not None:
+            # Share one text page between the plain text and the positioned blocks
+            textpage = page.get_textpage()
+            text = page.get_text("text", textpage=textpage)
+            detector.add_page(page_num, page.rect.height, page.get_text("blocks", textpage=textpage))
+            textpage = None
+        else:
+            text = page.get_text("text")
+        page = None
+
+        # Add page number and text
+        yield f"--- Page {page_num + 1} ---\n\n{text}\n\n"
+
+        # Extract images if needed (commented out for now)
+        # images = page.get_images(full=True)
+        # if images:
+        #     yield f"[This page contains {len(images)} image(s)]\n\n"
+
 def extract_text_from_pdf(pdf_path):
     """
     Extract text from a PDF file using PyMuPDF (fitz).
@@ -39,43 +100,171 @@ def extract_text_from_pdf(pdf_path):
                 logger.error(f"Invalid PDF file: {pdf_path}")
                 return "Invalid PDF file"
 
-        # Open the PDF file with PyMuPDF
-        doc = fitz.open(pdf_path)
-        logger.info(f"PDF opened successfully. Pages: {len(doc)}")
+        # Open the PDF file with PyMuPDF (reusing a cached handle if available)
+        with pdf_document_cache.open(pdf_path) as doc:
+            logger.info(f"PDF opened successfully. Pages: {len(doc)}")
+            full_text = "".join(iter_pdf_text(doc, pdf_path))
 
-        # Extract metadata
-        metadata = doc.metadata
-        title = metadata.get('title', os.path.basename(pdf_path))
+        logger.info(f"Text extraction completed. Extracted {len(full_text)} characters")
+        return full_text
+
+    except Exception as e:
+        logger.error(f"Error extracting text: {str(e)}", exc_info=True)
+        return f"Error extracting text: {str(e)}"
 
-        # Start with the title
-        full_text = f"Title: {title}\n\n"
+@contextmanager
+def open_pdf_mmap(pdf_path):
+    """
+    Open a PDF through a read-only memory map instead of reading it into memory.
 
-        # Extract text from each page
-        for page_num in range(len(doc)):
-            page = doc.load_page(page_num)
+    The mapped pages live in the OS page cache, so worker processes reading
+    the same large file share one copy of it.
 
-            # Get text with layout preservation
-            text = page.get_text("text")
+    Args:
+        pdf_path (str): Path to the PDF file
+
+    Yields:
+        fitz.Document: The open document
+    """
+    with open(pdf_path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+    doc = None
+    try:
+        doc = fitz.open(stream=view, filetype='pdf')
+        yield doc
+    finally:
+        if doc is not None:
+            doc.close()
+            doc.stream = None
+        view.release()
+        mapped.close()
+
+def extract_text_to_store(pdf_path, key, store=None, bounded=False, shrink_every=50,
+                          strip_boilerplate=False):
+    """
+    Extract text from a PDF and write it to the extraction store page by page.
 
-            # Add page number and text
-            full_text += f"--- Page {page_num + 1} ---\n\n"
-            full_text += text
-            full_text += "\n\n"
+    The output has the layout of extract_text_from_pdf(), but the full text
+    is never held in memory. In bounded mode the file is opened through a
+    memory map rather than the shared handle cache, and MuPDF's resource
+    store (fonts, images) is emptied periodically, so peak memory stays
+    flat regardless of the number of pages.
 
-            # Extract images if needed (commented out for now)
-            # images = page.get_images(full=True)
-            # if images:
-            #     full_text += f"[This page contains {len(images)} image(s)]\n\n"
+    With strip_boilerplate, running headers, footers and page numbers are
+    removed from the stored text. The raw text is first spooled to a
+    temporary file while the header/footer candidates are collected, then
+    copied to the store page by page with the detected lines removed. The
+    removed spans are recorded in the entry metadata so that offsets can be
+    mapped back to the raw text (see ExtractionStore.offset_map()).
 
-        # Close the document
-        doc.close()
+    Args:
+        pdf_path (str): Path to the PDF file
+        key (str): Extraction store key (the document id)
+        store (ExtractionStore, optional): Store to write to. Defaults to extraction_store.
+        bounded (bool): Use the bounded-memory mode intended for huge files
+        shrink_every (int): In bounded mode, pages between resource store purges
+        strip_boilerplate (bool): Remove repeated headers, footers and page numbers
 
-        logger.info(f"Text extraction completed. Extracted {len(full_text)} characters")
-        return full_text
+    Returns:
+        dict: Metadata of the stored entry
 
-    except Exception as e:
-        logger.error(f"Error extracting text: {str(e)}", exc_info=True)
-        return f"Error extracting text: {str(e)}"
+    Raises:
+        Exception: If the file is not a valid PDF or extraction fails
+    """
+    store = store or extraction_store
+    logger.info(f"Extracting text from PDF to store: {pdf_path} (bounded: {bounded})")
+
+    # Check if it's a valid PDF
+    with open(pdf_path, 'rb') as file:
+        if file.read(5) != b'%PDF-':
+            raise Exception("Invalid PDF file")
+
+    def write_pieces(doc, out, detector=None):
+        lengths = []
+        for index, piece in enumerate(iter_pdf_text(doc, pdf_path, detector)):
+            out.write(piece)
+            lengths.append(len(piece))
+            if bounded and index and index % shrink_every == 0:
+                fitz.TOOLS.store_shrink(100)
+        return lengths
+
+    opener = open_pdf_mmap if bounded else pdf_document_cache.open
+    meta = {'bounded': bounded, 'strip_boilerplate': strip_boilerplate}
+
+    if not strip_boilerplate:
+        with opener(pdf_path) as doc:
+            meta['pages'] = len(doc)
+            with store.writer(key, pdf_path, **meta) as out:
+                write_pieces(doc, out)
+    else:
+        detector = BoilerplateDetector()
+        with tempfile.TemporaryFile('w+', encoding='utf-8', newline='') as raw:
+            with opener(pdf_path) as doc:
+                meta['pages'] = len(doc)
+                lengths = write_pieces(doc, raw, detector)
+            boilerplate = detector.detect()
+
+            raw.seek(0)
+            spans = []
+            raw_pos = 0
+            with store.writer(key, pdf_path, **meta) as out:
+                for index, length in enumerate(lengths):
+                    piece = raw.read(length)
+                    lines = boilerplate.get(index - 1) if index else None
+                    if lines:
+                        # Page pieces are "--- Page N ---\n\n" + text + "\n\n"
+                        marker_length = piece.index('\n\n') + 2
+                        text = piece[marker_length:-2]
+                        text, removed = strip_lines(text, lines)
+                        spans.extend([raw_pos + marker_length + pos, chunk] for pos, chunk in removed)
+                        piece = piece[:marker_length] + text + piece[-2:]
+                    out.write(piece)
+                    raw_pos += length
+
+            meta = store.get_meta(key)
+            meta['boilerplate'] = {
+                'removed_chars': sum(len(chunk) for _, chunk in spans),
+                'removed_lines': len(spans),
+                'spans': spans,
+            }
+            store.write_meta(key, meta)
+
+    if bounded:
+        fitz.TOOLS.store_shrink(100)
+
+    meta = store.get_meta(key)
+    logger.info(
+        f"Text extraction completed. Stored {meta['text_bytes']} bytes for {meta['pages']} pages"
+        + (f", removed {meta['boilerplate']['removed_chars']} boilerplate characters" if strip_boilerplate else "")
+    )
+    return meta
+
+def ensure_extracted_text(pdf_path, key, store=None):
+    """
+    Make sure the extraction store holds text for the current version of a PDF.
+
+    Files at or above the PDF_BOUNDED_EXTRACTION_MIN_BYTES setting are
+    extracted in bounded-memory mode, and running headers and footers are
+    stripped if the PDF_STRIP_BOILERPLATE setting is on.
+
+    Args:
+        pdf_path (str): Path to the PDF file
+        key (str): Extraction store key (the document id)
+        store (ExtractionStore, optional): Store to use. Defaults to extraction_store.
+
+    Returns:
+        dict: Metadata of the stored entry
+    """
+    store = store or extraction_store
+    strip_boilerplate = get_setting('PDF_STRIP_BOILERPLATE', False)
+    if store.is_fresh(key, pdf_path, strip_boilerplate=strip_boilerplate):
+        return store.get_meta(key)
+
+    min_bytes = get_setting('PDF_BOUNDED_EXTRACTION_MIN_BYTES', 50 * 1024 * 1024)
+    bounded = os.path.getsize(pdf_path) >= min_bytes
+    return extract_text_to_store(pdf_path, key, store, bounded=bounded,
+                                 strip_boilerplate=strip_boilerplate)
 
 def get_pdf_info(pdf_path):
     """
@@ -94,25 +283,21 @@ def get_pdf_info(pdf_path):
         file_size = os.path.getsize(pdf_path)
         file_name = os.path.basename(pdf_path)
 
-        # Open the PDF with PyMuPDF
-        doc = fitz.open(pdf_path)
-
-        # Get metadata
-        metadata = doc.metadata
-
-        # Get page count and dimensions of first page
-        page_count = len(doc)
-        first_page = doc.load_page(0) if page_count > 0 else None
-        page_dimensions = first_page.rect.width, first_page.rect.height if first_page else (0, 0)
-
-        # Count images in the document
-        image_count = 0
-        for page_num in range(page_count):
-            page = doc.load_page(page_num)
-            image_count += len(page.get_images())
-
-        # Close the document
-        doc.close()
+        # Open the PDF with PyMuPDF (reusing a cached handle if available)
+        with pdf_document_cache.open(pdf_path) as doc:
+            # Get metadata
+            metadata = doc.metadata
+
+            # Get page count and dimensions of first page
+            page_count = len(doc)
+            first_page = doc.load_page(0) if page_count > 0 else None
+            page_dimensions = first_page.rect.width, first_page.rect.height if first_page else (0, 0)
+
+            # Count images in the document
+            image_count = 0
+            for page_num in range(page_count):
+                page = doc.load_page(page_num)
+                image_count += len(page.get_images())
 
         return {
             'file_name': file_name,
@@ -0,0 +1,29 @@
+"""
+Clean-up of per-process and on-disk state derived from a document's file.
+"""
+import logging
+
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from documents.models import Document, Audiobook
+from documents.audiobook import remove_audiobook_files
+from documents.pdf_cache import pdf_document_cache
+from documents.extraction_store import extraction_store
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_delete, sender=Document)
+def document_deleted(sender, instance, **kwargs):
+    """Close cached handles of a deleted document's files and remove its extracted text."""
+    for field in (instance.file, instance.optimized_file):
+        if field:
+            pdf_document_cache.invalidate(field.path)
+    extraction_store.delete(str(instance.pk))
+
+
+@receiver(post_delete, sender=Audiobook)
+def audiobook_deleted(sender, instance, **kwargs):
+    """Remove a deleted audiobook's files, also when it goes with its document."""
+    remove_audiobook_files(instance)
@@ -0,0 +1,98 @@
+"""
+Coalescing of identical concurrent calls.
+
+When many clients ask for the same thing at once (e.g. a class opening the
+same document and requesting its first paragraph), only the first caller
+for a key does the work; the others wait for it and share its result or
+its exception.
+"""
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time within this process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+        # Metrics
+        self.executed = 0
+        self.coalesced = 0
+        self.max_waiters = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Call fn, or wait for the call already in flight for the same key.
+
+        Args:
+            key: Hashable key identifying equivalent calls
+            fn (callable): Function doing the work
+            *args, **kwargs: Passed to fn
+
+        Returns:
+            tuple: (fn's result, whether it was shared from another caller's call)
+
+        Raises:
+            Exception: Whatever fn raised, in the caller and in every waiter
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+                leader = True
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+                self.max_waiters = max(self.max_waiters, call.waiters)
+                leader = False
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+            if call.waiters:
+                logger.debug(f"Shared one call with {call.waiters} waiting callers")
+        return call.result, False
+
+    def stats(self):
+        """
+        Get coalescing metrics.
+
+        Returns:
+            dict: Calls executed, calls coalesced onto another, and calls in flight
+        """
+        with self._lock:
+            total = self.executed + self.coalesced
+            return {
+                'executed': self.executed,
+                'coalesced': self.coalesced,
+                'coalesced_rate': self.coalesced / total if total else 0.0,
+                'max_waiters': self.max_waiters,
+                'in_flight': len(self._calls),
+            }
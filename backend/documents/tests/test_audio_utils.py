@@ -0,0 +1,115 @@
+import io
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from documents import tts_pipeline
+from documents.audio_utils import (
+    AudioFormatError, AudioWriter, parse_wav, wav_header, patch_wav_sizes, strip_id3, mp3_duration,
+    audio_duration,
+)
+from documents.tts_cache import tts_audio_cache
+from documents.tests.utils import TempMediaTestCase, fake_engine, wav_bytes
+
+# One MPEG-1 Layer III frame header: 128 kbit/s, 44.1 kHz, no padding (417 bytes, 1152 samples)
+MP3_FRAME = b'\xff\xfb\x90\x00' + b'\x00' * 413
+
+
+class WavTests(SimpleTestCase):
+
+    def test_parse_wav(self):
+        fmt, pcm = parse_wav(wav_bytes(0.5, sample_rate=8000))
+        self.assertEqual((fmt['channels'], fmt['sample_rate'], fmt['bits_per_sample']), (1, 8000, 16))
+        self.assertEqual(len(pcm), 8000)
+
+    def test_header_round_trip(self):
+        fmt, pcm = parse_wav(wav_bytes(0.1))
+        self.assertEqual(parse_wav(wav_header(fmt, len(pcm)) + pcm), (fmt, pcm))
+
+    def test_streamed_header_reads_to_the_end(self):
+        fmt, pcm = parse_wav(wav_bytes(0.1))
+        self.assertEqual(parse_wav(wav_header(fmt) + pcm + b'\x01\x02')[1], pcm + b'\x01\x02')
+
+    def test_not_a_wav(self):
+        with self.assertRaises(AudioFormatError):
+            parse_wav(b'ID3\x03' + b'\x00' * 40)
+        with self.assertRaises(AudioFormatError):
+            parse_wav(wav_bytes(0.1)[:36])
+
+    def test_patch_wav_sizes(self):
+        fmt, pcm = parse_wav(wav_bytes(0.1))
+        f = io.BytesIO()
+        f.write(b'prefix')
+        f.write(wav_header(fmt) + pcm)
+        patch_wav_sizes(f, start=6)
+        self.assertEqual(f.tell(), 6 + 44 + len(pcm))
+        self.assertEqual(f.getvalue()[6:], wav_header(fmt, len(pcm)) + pcm)
+
+
+class MP3Tests(SimpleTestCase):
+
+    def test_strip_id3(self):
+        tag = b'ID3\x04\x00\x00\x00\x00\x00\x05' + b'x' * 5
+        self.assertEqual(strip_id3(tag + MP3_FRAME), MP3_FRAME)
+        self.assertEqual(strip_id3(MP3_FRAME), MP3_FRAME)
+
+    def test_mp3_duration(self):
+        self.assertAlmostEqual(mp3_duration(MP3_FRAME * 10), 10 * 1152 / 44100)
+        # Garbage between frames is skipped
+        self.assertAlmostEqual(audio_duration(MP3_FRAME + b'junk' + MP3_FRAME, 'audio/mpeg'), 2 * 1152 / 44100)
+
+
+class AudioWriterTests(SimpleTestCase):
+
+    def test_joins_wav_segments(self):
+        f = io.BytesIO()
+        writer = AudioWriter(f)
+        first = writer.append('audio/wav', wav_bytes(0.5))
+        second = writer.append('audio/wav', wav_bytes(0.25))
+        writer.finish()
+
+        self.assertEqual(first, 44)
+        self.assertEqual(second, 44 + 16000)
+        self.assertAlmostEqual(writer.duration, 0.75)
+        self.assertAlmostEqual(audio_duration(f.getvalue(), 'audio/wav'), 0.75)
+
+    def test_joins_mp3_segments(self):
+        f = io.BytesIO()
+        writer = AudioWriter(f)
+        writer.append('audio/mpeg', b'ID3\x04\x00\x00\x00\x00\x00\x00' + MP3_FRAME)
+        writer.append('audio/mpeg', MP3_FRAME)
+        self.assertEqual(f.getvalue(), MP3_FRAME * 2)
+        self.assertAlmostEqual(writer.duration, 2 * 1152 / 44100)
+
+    def test_rejects_mixed_segments(self):
+        writer = AudioWriter(io.BytesIO())
+        writer.append('audio/wav', wav_bytes(0.1))
+        with self.assertRaises(Exception):
+            writer.append('audio/mpeg', MP3_FRAME)
+        with self.assertRaises(Exception):
+            writer.append('audio/wav', wav_bytes(0.1, sample_rate=22050))
+
+
+class SynthesizeIntoCacheTests(TempMediaTestCase):
+
+    def test_engine_writes_into_the_cache_entry(self):
+        calls = []
+        with mock.patch('documents.tts_pipeline.write_uncached', fake_engine(calls)):
+            result = tts_pipeline.synthesize('Hello there', 'en')
+            result.file.close()
+            again = tts_pipeline.synthesize('Hello  there', 'en')
+            again.file.close()
+
+        self.assertEqual((result.cache_hit, again.cache_hit), (False, True))
+        self.assertEqual((result.content_type, result.extension), ('audio/wav', 'wav'))
+        self.assertEqual(calls, ['Hello there'])
+
+    def test_failed_engine_caches_nothing(self):
+        def failing(fp, *args, **kwargs):
+            fp.write(b'partial audio')
+            raise Exception('All TTS engines failed')
+
+        with mock.patch('documents.tts_pipeline.write_uncached', failing):
+            with self.assertRaisesRegex(Exception, 'All TTS engines failed'):
+                tts_pipeline.synthesize('Hello there', 'en')
+        self.assertEqual(tts_audio_cache.stats()['entries'], 0)
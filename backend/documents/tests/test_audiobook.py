@@ -0,0 +1,158 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase, RequestFactory
+
+from documents.audiobook import segment_document, render_audiobook, locate
+from documents.extraction_store import extraction_store
+from documents.http_utils import ranged_file_response
+from documents.models import Audiobook
+from documents.tests.utils import DocumentAPITestCase
+
+
+class RangedFileResponseTests(SimpleTestCase):
+
+    def setUp(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        self.path = os.path.join(tmp, 'audio.wav')
+        self.data = bytes(range(256)) * 4
+        with open(self.path, 'wb') as f:
+            f.write(self.data)
+
+    def get(self, range_header=None):
+        headers = {'HTTP_RANGE': range_header} if range_header else {}
+        response = ranged_file_response(RequestFactory().get('/', **headers), self.path, 'audio/wav', 'a.wav')
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def test_whole_file(self):
+        response, body = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, self.data)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Disposition'], 'inline; filename="a.wav"')
+
+    def test_range(self):
+        response, body = self.get('bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, self.data[10:20])
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/1024')
+        self.assertEqual(response['Content-Length'], '10')
+
+    def test_open_ended_and_clamped_ranges(self):
+        response, body = self.get('bytes=1000-')
+        self.assertEqual((response.status_code, body), (206, self.data[1000:]))
+        response, body = self.get('bytes=1000-5000')
+        self.assertEqual(response['Content-Range'], 'bytes 1000-1023/1024')
+
+    def test_suffix_range(self):
+        response, body = self.get('bytes=-24')
+        self.assertEqual((response.status_code, body), (206, self.data[-24:]))
+        response, body = self.get('bytes=-5000')
+        self.assertEqual(body, self.data)
+
+    def test_unsatisfiable_range(self):
+        for header in ('bytes=1024-', 'bytes=20-10'):
+            with self.subTest(header=header):
+                response, _ = self.get(header)
+                self.assertEqual(response.status_code, 416)
+                self.assertEqual(response['Content-Range'], 'bytes */1024')
+
+    def test_unsupported_range_sends_whole_file(self):
+        for header in ('bytes=0-1,5-6', 'bytes=-', 'items=0-1'):
+            with self.subTest(header=header):
+                response, body = self.get(header)
+                self.assertEqual((response.status_code, body), (200, self.data))
+
+
+class SegmentDocumentTests(SimpleTestCase):
+
+    def test_page_markers_are_skipped(self):
+        text = ('Title: \n\n--- Page 1 ---\n\nThe first page has one sentence.\n\n'
+                '--- Page 2 ---\n\nThe second page has another one.\n\n')
+        segments = [text[start:end] for start, end in segment_document(text)]
+        self.assertEqual(segments, ['The first page has one sentence.', 'The second page has another one.'])
+
+    def test_titles_are_read(self):
+        text = 'Title: A Book\n\n--- Page 1 ---\n\nThe first page has one sentence.\n\n'
+        self.assertEqual(text[slice(*segment_document(text)[0])], 'Title: A Book')
+
+
+class AudiobookTests(DocumentAPITestCase):
+
+    pages = ['The first page has a sentence. And it has a second sentence.',
+             'The second page has one more sentence.']
+
+    def render(self):
+        audiobook = Audiobook.objects.create(document=self.document, language='en')
+        return render_audiobook(audiobook, workers=2)
+
+    def test_render_and_locate(self):
+        audiobook = self.render()
+        self.assertEqual(audiobook.status, Audiobook.STATUS_COMPLETE)
+        self.assertEqual(audiobook.content_type, 'audio/wav')
+
+        text = extraction_store.read(str(self.document.pk))
+        offset = text.index('The second page')
+        position = locate(audiobook, offset + 4)
+        self.assertEqual(position['segment'][0], offset)
+        self.assertGreater(position['time'], 0)
+        self.assertEqual(locate(audiobook, 0)['time'], 0)
+
+    def test_audio_view_supports_ranges(self):
+        audiobook = self.render()
+        url = f'/api/documents/{self.document.pk}/audiobook_audio/'
+        size = os.path.getsize(audiobook.audio_file.path)
+
+        response = self.client.get(url, HTTP_RANGE='bytes=0-43')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content)[:4], b'RIFF')
+        self.assertEqual(self.client.get(url, HTTP_RANGE=f'bytes={size}-').status_code, 416)
+
+    def test_audio_view_without_audiobook(self):
+        response = self.client.get(f'/api/documents/{self.document.pk}/audiobook_audio/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_status_view_errors(self):
+        url = f'/api/documents/{self.document.pk}/audiobook/'
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.render()
+        self.assertEqual(self.client.get(url, {'offset': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'offset': '3'}).data['position']['segment'][0], 0)
+
+    def test_post_queues_a_render(self):
+        with mock.patch('documents.audiobook.start_render') as start_render:
+            response = self.client.post(f'/api/documents/{self.document.pk}/audiobook/', {}, format='json')
+        self.assertEqual(response.status_code, 202)
+        self.assertTrue(response.data['queued'])
+        start_render.assert_called_once()
+
+    def test_post_validates_options(self):
+        url = f'/api/documents/{self.document.pk}/audiobook/'
+        with mock.patch('documents.audiobook.start_render') as start_render:
+            self.assertEqual(self.client.post(url, {'language': 'en-US-' + 'x' * 10}, format='json').status_code,
+                             400)
+            self.assertEqual(self.client.post(url, {'voice_name': 'v' * 256}, format='json').status_code, 400)
+            self.assertEqual(self.client.post(url, {'force': 'maybe'}, format='json').status_code, 400)
+            response = self.client.post(url, {'language': 'pt_BR', 'prefer_offline': 'false'}, format='json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual((response.data['language'], response.data['prefer_offline']), ('pt_BR', False))
+        start_render.assert_called_once()
+
+    def test_files_removed_with_the_document(self):
+        audiobook = self.render()
+        paths = [audiobook.audio_file.path, audiobook.index_file.path]
+        self.assertTrue(all(os.path.exists(path) for path in paths))
+        self.document.delete()
+        self.assertFalse(Audiobook.objects.exists())
+        self.assertFalse(any(os.path.exists(path) for path in paths))
+
+    def test_delete_view_removes_files(self):
+        audiobook = self.render()
+        path = audiobook.audio_file.path
+        response = self.client.delete(f'/api/documents/{self.document.pk}/audiobook/')
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(os.path.exists(path))
@@ -0,0 +1,92 @@
+import io
+import os
+import json
+import shutil
+import tempfile
+from unittest import mock
+from contextlib import redirect_stdout
+
+import fitz  # PyMuPDF
+from django.test import SimpleTestCase
+
+from benchmarks import corpus, compare
+from benchmarks.bench_extraction import _percentile
+
+
+class CorpusTests(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def test_every_kind(self):
+        for kind in corpus.KINDS:
+            with self.subTest(kind=kind):
+                path = corpus.ensure(kind, 3, self.directory)
+                with fitz.open(path) as doc:
+                    self.assertEqual(doc.page_count, 3)
+                    self.assertEqual(doc.metadata['title'], f'Synthetic {kind} (3 pages)')
+        with self.assertRaises(ValueError):
+            corpus.generate('handwritten', 1, os.path.join(self.directory, 'x.pdf'))
+
+    def test_reproducible(self):
+        first, second = (os.path.join(self.directory, name) for name in ('a.pdf', 'b.pdf'))
+        corpus.generate('mixed', 3, first)
+        corpus.generate('mixed', 3, second)
+        with open(first, 'rb') as a, open(second, 'rb') as b:
+            self.assertEqual(a.read(), b.read())
+
+    def test_ensure_reuses_documents(self):
+        path = corpus.ensure('text', 2, self.directory)
+        self.assertEqual(path, corpus.corpus_path('text', 2, self.directory))
+        with mock.patch.object(corpus, 'generate') as generate:
+            self.assertEqual(corpus.ensure('text', 2, self.directory), path)
+        generate.assert_not_called()
+
+
+class CompareTests(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def write(self, name, commit, results):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as f:
+            json.dump({'commit': commit, 'results': results}, f)
+        return path
+
+    def compare(self, base, new, *args):
+        output = io.StringIO()
+        with mock.patch('sys.argv', ['compare', base, new, *args]), redirect_stdout(output):
+            status = compare.main()
+        return status, output.getvalue()
+
+    def test_flags_regressions(self):
+        case = {'path': 'bounded', 'kind': 'text', 'pages': 10}
+        base = self.write('base.json', 'abc', [
+            dict(case, pages_per_sec=100, latency_s={'p50': 1.0, 'p90': 2.0}, peak_rss_mb=50),
+            dict(case, kind='scanned', pages_per_sec=10),
+        ])
+        new = self.write('new.json', 'def', [
+            dict(case, pages_per_sec=85, latency_s={'p50': 1.05, 'p90': 1.5}, peak_rss_mb=50),
+            dict(case, kind='scanned', status='error'),
+            dict(case, kind='mixed', pages_per_sec=1),
+        ])
+        status, output = self.compare(base, new)
+        self.assertEqual(status, 1)
+        self.assertIn('abc -> def', output)
+        self.assertIn('pages_per_sec -15.0% !', output)
+        self.assertIn('p50_latency +5.0%,', output)
+        self.assertIn('p90_latency -25.0%,', output)
+        self.assertNotIn('scanned', output)
+        self.assertNotIn('mixed', output)
+        self.assertIn('1 regression(s) above 10%', output)
+
+        status, output = self.compare(base, new, '--threshold', '0.2')
+        self.assertEqual(status, 0)
+
+    def test_percentile(self):
+        self.assertEqual(_percentile([3, 1, 2], 50), 2)
+        self.assertEqual(_percentile([1, 2, 3, 4], 90), 3.7)
+        self.assertEqual(_percentile([5], 99), 5)
@@ -0,0 +1,127 @@
+import os
+import shutil
+import tempfile
+
+import fitz  # PyMuPDF
+from django.test import SimpleTestCase
+
+from documents.boilerplate import BoilerplateDetector, OffsetMap, line_signature, strip_lines
+from documents.extraction_store import ExtractionStore
+from documents.pdf_utils import extract_text_from_pdf, extract_text_to_store
+
+
+def page_blocks(body, header=None, footer=None, height=800):
+    """Blocks as returned by page.get_text("blocks") for a page with a header, body and footer."""
+    blocks = []
+    if header:
+        blocks.append((50, 20, 500, 35, header + '\n', 0, 0))
+    blocks.append((50, 200, 500, 400, body + '\n', 1, 0))
+    if footer:
+        blocks.append((50, 770, 500, 785, footer + '\n', 2, 0))
+    return blocks
+
+
+class BoilerplateDetectorTests(SimpleTestCase):
+
+    def test_line_signature(self):
+        self.assertEqual(line_signature('  Chapter 3 -  Page 47 '), 'chapter # - page #')
+
+    def test_detects_running_header_and_page_numbers(self):
+        detector = BoilerplateDetector()
+        for n in range(10):
+            detector.add_page(n, 800, page_blocks(f'Body text number {n} with its own words',
+                                                  header='The Book Title', footer=f'Page {n + 1}'))
+        detected = detector.detect()
+
+        self.assertEqual(len(detected), 10)
+        self.assertCountEqual(detected[4], [('top', 'The Book Title'), ('bottom', 'Page 5')])
+
+    def test_ignores_lines_on_few_pages(self):
+        detector = BoilerplateDetector()
+        for n in range(10):
+            detector.add_page(n, 800, page_blocks(f'Body {n}', header='Chapter One' if n < 2 else None))
+        self.assertEqual(detector.detect(), {})
+
+    def test_needs_min_pages(self):
+        detector = BoilerplateDetector(min_pages=3)
+        for n in range(2):
+            detector.add_page(n, 800, page_blocks('Body', header='Title'))
+        self.assertEqual(detector.detect(), {})
+
+    def test_body_lines_are_not_candidates(self):
+        detector = BoilerplateDetector()
+        for n in range(5):
+            detector.add_page(n, 800, page_blocks('The same body on every page'))
+        self.assertEqual(detector.detect(), {})
+
+
+class StripLinesTests(SimpleTestCase):
+
+    def test_removes_zone_lines_with_offsets(self):
+        text = 'Header\nBody\nHeader\nPage 3\n'
+        stripped, removed = strip_lines(text, [('top', 'Header'), ('bottom', 'Page 3')])
+        self.assertEqual(stripped, 'Body\nHeader\n')
+        self.assertEqual(removed, [(0, 'Header\n'), (19, 'Page 3\n')])
+
+    def test_bottom_line_is_matched_from_the_end(self):
+        stripped, removed = strip_lines('Footer\nBody\nFooter', [('bottom', 'Footer')])
+        self.assertEqual(stripped, 'Footer\nBody\n')
+        self.assertEqual(removed, [(12, 'Footer')])
+
+
+class OffsetMapTests(SimpleTestCase):
+
+    def setUp(self):
+        self.raw = 'HEAD\nfirst page\nFOOT 1\nHEAD\nsecond page\nFOOT 2\n'
+        self.map = OffsetMap([[0, 'HEAD\n'], [16, 'FOOT 1\n'], [23, 'HEAD\n'], [40, 'FOOT 2\n']])
+        self.clean = 'first page\nsecond page\n'
+
+    def test_restore(self):
+        self.assertEqual(self.map.restore(self.clean), self.raw)
+        self.assertEqual(self.map.removed_chars, len(self.raw) - len(self.clean))
+
+    def test_round_trip(self):
+        for offset in range(len(self.clean) + 1):
+            raw = self.map.to_raw(offset)
+            if offset < len(self.clean):
+                self.assertEqual(self.raw[raw], self.clean[offset])
+            self.assertEqual(self.map.to_clean(raw), offset)
+
+    def test_offsets_inside_removed_text(self):
+        self.assertEqual(self.map.to_clean(2), 0)
+        self.assertEqual(self.map.to_clean(self.raw.index('FOOT 2') + 3), len(self.clean))
+
+    def test_empty_map(self):
+        identity = OffsetMap([])
+        self.assertEqual((identity.to_raw(7), identity.to_clean(7)), (7, 7))
+        self.assertEqual(identity.restore('text'), 'text')
+
+
+class StripBoilerplateExtractionTests(SimpleTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.store = ExtractionStore(root=os.path.join(self.tmp, 'store'))
+        self.pdf = os.path.join(self.tmp, 'book.pdf')
+        doc = fitz.open()
+        for n in range(6):
+            page = doc.new_page()
+            page.insert_text((72, 40), 'A Running Header')
+            page.insert_text((72, 300), f'Body of page {n + 1} about topic {n * 7}.')
+            page.insert_text((72, 820), str(n + 1))
+        doc.save(self.pdf)
+        doc.close()
+
+    def test_stored_text_without_boilerplate_restores_to_raw(self):
+        meta = extract_text_to_store(self.pdf, 'book', self.store, strip_boilerplate=True)
+        text = self.store.read('book')
+
+        self.assertNotIn('A Running Header', text)
+        self.assertIn('Body of page 3 about topic 14.', text)
+        self.assertEqual(meta['boilerplate']['removed_lines'], 12)
+        self.assertEqual(self.store.read_raw('book'), extract_text_from_pdf(self.pdf))
+
+        offsets = self.store.offset_map('book')
+        position = text.index('Body of page 3')
+        self.assertEqual(self.store.read_raw('book')[offsets.to_raw(position):][:14], 'Body of page 3')
@@ -0,0 +1,84 @@
+import os
+import sys
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase
+
+from documents.audio_utils import parse_wav
+from documents.espeak_engine import EspeakEngine
+
+# Stand-in for the espeak-ng binary: lists voices, or writes a WAV of the text read
+# from stdin with the arguments recorded in it; "sleep" hangs and "fail" exits with an error
+FAKE_ESPEAK = f'''#!{sys.executable}
+import sys, time, struct
+args = sys.argv[1:]
+if args == ['--voices']:
+    print('Pty Language       Age/Gender VoiceName          File                 Other Languages')
+    print(' 5  en-us           --/M      English_(America)  gmw/en-US            (en 2)')
+    print(' 5  pt              --/M      Portuguese_(Portugal) roa/pt            (pt-pt 5)')
+    print(' 5  pt-br           --/M      Portuguese_(Brazil) roa/pt-BR           (pt 6)')
+    sys.exit(0)
+text = sys.stdin.read()
+if text == 'fail':
+    sys.stderr.write('unknown voice')
+    sys.exit(1)
+if text == 'sleep':
+    time.sleep(10)
+pcm = ' '.join(args).encode() + b'|' + text.encode()
+pcm += b'\\0' * (len(pcm) % 2)
+header = b'RIFF' + struct.pack('<I', 36 + len(pcm)) + b'WAVEfmt ' + struct.pack(
+    '<IHHIIHH', 16, 1, 1, 22050, 44100, 2, 16) + b'data' + struct.pack('<I', len(pcm))
+sys.stdout.buffer.write(header + pcm)
+'''
+
+
+class EspeakEngineTests(SimpleTestCase):
+
+    def setUp(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        binary = os.path.join(tmp, 'espeak-ng')
+        with open(binary, 'w') as f:
+            f.write(FAKE_ESPEAK)
+        os.chmod(binary, 0o755)
+        self.engine = EspeakEngine(binary=binary, max_processes=2, timeout=5)
+
+    def test_get_voices(self):
+        voices = self.engine.get_voices()
+        self.assertEqual(voices[0], {'id': 'gmw/en-US', 'name': 'English (America)',
+                                     'language': 'en-us', 'gender': 'M'})
+        self.assertEqual(len(voices), 3)
+
+    def test_resolve_voice(self):
+        self.assertEqual(self.engine.resolve_voice(voice_name='roa/pt-BR'), 'roa/pt-BR')
+        self.assertEqual(self.engine.resolve_voice(voice_name='Portuguese (Portugal)'), 'roa/pt')
+        self.assertEqual(self.engine.resolve_voice('pt_BR'), 'pt-br')
+        self.assertEqual(self.engine.resolve_voice('pt-ao'), 'pt')
+        self.assertEqual(self.engine.resolve_voice('en'), 'en-us')
+        self.assertEqual(self.engine.resolve_voice('de'), 'en')
+
+    def test_synthesize(self):
+        fmt, pcm = parse_wav(self.engine.synthesize('Hello there', 'pt-br', rate=200))
+        self.assertEqual(fmt['sample_rate'], 22050)
+        self.assertEqual(pcm.rstrip(b'\0'), b'--stdout --stdin -b 1 -v pt-br -s 200|Hello there')
+
+    def test_synthesize_failure(self):
+        with self.assertRaisesRegex(Exception, 'exit code 1.*unknown voice'):
+            self.engine.synthesize('fail')
+
+    def test_iter_synthesize(self):
+        chunks = list(self.engine.iter_synthesize('Streamed text', 'en', chunk_size=16))
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(b''.join(chunks).endswith(b'|Streamed text'))
+
+    def test_iter_synthesize_timeout(self):
+        with self.assertRaisesRegex(Exception, 'timed out'):
+            list(self.engine.iter_synthesize('sleep', timeout=0.5))
+
+    def test_missing_binary(self):
+        engine = EspeakEngine()
+        engine.binary = None
+        self.assertEqual(engine.get_voices(), [])
+        with self.assertRaisesRegex(Exception, 'not installed'):
+            engine.synthesize('Hello')
@@ -0,0 +1,92 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from documents.extraction_store import ExtractionStore
+from documents.pdf_utils import extract_text_from_pdf, extract_text_to_store, ensure_extracted_text
+from documents.tests.utils import make_pdf
+
+
+class ExtractionStoreTests(SimpleTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.store = ExtractionStore(root=os.path.join(self.tmp, 'store'))
+        self.pdf = make_pdf(os.path.join(self.tmp, 'source.pdf'), ['One'])
+
+    def test_write_and_read(self):
+        with self.store.writer('1', self.pdf, pages=1) as f:
+            f.write('line one\r\nline two')
+        self.assertEqual(self.store.read('1'), 'line one\r\nline two')
+        meta = self.store.get_meta('1')
+        self.assertEqual(meta['pages'], 1)
+        self.assertEqual(meta['text_bytes'], 18)
+        self.assertTrue(self.store.is_fresh('1', self.pdf))
+        self.assertFalse(self.store.is_fresh('1', self.pdf, pages=2))
+
+    def test_failed_write_keeps_previous_entry(self):
+        with self.store.writer('1', self.pdf) as f:
+            f.write('first')
+        with self.assertRaises(RuntimeError):
+            with self.store.writer('1', self.pdf) as f:
+                f.write('partial')
+                raise RuntimeError('extraction failed')
+        self.assertEqual(self.store.read('1'), 'first')
+        self.assertEqual([name for name in os.listdir(self.store.root) if name.endswith('.tmp')], [])
+
+    def test_replaced_source_is_not_fresh(self):
+        with self.store.writer('1', self.pdf) as f:
+            f.write('first')
+        make_pdf(self.pdf, ['One', 'Two'])
+        self.assertFalse(self.store.is_fresh('1', self.pdf))
+
+    def test_delete(self):
+        with self.store.writer('1', self.pdf) as f:
+            f.write('first')
+        self.store.delete('1')
+        self.assertIsNone(self.store.read('1'))
+        self.assertIsNone(self.store.get_meta('1'))
+        self.store.delete('1')  # nothing left to remove
+
+
+class ExtractTextToStoreTests(SimpleTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.store = ExtractionStore(root=os.path.join(self.tmp, 'store'))
+        self.pdf = make_pdf(os.path.join(self.tmp, 'book.pdf'),
+                            [f'Text of page {n}' for n in range(1, 8)], title='Book')
+
+    def test_same_layout_as_in_memory_extraction(self):
+        expected = extract_text_from_pdf(self.pdf)
+        self.assertTrue(expected.startswith('Title: Book\n\n--- Page 1 ---\n\n'))
+        for bounded in (False, True):
+            with self.subTest(bounded=bounded):
+                meta = extract_text_to_store(self.pdf, 'book', self.store, bounded=bounded, shrink_every=2)
+                self.assertEqual(meta['pages'], 7)
+                self.assertEqual(self.store.read('book'), expected)
+
+    def test_rejects_non_pdf(self):
+        path = os.path.join(self.tmp, 'notes.pdf')
+        with open(path, 'w') as f:
+            f.write('not a pdf')
+        with self.assertRaises(Exception):
+            extract_text_to_store(path, 'notes', self.store)
+        self.assertIsNone(self.store.read('notes'))
+
+    @override_settings(PDF_BOUNDED_EXTRACTION_MIN_BYTES=1)
+    def test_ensure_extracted_text_extracts_once_per_version(self):
+        meta = ensure_extracted_text(self.pdf, 'book', self.store)
+        self.assertTrue(meta['bounded'])
+        with mock.patch('documents.pdf_utils.extract_text_to_store') as extract:
+            self.assertEqual(ensure_extracted_text(self.pdf, 'book', self.store), meta)
+        extract.assert_not_called()
+
+        make_pdf(self.pdf, ['Replaced'])
+        ensure_extracted_text(self.pdf, 'book', self.store)
+        self.assertIn('Replaced', self.store.read('book'))
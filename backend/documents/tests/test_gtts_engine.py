@@ -0,0 +1,103 @@
+import io
+import time
+import base64
+import threading
+from unittest import mock
+from contextlib import contextmanager
+from urllib.parse import unquote
+
+from django.test import SimpleTestCase
+from gtts import gTTS
+
+from documents.tts_engines import GTTSEngine
+
+
+def rpc_response(audio, status_code=200):
+    """A batchexecute response carrying base64 audio, as Google sends it."""
+    payload = base64.b64encode(audio).decode()
+    response = mock.Mock(status_code=status_code)
+    response.iter_lines.return_value = [b")]}'", f'[["wrb.fr","jQ1olc","[\\"{payload}\\"]"]]'.encode()]
+    return response
+
+
+class FetchTests(SimpleTestCase):
+
+    def test_decodes_audio_and_tries_other_hosts(self):
+        urls = []
+        responses = iter([rpc_response(b'', status_code=503), rpc_response(b'ID3audio')])
+
+        @contextmanager
+        def stream(method, url, **kwargs):
+            urls.append(url)
+            yield next(responses)
+
+        engine = GTTSEngine(url='https://translate.google.{tld}/rpc')
+        with mock.patch('documents.tts_engines.tts_http.stream', stream):
+            self.assertEqual(engine._fetch(b'f.req=x', None, None), b'ID3audio')
+        self.assertEqual(urls, ['https://translate.google.com/rpc', 'https://translate.google.ca/rpc'])
+
+    def test_reports_every_failure(self):
+        @contextmanager
+        def stream(method, url, **kwargs):
+            response = mock.Mock(status_code=200)
+            response.iter_lines.return_value = [b'[]']
+            yield response
+
+        engine = GTTSEngine(url='https://tts.example/rpc')
+        with mock.patch('documents.tts_engines.tts_http.stream', stream):
+            with self.assertRaisesRegex(Exception, 'gTTS chunk failed: TLD com: no audio in the response$'):
+                engine._fetch(b'f.req=x', None, None)
+
+    def test_no_time_left(self):
+        engine = GTTSEngine(url='https://tts.example/rpc')
+        with self.assertRaisesRegex(Exception, 'no time left'):
+            engine._fetch(b'f.req=x', time.monotonic() - 1, None)
+
+
+class ParallelWriteTests(SimpleTestCase):
+    text = ' '.join(f'word{i}' for i in range(60))  # several chunks of at most 100 characters
+
+    def setUp(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+
+    def fetch(self, delays):
+        """A _fetch stand-in returning the words of the chunk, slower for earlier chunks."""
+        def fetch(body, expires, priority):
+            words = unquote(body.decode()).split('\\"')[1]
+            with self.lock:
+                self.active += 1
+                self.max_active = max(self.max_active, self.active)
+            time.sleep(delays.get(words.split()[0], 0.0))
+            with self.lock:
+                self.active -= 1
+            return words.encode() + b'|'
+        return fetch
+
+    def test_chunks_written_in_order(self):
+        engine = GTTSEngine(parallel=2)
+        fp = io.BytesIO()
+        with mock.patch.object(engine, '_fetch', self.fetch({'word0': 0.1})):
+            self.assertEqual(engine.write(fp, self.text, 'en'), '.mp3')
+        chunks = fp.getvalue().decode().rstrip('|').split('|')
+        self.assertEqual(len(chunks), len(gTTS(text=self.text, lang='en').get_bodies()))
+        self.assertEqual(' '.join(chunks), self.text)
+        self.assertEqual(self.max_active, 2)
+
+    def test_single_chunk(self):
+        engine = GTTSEngine()
+        fp = io.BytesIO()
+        with mock.patch.object(engine, '_fetch', self.fetch({})):
+            engine.write(fp, 'Hello there.', 'en')
+        self.assertEqual(fp.getvalue(), b'Hello there.|')
+
+    def test_timeout(self):
+        engine = GTTSEngine(parallel=3)
+        with mock.patch.object(engine, '_fetch', self.fetch({'word0': 0.3})):
+            with self.assertRaisesRegex(Exception, 'gTTS took more than 0.1 s'):
+                engine.write(io.BytesIO(), self.text, 'en', timeout=0.1)
+
+    def test_unsupported_language(self):
+        with self.assertRaises(ValueError):
+            GTTSEngine().write(io.BytesIO(), 'Hello', 'zz')
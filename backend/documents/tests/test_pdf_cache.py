@@ -0,0 +1,101 @@
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.files import File
+from django.test import SimpleTestCase
+
+from documents.models import Document
+from documents.pdf_cache import PDFDocumentCache, pdf_document_cache
+from documents.tests.utils import make_pdf, TempMediaTestCase
+
+
+class PDFDocumentCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.paths = [make_pdf(os.path.join(self.tmp, f'{i}.pdf'), [f'Document {i}']) for i in range(3)]
+
+    def test_reuses_open_handle(self):
+        cache = PDFDocumentCache()
+        with cache.open(self.paths[0]) as first:
+            pass
+        with cache.open(self.paths[0]) as second:
+            self.assertIs(first, second)
+            self.assertIn('Document 0', second.load_page(0).get_text())
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_evicts_least_recently_used(self):
+        cache = PDFDocumentCache(max_documents=2)
+        for path in (self.paths[0], self.paths[1], self.paths[0], self.paths[2]):
+            with cache.open(path):
+                pass
+        stats = cache.stats()
+        self.assertEqual(stats['documents'], 2)
+        self.assertEqual(stats['evictions'], 1)
+
+        # 0 was used after 1, so 1 was evicted
+        with cache.open(self.paths[0]):
+            pass
+        with cache.open(self.paths[1]):
+            pass
+        self.assertEqual(cache.stats()['misses'], 4)
+
+    def test_byte_budget(self):
+        size = os.path.getsize(self.paths[0])
+        cache = PDFDocumentCache(max_bytes=size + size // 2)
+        with cache.open(self.paths[0]):
+            pass
+        with cache.open(self.paths[1]):
+            pass
+        self.assertEqual(cache.stats()['documents'], 1)
+
+    def test_document_over_budget_is_not_cached(self):
+        cache = PDFDocumentCache(max_bytes=10)
+        with cache.open(self.paths[0]) as doc:
+            self.assertEqual(len(doc), 1)
+        self.assertEqual(cache.stats()['documents'], 0)
+        self.assertTrue(doc.is_closed)
+
+    def test_evicted_handle_stays_open_while_in_use(self):
+        cache = PDFDocumentCache(max_documents=1)
+        with cache.open(self.paths[0]) as doc:
+            with cache.open(self.paths[1]):
+                pass
+            self.assertIn('Document 0', doc.load_page(0).get_text())
+        self.assertTrue(doc.is_closed)
+
+    def test_replaced_file_is_reopened(self):
+        cache = PDFDocumentCache()
+        with cache.open(self.paths[0]):
+            pass
+        make_pdf(self.paths[0], ['Replaced', 'Second page'])
+        os.utime(self.paths[0], ns=(0, 10 ** 18))
+        with cache.open(self.paths[0]) as doc:
+            self.assertEqual(len(doc), 2)
+        self.assertEqual(cache.stats()['invalidations'], 1)
+
+    def test_invalidate(self):
+        cache = PDFDocumentCache()
+        with cache.open(self.paths[0]) as doc:
+            pass
+        cache.invalidate(self.paths[0])
+        self.assertTrue(doc.is_closed)
+        self.assertEqual(cache.stats()['documents'], 0)
+
+
+class DocumentDeletedTests(TempMediaTestCase):
+
+    def test_delete_drops_cached_handle(self):
+        user = User.objects.create_user('reader', password='secret')
+        path = make_pdf(os.path.join(self.media_root, 'upload.pdf'), ['Hello'])
+        with open(path, 'rb') as f:
+            document = Document.objects.create(user=user, title='Upload', file=File(f, name='upload.pdf'))
+
+        with pdf_document_cache.open(document.file.path) as doc:
+            pass
+        document.delete()
+        self.assertTrue(doc.is_closed)
@@ -0,0 +1,81 @@
+import os
+from unittest import mock
+
+import fitz  # PyMuPDF
+from django.contrib.auth.models import User
+from django.core.files import File
+from django.test import override_settings
+
+from documents.models import Document
+from documents.pdf_optimizer import optimize_pdf, optimize_document, _run_optimize
+from documents.tests.utils import make_pdf, TempMediaTestCase, DocumentAPITestCase
+
+
+class OptimizePDFTests(TempMediaTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('reader', password='secret')
+        # Uncompressed, repetitive content streams leave plenty to compact
+        pages = ['\n'.join(f'Line {i} of page {n}' for i in range(40)) for n in range(5)]
+        self.path = make_pdf(os.path.join(self.media_root, 'book.pdf'), pages)
+
+    def _document(self):
+        with open(self.path, 'rb') as f:
+            return Document.objects.create(user=self.user, title='Book', file=File(f, name='book.pdf'))
+
+    def test_optimize_pdf_keeps_content(self):
+        output = os.path.join(self.media_root, 'optimized.pdf')
+        result = optimize_pdf(self.path, output)
+
+        self.assertEqual(result['original_size'], os.path.getsize(self.path))
+        self.assertLess(result['optimized_size'], result['original_size'])
+        with fitz.open(output) as doc:
+            self.assertEqual(len(doc), 5)
+            self.assertIn('Line 39 of page 4', doc.load_page(4).get_text())
+
+    def test_optimize_document_keeps_smaller_copy(self):
+        document = self._document()
+        optimize_document(document)
+
+        document.refresh_from_db()
+        self.assertTrue(document.optimized_file)
+        self.assertEqual(document.optimized_size, os.path.getsize(document.optimized_file.path))
+        self.assertIsNotNone(document.optimized_at)
+
+    def test_optimize_document_drops_copy_that_is_not_smaller(self):
+        document = self._document()
+        size = os.path.getsize(self.path)
+        measurements = {'original_size': size, 'optimized_size': size, 'original_open_ms': 1.0,
+                        'optimized_open_ms': 1.0, 'linearized': False}
+        with mock.patch('documents.pdf_optimizer.optimize_pdf', return_value=measurements):
+            optimize_document(document)
+
+        document.refresh_from_db()
+        self.assertFalse(document.optimized_file)
+        self.assertEqual(document.optimized_size, size)
+
+    def test_failed_background_optimization_is_logged(self):
+        document = self._document()
+        with mock.patch('documents.pdf_optimizer.optimize_pdf', side_effect=Exception('broken')), \
+                self.assertLogs('documents.pdf_optimizer', 'WARNING'):
+            _run_optimize(document.pk)
+        document.refresh_from_db()
+        self.assertFalse(document.optimized_file)
+
+
+class OptimizeOnUploadTests(DocumentAPITestCase):
+
+    @override_settings(PDF_OPTIMIZE_ON_UPLOAD=True)
+    def test_upload_queues_optimization(self):
+        with open(self.document.file.path, 'rb') as f, \
+                mock.patch('documents.api.views.start_optimize') as start_optimize, \
+                mock.patch('documents.pdf_optimizer.optimize_pdf') as optimize_pdf:
+            response = self.client.post('/api/documents/', {'title': 'Upload', 'file': f})
+        self.assertEqual(response.status_code, 201)
+        optimize_pdf.assert_not_called()
+        start_optimize.assert_called_once()
+
+        _run_optimize(response.json()['id'])
+        document = Document.objects.get(pk=response.json()['id'])
+        self.assertIsNotNone(document.optimized_at)
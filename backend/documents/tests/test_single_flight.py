@@ -0,0 +1,107 @@
+import threading
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+
+from django.test import SimpleTestCase
+
+from documents import tts_pipeline
+from documents.single_flight import SingleFlight
+from documents.tests.utils import TempMediaTestCase, fake_engine
+
+
+class SingleFlightTests(SimpleTestCase):
+
+    def run_concurrently(self, flights, key, fn, callers):
+        """Start callers calling flights.do(key, fn) while the first call is blocked in fn."""
+        results = []
+
+        def call():
+            try:
+                results.append(flights.do(key, fn))
+            except Exception as e:
+                results.append(e)
+
+        threads = [threading.Thread(target=call) for _ in range(callers)]
+        for thread in threads:
+            thread.start()
+        return threads, results
+
+    def test_concurrent_calls_share_one_execution(self):
+        flights = SingleFlight()
+        release = threading.Event()
+        fn = mock.Mock(side_effect=lambda: release.wait(5) and 'audio')
+
+        threads, results = self.run_concurrently(flights, 'key', fn, 4)
+        while flights.stats()['coalesced'] < 3:
+            release.wait(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        fn.assert_called_once()
+        self.assertEqual(sorted(results), [('audio', False)] + [('audio', True)] * 3)
+        stats = flights.stats()
+        self.assertEqual((stats['executed'], stats['coalesced'], stats['max_waiters']), (1, 3, 3))
+        self.assertEqual(stats['coalesced_rate'], 0.75)
+        self.assertEqual(stats['in_flight'], 0)
+
+    def test_exception_reaches_every_caller(self):
+        flights = SingleFlight()
+        release = threading.Event()
+
+        def fail():
+            release.wait(5)
+            raise ValueError('engine down')
+
+        threads, results = self.run_concurrently(flights, 'key', fail, 3)
+        while flights.stats()['coalesced'] < 2:
+            release.wait(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(results), 3)
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+
+        # The failed call is not remembered
+        self.assertEqual(flights.do('key', lambda: 'retried'), ('retried', False))
+
+    def test_different_keys_and_sequential_calls_run_separately(self):
+        flights = SingleFlight()
+        self.assertEqual(flights.do('a', lambda x: x * 2, 2), (4, False))
+        self.assertEqual(flights.do('a', lambda x: x * 3, 2), (6, False))
+        self.assertEqual(flights.do('b', lambda: 'b'), ('b', False))
+        self.assertEqual(flights.stats()['executed'], 3)
+        self.assertEqual(flights.stats()['coalesced'], 0)
+
+
+class PipelineCoalescingTests(TempMediaTestCase):
+
+    def test_identical_requests_synthesize_once(self):
+        calls = []
+        engine = fake_engine(calls)
+        started, release = threading.Event(), threading.Event()
+
+        def slow_engine(*args, **kwargs):
+            started.set()
+            release.wait(5)
+            return engine(*args, **kwargs)
+
+        def synthesize():
+            result = tts_pipeline.synthesize('Hello there.', 'en')
+            result.file.close()
+            return result.cache_hit or result.coalesced
+
+        with mock.patch('documents.tts_pipeline.write_uncached', slow_engine), \
+                mock.patch.object(tts_pipeline, 'synthesis_flights', SingleFlight()) as flights, \
+                ThreadPoolExecutor(max_workers=3) as executor:
+            first = executor.submit(synthesize)
+            started.wait(5)
+            others = [executor.submit(synthesize) for _ in range(2)]
+            while flights.stats()['coalesced'] < 2 and not others[0].done():
+                release.wait(0.01)
+            release.set()
+            shared = [future.result() for future in [first] + others]
+
+        self.assertEqual(calls, ['Hello there.'])
+        self.assertEqual(shared, [False, True, True])
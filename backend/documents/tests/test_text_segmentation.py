@@ -0,0 +1,87 @@
+from django.test import SimpleTestCase
+
+from documents.audio_utils import parse_wav
+from documents.text_segmentation import split_sentences
+from documents.tests.utils import DocumentAPITestCase
+
+
+def segments(text, **kwargs):
+    return [text[start:end] for start, end in split_sentences(text, **kwargs)]
+
+
+class SplitSentencesTests(SimpleTestCase):
+
+    def test_splits_at_sentence_ends(self):
+        text = 'The first sentence is here. Is this the second one? Yes, it is the third!  '
+        self.assertEqual(segments(text), [
+            'The first sentence is here.', 'Is this the second one?', 'Yes, it is the third!',
+        ])
+
+    def test_closing_quotes_stay_with_their_sentence(self):
+        text = 'He said "this is the end." Then he left the room quietly.'
+        self.assertEqual(segments(text), ['He said "this is the end."', 'Then he left the room quietly.'])
+
+    def test_abbreviations_and_initials_do_not_end_sentences(self):
+        text = 'We met Dr. Smith and J. Doe at the lab. They talked for an hour or so.'
+        self.assertEqual(segments(text), ['We met Dr. Smith and J. Doe at the lab.',
+                                          'They talked for an hour or so.'])
+
+    def test_lower_case_continuation(self):
+        text = 'Prices rose in the U.S. during the year. Everything was more expensive.'
+        self.assertEqual(len(split_sentences(text)), 2)
+
+    def test_short_sentences_are_merged_with_the_next(self):
+        self.assertEqual(segments('Hi. Ok. This sentence is long enough to stand.'),
+                         ['Hi. Ok. This sentence is long enough to stand.'])
+
+    def test_short_last_sentence_is_kept(self):
+        self.assertEqual(segments('This sentence is long enough to stand. Bye.'),
+                         ['This sentence is long enough to stand.', 'Bye.'])
+
+    def test_long_sentences_are_split_at_clauses_then_spaces(self):
+        text = 'one two three four five six, seven eight nine ten eleven twelve'
+        parts = segments(text, max_chars=40)
+        self.assertEqual(parts[0], 'one two three four five six, ')
+        self.assertTrue(all(len(part) <= 40 for part in parts))
+        self.assertEqual(''.join(parts), text)
+
+        words = ' '.join(['word'] * 30)
+        self.assertTrue(all(len(part) <= 25 for part in segments(words, max_chars=25)))
+
+    def test_offsets_refer_to_the_original_text(self):
+        text = '  First sentence of the text.\n\nSecond sentence of the text.  '
+        spans = split_sentences(text)
+        self.assertEqual(spans, [(2, 29), (31, 59)])
+
+    def test_blank_text(self):
+        self.assertEqual(split_sentences(''), [])
+        self.assertEqual(split_sentences('   \n '), [])
+
+
+class StreamingTTSViewTests(DocumentAPITestCase):
+
+    def test_stream_is_one_wav_of_all_sentences(self):
+        text = 'The first sentence is here. The second sentence is here. The third sentence is here.'
+        response = self.client.post(f'/api/documents/{self.document.pk}/tts/',
+                                    {'text': text, 'stream': 'true'}, format='json')
+        audio = b''.join(response.streaming_content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'audio/wav')
+        self.assertEqual(response['X-TTS-Segments'], '3')
+        self.assertEqual(len(self.engine_calls), 3)
+        fmt, pcm = parse_wav(audio)
+        # Each fake sentence is 0.05 s plus 0.01 s per character
+        expected = sum(0.05 + 0.01 * len(sentence) for sentence in self.engine_calls)
+        self.assertAlmostEqual(len(pcm) / fmt['byte_rate'], expected, delta=0.005)
+
+    def test_stream_rejects_audio_format_and_ignores_accept(self):
+        text = 'The first sentence is here. The second sentence is here.'
+        url = f'/api/documents/{self.document.pk}/tts/'
+        response = self.client.post(url, {'text': text, 'stream': 'true', 'audio_format': 'opus'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post(url, {'text': text, 'stream': 'true'}, format='json', HTTP_ACCEPT='audio/ogg')
+        b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'audio/wav')
@@ -0,0 +1,112 @@
+import io
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from documents.audio_utils import parse_wav, wav_header, AudioFormatError
+from documents.time_stretch import normalize_speed, wsola, stretch_wav, time_stretch
+from documents.tests.utils import DocumentAPITestCase, wav_bytes
+
+
+def tone(seconds, frequency=200, sample_rate=16000, channels=1):
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    wave = (8000 * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+    return np.repeat(wave[:, None], channels, axis=1)
+
+
+def dominant_frequency(samples, sample_rate=16000):
+    spectrum = np.abs(np.fft.rfft(samples[:, 0]))
+    return np.argmax(spectrum) * sample_rate / len(samples)
+
+
+class NormalizeSpeedTests(SimpleTestCase):
+
+    def test_valid_speeds(self):
+        self.assertIsNone(normalize_speed(None))
+        self.assertIsNone(normalize_speed(''))
+        self.assertIsNone(normalize_speed(1.02))
+        self.assertEqual(normalize_speed('1.5'), 1.5)
+        self.assertEqual(normalize_speed(1.33), 1.35)
+        self.assertEqual(normalize_speed(0.75), 0.75)
+        self.assertEqual(normalize_speed(2), 2.0)
+
+    def test_invalid_speeds(self):
+        for speed in ('fast', [1.5], 0.7, 2.01, 1e308, float('inf'), '-inf', float('nan'), 'NaN'):
+            with self.subTest(speed=speed), self.assertRaises(ValueError):
+                normalize_speed(speed)
+
+
+class WSOLATests(SimpleTestCase):
+
+    def test_duration_changes_pitch_does_not(self):
+        samples = tone(1.0)
+        for speed in (0.75, 1.5, 2.0):
+            with self.subTest(speed=speed):
+                stretched = wsola(samples, speed, 16000)
+                self.assertEqual(len(stretched), int(len(samples) / speed))
+                self.assertAlmostEqual(dominant_frequency(stretched), 200, delta=5)
+                # Overlap-add of the windows keeps the level
+                self.assertAlmostEqual(np.abs(stretched[1000:-1000]).max(), 8000, delta=800)
+
+    def test_stereo(self):
+        stretched = wsola(tone(0.5, channels=2), 1.25, 16000)
+        self.assertEqual(stretched.shape, (6400, 2))
+        np.testing.assert_array_equal(stretched[:, 0], stretched[:, 1])
+
+    def test_short_input_is_copied(self):
+        samples = tone(0.01)
+        stretched = wsola(samples, 2.0, 16000)
+        np.testing.assert_array_equal(stretched, samples)
+        self.assertIsNot(stretched, samples)
+
+
+class StretchWavTests(SimpleTestCase):
+
+    def test_stretch_wav(self):
+        fmt, pcm = parse_wav(stretch_wav(wav_bytes(1.0, channels=2), 2.0))
+        self.assertEqual((fmt['channels'], fmt['sample_rate'], fmt['bits_per_sample']), (2, 16000, 16))
+        self.assertEqual(len(pcm), 8000 * 2 * 2)
+
+    def test_unsupported_wav(self):
+        fmt = {'audio_format': 1, 'channels': 1, 'sample_rate': 8000, 'bits_per_sample': 8,
+               'byte_rate': 8000, 'block_align': 1}
+        with self.assertRaises(AudioFormatError):
+            stretch_wav(wav_header(fmt, 100) + b'\x80' * 100, 1.5)
+
+    @mock.patch('documents.time_stretch.ffmpeg_binary', return_value=None)
+    def test_time_stretch_without_ffmpeg(self, ffmpeg_binary):
+        destination = io.BytesIO()
+        self.assertEqual(time_stretch(io.BytesIO(wav_bytes(1.0)), destination, 'audio/wav', 1.25), '.wav')
+        fmt, pcm = parse_wav(destination.getvalue())
+        self.assertEqual(len(pcm) // 2, 12800)
+        with self.assertRaisesRegex(Exception, 'needs ffmpeg'):
+            time_stretch(io.BytesIO(b'ID3'), io.BytesIO(), 'audio/mpeg', 1.25)
+
+
+@mock.patch('documents.time_stretch.ffmpeg_binary', mock.Mock(return_value=None))
+class SpeedViewTests(DocumentAPITestCase):
+
+    def tts(self, **data):
+        return self.client.post(f'/api/documents/{self.document.pk}/tts/', {'text': 'Hello there.', **data},
+                                format='json')
+
+    def duration(self, response):
+        fmt, pcm = parse_wav(b''.join(response.streaming_content))
+        return len(pcm) / fmt['byte_rate']
+
+    def test_speed_variants_reuse_the_synthesis(self):
+        normal = self.duration(self.tts())
+        response = self.tts(speed='2')
+        self.assertEqual(response.status_code, 200)
+        self.assertAlmostEqual(self.duration(response), normal / 2, delta=0.001)
+        self.assertEqual(self.tts(speed=2)['X-TTS-Cache'], 'hit')
+        self.assertEqual(self.engine_calls, ['Hello there.'])
+
+    def test_invalid_speeds(self):
+        for speed in ('3', 'inf', 'nan', 'fast'):
+            with self.subTest(speed=speed):
+                response = self.tts(speed=speed)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('speed', response.json()['error'])
+        self.assertEqual(self.engine_calls, [])
@@ -0,0 +1,124 @@
+import os
+import sys
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from documents import transcoding
+from documents.transcoding import negotiate_format, transcode
+from documents.tests.utils import DocumentAPITestCase
+
+# Stand-in for ffmpeg: writes its arguments and the audio read from stdin
+# to stdout; input starting with "fail" makes it exit with an error
+FAKE_FFMPEG = f'''#!{sys.executable}
+import sys
+data = sys.stdin.buffer.read()
+if data.startswith(b'fail'):
+    sys.stderr.write('Invalid data found when processing input')
+    sys.exit(1)
+sys.stdout.buffer.write(' '.join(sys.argv[1:]).encode() + b'|' + data)
+'''
+
+
+class FakeFFmpegMixin:
+
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        self.tmp = tmp
+        binary = os.path.join(tmp, 'ffmpeg')
+        with open(binary, 'w') as f:
+            f.write(FAKE_FFMPEG)
+        os.chmod(binary, 0o755)
+        patcher = mock.patch.object(transcoding, '_ffmpeg', binary)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class NegotiateFormatTests(FakeFFmpegMixin, SimpleTestCase):
+
+    def test_explicit_format(self):
+        self.assertEqual(negotiate_format('OPUS'), 'opus')
+        self.assertEqual(negotiate_format('mp3', 'audio/ogg'), 'mp3')
+        self.assertIsNone(negotiate_format('native', 'audio/ogg'))
+        self.assertIsNone(negotiate_format('wav'))
+
+    def test_accept_header(self):
+        self.assertEqual(negotiate_format(accept='audio/ogg'), 'opus')
+        self.assertEqual(negotiate_format(accept='audio/mpeg'), 'mp3')
+        self.assertEqual(negotiate_format(accept='audio/ogg;q=0.5, audio/mpeg;q=0.8'), 'mp3')
+        self.assertEqual(negotiate_format(accept='audio/mpeg;q=0.5, audio/opus'), 'opus')
+        self.assertIsNone(negotiate_format(accept='audio/ogg;q=bad'))
+
+    def test_default_format(self):
+        self.assertIsNone(negotiate_format(accept='*/*'))
+        with override_settings(TTS_DEFAULT_FORMAT='opus'):
+            self.assertEqual(negotiate_format(accept='*/*'), 'opus')
+            self.assertEqual(negotiate_format(), 'opus')
+            self.assertIsNone(negotiate_format(accept='audio/wav'))
+
+    def test_without_ffmpeg(self):
+        with mock.patch.object(transcoding, '_ffmpeg', ''), \
+                mock.patch('documents.transcoding.shutil.which', return_value=None):
+            self.assertIsNone(transcoding.ffmpeg_binary())
+            self.assertIsNone(negotiate_format('opus'))
+            self.assertIsNone(negotiate_format(accept='audio/ogg'))
+            with self.assertRaises(Exception):
+                transcode(None, None, 'opus')
+
+
+class TranscodeTests(FakeFFmpegMixin, SimpleTestCase):
+
+    def transcode(self, data, fmt, **kwargs):
+        with tempfile.TemporaryFile(dir=self.tmp) as source, tempfile.TemporaryFile(dir=self.tmp) as destination:
+            source.write(data)
+            source.seek(0)
+            destination.write(b'head:')
+            extension = transcode(source, destination, fmt, **kwargs)
+            self.assertEqual(destination.tell(), os.fstat(destination.fileno()).st_size)
+            destination.seek(0)
+            return extension, destination.read()
+
+    def test_opus(self):
+        extension, output = self.transcode(b'RIFFaudio', 'opus')
+        self.assertEqual(extension, '.opus')
+        self.assertTrue(output.startswith(b'head:'))
+        args, _, audio = output[5:].partition(b'|')
+        self.assertEqual(audio, b'RIFFaudio')
+        self.assertIn(b'-ac 1 -ar 24000 -b:a 24k -c:a libopus', args)
+
+    def test_mp3_bitrate(self):
+        extension, output = self.transcode(b'RIFFaudio', 'mp3', bitrate='32k')
+        self.assertEqual(extension, '.mp3')
+        self.assertIn(b'-b:a 32k -c:a libmp3lame', output)
+        with override_settings(TTS_MP3_BITRATE='64k'):
+            self.assertIn(b'-b:a 64k', self.transcode(b'RIFFaudio', 'mp3')[1])
+
+    def test_failure(self):
+        with self.assertRaisesRegex(Exception, 'exit code 1.*Invalid data'):
+            self.transcode(b'fail', 'opus')
+
+
+class TranscodedTTSTests(FakeFFmpegMixin, DocumentAPITestCase):
+
+    def tts(self, accept=None, **data):
+        headers = {'HTTP_ACCEPT': accept} if accept else {}
+        return self.client.post(f'/api/documents/{self.document.pk}/tts/', {'text': 'Hello there.', **data},
+                                format='json', **headers)
+
+    def test_format_from_accept_header(self):
+        response = self.tts(accept='audio/ogg')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'audio/ogg')
+        self.assertIn('Accept', response['Vary'])
+        self.assertIn(b'libopus', b''.join(response.streaming_content))
+
+        self.assertEqual(self.tts(audio_format='mp3')['Content-Type'], 'audio/mpeg')
+        self.assertEqual(self.tts()['Content-Type'], 'audio/wav')
+
+        # Each format is cached separately
+        self.assertEqual(self.tts(accept='audio/ogg')['X-TTS-Cache'], 'hit')
+        self.assertEqual(len(self.engine_calls), 3)
@@ -0,0 +1,108 @@
+import io
+import json
+import zipfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import override_settings
+
+from annotations.models import Annotation
+from documents.tts_batch import SpeechBatch
+from documents.tests.utils import DocumentAPITestCase, fake_engine
+
+
+class SpeechBatchTests(DocumentAPITestCase):
+
+    def archive(self, snippets, **kwargs):
+        batch = SpeechBatch(snippets, 'en', **kwargs)
+        chunks = list(batch)
+        return chunks, zipfile.ZipFile(io.BytesIO(b''.join(chunks)))
+
+    def test_archive_in_request_order(self):
+        chunks, archive = self.archive([{'text': 'First.'}, {'text': 'Second  one.', 'annotation': 7},
+                                        {'text': 'First.'}], window=2)
+        self.assertEqual(archive.namelist(), ['0000.wav', '0001.wav', '0002.wav', 'manifest.json'])
+        self.assertEqual(len(chunks), 4)  # one chunk per snippet, then the manifest
+        self.assertTrue(all(info.compress_type == zipfile.ZIP_STORED for info in archive.infolist()))
+        self.assertEqual(archive.read('0000.wav')[:4], b'RIFF')
+        self.assertEqual(archive.read('0000.wav'), archive.read('0002.wav'))
+
+        manifest = json.loads(archive.read('manifest.json'))
+        self.assertEqual(manifest['language'], 'en')
+        entries = manifest['snippets']
+        self.assertEqual([entry['file'] for entry in entries], ['0000.wav', '0001.wav', '0002.wav'])
+        self.assertEqual(entries[1]['annotation'], 7)
+        self.assertEqual(entries[1]['chars'], len('Second one.'))
+        self.assertEqual(entries[0]['cache'], 'miss')
+        self.assertIn(entries[2]['cache'], ('hit', 'coalesced'))
+        self.assertEqual(entries[0]['bytes'], len(archive.read('0000.wav')))
+        self.assertEqual(sorted(self.engine_calls), ['First.', 'Second one.'])
+
+    def test_failed_snippets_are_listed(self):
+        engine = fake_engine(self.engine_calls)
+
+        def flaky(fp, text, *args, **kwargs):
+            if text == 'Broken.':
+                raise Exception('engine crashed')
+            return engine(fp, text, *args, **kwargs)
+
+        with mock.patch('documents.tts_pipeline.write_uncached', flaky):
+            _, archive = self.archive([{'text': 'Broken.'}, {'text': '  '}, {'text': 'Fine.'}])
+        self.assertEqual(archive.namelist(), ['0002.wav', 'manifest.json'])
+        entries = json.loads(archive.read('manifest.json'))['snippets']
+        self.assertIn('engine crashed', entries[0]['error'])
+        self.assertEqual(entries[1], {'index': 1, 'chars': 0, 'error': 'No text'})
+        self.assertEqual(entries[2]['file'], '0002.wav')
+
+    def test_closing_cancels_pending_snippets(self):
+        batch = SpeechBatch([{'text': f'Snippet {i}.'} for i in range(20)], 'en', window=2)
+        iterator = iter(batch)
+        next(iterator)
+        iterator.close()
+        self.assertLessEqual(len(self.engine_calls), 4)
+        self.assertEqual(len(batch.manifest), 1)
+
+
+class BatchViewTests(DocumentAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.url = f'/api/documents/{self.document.pk}/tts_batch/'
+        self.highlights = [
+            Annotation.objects.create(document=self.document, user=self.user, start_offset=offset,
+                                      end_offset=offset + len(text), selected_text=text)
+            for offset, text in ((30, 'Later highlight.'), (10, 'Earlier highlight.'))
+        ]
+
+    def post(self, **data):
+        return self.client.post(self.url, data, format='json')
+
+    def manifest(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        return json.loads(archive.read('manifest.json'))['snippets']
+
+    def test_snippets_and_annotations(self):
+        entries = self.manifest(self.post(snippets=['Hello.'], annotations='all'))
+        self.assertEqual([entry.get('annotation') for entry in entries],
+                         [None, self.highlights[1].pk, self.highlights[0].pk])
+
+        entries = self.manifest(self.post(annotations=[self.highlights[0].pk]))
+        self.assertEqual(entries[0]['annotation'], self.highlights[0].pk)
+
+    def test_other_users_annotations_are_not_found(self):
+        other = User.objects.create_user('other', password='secret')
+        theirs = Annotation.objects.create(document=self.document, user=other, start_offset=0, end_offset=5,
+                                           selected_text='Mine.')
+        self.assertEqual(self.post(annotations=[theirs.pk]).status_code, 404)
+
+    @override_settings(TTS_BATCH_MAX_SNIPPETS=2, TTS_BATCH_MAX_CHARS=20)
+    def test_invalid_requests(self):
+        self.assertEqual(self.post().status_code, 400)
+        self.assertEqual(self.post(snippets='Hello.').status_code, 400)
+        self.assertEqual(self.post(annotations=['x']).status_code, 400)
+        self.assertEqual(self.post(snippets=['a', 'b', 'c']).status_code, 400)
+        self.assertEqual(self.post(snippets=['x' * 21]).status_code, 400)
+        self.assertEqual(self.post(snippets=['Hello.'], speed=9).status_code, 400)
+        self.assertEqual(self.engine_calls, [])
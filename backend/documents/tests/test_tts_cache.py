@@ -0,0 +1,130 @@
+import os
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase
+
+from documents.tts_cache import TTSAudioCache, make_cache_key, normalize_text
+from documents.tests.utils import DocumentAPITestCase
+
+
+class CacheKeyTests(SimpleTestCase):
+
+    def test_normalize_text(self):
+        self.assertEqual(normalize_text('  Café\n\n and\tmore  '), 'Café and more')
+
+    def test_equivalent_requests_share_a_key(self):
+        self.assertEqual(make_cache_key('Hello\n world', 'gtts', '', 'EN'),
+                         make_cache_key('Hello world', 'gtts', '', 'en'))
+
+    def test_every_parameter_is_part_of_the_key(self):
+        base = make_cache_key('Hello', 'gtts', 'v1', 'en', None)
+        variants = [
+            make_cache_key('Hello!', 'gtts', 'v1', 'en', None),
+            make_cache_key('Hello', 'sapi', 'v1', 'en', None),
+            make_cache_key('Hello', 'gtts', 'v2', 'en', None),
+            make_cache_key('Hello', 'gtts', 'v1', 'fr', None),
+            make_cache_key('Hello', 'gtts', 'v1', 'en', 1.5),
+        ]
+        self.assertNotIn(base, variants)
+        self.assertEqual(len(set(variants)), len(variants))
+
+
+class TTSAudioCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.cache = TTSAudioCache(root=self.tmp, max_bytes=1000, low_watermark=0.6)
+
+    def key(self, name):
+        return make_cache_key(name)
+
+    def test_miss_then_hit(self):
+        key = self.key('a')
+        self.assertIsNone(self.cache.open(key))
+        self.cache.put_bytes(key, b'x' * 100, '.mp3')
+
+        f, content_type, size = self.cache.open(key)
+        with f:
+            self.assertEqual(f.read(), b'x' * 100)
+        self.assertEqual((content_type, size), ('audio/mpeg', 100))
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['bytes_saved']), (1, 1, 100))
+
+    def test_evicts_least_recently_used_down_to_low_watermark(self):
+        keys = [self.key(str(i)) for i in range(3)]
+        for i, key in enumerate(keys):
+            path = self.cache.put_bytes(key, b'x' * 300, '.wav')
+            os.utime(path, (1000 + i, 1000 + i))
+        # Reading the oldest entry makes it the most recently used
+        self.cache.open(keys[0])[0].close()
+
+        self.cache.put_bytes(self.key('new'), b'x' * 300, '.wav')
+
+        self.assertTrue(self.cache.contains(keys[0]))
+        self.assertTrue(self.cache.contains(self.key('new')))
+        for key in keys[1:]:
+            self.assertFalse(self.cache.contains(key))
+        self.assertEqual(self.cache.stats()['bytes'], 600)
+        self.assertEqual(self.cache.stats()['evictions'], 2)
+
+    def test_entry_larger_than_budget_is_kept_until_the_next_store(self):
+        key = self.key('big')
+        self.cache.put_bytes(key, b'x' * 2000, '.mp3')
+        self.assertTrue(self.cache.contains(key))
+
+    def test_failed_writer_leaves_nothing(self):
+        key = self.key('a')
+        with self.assertRaises(RuntimeError):
+            with self.cache.writer(key) as entry:
+                entry.file.write(b'partial')
+                entry.extension = '.mp3'
+                raise RuntimeError('engine failed')
+        with self.assertRaises(Exception):
+            with self.cache.writer(key) as entry:
+                entry.extension = '.mp3'  # nothing written
+        with self.assertRaises(ValueError):
+            with self.cache.writer(key) as entry:
+                entry.file.write(b'data')
+                entry.extension = '.ogg'
+        self.assertFalse(self.cache.contains(key))
+        self.assertEqual([name for _, _, names in os.walk(self.tmp) for name in names], [])
+
+    def test_index_is_rebuilt_from_disk(self):
+        key = self.key('a')
+        self.cache.put_bytes(key, b'x' * 10, '.opus')
+        other = TTSAudioCache(root=self.tmp)
+        f, content_type, size = other.open(key)
+        f.close()
+        self.assertEqual((content_type, size), ('audio/ogg', 10))
+
+    def test_new_format_replaces_old_file(self):
+        key = self.key('a')
+        old = self.cache.put_bytes(key, b'x' * 10, '.wav')
+        self.cache.put_bytes(key, b'y' * 5, '.mp3')
+        self.assertFalse(os.path.exists(old))
+        self.assertEqual(self.cache.stats()['bytes'], 5)
+
+    def test_clear(self):
+        self.cache.put_bytes(self.key('a'), b'x', '.mp3')
+        self.cache.clear()
+        self.assertEqual(self.cache.stats()['entries'], 0)
+        self.assertIsNone(self.cache.open(self.key('a')))
+
+
+class TTSViewCacheTests(DocumentAPITestCase):
+
+    def test_repeated_request_is_a_cache_hit(self):
+        url = f'/api/documents/{self.document.pk}/tts/'
+        first = self.client.post(url, {'text': 'Hello  there.', 'language': 'en'}, format='json')
+        second = self.client.post(url, {'text': 'Hello there.', 'language': 'en'}, format='json')
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual((first['X-TTS-Cache'], second['X-TTS-Cache']), ('miss', 'hit'))
+        self.assertEqual(b''.join(first.streaming_content), b''.join(second.streaming_content))
+        self.assertEqual(self.engine_calls, ['Hello there.'])
+
+    def test_no_text(self):
+        response = self.client.post(f'/api/documents/{self.document.pk}/tts/', {'text': ''}, format='json')
+        self.assertEqual(response.status_code, 400)
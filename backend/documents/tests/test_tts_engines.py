@@ -0,0 +1,171 @@
+import io
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from documents.tts_health import TTSHealthRegistry
+from documents.tts_engines import (Deadline, TTSDeadlineExceeded, TTSEngine, EngineRegistry,
+                                   language_name)
+from documents.enhanced_tts_service import EnhancedTTSService
+
+
+class FakeEngine(TTSEngine):
+    """Engine writing its name, or raising the given error after a delay."""
+
+    def __init__(self, name, offline=True, available=True, error=None, delay=0.0, voices=()):
+        super().__init__()
+        self.name = name
+        self.offline = offline
+        self._available = available
+        self.error = error
+        self.delay = delay
+        self._voices = list(voices)
+        self.timeouts = []
+
+    @property
+    def available(self):
+        return self._available
+
+    def voices(self):
+        return self._voices
+
+    def write(self, fp, text, language, voice_name=None, timeout=None):
+        self.timeouts.append(timeout)
+        fp.write(f'{self.name}:'.encode())
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        fp.write(text.encode())
+        return '.wav'
+
+
+class DeadlineTests(SimpleTestCase):
+
+    def setUp(self):
+        self.now = 100.0
+        patcher = mock.patch('documents.tts_engines.time.monotonic', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_remaining_and_check(self):
+        deadline = Deadline(10)
+        self.now += 4
+        self.assertEqual(deadline.remaining(), 6)
+        self.assertFalse(deadline.expired)
+        deadline.check()
+        self.now += 7
+        self.assertEqual(deadline.remaining(), 0)
+        self.assertTrue(deadline.expired)
+        with self.assertRaisesRegex(TTSDeadlineExceeded, 'Synthesis exceeded its deadline of 10 s'):
+            deadline.check('Synthesis')
+
+    def test_attempt_budget(self):
+        deadline = Deadline(12)
+        self.assertEqual(deadline.attempt_budget(3), 4)
+        self.assertEqual(deadline.attempt_budget(0), 12)
+        # A slower engine gets up to twice its expected time, within what is left
+        self.assertEqual(deadline.attempt_budget(3, expected=1.0), 4)
+        self.assertEqual(deadline.attempt_budget(3, expected=5.0), 10)
+        self.assertEqual(deadline.attempt_budget(3, expected=30.0), 12)
+
+
+class EngineRegistryTests(SimpleTestCase):
+
+    def test_register_and_names(self):
+        registry = EngineRegistry()
+        sapi = registry.register(FakeEngine('sapi', available=False))
+        registry.register(FakeEngine('espeak'))
+        registry.register(FakeEngine('gtts', offline=False))
+        self.assertIs(sapi.registry, registry)
+        self.assertEqual(registry.names(), ['sapi', 'espeak', 'gtts'])
+        self.assertEqual(registry.names(offline=True), ['sapi', 'espeak'])
+        self.assertEqual(registry.names(offline=False), ['gtts'])
+        self.assertEqual(registry.names(available_only=True), ['espeak', 'gtts'])
+
+        replacement = registry.register(FakeEngine('espeak', offline=False))
+        self.assertIs(registry.get('espeak'), replacement)
+        registry.unregister('sapi')
+        self.assertIsNone(sapi.registry)
+        with self.assertRaises(KeyError):
+            registry.get('sapi')
+
+    def test_voices_and_catalog(self):
+        registry = EngineRegistry()
+        registry.register(FakeEngine('espeak', voices=[{'id': 'gmw/en-US', 'name': 'English', 'language': 'en-us'}]))
+        registry.register(FakeEngine('gtts', offline=False, voices=[{'id': 'en', 'name': 'English', 'language': 'en'}]))
+        self.assertEqual(registry.load_voices(), {
+            'espeak': [{'id': 'gmw/en-US', 'name': 'English', 'language': 'en-us'}],
+            'online': [{'id': 'en', 'name': 'English', 'language': 'en'}],
+        })
+        self.assertEqual(registry.get('espeak').find_voice('en')['id'], 'gmw/en-US')
+        self.assertIsNone(FakeEngine('loose').find_voice('en'))
+
+    def test_language_name(self):
+        self.assertEqual(language_name('en-GB'), 'English (UK)')
+        self.assertEqual(language_name('pt-AO'), 'Portuguese')
+        self.assertEqual(language_name('xx'), 'xx')
+
+
+class WriteSpeechTests(SimpleTestCase):
+
+    def setUp(self):
+        self.health = TTSHealthRegistry(failure_threshold=1, cooldown=60)
+        patcher = mock.patch('documents.enhanced_tts_service.tts_health', self.health)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.registry = EngineRegistry()
+        self.service = EnhancedTTSService(self.registry)
+
+    def write(self, prefer_offline=True, deadline=10, voice_name=None):
+        fp = io.BytesIO(b'prefix|')
+        fp.seek(0, 2)
+        ext = self.service.write_speech(fp, 'Hello', 'EN', prefer_offline, voice_name, deadline=deadline)
+        return ext, fp.getvalue()
+
+    def test_preferred_group_first(self):
+        self.registry.register(FakeEngine('espeak'))
+        self.registry.register(FakeEngine('gtts', offline=False))
+        self.assertEqual(self.write(), ('.wav', b'prefix|espeak:Hello'))
+        self.assertEqual(self.write(prefer_offline=False), ('.wav', b'prefix|gtts:Hello'))
+
+    def test_engine_with_the_voice_first(self):
+        self.registry.register(FakeEngine('espeak'))
+        self.registry.register(FakeEngine('sapi', voices=[{'id': 'TTS_MS_EN-US_ZIRA', 'name': 'Zira'}]))
+        self.registry.register(FakeEngine('gtts', offline=False))
+        self.assertEqual(self.write(voice_name='Zira'), ('.wav', b'prefix|sapi:Hello'))
+        self.assertEqual(self.write(prefer_offline=False, voice_name='TTS_MS_EN-US_ZIRA'),
+                         ('.wav', b'prefix|sapi:Hello'))
+        self.assertEqual(self.write(voice_name='unknown'), ('.wav', b'prefix|espeak:Hello'))
+
+    def test_falls_back_and_discards_partial_output(self):
+        broken = self.registry.register(FakeEngine('espeak', error=Exception('crashed')))
+        self.registry.register(FakeEngine('gtts', offline=False))
+        self.assertEqual(self.write(), ('.wav', b'prefix|gtts:Hello'))
+        self.assertEqual(self.health.stats()['espeak']['state'], 'open')
+
+        # The open breaker skips the broken engine
+        self.assertEqual(self.write(), ('.wav', b'prefix|gtts:Hello'))
+        self.assertEqual(len(broken.timeouts), 1)
+
+    def test_rejected_request_is_not_an_engine_fault(self):
+        self.registry.register(FakeEngine('espeak', error=ValueError('unsupported language')))
+        self.registry.register(FakeEngine('gtts', offline=False))
+        self.write()
+        self.assertEqual(self.health.stats()['espeak']['state'], 'closed')
+
+    def test_all_engines_fail(self):
+        self.registry.register(FakeEngine('espeak', error=Exception('crashed')))
+        self.registry.register(FakeEngine('sapi', available=False))
+        with self.assertRaisesRegex(Exception, 'All TTS engines failed: espeak failed: crashed$'):
+            self.write()
+        with self.assertRaisesRegex(Exception, 'No text provided'):
+            self.service.write_speech(io.BytesIO(), '', 'en')
+
+    def test_deadline_shared_by_attempts(self):
+        slow = self.registry.register(FakeEngine('espeak', error=Exception('timed out'), delay=0.15))
+        fallback = self.registry.register(FakeEngine('gtts', offline=False))
+        with self.assertRaisesRegex(TTSDeadlineExceeded, 'gtts not tried: deadline passed'):
+            self.write(deadline=0.1)
+        self.assertAlmostEqual(slow.timeouts[0], 0.05, delta=0.01)
+        self.assertEqual(fallback.timeouts, [])
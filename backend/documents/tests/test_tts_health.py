@@ -0,0 +1,104 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from documents.tts_health import TTSHealthRegistry, CLOSED, OPEN, HALF_OPEN
+
+
+class CircuitBreakerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch('documents.tts_health.time.monotonic', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.health = TTSHealthRegistry(failure_threshold=3, error_rate_threshold=0.5, min_requests=4,
+                                        cooldown=10, max_cooldown=25)
+
+    def state(self, engine='gtts'):
+        return self.health.stats()[engine]['state']
+
+    def record_failures(self, times=1, engine='gtts'):
+        for _ in range(times):
+            self.health.record_failure(engine, 'en', 1.0, 'HTTP 500')
+
+    def test_opens_after_consecutive_failures(self):
+        self.record_failures(2)
+        self.assertEqual(self.state(), CLOSED)
+        self.assertTrue(self.health.allow('gtts'))
+        self.record_failures()
+        self.assertEqual(self.state(), OPEN)
+        self.assertFalse(self.health.allow('gtts'))
+        self.assertEqual(self.health.stats()['gtts']['retry_in'], 10)
+
+    def test_success_resets_consecutive_failures(self):
+        for _ in range(4):
+            self.health.record_success('gtts', 'en', 1.0, 100)
+        self.record_failures(2)
+        self.health.record_success('gtts', 'en', 1.0, 100)
+        self.record_failures(2)
+        self.assertEqual(self.state(), CLOSED)
+
+    def test_opens_on_error_rate(self):
+        for _ in range(2):
+            self.health.record_success('gtts', 'en', 1.0, 100)
+            self.record_failures()
+        self.assertEqual(self.state(), OPEN)
+
+    def test_single_trial_after_cooldown(self):
+        self.record_failures(3)
+        self.now += 10
+        self.assertTrue(self.health.allow('gtts'))
+        self.assertEqual(self.state(), HALF_OPEN)
+        self.assertFalse(self.health.allow('gtts'))
+
+        self.health.record_success('gtts', 'en', 1.0, 100)
+        self.assertEqual(self.state(), CLOSED)
+        self.assertTrue(self.health.allow('gtts'))
+
+    def test_failed_trial_doubles_cooldown_up_to_max(self):
+        self.record_failures(3)
+        for cooldown in (20, 25, 25):
+            self.now += 30
+            self.assertTrue(self.health.allow('gtts'))
+            self.record_failures()
+            self.assertEqual(self.state(), OPEN)
+            self.assertEqual(self.health.stats()['gtts']['retry_in'], cooldown)
+
+    def test_released_trial_can_be_retried(self):
+        self.record_failures(3)
+        self.now += 10
+        self.assertTrue(self.health.allow('gtts'))
+        self.health.release('gtts')
+        self.assertTrue(self.health.allow('gtts'))
+
+
+class RoutingTests(SimpleTestCase):
+
+    def setUp(self):
+        self.health = TTSHealthRegistry(smoothing=0.5)
+
+    def test_rank_by_group_failures_and_speed(self):
+        self.health.record_success('gtts', 'en', 2.0, 100)       # 20 ms/char
+        self.health.record_success('voicerss', 'en', 1.0, 100)   # 10 ms/char
+        self.health.record_success('espeak', 'en', 3.0, 100)
+        self.health.record_failure('pyttsx3', 'en', 1.0)
+
+        engines = ['pyttsx3', 'espeak', 'gtts', 'voicerss', 'sapi']
+        self.assertEqual(self.health.rank(engines, 'en', preferred={'pyttsx3', 'espeak'}),
+                         ['espeak', 'pyttsx3', 'sapi', 'voicerss', 'gtts'])
+
+    def test_language_specific_speed(self):
+        self.health.record_success('gtts', 'fr', 5.0, 100)
+        self.health.record_success('gtts', 'en', 1.0, 100)
+        self.health.record_success('voicerss', 'en', 2.0, 100)
+        self.assertEqual(self.health.rank(['voicerss', 'gtts'], 'en-US'), ['gtts', 'voicerss'])
+        self.assertEqual(self.health.rank(['gtts', 'voicerss'], 'fr_FR'), ['voicerss', 'gtts'])
+
+    def test_expected_latency(self):
+        self.assertIsNone(self.health.expected_latency('gtts', 'en', 100))
+        self.health.record_success('gtts', 'en', 1.0, 100)
+        self.health.record_success('gtts', 'en', 3.0, 100)
+        # EWMA of 10 and 30 ms per character with weight 0.5
+        self.assertAlmostEqual(self.health.expected_latency('gtts', 'en', 50), 1.0)
+        self.assertAlmostEqual(self.health.expected_latency('gtts', 'de', 50), 1.0)
@@ -0,0 +1,87 @@
+from unittest import mock
+
+import requests
+from django.test import SimpleTestCase
+
+from documents.tts_http import TTSHttpClient, TTSHttpError
+
+
+def response(status_code, headers=None):
+    resp = mock.MagicMock(status_code=status_code, headers=headers or {})
+    resp.__enter__.return_value = resp
+    return resp
+
+
+class TTSHttpClientTests(SimpleTestCase):
+
+    def setUp(self):
+        self.client = TTSHttpClient(retries=2, backoff=0.5, max_backoff=4.0, max_concurrency=1,
+                                    acquire_timeout=0.05)
+        self.client._session = mock.MagicMock()
+        self.request = self.client._session.request
+        patcher = mock.patch('documents.tts_http.time.sleep')
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_retries_server_errors(self):
+        self.request.side_effect = [response(503), response(200)]
+        with self.client.stream('GET', 'https://tts.example/') as resp:
+            self.assertEqual(resp.status_code, 200)
+        self.assertEqual(self.request.call_count, 2)
+        self.assertEqual(self.client.stats()['retried'], 1)
+        self.assertEqual(self.client.stats()['in_flight'], 0)
+
+    def test_honours_retry_after(self):
+        self.request.side_effect = [response(429, {'Retry-After': '3'}),
+                                    response(429, {'Retry-After': '60'}), response(200)]
+        with self.client.stream('GET', 'https://tts.example/'):
+            pass
+        self.assertEqual([c.args[0] for c in self.sleep.call_args_list], [3.0, 4.0])
+
+    def test_client_errors_are_returned(self):
+        self.request.return_value = response(404)
+        with self.client.stream('GET', 'https://tts.example/') as resp:
+            self.assertEqual(resp.status_code, 404)
+        self.assertEqual(self.request.call_count, 1)
+
+    def test_gives_up_after_retries(self):
+        self.request.side_effect = requests.ConnectionError('refused')
+        with self.assertRaises(TTSHttpError) as ctx:
+            with self.client.stream('GET', 'https://tts.example/'):
+                pass
+        self.assertIn('3 attempts', str(ctx.exception))
+        self.assertEqual(self.client.stats()['failures'], 1)
+
+        self.request.side_effect = [response(502)] * 3
+        with self.assertRaises(TTSHttpError) as ctx:
+            with self.client.stream('GET', 'https://tts.example/'):
+                pass
+        self.assertEqual(ctx.exception.status_code, 502)
+
+    def test_budget_limits_timeouts_and_retries(self):
+        self.request.side_effect = [response(503, {'Retry-After': '2'}), response(200)]
+        with self.assertRaises(TTSHttpError):
+            with self.client.stream('GET', 'https://tts.example/', budget=1.0):
+                pass
+        self.assertEqual(self.request.call_count, 1)
+        connect, read = self.request.call_args.kwargs['timeout']
+        self.assertLessEqual(connect, 1.0)
+        self.assertLessEqual(read, 1.0)
+
+    def test_concurrency_bound(self):
+        self.request.return_value = response(200)
+        with self.client.stream('GET', 'https://tts.example/'):
+            with self.assertRaises(TTSHttpError):
+                with self.client.stream('GET', 'https://tts.example/'):
+                    pass
+        with self.client.stream('GET', 'https://tts.example/'):
+            pass
+
+    def test_provider_rate_limit_and_throttle(self):
+        self.request.side_effect = [response(429, {'Retry-After': '2'}), response(200)]
+        with mock.patch('documents.tts_http.tts_rate_limiter') as limiter:
+            with self.client.stream('GET', 'https://tts.example/', provider='voicerss', priority=0):
+                pass
+        self.assertEqual(limiter.acquire.call_count, 2)
+        self.assertEqual(limiter.acquire.call_args.args[:2], ('voicerss', 0))
+        limiter.throttle.assert_called_once_with('voicerss', 2.0)
@@ -0,0 +1,147 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import override_settings
+from django.utils import timezone
+from django.contrib.auth.models import User
+
+from documents.models import TTSJob
+from documents import tts_jobs
+from documents.tts_jobs import submit_job, run_job, claim_job, requeue_stale_jobs, job_events
+from documents.tests.utils import DocumentAPITestCase
+
+
+@override_settings(TTS_JOB_RUNNER='external')
+class TTSJobTests(DocumentAPITestCase):
+
+    def submit(self, text='Read this aloud.'):
+        return submit_job(self.user, self.document, text, 'en')
+
+    def test_run_job(self):
+        job = self.submit()
+        self.assertEqual(job.status, TTSJob.STATUS_PENDING)
+        run_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, TTSJob.STATUS_COMPLETE)
+        self.assertEqual(job.content_type, 'audio/wav')
+        self.assertFalse(job.cache_hit)
+        self.assertEqual(self.engine_calls, ['Read this aloud.'])
+
+        # Already claimed: nothing runs again
+        self.assertFalse(claim_job(job.pk))
+        run_job(job.pk)
+        self.assertEqual(len(self.engine_calls), 1)
+
+        # Cached audio completes at submission
+        again = self.submit()
+        self.assertEqual(again.status, TTSJob.STATUS_COMPLETE)
+        self.assertTrue(again.cache_hit)
+        self.assertEqual(again.cache_key, job.cache_key)
+
+    def test_failed_job(self):
+        job = self.submit('Bad request.')
+        with mock.patch('documents.tts_pipeline.write_uncached', side_effect=Exception('all engines failed')):
+            run_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, TTSJob.STATUS_FAILED)
+        self.assertIn('all engines failed', job.error)
+
+    def test_requeue_stale_jobs(self):
+        stale, fresh = self.submit('One.'), self.submit('Two.')
+        TTSJob.objects.filter(pk=stale.pk).update(status=TTSJob.STATUS_RUNNING,
+                                                  started_at=timezone.now() - timedelta(minutes=20))
+        TTSJob.objects.filter(pk=fresh.pk).update(status=TTSJob.STATUS_RUNNING, started_at=timezone.now())
+
+        self.assertEqual(requeue_stale_jobs(600), 1)
+        stale.refresh_from_db()
+        fresh.refresh_from_db()
+        self.assertEqual((stale.status, stale.started_at), (TTSJob.STATUS_PENDING, None))
+        self.assertEqual(fresh.status, TTSJob.STATUS_RUNNING)
+        with override_settings(TTS_JOB_STALE_AFTER=0):
+            self.assertEqual(requeue_stale_jobs(), 1)
+
+    def test_recovery_dispatches_each_pending_job_once(self):
+        first, second = self.submit('One.'), self.submit('Two.')
+        executor = mock.Mock()
+        self.addCleanup(tts_jobs._dispatched.clear)
+        with mock.patch.object(tts_jobs, '_executor', executor):
+            tts_jobs._recover_jobs()
+            tts_jobs._recover_jobs()
+            self.assertEqual([call.args[1] for call in executor.submit.call_args_list], [first.pk, second.pk])
+
+            # Once a job has run on this process it can be dispatched again
+            with mock.patch.object(tts_jobs, 'run_job'):
+                tts_jobs._run_in_thread(first.pk)
+            tts_jobs._recover_jobs()
+            self.assertEqual(executor.submit.call_args_list[-1].args[1], first.pk)
+            self.assertEqual(executor.submit.call_count, 3)
+
+    def test_job_events(self):
+        job = self.submit()
+        events = list(job_events(job, timeout=0))
+        self.assertEqual([event.split('\n')[0] for event in events], ['event: status', 'event: timeout'])
+
+        run_job(job.pk)
+        job.refresh_from_db()
+        events = list(job_events(job))
+        self.assertEqual(len(events), 1)
+        self.assertTrue(events[0].startswith('event: complete\ndata: {"id": %d, "status": "complete"' % job.pk))
+
+
+@override_settings(TTS_JOB_RUNNER='external')
+class TTSJobAPITests(DocumentAPITestCase):
+    url = '/api/tts-jobs/'
+
+    def create(self, **data):
+        return self.client.post(self.url, {'document': self.document.pk, 'text': 'Read this aloud.', **data},
+                                format='json')
+
+    def test_create_and_download(self):
+        response = self.create(language='en-US')
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['id']
+        self.assertTrue(response['Location'].endswith(f'/api/tts-jobs/{job_id}/'))
+        self.assertEqual(response.json()['status'], 'pending')
+
+        self.assertEqual(self.client.get(f'{self.url}{job_id}/audio/').status_code, 409)
+        run_job(job_id)
+        response = self.client.get(f'{self.url}{job_id}/audio/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content)[:4], b'RIFF')
+
+    def test_create_from_text_reference(self):
+        response = self.create(text='', page=2)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(TTSJob.objects.get(pk=response.json()['id']).text, 'Second page here.')
+
+    def test_create_validation(self):
+        self.assertEqual(self.create(language='en-US-x-' + 'a' * 20).status_code, 400)
+        self.assertEqual(self.create(language='en US').status_code, 400)
+        self.assertEqual(self.create(document='abc').status_code, 400)
+        self.assertEqual(self.create(text='').status_code, 400)
+        self.assertEqual(self.create(text='', page=99).status_code, 400)
+        self.assertEqual(self.create(document=self.document.pk + 100).status_code, 404)
+
+    def test_jobs_are_private(self):
+        job_id = self.create().json()['id']
+        other = User.objects.create_user('other', password='secret')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(f'{self.url}{job_id}/').status_code, 404)
+        self.assertEqual(self.client.delete(f'{self.url}{job_id}/').status_code, 404)
+        self.assertEqual(self.create().status_code, 404)
+
+    def test_cancel(self):
+        job_id = self.create().json()['id']
+        self.assertEqual(self.client.delete(f'{self.url}{job_id}/').status_code, 204)
+        self.assertFalse(TTSJob.objects.filter(pk=job_id).exists())
+
+        job_id = self.create().json()['id']
+        run_job(job_id)
+        response = self.client.delete(f'{self.url}{job_id}/')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['status'], 'complete')
+
+        job_id = self.create(text='Another one.').json()['id']
+        claim_job(job_id)
+        self.assertEqual(self.client.delete(f'{self.url}{job_id}/').status_code, 409)
+        self.assertTrue(TTSJob.objects.filter(pk=job_id).exists())
@@ -0,0 +1,86 @@
+import io
+import wave
+from urllib.parse import urlparse
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, override_settings
+
+from documents.tts_marks import word_marks, marks_token, check_marks_token
+from documents.tests.utils import DocumentAPITestCase
+
+
+class WordMarksTests(SimpleTestCase):
+
+    def test_words_share_the_sentence_duration(self):
+        text = 'Skip. Hi there, world.'
+        marks = word_marks(text, 6, len(text), 1.0, 3.0)
+        self.assertEqual([text[start:end] for start, end, _, _ in marks], ['Hi', 'there,', 'world.'])
+        # Weights: 2, 6 + 2 (comma), 6 + 4 (full stop) = 20 units over 2 s
+        self.assertEqual(marks[0][2:], [1.0, 1.2])
+        self.assertEqual(marks[1][2:], [1.2, 1.8])
+        self.assertEqual(marks[2][2:], [2.0, 2.6])
+
+    def test_closing_quotes_keep_the_pause(self):
+        marks = word_marks('"Stop."', 0, 7, 0.0, 1.1)
+        self.assertEqual(marks, [[0, 7, 0.0, 0.7]])
+
+    def test_no_words(self):
+        self.assertEqual(word_marks('   ', 0, 3, 0.0, 1.0), [])
+
+
+class MarksTokenTests(SimpleTestCase):
+
+    def test_token_is_bound_to_key_and_user(self):
+        token = marks_token('abc', 1)
+        self.assertTrue(check_marks_token('abc', 1, token))
+        self.assertFalse(check_marks_token('abc', 2, token))
+        self.assertFalse(check_marks_token('abd', 1, token))
+        self.assertFalse(check_marks_token('abc', 1, None))
+        self.assertFalse(check_marks_token('abc', 1, ''))
+
+
+@override_settings(TTS_STREAM_SEGMENT_CHARS=15)
+class MarksViewTests(DocumentAPITestCase):
+
+    def tts(self, **data):
+        return self.client.post(f'/api/documents/{self.document.pk}/tts/',
+                                {'text': 'Hello there. How are you?', 'marks': True, **data}, format='json')
+
+    def test_audio_and_timing_track(self):
+        response = self.tts()
+        self.assertEqual(response.status_code, 200)
+        audio = b''.join(response.streaming_content)
+        with wave.open(io.BytesIO(audio)) as w:
+            duration = w.getnframes() / w.getframerate()
+        self.assertEqual(sorted(self.engine_calls), ['Hello there.', 'How are you?'])  # synthesized in parallel
+
+        link = urlparse(response['X-TTS-Marks'])
+        self.assertEqual(link.path, '/api/documents/tts_marks/')
+        marks = self.client.get(f'{link.path}?{link.query}')
+        self.assertEqual(marks.status_code, 200)
+        marks = marks.json()
+        self.assertEqual([s[:2] for s in marks['sentences']], [[0, 13], [13, 25]])
+        self.assertAlmostEqual(marks['duration'], duration, delta=0.001)
+        self.assertEqual(marks['sentences'][1][3], marks['duration'])
+        self.assertEqual(len(marks['words']), 5)
+        self.assertEqual(marks['word_timing'], 'estimated')
+
+        # Same request again is served from the cache
+        response = self.tts()
+        self.assertEqual(response['X-TTS-Cache'], 'hit')
+        self.assertEqual(len(self.engine_calls), 2)
+
+    def test_timing_track_needs_the_users_token(self):
+        link = urlparse(self.tts()['X-TTS-Marks'])
+        key = dict(part.split('=') for part in link.query.split('&'))['key']
+        self.assertEqual(self.client.get(link.path, {'key': key}).status_code, 404)
+        self.assertEqual(self.client.get(link.path, {'key': key, 'token': 'forged'}).status_code, 404)
+
+        other = User.objects.create_user('other', password='secret')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(f'{link.path}?{link.query}').status_code, 404)
+
+    def test_marks_reject_speed_and_format(self):
+        self.assertEqual(self.tts(speed=1.5).status_code, 400)
+        self.assertEqual(self.tts(audio_format='opus').status_code, 400)
+        self.assertEqual(self.engine_calls, [])
@@ -0,0 +1,161 @@
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from documents import tts_pipeline
+from documents.tts_prefetch import TTSPrefetcher
+from documents.extraction_store import extraction_store
+from documents.tests.utils import TempMediaTestCase, fake_engine
+
+TEXT = 'One fish. Two fish. Red fish. Blue fish. Old fish. New fish.'
+
+
+@override_settings(TTS_STREAM_SEGMENT_CHARS=12)
+class PredictTests(SimpleTestCase):
+
+    def setUp(self):
+        self.prefetcher = TTSPrefetcher()
+
+    def test_next_passage_of_the_same_length(self):
+        self.assertEqual(self.prefetcher.predict(TEXT, 'One fish. Two fish.'), (['Red fish. Blue fish.'], 19))
+
+    def test_lookahead(self):
+        self.prefetcher.lookahead = 2
+        self.assertEqual(self.prefetcher.predict(TEXT, 'Red fish.'), (['Blue fish. ', 'Old fish.'], 29))
+
+    def test_per_sentence(self):
+        self.assertEqual(self.prefetcher.predict(TEXT, 'One fish. Two fish.', per_sentence=True),
+                         (['Red fish. ', 'Blue fish.'], 19))
+
+    def test_hint_locates_repeated_text(self):
+        self.assertEqual(self.prefetcher.predict(TEXT, 'fish.'), (['Two fish. '], 9))
+        self.assertEqual(self.prefetcher.predict(TEXT, 'fish.', hint=9), (['Red fish. '], 19))
+        # A hint past the last occurrence falls back to the first one
+        self.assertEqual(self.prefetcher.predict(TEXT, 'One fish.', hint=50), (['Two fish. '], 9))
+
+    def test_unknown_text(self):
+        self.assertEqual(self.prefetcher.predict(TEXT, 'Green eggs and ham.'), ([], None))
+
+
+@override_settings(TTS_STREAM_SEGMENT_CHARS=12)
+class PrefetcherTests(TempMediaTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.engine_calls = []
+        patcher = mock.patch('documents.tts_pipeline.write_uncached', fake_engine(self.engine_calls))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.pdf = f'{self.media_root}/source.pdf'
+        with open(self.pdf, 'wb') as f:
+            f.write(b'%PDF')
+        self.store(1, TEXT)
+        self.prefetcher = TTSPrefetcher(tracked_positions=2, cached_documents=2, cached_chars=120)
+
+    def store(self, document_id, text):
+        with extraction_store.writer(str(document_id), self.pdf) as f:
+            f.write(text)
+
+    def run_prefetch(self, text, user_id=1, document_id=1, **kwargs):
+        """Run a prefetch task on this thread, as after_request would queue it."""
+        self.prefetcher._queued += 1
+        self.prefetcher._pending[user_id] = self.prefetcher._pending.get(user_id, 0) + 1
+        self.prefetcher._run(user_id, document_id, text, 'en', True, None, kwargs.get('audio_format'),
+                             kwargs.get('per_sentence', False))
+
+    def test_prefetches_the_continuation(self):
+        self.run_prefetch('One  fish. Two fish.')
+        self.assertEqual(self.engine_calls, ['Red fish. Blue fish.'])
+        stats = self.prefetcher.stats()
+        self.assertEqual((stats['located'], stats['prefetched'], stats['queued']), (1, 1, 0))
+        self.assertEqual(self.prefetcher._pending, {})
+
+        # The reader asks for it: the cache hit counts as a use
+        self.prefetcher.record_hit(tts_pipeline.cache_key_for('Red fish. Blue fish.', 'en', True, None))
+        self.assertEqual(self.prefetcher.stats()['used'], 1)
+        self.assertEqual(self.prefetcher.stats()['hit_rate'], 1.0)
+
+        # Already cached continuations are not synthesized again
+        self.run_prefetch('One fish. Two fish.')
+        self.assertEqual(len(self.engine_calls), 1)
+        self.assertEqual(self.prefetcher.stats()['already_cached'], 1)
+
+    def test_hourly_budget(self):
+        self.prefetcher.user_chars_per_hour = 30
+        self.run_prefetch('One fish. Two fish.')
+        self.run_prefetch('Red fish. Blue fish.')
+        self.assertEqual(self.engine_calls, ['Red fish. Blue fish.'])
+        self.assertEqual(self.prefetcher.stats()['dropped_budget'], 1)
+        # Budgets are per user
+        self.run_prefetch('Red fish. Blue fish.', user_id=2)
+        self.assertEqual(len(self.engine_calls), 2)
+
+    def test_unextracted_document(self):
+        self.run_prefetch('One fish.', document_id=99)
+        self.assertEqual(self.engine_calls, [])
+        self.assertEqual(self.prefetcher.stats()['queued'], 0)
+
+    def test_positions_are_bounded(self):
+        for user_id in (1, 2, 3):
+            self.run_prefetch('One fish.', user_id=user_id)
+        self.assertEqual(list(self.prefetcher._positions), [(2, 1), (3, 1)])
+
+    def test_page_markers_are_not_prefetched(self):
+        self.store(2, 'Title: Fish\n\n--- Page 1 ---\n\nOne fish. Two fish.\n\n'
+                      '--- Page 2 ---\n\nRed fish. Blue fish.\n\n')
+        self.assertEqual(self.prefetcher._document_text(2), 'One fish. Two fish. Red fish. Blue fish.')
+        self.run_prefetch('One fish. Two fish.', document_id=2)
+        self.assertEqual(self.engine_calls, ['Red fish. Blue fish.'])
+        # Requests spanning the page break are located too
+        self.run_prefetch('Two fish. Red fish.', document_id=2)
+        self.assertEqual(self.prefetcher.stats()['located'], 2)
+
+    def test_idle_users_are_forgotten(self):
+        self.prefetcher.user_chars_per_hour = 10
+        with self.prefetcher._lock:
+            self.assertTrue(self.prefetcher._within_budget(1, 5))
+            self.assertFalse(self.prefetcher._within_budget(2, 50))
+        self.assertEqual(list(self.prefetcher._usage), [1])
+
+        with mock.patch('documents.tts_prefetch.time.time', return_value=time.time() + 3700), \
+                self.prefetcher._lock:
+            self.assertTrue(self.prefetcher._within_budget(3, 5))
+        self.assertEqual(list(self.prefetcher._usage), [3])
+
+    def test_document_texts_are_bounded(self):
+        self.store(2, 'Short text.')
+        self.store(3, 'Another short text.')
+        self.prefetcher._document_text(1)
+        self.prefetcher._document_text(2)
+        self.prefetcher._document_text(1)
+        self.prefetcher._document_text(3)
+        self.assertEqual(list(self.prefetcher._documents), [1, 3])
+
+        self.store(4, 'x' * 110)
+        self.prefetcher._document_text(4)
+        self.assertEqual(list(self.prefetcher._documents), [4])
+        self.assertEqual(self.prefetcher._document_chars, 110)
+
+        # Longer than all of the memory budget: read, never kept
+        self.store(5, 'y' * 200)
+        self.assertEqual(len(self.prefetcher._document_text(5)), 200)
+        self.assertEqual(list(self.prefetcher._documents), [4])
+
+        # Re-extracted text replaces the kept copy
+        self.store(4, 'z' * 50)
+        self.assertEqual(self.prefetcher._document_text(4), 'z' * 50)
+        self.assertEqual(self.prefetcher._document_chars, 50)
+
+    def test_after_request_limits(self):
+        self.prefetcher.user_pending = 1
+        self.prefetcher.max_queue = 2
+        self.prefetcher._executor = mock.Mock()
+        self.assertTrue(self.prefetcher.after_request(1, 1, 'One fish.', 'en'))
+        self.assertFalse(self.prefetcher.after_request(1, 1, 'Two fish.', 'en'))
+        self.assertTrue(self.prefetcher.after_request(2, 1, 'One fish.', 'en'))
+        self.assertFalse(self.prefetcher.after_request(3, 1, 'One fish.', 'en'))
+        stats = self.prefetcher.stats()
+        self.assertEqual((stats['requests'], stats['queued'], stats['dropped_budget'], stats['dropped_queue']),
+                         (4, 2, 1, 1))
+        self.assertEqual(self.prefetcher._executor.submit.call_count, 2)
@@ -0,0 +1,93 @@
+import time
+import threading
+
+from django.test import SimpleTestCase, override_settings
+
+from documents.tts_rate_limit import (ProviderRateLimit, TTSRateLimiter, RateLimitTimeout, tts_priority,
+                                      current_priority, PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND,
+                                      PRIORITY_PREFETCH)
+
+
+class ProviderRateLimitTests(SimpleTestCase):
+
+    def test_burst_then_rate(self):
+        limit = ProviderRateLimit('voicerss', rate=20, burst=3)
+        for _ in range(3):
+            self.assertLess(limit.acquire(), 0.01)
+        waited = limit.acquire()
+        self.assertGreater(waited, 0.03)
+        self.assertLess(waited, 1.0)
+        stats = limit.stats()
+        self.assertEqual((stats['granted'], stats['delayed'], stats['queue_depth']), (4, 1, 0))
+
+    def test_timeout(self):
+        limit = ProviderRateLimit('voicerss', rate=1, burst=1)
+        limit.acquire()
+        with self.assertRaisesRegex(RateLimitTimeout, 'voicerss rate limit: no request slot within 0.1 s'):
+            limit.acquire(timeout=0.1)
+        self.assertEqual(limit.stats()['timeouts'], 1)
+        self.assertEqual(limit.stats()['queue_depth'], 0)
+
+    def test_waiters_served_by_priority(self):
+        # Grants are 50 ms apart, so each waiter records its turn before the next one goes
+        limit = ProviderRateLimit('gtts', rate=20, burst=1)
+        limit.throttle(0.2)
+        order = []
+
+        def request(priority):
+            limit.acquire(priority)
+            order.append(priority)
+
+        threads = []
+        for priority in (PRIORITY_PREFETCH, PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, PRIORITY_PREFETCH):
+            thread = threading.Thread(target=request, args=(priority,))
+            thread.start()
+            threads.append(thread)
+            while limit.stats()['queue_depth'] < len(threads):
+                time.sleep(0.001)
+        self.assertEqual(limit.stats()['queued'], {'interactive': 1, 'background': 1, 'prefetch': 2})
+        for thread in threads:
+            thread.join()
+        self.assertEqual(order, [PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND, PRIORITY_PREFETCH, PRIORITY_PREFETCH])
+
+    def test_throttle_pauses_requests(self):
+        limit = ProviderRateLimit('voicerss', rate=100, burst=5, pause_after_429=0.1)
+        limit.throttle()
+        self.assertGreater(limit.stats()['paused_for'], 0.05)
+        self.assertGreater(limit.acquire(), 0.08)
+        self.assertEqual(limit.stats()['throttled'], 1)
+
+    def test_unlimited_provider_still_honours_throttle(self):
+        limit = ProviderRateLimit('gtts', rate=0)
+        for _ in range(10):
+            self.assertEqual(limit.acquire(), 0.0)
+        limit.throttle(0.1)
+        self.assertGreater(limit.acquire(), 0.08)
+        with self.assertRaises(RateLimitTimeout):
+            limit.throttle(1)
+            limit.acquire(timeout=0.05)
+
+
+class TTSRateLimiterTests(SimpleTestCase):
+
+    @override_settings(TTS_VOICERSS_RATE=2, TTS_VOICERSS_BURST=4, TTS_GTTS_RATE=0)
+    def test_limits_from_settings(self):
+        limiter = TTSRateLimiter()
+        limit = limiter.get('voicerss')
+        self.assertIs(limiter.get('voicerss'), limit)
+        self.assertEqual((limit.rate, limit.burst), (2, 4))
+        self.assertEqual(limiter.get('gtts').rate, 0)
+        self.assertEqual(set(limiter.stats()), {'voicerss', 'gtts'})
+
+    def test_priority_context_and_max_wait(self):
+        limiter = TTSRateLimiter(max_wait=0.05)
+        limiter._limits['voicerss'] = ProviderRateLimit('voicerss', rate=1, burst=1)
+        self.assertEqual(current_priority(), PRIORITY_INTERACTIVE)
+        with tts_priority(PRIORITY_PREFETCH):
+            self.assertEqual(current_priority(), PRIORITY_PREFETCH)
+            limiter.acquire('voicerss')
+            start = time.monotonic()
+            with self.assertRaises(RateLimitTimeout):
+                limiter.acquire('voicerss', timeout=10)
+            self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual(current_priority(), PRIORITY_INTERACTIVE)
@@ -0,0 +1,92 @@
+from django.test import SimpleTestCase
+
+from documents.extraction_store import extraction_store
+from documents.pdf_utils import PAGE_MARKER, PAGE_HEADER
+from documents.tts_text import has_text_reference, resolve_text_reference, read_range, find_page
+from documents.tests.utils import DocumentAPITestCase
+
+
+class PageMarkerTests(SimpleTestCase):
+
+    def test_markers(self):
+        text = 'Title: \n--- Page 1 ---\nText.\n--- Page 12 ---\nMore --- Page 3 --- text.'
+        self.assertEqual(PAGE_MARKER.sub('', text), '\n\nText.\n\nMore --- Page 3 --- text.')
+        self.assertEqual(PAGE_HEADER.fullmatch('--- Page 12 ---').group(1), '12')
+
+    def test_has_text_reference(self):
+        self.assertTrue(has_text_reference({'page': 1}))
+        self.assertTrue(has_text_reference({'start_offset': 0}))
+        self.assertFalse(has_text_reference({'text': 'Hello', 'page': '', 'end_offset': None}))
+
+
+class TextReferenceTests(DocumentAPITestCase):
+    pages = ['This is the first page. It has two sentences.', 'Second page here.', 'Third and last page.']
+
+    def setUp(self):
+        super().setUp()
+        self.key = str(self.document.pk)
+        resolve_text_reference(self.document, {'page': 1})  # extracts the text
+        self.text = extraction_store.read(self.key)
+
+    def test_page(self):
+        text, start, end = resolve_text_reference(self.document, {'page': 2})
+        self.assertEqual(text, 'Second page here.')
+        self.assertEqual(self.text[start:end].strip(), 'Second page here.')
+
+    def test_page_sentences(self):
+        text, start, end = resolve_text_reference(self.document, {'page': '1', 'sentence_start': 1})
+        self.assertEqual(text, 'It has two sentences.')
+        self.assertEqual(resolve_text_reference(self.document, {'page': 1, 'sentence_end': 1})[0],
+                         'This is the first page.')
+        self.assertEqual(self.text[start:end].strip(), 'It has two sentences.')
+
+    def test_offsets(self):
+        start = self.text.index('It has')
+        text, _, _ = resolve_text_reference(self.document, {'start_offset': start, 'end_offset': start + 10})
+        self.assertEqual(text, 'It has two')
+        # Page separators in the range are not read aloud
+        end = self.text.index('here.') + 5
+        text, _, _ = resolve_text_reference(self.document, {'start_offset': start, 'end_offset': end})
+        self.assertEqual(text, 'It has two sentences. Second page here.')
+
+    def test_read_range_and_find_page(self):
+        self.assertEqual(read_range(self.key, 0, 5), self.text[:5])
+        with self.assertRaisesRegex(ValueError, 'start_offset'):
+            read_range(self.key, len(self.text) + 1, len(self.text) + 2)
+        with self.assertRaisesRegex(ValueError, 'end_offset'):
+            read_range(self.key, 0, len(self.text) + 10)
+        page_text, offset = find_page(self.key, 3)
+        self.assertEqual(page_text.strip(), 'Third and last page.')
+        self.assertEqual(self.text[offset:].strip(), 'Third and last page.')
+        with self.assertRaisesRegex(ValueError, 'no page 4'):
+            find_page(self.key, 4)
+
+    def test_invalid_references(self):
+        for data, message in [
+            ({'page': 'one'}, 'page must be an integer'),
+            ({'page': 9}, 'no page 9'),
+            ({'page': 1, 'start_offset': 0, 'end_offset': 5}, 'either'),
+            ({'page': 1, 'sentence_start': 1, 'sentence_end': 1}, 'Invalid sentence range 1-1'),
+            ({'page': 1, 'sentence_end': 3}, 'page 1 has 2 sentences'),
+            ({'sentence_start': 0}, 'need a page'),
+            ({'start_offset': 0}, 'both'),
+            ({'start_offset': 5, 'end_offset': 2}, 'Invalid offset range'),
+            ({'start_offset': 0, 'end_offset': 10 ** 6}, 'limit is'),
+            ({'start_offset': 0, 'end_offset': len(self.text) + 1}, 'past the end'),
+        ]:
+            with self.subTest(data=data), self.assertRaisesRegex(ValueError, message):
+                resolve_text_reference(self.document, data)
+        with self.assertRaisesRegex(ValueError, 'limit is 10'):
+            resolve_text_reference(self.document, {'page': 1}, max_chars=10)
+
+    def test_tts_view(self):
+        url = f'/api/documents/{self.document.pk}/tts/'
+        response = self.client.post(url, {'page': 2}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.engine_calls, ['Second page here.'])
+        start, end = int(response['X-TTS-Text-Start']), int(response['X-TTS-Text-End'])
+        self.assertEqual(self.text[start:end].strip(), 'Second page here.')
+
+        self.assertEqual(self.client.post(url, {'page': 7}, format='json').status_code, 400)
+        self.assertEqual(self.client.post(url, {'start_offset': 4}, format='json').status_code, 400)
+        self.assertEqual(self.client.post(url, {'page': 1, 'sentence_start': 'x'}, format='json').status_code, 400)
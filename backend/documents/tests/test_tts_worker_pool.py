@@ -0,0 +1,109 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.test import SimpleTestCase
+
+from documents.tts_worker_pool import TTSWorkerPool
+from documents.tests.workers import echo_worker, broken_worker
+
+
+class TTSWorkerPoolTests(SimpleTestCase):
+
+    def pool(self, **kwargs):
+        pool = TTSWorkerPool(target=kwargs.pop('target', echo_worker), startup_timeout=30, **kwargs)
+        self.addCleanup(pool.close)
+        return pool
+
+    def read(self, path):
+        with open(path) as f:
+            content = f.read()
+        os.remove(path)
+        return content.split(':', 1)
+
+    def wait_for(self, condition, timeout=30):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.05)
+
+    def test_synthesize_reuses_worker(self):
+        pool = self.pool(size=1)
+        first_pid, text = self.read(pool.synthesize('hello'))
+        second_pid, _ = self.read(pool.synthesize('again'))
+        self.assertEqual(text, 'hello')
+        self.assertEqual(first_pid, second_pid)
+        stats = pool.stats()
+        self.assertEqual((stats['workers'], stats['jobs'], stats['idle']), (1, 2, 1))
+
+    def test_concurrent_jobs_run_in_separate_workers(self):
+        pool = self.pool(size=2)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            paths = list(executor.map(pool.synthesize, ['sleep 0.5', 'sleep 0.5']))
+        self.assertEqual(len({self.read(path)[0] for path in paths}), 2)
+
+    def test_timeout_replaces_worker(self):
+        pool = self.pool(size=1, job_timeout=0.5)
+        with self.assertRaisesRegex(Exception, 'timed out'):
+            pool.synthesize('sleep 5')
+        self.assertEqual(pool.stats()['timeouts'], 1)
+        self.assertEqual(self.read(pool.synthesize('after'))[1], 'after')
+        self.assertEqual(pool.stats()['workers'], 1)
+
+    def test_no_budget_left_keeps_worker(self):
+        pool = self.pool(size=1)
+        pid, _ = self.read(pool.synthesize('hello'))
+        with self.assertRaisesRegex(Exception, 'No time left'):
+            pool.synthesize('late', timeout=0)
+        stats = pool.stats()
+        self.assertEqual((stats['timeouts'], stats['workers'], stats['idle']), (0, 1, 1))
+        self.assertEqual(self.read(pool.synthesize('after'))[0], pid)
+
+    def test_crash_replaces_worker(self):
+        pool = self.pool(size=1)
+        with self.assertRaisesRegex(Exception, 'crashed'):
+            pool.synthesize('crash')
+        self.assertEqual(pool.stats()['crashes'], 1)
+        self.assertEqual(self.read(pool.synthesize('after'))[1], 'after')
+
+    def test_failed_job_keeps_worker(self):
+        pool = self.pool(size=1)
+        with self.assertRaisesRegex(Exception, 'synthesis failed'):
+            pool.synthesize('fail')
+        stats = pool.stats()
+        self.assertEqual((stats['failures'], stats['idle']), (1, 1))
+
+    def test_worker_is_recycled_after_max_jobs(self):
+        pool = self.pool(size=1, max_jobs_per_worker=2)
+        pids = [self.read(pool.synthesize(text))[0] for text in ('a', 'b')]
+        self.wait_for(lambda: pool.stats()['idle'] == 1)
+        pids.append(self.read(pool.synthesize('c'))[0])
+        self.assertEqual(pids[0], pids[1])
+        self.assertNotEqual(pids[1], pids[2])
+        self.assertEqual(pool.stats()['recycled'], 1)
+
+    def test_acquire_timeout(self):
+        pool = self.pool(size=1, acquire_timeout=0.2)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            busy = executor.submit(pool.synthesize, 'sleep 1')
+            time.sleep(0.5)
+            with self.assertRaisesRegex(Exception, 'No TTS worker became available'):
+                pool.synthesize('waiting')
+            self.read(busy.result())
+
+    def test_worker_that_fails_to_start(self):
+        pool = self.pool(size=1, target=broken_worker)
+        with self.assertRaisesRegex(Exception, 'no driver'):
+            pool.synthesize('hello')
+        self.assertEqual(pool.stats()['workers'], 0)
+
+    def test_list_voices(self):
+        pool = self.pool(size=1)
+        self.assertEqual(pool.list_voices(), [('en-us', 'English'), ('fr', 'French')])
+        self.assertEqual(pool.stats()['idle'], 1)
+
+    def test_closed_pool(self):
+        pool = self.pool(size=1)
+        pool.close()
+        with self.assertRaisesRegex(Exception, 'closed'):
+            pool.synthesize('hello')
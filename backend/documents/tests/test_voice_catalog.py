@@ -0,0 +1,112 @@
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from documents.voice_catalog import VoiceCatalog, VoiceCatalogSnapshot, guess_language, normalize_language
+from documents.tests.utils import DocumentAPITestCase
+
+VOICES = {
+    'pyttsx3': [
+        {'id': 'gmw/en-US', 'name': 'English (America)', 'language': 'en-us'},
+        {'id': 'roa/pt-BR', 'name': 'Portuguese (Brazil)', 'language': 'pt-br'},
+    ],
+    'windows_sapi': [
+        {'id': r'HKEY\Voices\TTS_MS_DE-DE_HEDDA_11.0', 'name': 'Hedda', 'language': 'unknown'},
+    ],
+}
+
+
+class LanguageTests(SimpleTestCase):
+
+    def test_normalize_language(self):
+        self.assertEqual(normalize_language(' en_US '), 'en-us')
+        self.assertEqual(normalize_language(None), '')
+
+    def test_guess_language(self):
+        self.assertEqual(guess_language('gmw/en-US'), 'en-us')
+        self.assertEqual(guess_language('roa/fr'), 'fr')
+        self.assertEqual(guess_language('com.apple.voice;language=pt_BR;gender=f'), 'pt-br')
+        self.assertEqual(guess_language(r'HKEY\Voices\TTS_MS_DE-DE_HEDDA_11.0'), 'unknown')
+
+
+class SnapshotTests(SimpleTestCase):
+
+    def setUp(self):
+        self.snapshot = VoiceCatalogSnapshot(VOICES)
+
+    def test_find(self):
+        self.assertEqual(self.snapshot.find('pyttsx3', voice_name='roa/pt-BR')['id'], 'roa/pt-BR')
+        self.assertEqual(self.snapshot.find('pyttsx3', voice_name='English (America)')['id'], 'gmw/en-US')
+        self.assertEqual(self.snapshot.find('pyttsx3', language='en_US')['id'], 'gmw/en-US')
+        self.assertEqual(self.snapshot.find('pyttsx3', language='pt-PT')['id'], 'roa/pt-BR')
+        self.assertEqual(self.snapshot.find('windows_sapi', voice_name='de-de_hedda')['name'], 'Hedda')
+        self.assertIsNone(self.snapshot.find('windows_sapi', language='de'))
+        self.assertIsNone(self.snapshot.find('pyttsx3', language='ja'))
+        self.assertIsNone(self.snapshot.find('espeak', language='en'))
+
+    def test_etag_depends_on_content(self):
+        self.assertEqual(self.snapshot.etag, VoiceCatalogSnapshot(dict(VOICES)).etag)
+        self.assertNotEqual(self.snapshot.etag, VoiceCatalogSnapshot({'pyttsx3': []}).etag)
+
+
+class VoiceCatalogTests(SimpleTestCase):
+
+    def test_built_once_on_first_use(self):
+        loader = mock.Mock(return_value=VOICES)
+        catalog = VoiceCatalog(loader, ttl=0)
+        loader.assert_not_called()
+        self.assertIs(catalog.get(), catalog.get())
+        self.assertEqual(catalog.find('pyttsx3', 'en')['id'], 'gmw/en-US')
+        loader.assert_called_once()
+
+    def test_refresh(self):
+        loader = mock.Mock(side_effect=[VOICES, {'pyttsx3': []}])
+        catalog = VoiceCatalog(loader, ttl=0)
+        first = catalog.get()
+        self.assertNotEqual(catalog.refresh().etag, first.etag)
+        self.assertIsNone(catalog.find('pyttsx3', 'en'))
+
+    def test_stale_catalog_is_rebuilt_in_background(self):
+        loader = mock.Mock(side_effect=[VOICES, {'pyttsx3': []}])
+        catalog = VoiceCatalog(loader, ttl=60)
+        first = catalog.get()
+        first.built_at -= 120
+        self.assertIs(catalog.get(), first)
+        for _ in range(100):
+            if catalog.get() is not first:
+                break
+            time.sleep(0.01)
+        self.assertEqual(loader.call_count, 2)
+        self.assertEqual(catalog.get().voices, {'pyttsx3': []})
+
+
+class AvailableVoicesViewTests(DocumentAPITestCase):
+    url = '/api/documents/available_voices/'
+
+    def setUp(self):
+        super().setUp()
+        self.catalog = VoiceCatalog(mock.Mock(return_value=VOICES), ttl=0)
+        patcher = mock.patch('documents.api.views.enhanced_tts_service.voice_catalog', self.catalog)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_etag_and_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), VOICES)
+        etag = response['ETag']
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=f'"other", W/{etag}')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+
+    def test_refresh_requires_staff(self):
+        self.catalog.get()
+        with mock.patch.object(self.catalog, 'refresh', wraps=self.catalog.refresh) as refresh:
+            self.client.get(self.url, {'refresh': 'true'})
+            refresh.assert_not_called()
+            self.user.is_staff = True
+            self.client.get(self.url, {'refresh': 'true'})
+            refresh.assert_called_once()
@@ -0,0 +1,116 @@
+"""
+Helpers shared by the documents tests.
+"""
+import io
+import wave
+import shutil
+import tempfile
+from unittest import mock
+
+import fitz  # PyMuPDF
+from django.contrib.auth.models import User
+from django.core.files import File
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from documents.models import Document
+from documents.extraction_store import extraction_store
+from documents.tts_cache import tts_audio_cache
+
+
+def make_pdf(path, pages, title=None):
+    """
+    Write a PDF with one line of text per page.
+
+    Args:
+        path (str): Where to write the file
+        pages (list): Text of each page
+        title (str, optional): Title in the document metadata
+
+    Returns:
+        str: The path
+    """
+    doc = fitz.open()
+    for text in pages:
+        page = doc.new_page()
+        for i, line in enumerate(text.split('\n')):
+            page.insert_text((72, 72 + 14 * i), line)
+    if title:
+        doc.set_metadata({'title': title})
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def wav_bytes(seconds, sample_rate=16000, channels=1):
+    """16-bit PCM WAV file contents with a quiet square wave."""
+    frames = int(seconds * sample_rate)
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes((b'\x00\x01' * channels + b'\x00\xff' * channels) * (frames // 2))
+    return buffer.getvalue()
+
+
+def fake_engine(calls=None):
+    """
+    Stand-in for tts_pipeline.write_uncached writing WAV audio whose length
+    grows with the text, recording each synthesized text in calls.
+    """
+    def write_uncached(fp, text, language, prefer_offline=True, voice_name=None):
+        if calls is not None:
+            calls.append(text)
+        fp.write(wav_bytes(0.05 + 0.01 * len(text)))
+        return '.wav'
+    return write_uncached
+
+
+class TempMediaTestCase(TestCase):
+    """
+    TestCase with MEDIA_ROOT in a temporary directory, and the extraction
+    store and TTS audio cache singletons moved into it.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        for target, attributes in ((extraction_store, {'_root': None}),
+                                   (tts_audio_cache, {'_root': None, '_index': None, '_total_bytes': 0})):
+            for name, value in attributes.items():
+                patcher = mock.patch.object(target, name, value)
+                patcher.start()
+                self.addCleanup(patcher.stop)
+
+
+class DocumentAPITestCase(TempMediaTestCase):
+    """
+    TempMediaTestCase with a signed-in user owning a document, and the TTS
+    engines replaced by fake_engine() (texts synthesized go to engine_calls).
+    """
+    pages = ['First page. It has two sentences.', 'Second page here.', 'Third and last page.']
+
+    def setUp(self):
+        super().setUp()
+        settings = override_settings(SECURE_SSL_REDIRECT=False, TTS_PREFETCH_ENABLED=False)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.engine_calls = []
+        engine = mock.patch('documents.tts_pipeline.write_uncached', fake_engine(self.engine_calls))
+        engine.start()
+        self.addCleanup(engine.stop)
+
+        self.user = User.objects.create_user('reader', password='secret')
+        path = make_pdf(f'{self.media_root}/book.pdf', self.pages, title='Book')
+        with open(path, 'rb') as f:
+            self.document = Document.objects.create(user=self.user, title='Book', file=File(f, name='book.pdf'))
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
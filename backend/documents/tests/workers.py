@@ -0,0 +1,33 @@
+"""
+Stand-in worker process main functions for the worker pool tests (spawned
+processes import them by name, so they live in a module of their own).
+"""
+import os
+import time
+
+
+def echo_worker(conn):
+    """Writes the text of each job to its output file; 'sleep N', 'crash' and 'fail' misbehave."""
+    conn.send(('ready', os.getpid()))
+    while True:
+        job = conn.recv()
+        if job is None:
+            break
+        if job == 'voices':
+            conn.send(('ok', [('en-us', 'English'), ('fr', 'French')]))
+            continue
+        text, language, voice_name, rate, output_file = job
+        if text.startswith('sleep '):
+            time.sleep(float(text.split()[1]))
+        elif text == 'crash':
+            os._exit(1)
+        elif text == 'fail':
+            conn.send(('error', 'synthesis failed'))
+            continue
+        with open(output_file, 'w') as f:
+            f.write(f'{os.getpid()}:{text}')
+        conn.send(('ok', output_file))
+
+
+def broken_worker(conn):
+    conn.send(('error', 'Failed to initialize pyttsx3 engine: no driver'))
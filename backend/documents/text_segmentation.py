@@ -0,0 +1,104 @@
+"""
+Sentence segmentation for speech synthesis.
+
+Splits text into sentence-sized segments, reported as character offsets
+into the original text so that audio produced per segment can be mapped
+back to positions in the document.
+"""
+import re
+
+# A sentence ends with ., !, ? or … (optionally followed by closing quotes or
+# brackets) and is followed by whitespace
+_SENTENCE_END = re.compile(r'[.!?…]+[\'"’”)\]]*(?=\s)')
+_CLAUSE_END = re.compile(r'[,;:—]\s')
+_ABBREVIATIONS = {
+    'mr', 'mrs', 'ms', 'dr', 'prof', 'sr', 'jr', 'st', 'vs', 'etc', 'e.g', 'i.e',
+    'fig', 'no', 'vol', 'pp', 'p', 'ch', 'sec', 'approx',
+}
+
+
+def _is_abbreviation(text, end):
+    """Check whether the period ending at `end` belongs to an abbreviation or initial."""
+    start = end
+    while start > 0 and not text[start - 1].isspace():
+        start -= 1
+    word = text[start:end].rstrip('.').lower()
+    return word in _ABBREVIATIONS or (len(word) == 1 and word.isalpha())
+
+
+def _split_long(text, start, end, max_chars):
+    """Split an over-long span at clause boundaries, then at spaces."""
+    spans = []
+    while end - start > max_chars:
+        window = text[start:start + max_chars]
+        cut = None
+        for match in _CLAUSE_END.finditer(window):
+            cut = match.end()
+        if cut is None or cut < max_chars // 3:
+            space = window.rfind(' ')
+            cut = space + 1 if space > 0 else max_chars
+        spans.append((start, start + cut))
+        start += cut
+    spans.append((start, end))
+    return spans
+
+
+def split_sentences(text, max_chars=300, min_chars=20):
+    """
+    Split text into sentence segments.
+
+    Very short sentences are merged with the following one and sentences
+    longer than max_chars are split at clause boundaries or spaces, so that
+    every segment is a reasonable unit of synthesis.
+
+    Args:
+        text (str): Text to segment
+        max_chars (int): Maximum segment length
+        min_chars (int): Segments shorter than this are merged with the next one
+
+    Returns:
+        list: (start, end) character offsets of the segments, with surrounding
+              whitespace excluded
+    """
+    boundaries = []
+    for match in _SENTENCE_END.finditer(text):
+        if text[match.end() - 1] == '.':
+            if _is_abbreviation(text, match.end()):
+                continue
+            # "e.g. the", "U.S. yesterday": a sentence doesn't continue in lower case
+            following = text[match.end():match.end() + 16].lstrip()
+            if following[:1].islower():
+                continue
+        boundaries.append(match.end())
+    boundaries.append(len(text))
+
+    spans = []
+    start = 0
+    pending = None
+    for end in boundaries:
+        # Trim surrounding whitespace
+        while start < end and text[start].isspace():
+            start += 1
+        stop = end
+        while stop > start and text[stop - 1].isspace():
+            stop -= 1
+        if stop <= start:
+            start = end
+            continue
+
+        if pending is not None:
+            start = pending
+            pending = None
+        if stop - start < min_chars and end < len(text):
+            pending = start
+            start = end
+            continue
+
+        spans.extend(_split_long(text, start, stop, max_chars))
+        start = end
+
+    if pending is not None:
+        stop = len(text.rstrip())
+        if stop > pending:
+            spans.extend(_split_long(text, pending, stop, max_chars))
+    return spans
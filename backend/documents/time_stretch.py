@@ -0,0 +1,201 @@
+"""
+Pitch-preserving time stretching of synthesized speech.
+
+Playback speed variants (0.75x to 2x) are derived from audio already in
+the cache instead of running an engine again at another rate. With ffmpeg
+the `atempo` filter does the stretch for every format; without it, WAV
+audio (SAPI, espeak, pyttsx3) is stretched in-process with WSOLA
+(waveform-similarity overlap-add): frames are taken from the input at the
+speed-scaled position, shifted within a small tolerance to the offset most
+similar to the natural continuation of the previous frame, and overlap-added
+at a fixed hop, so the pitch stays the same and there are no phase jumps.
+"""
+import math
+import logging
+import subprocess
+
+import numpy as np
+
+from documents.audio_utils import parse_wav, wav_header, AudioFormatError
+from documents.transcoding import ffmpeg_binary, FORMATS
+
+logger = logging.getLogger(__name__)
+
+MIN_SPEED = 0.75
+MAX_SPEED = 2.0
+
+
+def normalize_speed(speed):
+    """
+    Validate a playback speed and round it to a step of 0.05, so that
+    nearby speeds share one cached variant.
+
+    Args:
+        speed: Speed factor (number or numeric string)
+
+    Returns:
+        float: The speed, or None for normal speed
+
+    Raises:
+        ValueError: If the speed is not a number between MIN_SPEED and MAX_SPEED
+    """
+    if speed in (None, ''):
+        return None
+    try:
+        speed = float(speed)
+    except (TypeError, ValueError):
+        raise ValueError("speed must be a number")
+    # Checked before rounding, which fails on infinity and NaN
+    if not math.isfinite(speed) or not MIN_SPEED <= speed <= MAX_SPEED:
+        raise ValueError(f"speed must be between {MIN_SPEED} and {MAX_SPEED}")
+    speed = round(speed * 20) / 20
+    return None if speed == 1.0 else speed
+
+
+def wsola(samples, speed, sample_rate, frame_ms=30, tolerance_ms=8):
+    """
+    Time-stretch PCM samples without changing their pitch.
+
+    Args:
+        samples (np.ndarray): float32 samples, shape (frames, channels)
+        speed (float): Speed factor (2.0 halves the duration)
+        sample_rate (int): Sample rate of the audio
+        frame_ms (float): Length of the overlap-added frames
+        tolerance_ms (float): How far a frame may move from its nominal position
+
+    Returns:
+        np.ndarray: Stretched float32 samples, shape (frames, channels)
+    """
+    frame = max(32, int(sample_rate * frame_ms / 1000) // 2 * 2)
+    hop = frame // 2
+    tolerance = max(1, int(sample_rate * tolerance_ms / 1000))
+    # Periodic Hann windows at 50% overlap sum to one
+    window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(frame) / frame)).astype(np.float32)[:, None]
+
+    length = len(samples)
+    out_length = int(length / speed)
+    if out_length < frame:
+        # Too short to overlap-add; a few milliseconds either way don't matter
+        return samples.copy()
+
+    # Pad so every search region and continuation lies inside the input
+    padded = np.concatenate([
+        np.zeros((tolerance, samples.shape[1]), np.float32),
+        samples,
+        np.zeros((frame + 2 * tolerance + int(hop * speed) + hop, samples.shape[1]), np.float32),
+    ])
+    mono = padded.mean(axis=1)
+
+    frames = out_length // hop + 1
+    output = np.zeros(((frames + 1) * hop, samples.shape[1]), np.float32)
+    previous = tolerance  # input position of the previous frame
+    for k in range(frames):
+        nominal = tolerance + int(k * hop * speed)
+        if k == 0:
+            position = nominal
+        else:
+            # Pick the offset most similar to where the previous frame would continue
+            continuation = mono[previous + hop:previous + hop + frame]
+            region = mono[nominal - tolerance:nominal + tolerance + frame]
+            position = nominal - tolerance + int(np.argmax(np.correlate(region, continuation, 'valid')))
+        output[k * hop:k * hop + frame] += padded[position:position + frame] * window
+        previous = position
+
+    return output[:out_length]
+
+
+def stretch_wav(data, speed):
+    """
+    Time-stretch 16-bit PCM WAV audio with WSOLA.
+
+    Args:
+        data (bytes): WAV file contents
+        speed (float): Speed factor
+
+    Returns:
+        bytes: Stretched WAV file contents in the same format
+
+    Raises:
+        AudioFormatError: If the data is not 16-bit PCM WAV
+    """
+    fmt, pcm = parse_wav(data)
+    if fmt['audio_format'] != 1 or fmt['bits_per_sample'] != 16:
+        raise AudioFormatError(f"Can't stretch {fmt['bits_per_sample']}-bit WAV "
+                               f"(format {fmt['audio_format']}) without ffmpeg")
+    channels = fmt['channels']
+    usable = len(pcm) // (2 * channels) * 2 * channels
+    samples = np.frombuffer(pcm[:usable], dtype='<i2').reshape(-1, channels).astype(np.float32)
+
+    stretched = wsola(samples, speed, fmt['sample_rate'])
+    out = np.clip(np.rint(stretched), -32768, 32767).astype('<i2').tobytes()
+    return wav_header(fmt, len(out)) + out
+
+
+def stretch_with_ffmpeg(source, destination, content_type, speed, timeout=60):
+    """
+    Time-stretch audio with ffmpeg's atempo filter, keeping its format.
+
+    Args:
+        source: Binary file object with a file descriptor, positioned at the audio
+        destination: Binary file object with a file descriptor to write to
+        content_type (str): Content type of the audio
+        speed (float): Speed factor (atempo takes 0.5 to 100)
+        timeout (float): Seconds ffmpeg may run
+
+    Returns:
+        str: File extension of the audio written
+
+    Raises:
+        Exception: If ffmpeg is missing or fails
+    """
+    binary = ffmpeg_binary()
+    if binary is None:
+        raise Exception("ffmpeg is not installed")
+
+    command = [binary, '-hide_banner', '-loglevel', 'error', '-i', 'pipe:0', '-vn',
+               '-filter:a', f'atempo={speed}']
+    if content_type == 'audio/wav':
+        command += ['-c:a', 'pcm_s16le', '-f', 'wav']
+        extension = '.wav'
+    else:
+        fmt = 'opus' if content_type == 'audio/ogg' else 'mp3'
+        spec = FORMATS[fmt]
+        command += ['-ac', '1', '-ar', '24000', '-b:a', spec['bitrate']] + spec['codec']
+        extension = spec['extension']
+    command.append('pipe:1')
+
+    destination.flush()
+    try:
+        result = subprocess.run(command, stdin=source, stdout=destination, stderr=subprocess.PIPE,
+                                timeout=timeout)
+    except subprocess.TimeoutExpired:
+        raise Exception(f"ffmpeg timed out after {timeout} s")
+    if result.returncode != 0:
+        raise Exception(f"ffmpeg failed (exit code {result.returncode}): "
+                        f"{result.stderr.decode('utf-8', errors='replace').strip()}")
+    destination.seek(0, 2)
+    return extension
+
+
+def time_stretch(source, destination, content_type, speed):
+    """
+    Write a speed variant of audio, with ffmpeg if installed and WSOLA otherwise.
+
+    Args:
+        source: Binary file object with the audio, positioned at its start
+        destination: Binary file object to write the variant to
+        content_type (str): Content type of the audio
+        speed (float): Speed factor
+
+    Returns:
+        str: File extension of the audio written
+
+    Raises:
+        Exception: If the audio can't be stretched (compressed audio without ffmpeg)
+    """
+    if ffmpeg_binary() is not None:
+        return stretch_with_ffmpeg(source, destination, content_type, speed)
+    if content_type != 'audio/wav':
+        raise Exception(f"Stretching {content_type} audio needs ffmpeg")
+    destination.write(stretch_wav(source.read(), speed))
+    return '.wav'
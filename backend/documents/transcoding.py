@@ -0,0 +1,132 @@
+"""
+Compact audio formats for speech.
+
+Engines produce 16-bit PCM WAV (SAPI, espeak, pyttsx3) or MP3 (VoiceRSS,
+gTTS), often at music sample rates. For speech a mono, 24 kHz, low bitrate
+Opus or MP3 stream is indistinguishable and a fraction of the size, so the
+pipeline transcodes engine output with ffmpeg before it is cached. The
+format is negotiated per request (an explicit `format` parameter or the
+Accept header); without ffmpeg, audio is served in the engine's format.
+"""
+import shutil
+import logging
+import subprocess
+
+from documents.conf import get_setting
+
+logger = logging.getLogger(__name__)
+
+# Speech settings: mono at 24 kHz, which both Opus and MPEG-2 Layer III support
+FORMATS = {
+    'opus': {
+        'extension': '.opus',
+        'content_type': 'audio/ogg',
+        'codec': ['-c:a', 'libopus', '-application', 'voip', '-f', 'ogg'],
+        'bitrate': '24k',
+    },
+    'mp3': {
+        'extension': '.mp3',
+        'content_type': 'audio/mpeg',
+        'codec': ['-c:a', 'libmp3lame', '-f', 'mp3'],
+        'bitrate': '48k',
+    },
+}
+
+# Accept header media types for each format, in server preference order
+_MEDIA_TYPES = [
+    ('opus', ('audio/ogg', 'audio/opus')),
+    ('mp3', ('audio/mpeg', 'audio/mp3')),
+]
+
+_ffmpeg = None
+
+
+def ffmpeg_binary():
+    """Path of ffmpeg (FFMPEG_BINARY or found on the PATH), or None if not installed."""
+    global _ffmpeg
+    if _ffmpeg is None:
+        _ffmpeg = get_setting('FFMPEG_BINARY', '') or shutil.which('ffmpeg') or ''
+        if not _ffmpeg:
+            logger.info("ffmpeg not found; TTS audio is served in the engines' formats")
+    return _ffmpeg or None
+
+
+def negotiate_format(requested=None, accept=''):
+    """
+    Pick the output format of a TTS response.
+
+    An explicit format ('opus', 'mp3', or 'native'/'wav' for the engine's own
+    format) wins; otherwise the Accept header is matched, honouring q-values.
+    Wildcards and unknown types leave the choice to TTS_DEFAULT_FORMAT.
+
+    Args:
+        requested (str, optional): Format named in the request
+        accept (str): Accept header
+
+    Returns:
+        str: A key of FORMATS, or None for the engine's own format
+    """
+    if requested:
+        requested = requested.lower()
+        fmt = requested if requested in FORMATS else None
+    else:
+        fmt = None
+        best = 0.0
+        for part in (accept or '').split(','):
+            media_type, _, params = part.strip().partition(';')
+            quality = 1.0
+            for param in params.split(';'):
+                name, _, value = param.strip().partition('=')
+                if name == 'q':
+                    try:
+                        quality = float(value)
+                    except ValueError:
+                        quality = 0.0
+            for name, media_types in _MEDIA_TYPES:
+                if media_type.strip().lower() in media_types and quality > best:
+                    fmt, best = name, quality
+        if fmt is None and not any(t in (accept or '') for t in ('audio/wav', 'audio/x-wav', 'audio/wave')):
+            fmt = get_setting('TTS_DEFAULT_FORMAT', '') or None
+
+    if fmt is not None and ffmpeg_binary() is None:
+        return None
+    return fmt
+
+
+def transcode(source, destination, fmt, bitrate=None, timeout=60):
+    """
+    Transcode audio with ffmpeg, file to file.
+
+    Args:
+        source: Binary file object with a file descriptor, positioned at the audio
+        destination: Binary file object with a file descriptor to write to
+        fmt (str): A key of FORMATS
+        bitrate (str, optional): Target bitrate (e.g. '24k'); defaults to the
+                                 format's TTS_<FORMAT>_BITRATE setting
+
+    Returns:
+        str: File extension of the audio written
+
+    Raises:
+        Exception: If ffmpeg is missing or fails
+    """
+    binary = ffmpeg_binary()
+    if binary is None:
+        raise Exception("ffmpeg is not installed")
+    spec = FORMATS[fmt]
+    bitrate = bitrate or get_setting(f'TTS_{fmt.upper()}_BITRATE', spec['bitrate'])
+
+    command = [binary, '-hide_banner', '-loglevel', 'error', '-i', 'pipe:0',
+               '-vn', '-ac', '1', '-ar', '24000', '-b:a', bitrate] + spec['codec'] + ['pipe:1']
+    destination.flush()
+    try:
+        result = subprocess.run(command, stdin=source, stdout=destination, stderr=subprocess.PIPE,
+                                timeout=timeout)
+    except subprocess.TimeoutExpired:
+        raise Exception(f"ffmpeg timed out after {timeout} s")
+    if result.returncode != 0:
+        raise Exception(f"ffmpeg failed (exit code {result.returncode}): "
+                        f"{result.stderr.decode('utf-8', errors='replace').strip()}")
+    # ffmpeg wrote through the descriptor; move the file object's position past its output
+    destination.seek(0, 2)
+    return spec['extension']
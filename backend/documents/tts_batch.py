@@ -0,0 +1,167 @@
+"""
+Batch text-to-speech.
+
+Features such as reading a user's highlights need audio for many short
+snippets. A batch synthesizes them concurrently through the cached
+pipeline (so offline engines go through the worker pool and repeated
+snippets are cache hits) and returns them as one zip archive: one audio
+file per snippet, in request order, followed by manifest.json describing
+each entry.
+
+The archive is streamed: each snippet is written as soon as it and every
+snippet before it are ready, so the download starts with the first one.
+A snippet that fails is listed in the manifest with its error instead of
+failing the batch.
+"""
+import json
+import time
+import logging
+import zipfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from documents import tts_pipeline
+from documents.conf import get_setting
+from documents.tts_cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_batch_executor():
+    """Get the thread pool that synthesizes snippets for all batches in this process."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=get_setting('TTS_BATCH_WORKERS', 4),
+                thread_name_prefix='tts-batch',
+            )
+        return _executor
+
+
+class _ChunkSink:
+    """Write-only file object collecting what zipfile writes, to be yielded in chunks."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+class SpeechBatch:
+    """
+    Iterable of the chunks of a zip archive with the audio of many snippets.
+    """
+
+    def __init__(self, snippets, language, prefer_offline=True, voice_name=None,
+                 audio_format=None, speed=None, window=None):
+        """
+        Initialize the batch.
+
+        Args:
+            snippets (list): Dicts with the 'text' of each snippet and any extra
+                             fields to copy to its manifest entry (e.g. 'annotation')
+            language (str): Language code
+            prefer_offline (bool): Whether to prefer offline TTS engines
+            voice_name (str, optional): Specific voice id
+            audio_format (str, optional): Compact format to transcode to
+            speed (float, optional): Playback speed; None for normal speed
+            window (int, optional): Snippets synthesized ahead of the one being
+                                    written. Defaults to twice TTS_BATCH_WORKERS.
+        """
+        self.snippets = snippets
+        self.language = language
+        self.prefer_offline = prefer_offline
+        self.voice_name = voice_name
+        self.audio_format = audio_format
+        self.speed = speed
+        self.window = window or 2 * get_setting('TTS_BATCH_WORKERS', 4)
+        self.manifest = []
+
+    def _synthesize(self, text):
+        start = time.perf_counter()
+        result = tts_pipeline.synthesize(text, self.language, self.prefer_offline,
+                                         self.voice_name, audio_format=self.audio_format, speed=self.speed)
+        with result.file as f:
+            audio = f.read()
+        return result, audio, time.perf_counter() - start
+
+    def _entry(self, index, snippet, future):
+        """Manifest entry of a snippet, and its archive name and audio if it succeeded."""
+        entry = {key: value for key, value in snippet.items() if key != 'text'}
+        entry.update({'index': index, 'chars': len(snippet['text'])})
+        if future is None:
+            entry['error'] = 'No text'
+            return entry, None, None
+        try:
+            result, audio, elapsed = future.result()
+        except Exception as e:
+            logger.warning(f"Batch TTS snippet {index} failed: {str(e)}")
+            entry['error'] = str(e)
+            return entry, None, None
+
+        name = f"{index:04d}.{result.extension}"
+        entry.update({
+            'file': name,
+            'content_type': result.content_type,
+            'bytes': len(audio),
+            'cache': 'hit' if result.cache_hit else ('coalesced' if result.coalesced else 'miss'),
+            'speed': result.speed or 1.0,
+            'ms': round(elapsed * 1000),
+        })
+        return entry, name, audio
+
+    def __iter__(self):
+        executor = get_batch_executor()
+        texts = [normalize_text(snippet.get('text') or '') for snippet in self.snippets]
+        futures = {}
+
+        def submit(i):
+            futures[i] = executor.submit(self._synthesize, texts[i]) if texts[i] else None
+
+        sink = _ChunkSink()
+        started = time.perf_counter()
+        try:
+            for i in range(min(self.window, len(texts))):
+                submit(i)
+            # Audio is already compressed (or too short to gain much), so store it as is
+            with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED) as archive:
+                for i, snippet in enumerate(self.snippets):
+                    if i + self.window < len(texts):
+                        submit(i + self.window)
+                    entry, name, audio = self._entry(i, dict(snippet, text=texts[i]), futures.pop(i))
+                    self.manifest.append(entry)
+                    if name is not None:
+                        archive.writestr(name, audio)
+                        yield sink.take()
+
+                archive.writestr('manifest.json', json.dumps({
+                    'language': self.language,
+                    'prefer_offline': self.prefer_offline,
+                    'voice_name': self.voice_name,
+                    'audio_format': self.audio_format,
+                    'snippets': self.manifest,
+                }, indent=2))
+            yield sink.take()
+        finally:
+            # The client went away: don't synthesize what it will never receive
+            for future in futures.values():
+                if future is not None:
+                    future.cancel()
+
+        failed = sum(1 for entry in self.manifest if 'error' in entry)
+        logger.info(f"Batch TTS: {len(self.snippets)} snippets ({failed} failed) "
+                    f"in {time.perf_counter() - started:.2f} s")
@@ -0,0 +1,363 @@
+"""
+Content-addressed cache of synthesized TTS audio.
+
+Audio is stored on disk under a key derived from the normalized text and
+every synthesis parameter (engine, voice, language, rate), so the same
+paragraph requested again, by any user, is served from disk instead of
+being re-synthesized. The cache has a disk budget and evicts least
+recently used entries; a hit refreshes the file's modification time, so
+the LRU order is shared by all worker processes using the same directory.
+"""
+import os
+import re
+import json
+import shutil
+import hashlib
+import logging
+import threading
+import unicodedata
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from documents.conf import get_setting
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPES = {
+    '.mp3': 'audio/mpeg',
+    '.wav': 'audio/wav',
+    '.opus': 'audio/ogg',
+    '.json': 'application/json',  # sidecars, e.g. timing marks
+}
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_text(text):
+    """
+    Normalize text so that equivalent selections produce the same cache key.
+
+    Applies Unicode NFC normalization and collapses runs of whitespace
+    (including line breaks from PDF extraction) into single spaces.
+    """
+    return _WHITESPACE.sub(' ', unicodedata.normalize('NFC', text)).strip()
+
+
+def make_cache_key(text, engine='', voice='', language='', rate=None):
+    """
+    Build the cache key for a synthesis request.
+
+    Args:
+        text (str): Text to synthesize (normalized with normalize_text())
+        engine (str): Engine or engine preference used for synthesis
+        voice (str): Voice id
+        language (str): Language code
+        rate: Speech rate
+
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    payload = json.dumps([
+        normalize_text(text),
+        engine or '',
+        voice or '',
+        (language or '').lower(),
+        rate,
+    ], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class PendingEntry:
+    """A cache entry being written (see TTSAudioCache.writer())."""
+
+    def __init__(self, file):
+        self.file = file
+        self.extension = None
+
+
+class TTSAudioCache:
+    """
+    Disk-backed LRU cache of audio files with a size budget.
+    """
+
+    def __init__(self, root=None, max_bytes=512 * 1024 * 1024, low_watermark=0.9):
+        """
+        Initialize the cache.
+
+        Args:
+            root (str, optional): Cache directory. Defaults to MEDIA_ROOT/tts_cache.
+            max_bytes (int): Disk budget
+            low_watermark (float): Eviction frees space down to this fraction of the budget
+        """
+        self._root = root
+        self.max_bytes = max_bytes
+        self.low_watermark = low_watermark
+        self._lock = threading.Lock()
+        self._index = None  # key -> (path, size)
+        self._total_bytes = 0
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.stores = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+
+    @property
+    def root(self):
+        if self._root is None:
+            self._root = os.path.join(settings.MEDIA_ROOT, 'tts_cache')
+        return self._root
+
+    def _entry_dir(self, key):
+        return os.path.join(self.root, key[:2])
+
+    def _scan(self):
+        """Rebuild the index from disk. Caller holds the lock."""
+        index = {}
+        total = 0
+        if os.path.isdir(self.root):
+            for subdir in os.listdir(self.root):
+                directory = os.path.join(self.root, subdir)
+                if not os.path.isdir(directory):
+                    continue
+                for name in os.listdir(directory):
+                    key, ext = os.path.splitext(name)
+                    if ext not in CONTENT_TYPES or len(key) != 64:
+                        continue  # not an entry (e.g. a file being written)
+                    path = os.path.join(directory, name)
+                    try:
+                        size = os.path.getsize(path)
+                    except OSError:
+                        continue
+                    index[key] = (path, size)
+                    total += size
+        self._index = index
+        self._total_bytes = total
+
+    def _ensure_index(self):
+        if self._index is None:
+            self._scan()
+
+    def open(self, key, record=True):
+        """
+        Open a cached entry.
+
+        Args:
+            key (str): Cache key
+            record (bool): Count the lookup in the hit/miss metrics
+
+        Returns:
+            tuple: (open binary file, content type, size), or None on a miss
+        """
+        with self._lock:
+            self._ensure_index()
+            entry = self._index.get(key)
+            if entry is not None:
+                path, size = entry
+                try:
+                    f = open(path, 'rb')
+                    os.utime(path)  # mark as recently used for every process
+                except OSError:
+                    # Evicted by another process
+                    del self._index[key]
+                    self._total_bytes -= size
+                    entry = None
+
+            if entry is None:
+                if record:
+                    self.misses += 1
+                return None
+
+            if record:
+                self.hits += 1
+                self.bytes_saved += size
+            return f, CONTENT_TYPES[os.path.splitext(path)[1]], size
+
+    def contains(self, key):
+        """Check whether a key is cached, without counting a hit or miss."""
+        with self._lock:
+            self._ensure_index()
+            entry = self._index.get(key)
+            return entry is not None and os.path.exists(entry[0])
+
+    def put_file(self, key, source_path, move=True):
+        """
+        Store an audio file under a key.
+
+        Args:
+            key (str): Cache key
+            source_path (str): Audio file; its extension determines the content type
+            move (bool): Move the file into the cache instead of copying it
+
+        Returns:
+            str: Path of the cached file
+        """
+        ext = os.path.splitext(source_path)[1].lower()
+        if ext not in CONTENT_TYPES:
+            raise ValueError(f"Unsupported audio file type: {ext}")
+
+        directory = self._entry_dir(key)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, key + ext)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+        if move:
+            shutil.move(source_path, temp_path)
+        else:
+            shutil.copyfile(source_path, temp_path)
+        os.replace(temp_path, path)
+        return self._add(key, path)
+
+    @contextmanager
+    def writer(self, key):
+        """
+        Write a new entry in place, without an intermediate file.
+
+        The audio is written to a temporary file in the cache directory and
+        becomes visible under the key when the block exits without an error.
+        The caller must set the entry's extension (e.g. '.mp3') before then.
+
+        Args:
+            key (str): Cache key
+
+        Yields:
+            PendingEntry: Object with the open binary `file` and an `extension` to set
+
+        Raises:
+            ValueError: If no supported extension was set
+            Exception: If nothing was written
+        """
+        directory = self._entry_dir(key)
+        os.makedirs(directory, exist_ok=True)
+        temp_path = os.path.join(directory, f"{key}.{os.getpid()}.{threading.get_ident()}.tmp")
+        entry = PendingEntry(open(temp_path, 'w+b'))
+        try:
+            try:
+                yield entry
+            finally:
+                entry.file.close()
+            ext = (entry.extension or '').lower()
+            if ext not in CONTENT_TYPES:
+                raise ValueError(f"Unsupported audio file type: {ext}")
+            if os.path.getsize(temp_path) == 0:
+                raise Exception("Generated audio file is empty or does not exist")
+            path = os.path.join(directory, key + ext)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self._add(key, path)
+
+    def _add(self, key, path):
+        """Record a file moved into place under a key, evicting if over budget."""
+        size = os.path.getsize(path)
+
+        with self._lock:
+            self._ensure_index()
+            old = self._index.get(key)
+            if old is not None:
+                self._total_bytes -= old[1]
+                if old[0] != path:
+                    # Same request, previously cached in the other format
+                    try:
+                        os.remove(old[0])
+                    except OSError:
+                        pass
+            self._index[key] = (path, size)
+            self._total_bytes += size
+            self.stores += 1
+            if self._total_bytes > self.max_bytes:
+                self._evict(keep=key)
+
+        return path
+
+    def put_bytes(self, key, data, ext):
+        """
+        Store audio bytes under a key.
+
+        Args:
+            key (str): Cache key
+            data (bytes): Audio data
+            ext (str): File extension (e.g. '.mp3')
+
+        Returns:
+            str: Path of the cached file
+        """
+        with self.writer(key) as entry:
+            entry.file.write(data)
+            entry.extension = ext
+        return os.path.join(self._entry_dir(key), key + ext.lower())
+
+    def _evict(self, keep=None):
+        """Evict least recently used entries down to the low watermark. Caller holds the lock."""
+        # Other processes share the directory, so start from what is actually on disk
+        self._scan()
+        target = self.max_bytes * self.low_watermark
+
+        def last_used(item):
+            try:
+                return os.path.getmtime(item[1][0])
+            except OSError:
+                return 0
+
+        for key, (path, size) in sorted(self._index.items(), key=last_used):
+            if self._total_bytes <= target:
+                break
+            if key == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError as e:
+                # e.g. still open for a response on Windows; try again next time
+                logger.debug(f"Could not evict cached audio {path}: {str(e)}")
+                continue
+            del self._index[key]
+            self._total_bytes -= size
+            self.evictions += 1
+            self.evicted_bytes += size
+
+    def clear(self):
+        """Remove every cached entry."""
+        with self._lock:
+            self._ensure_index()
+            for path, size in self._index.values():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._index = {}
+            self._total_bytes = 0
+
+    def stats(self):
+        """
+        Get cache metrics.
+
+        Returns:
+            dict: Hit rate, bytes saved and occupancy
+        """
+        with self._lock:
+            self._ensure_index()
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._index),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'bytes_saved': self.bytes_saved,
+                'stores': self.stores,
+                'evictions': self.evictions,
+                'evicted_bytes': self.evicted_bytes,
+            }
+
+
+# Create a singleton instance
+tts_audio_cache = TTSAudioCache(
+    root=get_setting('TTS_CACHE_DIR', '') or None,
+    max_bytes=get_setting('TTS_CACHE_MAX_BYTES', 512 * 1024 * 1024),
+)
@@ -0,0 +1,822 @@
+"""
+TTS engine plugins.
+
+Every engine (Windows SAPI, espeak-ng, pyttsx3, VoiceRSS, gTTS) is a
+TTSEngine registered in `engine_registry`; the service routes requests
+over the registered engines without knowing any of them. An engine
+writes audio into a file object within a time limit, lists its voices,
+and says whether it can run on this system. Adding an engine is a
+matter of registering another TTSEngine.
+
+Each request carries a Deadline, and every engine attempt gets a share
+of what is left of it, so a request whose engines all fail or hang ends
+within its deadline instead of after every engine's own timeouts.
+"""
+import os
+import re
+import time
+import base64
+import shutil
+import logging
+import platform
+import tempfile
+import threading
+from collections import deque
+from urllib.parse import urlencode
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from gtts import gTTS
+
+# For direct Windows SAPI access
+if platform.system() == 'Windows':
+    try:
+        import win32com.client
+        import pyttsx3
+        WINDOWS_TTS_AVAILABLE = True
+    except ImportError:
+        WINDOWS_TTS_AVAILABLE = False
+    PYTTSX3_AVAILABLE = WINDOWS_TTS_AVAILABLE
+else:
+    WINDOWS_TTS_AVAILABLE = False
+    try:
+        import pyttsx3
+        PYTTSX3_AVAILABLE = True
+    except ImportError:
+        PYTTSX3_AVAILABLE = False
+
+from documents.tts_worker_pool import get_worker_pool
+from documents.espeak_engine import espeak_engine
+from documents.audio_utils import wav_header, patch_wav_sizes
+from documents.tts_http import tts_http
+from documents.tts_rate_limit import current_priority
+from documents.conf import get_setting
+from documents.voice_catalog import VoiceCatalog, guess_language
+
+logger = logging.getLogger(__name__)
+
+
+class TTSDeadlineExceeded(Exception):
+    """The time budget of a TTS request ran out."""
+
+
+class Deadline:
+    """
+    Time budget of one TTS request, shared by its engine attempts.
+    """
+
+    def __init__(self, seconds):
+        """
+        Args:
+            seconds (float): Time the request may take
+        """
+        self.seconds = seconds
+        self.expires = time.monotonic() + seconds
+
+    def remaining(self):
+        """Seconds left, never negative."""
+        return max(0.0, self.expires - time.monotonic())
+
+    @property
+    def expired(self):
+        return self.remaining() <= 0
+
+    def check(self, what='TTS request'):
+        """
+        Raises:
+            TTSDeadlineExceeded: If the deadline has passed
+        """
+        if self.expired:
+            raise TTSDeadlineExceeded(f"{what} exceeded its deadline of {self.seconds:.0f} s")
+
+    def attempt_budget(self, attempts_left, expected=None):
+        """
+        Time to give the next of `attempts_left` engine attempts.
+
+        The remaining time is split evenly over the attempts still to come,
+        but an engine that is expected (from measured latency) to need more
+        than its share gets up to twice its expected time, so a fast-enough
+        engine isn't cut off just because slower fallbacks follow it.
+
+        Args:
+            attempts_left (int): Attempts still to come, including this one
+            expected (float, optional): Expected synthesis time of this engine
+
+        Returns:
+            float: Seconds
+        """
+        remaining = self.remaining()
+        budget = remaining / max(attempts_left, 1)
+        if expected is not None:
+            budget = max(budget, min(remaining, expected * 2))
+        return budget
+
+
+def language_name(lang_code):
+    """Get a human-readable language name from a language code"""
+    language_map = {
+        'en-us': 'English (US)',
+        'en-gb': 'English (UK)',
+        'en-au': 'English (Australia)',
+        'en-ca': 'English (Canada)',
+        'en-in': 'English (India)',
+        'en-ie': 'English (Ireland)',
+        'fr-fr': 'French',
+        'fr-ca': 'French (Canada)',
+        'de-de': 'German',
+        'it-it': 'Italian',
+        'es-es': 'Spanish (Spain)',
+        'es-mx': 'Spanish (Mexico)',
+        'pt-pt': 'Portuguese',
+        'pt-br': 'Portuguese (Brazil)',
+        'ru-ru': 'Russian',
+        'zh-cn': 'Chinese (Simplified)',
+        'zh-tw': 'Chinese (Traditional)',
+        'ja-jp': 'Japanese',
+        'ko-kr': 'Korean',
+        'ar-sa': 'Arabic',
+        'sq': 'Albanian',
+        'sq-al': 'Albanian',
+        'el': 'Greek',
+        'el-gr': 'Greek',
+    }
+
+    # Try to match the exact code
+    if lang_code.lower() in language_map:
+        return language_map[lang_code.lower()]
+
+    # Try to match just the first part (e.g., 'en' from 'en-us')
+    if '-' in lang_code:
+        base_lang = lang_code.split('-')[0].lower()
+        for code, name in language_map.items():
+            if code.startswith(base_lang + '-'):
+                return name
+
+    # Return the code itself if no match is found
+    return lang_code
+
+
+class TTSEngine:
+    """
+    Base class of engine plugins.
+
+    Subclasses set `name` and `offline` and implement write(); engines
+    with selectable voices also implement voices().
+    """
+
+    name = None
+    offline = True
+
+    def __init__(self):
+        self.registry = None
+
+    @property
+    def available(self):
+        """Whether the engine can run on this system at all."""
+        return True
+
+    def voices(self):
+        """
+        List the engine's voices.
+
+        Returns:
+            list: Dicts with 'id', 'name' and 'language'
+        """
+        return []
+
+    def write(self, fp, text, language, voice_name=None, timeout=None):
+        """
+        Synthesize speech into a file object.
+
+        Args:
+            fp: Writable, seekable binary file object
+            text (str): The text to convert to speech
+            language (str): Lower-case language code
+            voice_name (str, optional): Voice id
+            timeout (float, optional): Seconds the synthesis may take
+
+        Returns:
+            str: File extension of the audio written ('.mp3' or '.wav')
+
+        Raises:
+            ValueError: If the engine can't handle the request (e.g. its language)
+            Exception: If synthesis fails
+        """
+        raise NotImplementedError
+
+    def find_voice(self, language=None, voice_name=None):
+        """Look up a voice of this engine in the registry's voice catalog."""
+        if self.registry is None:
+            return None
+        return self.registry.voice_catalog.find(self.name, language, voice_name)
+
+
+class WindowsSAPIEngine(TTSEngine):
+    """Windows Speech API, rendering into memory."""
+
+    name = 'windows_sapi'
+    offline = True
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._voice = None
+        self._tokens = None
+
+        # Initialize Windows SAPI if available
+        if WINDOWS_TTS_AVAILABLE:
+            try:
+                logger.debug("Initializing Windows SAPI")
+                self._voice = win32com.client.Dispatch("SAPI.SpVoice")
+                logger.debug("Windows SAPI initialized successfully")
+            except Exception as e:
+                logger.error(f"Error initializing Windows SAPI: {str(e)}")
+                self._voice = None
+
+    @property
+    def available(self):
+        return WINDOWS_TTS_AVAILABLE
+
+    def _get_voice(self):
+        """The SAPI voice object, initialized again if that failed at startup."""
+        if self._voice is None:
+            try:
+                logger.info("Attempting to initialize Windows SAPI")
+                self._voice = win32com.client.Dispatch("SAPI.SpVoice")
+                logger.info("Windows SAPI initialized successfully on retry")
+            except Exception as e:
+                logger.error(f"Failed to initialize Windows SAPI on retry: {str(e)}")
+                raise Exception("Windows SAPI voice could not be initialized")
+        return self._voice
+
+    def voices(self):
+        if not WINDOWS_TTS_AVAILABLE:
+            return []
+
+        voices = []
+        try:
+            sapi_voices = self._get_voice().GetVoices()
+            logger.info(f"Found {sapi_voices.Count} Windows SAPI voices")
+
+            for i in range(sapi_voices.Count):
+                voice = sapi_voices.Item(i)
+                voice_id = voice.Id
+
+                # Extract language and name from voice ID
+                parts = voice_id.split('\\')
+
+                # Try to get a more user-friendly name
+                try:
+                    # Get the voice description if available
+                    description = voice.GetDescription()
+                    if description:
+                        name = description
+                    else:
+                        name = parts[-1].replace('TTS_MS_', '').replace('_', ' ').title()
+                except:
+                    # Fall back to parsing the ID
+                    name = parts[-1].replace('TTS_MS_', '').replace('_', ' ').title()
+
+                # Try to extract language code
+                lang_code = 'unknown'
+                for part in parts[-1].split('_'):
+                    if '-' in part:
+                        lang_code = part.lower()
+                        break
+
+                voices.append({
+                    'id': voice_id,
+                    'name': f"{name} ({language_name(lang_code)})",
+                    'language': lang_code
+                })
+
+            logger.debug(f"Windows SAPI voices: {[v['name'] for v in voices]}")
+        except Exception as e:
+            logger.error(f"Error getting Windows SAPI voices: {str(e)}")
+
+        # Voice tokens are looked up again after the catalog is rebuilt
+        self._tokens = None
+        return voices
+
+    def _select_voice(self, language=None, voice_name=None):
+        """Select the SAPI voice for a request from the voice catalog. Caller holds the SAPI lock."""
+        try:
+            voice = self.find_voice(language, voice_name)
+            if voice is None:
+                logger.warning(f"No matching voice found for language '{language}' or voice name '{voice_name}'. Using default voice.")
+                return
+
+            # Voice tokens by id, so selecting one doesn't enumerate them again
+            if self._tokens is None:
+                tokens = self._voice.GetVoices()
+                self._tokens = {tokens.Item(i).Id: tokens.Item(i) for i in range(tokens.Count)}
+            token = self._tokens.get(voice['id'])
+            if token is None:
+                logger.warning(f"Voice '{voice['id']}' is no longer installed. Using default voice.")
+                return
+            self._voice.Voice = token
+            logger.info(f"Selected voice: '{voice['id']}'")
+        except Exception as e:
+            logger.error(f"Error getting or setting Windows SAPI voices: {str(e)}")
+            logger.warning("Continuing with default voice")
+
+    def write(self, fp, text, language, voice_name=None, timeout=None):
+        """
+        Synthesize speech with Windows SAPI.
+
+        SAPI renders into an in-memory stream (SpMemoryStream) whose PCM data
+        is written to fp behind a WAV header, so no file is created. A
+        synthesis in progress can't be interrupted, so the time limit only
+        bounds the wait for the engine.
+        """
+        if not WINDOWS_TTS_AVAILABLE:
+            raise Exception("Windows SAPI is not available on this system")
+
+        if not self._lock.acquire(timeout=-1 if timeout is None else timeout):
+            raise Exception(f"Windows SAPI busy for more than {timeout:.1f} s")
+        try:
+            voice = self._get_voice()
+            self._select_voice(language, voice_name)
+
+            # Render into memory instead of a SpFileStream
+            stream = win32com.client.Dispatch("SAPI.SpMemoryStream")
+
+            # Set the output to our memory stream
+            old_output = voice.AudioOutputStream
+            voice.AudioOutputStream = stream
+
+            # Set speech rate (slightly slower than default)
+            voice.Rate = 0  # Range is -10 to 10, with 0 being the default
+
+            # Set volume to maximum
+            voice.Volume = 100  # Range is 0 to 100
+
+            # Speak the text
+            logger.debug(f"Speaking text with length {len(text)} characters")
+            try:
+                voice.Speak(text)
+            finally:
+                voice.AudioOutputStream = old_output
+
+            pcm = bytes(stream.GetData())
+            if not pcm:
+                raise Exception("Generated audio is empty")
+
+            wave_format = stream.Format.GetWaveFormatEx()
+            fp.write(wav_header({
+                'audio_format': wave_format.FormatTag,
+                'channels': wave_format.Channels,
+                'sample_rate': wave_format.SamplesPerSec,
+                'byte_rate': wave_format.AvgBytesPerSec,
+                'block_align': wave_format.BlockAlign,
+                'bits_per_sample': wave_format.BitsPerSample,
+            }, len(pcm)))
+            fp.write(pcm)
+
+            logger.info(f"Successfully generated Windows SAPI audio ({len(pcm) + 44} bytes)")
+            return '.wav'
+
+        except Exception as e:
+            logger.error(f"Error in Windows SAPI TTS conversion: {str(e)}")
+            raise Exception(f"Windows SAPI TTS failed: {str(e)}")
+        finally:
+            self._lock.release()
+
+
+class EspeakEngine(TTSEngine):
+    """espeak-ng run directly, streaming its output."""
+
+    name = 'espeak'
+    offline = True
+
+    @property
+    def available(self):
+        return espeak_engine.available
+
+    def voices(self):
+        return [
+            {
+                'id': voice['id'],
+                'name': f"{voice['name']} ({language_name(voice['language'])})",
+                'language': voice['language'],
+            }
+            for voice in espeak_engine.get_voices()
+        ]
+
+    def write(self, fp, text, language, voice_name=None, timeout=None):
+        start = fp.tell()
+        for chunk in espeak_engine.iter_synthesize(text, language=language, voice_name=voice_name,
+                                                   timeout=timeout):
+            fp.write(chunk)
+        # espeak can't fill in the WAV sizes when writing to a pipe
+        patch_wav_sizes(fp, start)
+        return '.wav'
+
+
+class Pyttsx3Engine(TTSEngine):
+    """pyttsx3 (SAPI5, NSSpeechSynthesizer or espeak drivers), in worker processes."""
+
+    name = 'pyttsx3'
+    offline = True
+
+    def __init__(self):
+        super().__init__()
+        self._engine = None
+        self._lock = threading.Lock()
+
+    @property
+    def available(self):
+        return PYTTSX3_AVAILABLE
+
+    def _get_engine(self):
+        """Get or initialize the in-process pyttsx3 engine"""
+        if not PYTTSX3_AVAILABLE:
+            return None
+
+        with self._lock:
+            if self._engine is None:
+                try:
+                    logger.debug("Initializing pyttsx3 engine")
+                    self._engine = pyttsx3.init()
+                except Exception as e:
+                    logger.error(f"Error initializing pyttsx3 engine: {str(e)}")
+                    return None
+            return self._engine
+
+    def voices(self):
+        voices = []
+        if not PYTTSX3_AVAILABLE:
+            return voices
+        try:
+            # Ask a worker process, so the web process never initializes pyttsx3
+            pool = get_worker_pool()
+            if pool is not None:
+                pyttsx3_voices = pool.list_voices()
+            else:
+                engine = self._get_engine()
+                pyttsx3_voices = [(voice.id, voice.name) for voice in engine.getProperty('voices')] if engine else []
+            logger.info(f"Found {len(pyttsx3_voices)} pyttsx3 voices")
+
+            for voice_id, voice_name in pyttsx3_voices:
+                # Extract language from voice ID if possible
+                lang_code = guess_language(voice_id)
+                voices.append({
+                    'id': voice_id,
+                    'name': f"{voice_name} ({language_name(lang_code)})",
+                    'language': lang_code
+                })
+
+            logger.debug(f"pyttsx3 voices: {[v['name'] for v in voices]}")
+        except Exception as e:
+            logger.error(f"Error getting pyttsx3 voices: {str(e)}")
+        return voices
+
+    def to_file(self, text, language=None, output_file=None, timeout=None):
+        """
+        Synthesize speech into a file.
+
+        Returns:
+            str: Path to the generated audio file
+        """
+        # Run in an isolated worker process so concurrent requests don't share one engine
+        voice = self.find_voice(language) if language else None
+        pool = get_worker_pool()
+        if pool is not None:
+            return pool.synthesize(text, voice_name=voice['id'] if voice else None, output_file=output_file,
+                                   timeout=timeout)
+
+        try:
+            engine = self._get_engine()
+            if engine is None:
+                raise Exception("Failed to initialize pyttsx3 engine")
+
+            # Create a temporary file if output_file is not provided
+            if output_file is None:
+                fd, output_file = tempfile.mkstemp(suffix='.mp3')
+                os.close(fd)
+
+            # Set voice properties if language is provided
+            if voice is not None:
+                engine.setProperty('voice', voice['id'])
+                logger.debug(f"Set voice to {voice['name']} for language {language}")
+
+            # Set speech rate (default is 200)
+            engine.setProperty('rate', 150)
+
+            # Generate speech
+            logger.debug(f"Generating speech with pyttsx3 to {output_file}")
+            engine.save_to_file(text, output_file)
+            engine.runAndWait()
+
+            # Verify the file was created
+            if not os.path.exists(output_file) or os.path.getsize(output_file) == 0:
+                raise Exception("Generated audio file is empty or does not exist")
+
+            return output_file
+
+        except Exception as e:
+            logger.error(f"Error in pyttsx3 TTS conversion: {str(e)}")
+            if output_file and os.path.exists(output_file):
+                try:
+                    os.remove(output_file)
+                except:
+                    pass
+            raise
+
+    def write(self, fp, text, language, voice_name=None, timeout=None):
+        """
+        Synthesize speech with pyttsx3.
+
+        pyttsx3 drivers can only render to a file, so this is the one engine
+        that still goes through a temporary file.
+        """
+        output_file = self.to_file(text, language, timeout=timeout)
+        try:
+            with open(output_file, 'rb') as f:
+                shutil.copyfileobj(f, fp)
+        finally:
+            os.remove(output_file)
+        return os.path.splitext(output_file)[1]
+
+
+class VoiceRSSEngine(TTSEngine):
+    """The VoiceRSS web API."""
+
+    name = 'voicerss'
+    offline = False
+
+    VOICES = (
+        {'id': 'voicerss_en-us', 'name': 'English (US)', 'language': 'en-us'},
+        {'id': 'voicerss_en-gb', 'name': 'English (UK)', 'language': 'en-gb'},
+        {'id': 'voicerss_fr-fr', 'name': 'French', 'language': 'fr-fr'},
+        {'id': 'voicerss_de-de', 'name': 'German', 'language': 'de-de'},
+        {'id': 'voicerss_es-es', 'name': 'Spanish', 'language': 'es-es'},
+        {'id': 'voicerss_it-it', 'name': 'Italian', 'language': 'it-it'},
+    )
+
+    LANGUAGE_CODES = {
+        'en': 'en-us',
+        'fr': 'fr-fr',
+        'de': 'de-de',
+        'es': 'es-es',
+        'it': 'it-it',
+        'pt': 'pt-pt',
+        'ru': 'ru-ru',
+        'ja': 'ja-jp',
+        'zh': 'zh-cn',
+        'ko': 'ko-kr',
+        'ar': 'ar-sa',
+        'sq': 'sq-al',
+        'el': 'el-gr',
+    }
+
+    def voices(self):
+        return [dict(voice) for voice in self.VOICES]
+
+    def language_code(self, language):
+        """Convert a 2-letter language code to VoiceRSS format (e.g. 'en' to 'en-us')"""
+        if len(language) != 2:
+            return language
+        return self.LANGUAGE_CODES.get(language.lower(), f"{language}-{language}")
+
+    def write(self, fp, text, language, voice_name=None, timeout=None):
+        """
+        Synthesize speech with the VoiceRSS API.
+
+        The request goes through the shared TTS HTTP client (keep-alive,
+        timeouts, retries, none of them beyond the time limit); text too
+        long for a URL is sent as a POST body. The response body is
+        streamed into fp in chunks instead of being held in memory.
+        """
+        lang_code = self.language_code(language)
+        logger.info(f"Using VoiceRSS with language code: {lang_code}")
+
+        # VoiceRSS API parameters
+        params = {
+            'src': text,
+            'hl': lang_code,
+            'r': '0',
+            'c': 'mp3',
+            # Speech needs neither 44.1 kHz nor stereo; this is a quarter of the data
+            'f': get_setting('VOICERSS_AUDIO_FORMAT', '16khz_16bit_mono'),
+            'ssml': 'false',
+            'b64': 'false'
+        }
+        api_key = get_setting('VOICERSS_API_KEY', '')
+        if api_key:
+            params['key'] = api_key
+
+        url = get_setting('VOICERSS_API_URL', 'https://api.voicerss.org/')
+        query = urlencode(params)
+        if len(url) + len(query) + 1 <= get_setting('TTS_HTTP_MAX_URL_LENGTH', 2000):
+            request = tts_http.stream('GET', url + '?' + query, budget=timeout, provider='voicerss')
+        else:
+            request = tts_http.stream(
+                'POST', url, data=query.encode('ascii'), budget=timeout, provider='voicerss',
+                headers={'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8'},
+            )
+
+        expires = None if timeout is None else time.monotonic() + timeout
+        with request as response:
+            # Check if the request was successful
+            if response.status_code != 200:
+                raise Exception(f"VoiceRSS API returned status code {response.status_code}: {response.text}")
+
+            written = 0
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                # VoiceRSS reports errors as a text body with status 200
+                if written == 0 and chunk.startswith(b'ERROR'):
+                    raise Exception(f"VoiceRSS API error: {chunk.decode('utf-8', errors='replace')}")
+                fp.write(chunk)
+                written += len(chunk)
+                if expires is not None and time.monotonic() > expires:
+                    raise Exception(f"VoiceRSS response took more than {timeout:.1f} s")
+
+        if written == 0:
+            raise Exception("Generated audio is empty")
+        return '.mp3'
+
+
+class GTTSEngine(TTSEngine):
+    """
+    Google Translate's TTS, the service behind gTTS.
+
+    Google takes at most 100 characters per request, so gTTS splits text
+    into many small requests and sends them one after another, each on a
+    new connection. This engine lets gTTS split the text and build the
+    requests, then sends them over the shared keep-alive HTTP client,
+    several at a time, and writes the MP3 of each chunk in text order as
+    soon as it and the chunks before it have arrived.
+    """
+
+    name = 'gtts'
+    offline = False
+
+    TLDS = ('com', 'ca', 'co.uk', 'com.au', 'co.in', 'ie', 'co.za')
+    URL = 'https://translate.google.{tld}/_/TranslateWebserverUi/data/batchexecute'
+
+    _AUDIO = re.compile(r'jQ1olc","\[\\"(.*)\\"]')
+
+    _executor = None
+    _executor_lock = threading.Lock()
+
+    def __init__(self, url=None, parallel=None):
+        """
+        Args:
+            url (str, optional): RPC endpoint, with an optional {tld} placeholder
+                                 (GTTS_API_URL, Google Translate by default)
+            parallel (int, optional): Chunk requests in flight per synthesis
+                                      (TTS_GTTS_PARALLEL)
+        """
+        super().__init__()
+        self.url = url
+        self.parallel = parallel
+
+    @classmethod
+    def _get_executor(cls):
+        with cls._executor_lock:
+            if cls._executor is None:
+                # More threads than HTTP slots would only wait for a slot
+                cls._executor = ThreadPoolExecutor(
+                    max_workers=get_setting('TTS_HTTP_MAX_CONCURRENCY', 10),
+                    thread_name_prefix='tts-gtts',
+                )
+            return cls._executor
+
+    def _fetch(self, body, expires, priority):
+        """
+        Fetch the audio of one chunk, trying the next Google host after a failure.
+
+        Returns:
+            bytes: MP3 data
+        """
+        url = self.url or get_setting('GTTS_API_URL', self.URL)
+        errors = []
+        for tld in self.TLDS if '{tld}' in url else self.TLDS[:1]:
+            budget = None if expires is None else expires - time.monotonic()
+            if budget is not None and budget <= 0:
+                errors.append("no time left")
+                break
+            try:
+                with tts_http.stream('POST', url.format(tld=tld), data=body, budget=budget,
+                                     provider='gtts', priority=priority,
+                                     headers=gTTS.GOOGLE_TTS_HEADERS) as response:
+                    if response.status_code != 200:
+                        raise Exception(f"status code {response.status_code}")
+                    for line in response.iter_lines(chunk_size=8192):
+                        match = self._AUDIO.search(line.decode('utf-8', errors='replace'))
+                        if match:
+                            return base64.b64decode(match.group(1))
+                    raise Exception("no audio in the response")
+            except Exception as e:
+                errors.append(f"TLD {tld}: {str(e)}")
+        raise Exception("gTTS chunk failed: " + "; ".join(errors))
+
+    def write(self, fp, text, language, voice_name=None, timeout=None):
+        """
+        Synthesize speech with Google Translate's TTS.
+
+        At most `parallel` chunk requests are in flight, so a long text
+        doesn't take all HTTP slots and memory stays bounded.
+        """
+        expires = None if timeout is None else time.monotonic() + timeout
+        # Validates the language (ValueError) and splits the text into requests
+        bodies = [body.encode('ascii') for body in gTTS(text=text, lang=language).get_bodies()]
+        logger.debug(f"Generating speech with gTTS: {len(bodies)} chunks")
+
+        # Chunks are fetched on pool threads, at the priority of this request
+        priority = current_priority()
+        if len(bodies) == 1:
+            fp.write(self._fetch(bodies[0], expires, priority))
+            return '.mp3'
+
+        executor = self._get_executor()
+        parallel = max(1, self.parallel or get_setting('TTS_GTTS_PARALLEL', 4))
+        pending = iter(bodies)
+        in_flight = deque()
+        try:
+            for body in pending:
+                in_flight.append(executor.submit(self._fetch, body, expires, priority))
+                if len(in_flight) >= parallel:
+                    break
+            while in_flight:
+                remaining = None if expires is None else max(0.0, expires - time.monotonic())
+                try:
+                    audio = in_flight.popleft().result(timeout=remaining)
+                except FutureTimeoutError:
+                    raise Exception(f"gTTS took more than {timeout:.1f} s")
+                fp.write(audio)
+                body = next(pending, None)
+                if body is not None:
+                    in_flight.append(executor.submit(self._fetch, body, expires, priority))
+        finally:
+            for future in in_flight:
+                future.cancel()
+        return '.mp3'
+
+
+class EngineRegistry:
+    """
+    The registered TTS engines, in default order, and their voice catalog.
+    """
+
+    def __init__(self):
+        self._engines = {}
+        self.voice_catalog = VoiceCatalog(self.load_voices, ttl=get_setting('TTS_VOICE_CATALOG_TTL', 3600))
+
+    def register(self, engine):
+        """
+        Add an engine plugin, replacing any engine of the same name.
+
+        Args:
+            engine (TTSEngine): The engine
+
+        Returns:
+            TTSEngine: The engine
+        """
+        engine.registry = self
+        self._engines[engine.name] = engine
+        return engine
+
+    def unregister(self, name):
+        """Remove an engine."""
+        engine = self._engines.pop(name, None)
+        if engine is not None:
+            engine.registry = None
+
+    def get(self, name):
+        """
+        Raises:
+            KeyError: If no engine of that name is registered
+        """
+        return self._engines[name]
+
+    def names(self, offline=None, available_only=False):
+        """
+        Names of registered engines in registration order.
+
+        Args:
+            offline (bool, optional): Only offline (True) or online (False) engines
+            available_only (bool): Leave out engines that can't run on this system
+        """
+        return [
+            name for name, engine in self._engines.items()
+            if (offline is None or engine.offline == offline) and (not available_only or engine.available)
+        ]
+
+    def load_voices(self):
+        """Enumerate every engine's voices for the voice catalog."""
+        voices = {}
+        online = []
+        for name, engine in self._engines.items():
+            if engine.offline:
+                voices[name] = engine.voices()
+            else:
+                online.extend(engine.voices())
+        voices['online'] = online
+        return voices
+
+
+# Create a singleton instance
+engine_registry = EngineRegistry()
+for _engine in (WindowsSAPIEngine(), EspeakEngine(), Pyttsx3Engine(), VoiceRSSEngine(), GTTSEngine()):
+    engine_registry.register(_engine)
@@ -0,0 +1,247 @@
+"""
+Health tracking and routing for TTS engines.
+
+Every synthesis attempt is recorded per engine: a rolling window of
+outcomes and latencies gives the error rate and latency percentiles, and
+a smoothed latency per character (per language) is used to rank engines.
+Each engine has a circuit breaker: after repeated failures, or a high
+error rate, the engine is skipped for a cool-down period, after which a
+single trial request decides whether it is closed again or re-opened
+with a longer cool-down.
+"""
+import time
+import logging
+import threading
+from collections import deque
+
+from documents.conf import get_setting
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    index = (len(ordered) - 1) * percent / 100
+    lower = int(index)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (index - lower)
+
+
+class EngineHealth:
+    """Rolling statistics and circuit breaker of one engine."""
+
+    def __init__(self, name, window=50):
+        self.name = name
+        self.window = deque(maxlen=window)  # (ok, latency seconds)
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.cooldown = 0.0
+        self.trial_in_progress = False
+        self.requests = 0
+        self.failures = 0
+        self.opened = 0
+        self.last_error = ''
+        self.seconds_per_char = {}  # language -> EWMA, '' for all languages
+
+    def error_rate(self):
+        if not self.window:
+            return 0.0
+        return sum(1 for ok, _ in self.window if not ok) / len(self.window)
+
+
+class TTSHealthRegistry:
+    """
+    Tracks engine health and orders engines for each request.
+    """
+
+    def __init__(self, failure_threshold=3, error_rate_threshold=0.5, min_requests=10,
+                 cooldown=30.0, max_cooldown=300.0, smoothing=0.3):
+        """
+        Initialize the registry.
+
+        Args:
+            failure_threshold (int): Consecutive failures that open the breaker
+            error_rate_threshold (float): Error rate over the window that opens the breaker
+            min_requests (int): Window size required before the error rate is considered
+            cooldown (float): Seconds an opened breaker skips the engine
+            max_cooldown (float): Upper bound of the cool-down, which doubles on failed trials
+            smoothing (float): Weight of the newest sample in the latency average
+        """
+        self.failure_threshold = failure_threshold
+        self.error_rate_threshold = error_rate_threshold
+        self.min_requests = min_requests
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.smoothing = smoothing
+        self._engines = {}
+        self._lock = threading.Lock()
+
+    def _get(self, engine):
+        health = self._engines.get(engine)
+        if health is None:
+            health = self._engines[engine] = EngineHealth(engine)
+        return health
+
+    @staticmethod
+    def _language_key(language):
+        return (language or '').lower().replace('_', '-').split('-')[0]
+
+    def allow(self, engine):
+        """
+        Check whether a request may be sent to an engine, claiming the trial
+        request if its breaker is due for one.
+        """
+        with self._lock:
+            health = self._get(engine)
+            if health.state == CLOSED:
+                return True
+            if health.state == OPEN and time.monotonic() >= health.open_until:
+                health.state = HALF_OPEN
+                health.trial_in_progress = False
+            if health.state == HALF_OPEN and not health.trial_in_progress:
+                health.trial_in_progress = True
+                return True
+            return False
+
+    def release(self, engine):
+        """Give back a trial request without recording an outcome."""
+        with self._lock:
+            self._get(engine).trial_in_progress = False
+
+    def _open(self, health, reason):
+        health.cooldown = min(max(health.cooldown * 2, self.base_cooldown), self.max_cooldown)
+        health.state = OPEN
+        health.open_until = time.monotonic() + health.cooldown
+        health.trial_in_progress = False
+        health.opened += 1
+        logger.warning(f"TTS engine {health.name} disabled for {health.cooldown:.0f} s: {reason}")
+
+    def record_success(self, engine, language, latency, chars):
+        """Record a successful synthesis of `chars` characters taking `latency` seconds."""
+        with self._lock:
+            health = self._get(engine)
+            health.requests += 1
+            health.window.append((True, latency))
+            health.consecutive_failures = 0
+            if health.state != CLOSED:
+                logger.info(f"TTS engine {engine} recovered")
+            health.state = CLOSED
+            health.cooldown = 0.0
+            health.trial_in_progress = False
+
+            sample = latency / max(chars, 1)
+            for key in ('', self._language_key(language)):
+                previous = health.seconds_per_char.get(key)
+                health.seconds_per_char[key] = sample if previous is None else \
+                    previous + self.smoothing * (sample - previous)
+
+    def record_failure(self, engine, language, latency, error=''):
+        """Record a failed synthesis attempt."""
+        with self._lock:
+            health = self._get(engine)
+            health.requests += 1
+            health.failures += 1
+            health.window.append((False, latency))
+            health.consecutive_failures += 1
+            health.last_error = str(error)[:200]
+
+            if health.state == HALF_OPEN:
+                self._open(health, f"trial request failed ({health.last_error})")
+            elif health.state == CLOSED:
+                if health.consecutive_failures >= self.failure_threshold:
+                    self._open(health, f"{health.consecutive_failures} consecutive failures ({health.last_error})")
+                elif len(health.window) >= self.min_requests and \
+                        health.error_rate() >= self.error_rate_threshold:
+                    self._open(health, f"error rate {health.error_rate():.0%}")
+
+    def rank(self, engines, language, preferred=None):
+        """
+        Order candidate engines for a request.
+
+        Engines in the preferred group come first; within a group, engines
+        are ordered by their smoothed latency per character for the
+        language (falling back to all languages), after any engine whose
+        last attempt failed. Engines without data are tried first so that
+        they get measured; ties keep the given order.
+
+        Args:
+            engines (list): Candidate engine names in default order
+            language (str): Language code of the request
+            preferred (set, optional): Engines to try before the others
+
+        Returns:
+            list: Engine names, best first
+        """
+        language_key = self._language_key(language)
+        with self._lock:
+            def sort_key(item):
+                position, engine = item
+                health = self._engines.get(engine)
+                speed, failing = 0.0, False
+                if health is not None:
+                    failing = health.consecutive_failures > 0
+                    speed = health.seconds_per_char.get(language_key,
+                                                        health.seconds_per_char.get('', 0.0))
+                group = 0 if preferred is None or engine in preferred else 1
+                return group, failing, speed, position
+
+            return [engine for _, engine in sorted(enumerate(engines), key=sort_key)]
+
+    def expected_latency(self, engine, language, chars):
+        """
+        Estimate how long an engine will take for a request.
+
+        Returns:
+            float: Seconds, from the smoothed latency per character, or None
+                   without measurements
+        """
+        with self._lock:
+            health = self._engines.get(engine)
+            if health is None:
+                return None
+            speed = health.seconds_per_char.get(self._language_key(language),
+                                                health.seconds_per_char.get(''))
+        return None if speed is None else speed * max(chars, 1)
+
+    def stats(self):
+        """
+        Get per-engine health.
+
+        Returns:
+            dict: Engine name -> breaker state, error rate, latency percentiles
+                  and latency per 100 characters by language
+        """
+        now = time.monotonic()
+        with self._lock:
+            result = {}
+            for name, health in self._engines.items():
+                latencies = [latency for ok, latency in health.window if ok]
+                result[name] = {
+                    'state': health.state,
+                    'retry_in': max(health.open_until - now, 0.0) if health.state == OPEN else 0.0,
+                    'requests': health.requests,
+                    'failures': health.failures,
+                    'times_opened': health.opened,
+                    'consecutive_failures': health.consecutive_failures,
+                    'error_rate': health.error_rate(),
+                    'p50_latency_ms': _percentile(latencies, 50) * 1000 if latencies else None,
+                    'p90_latency_ms': _percentile(latencies, 90) * 1000 if latencies else None,
+                    'ms_per_100_chars': {
+                        language or 'all': value * 100000
+                        for language, value in health.seconds_per_char.items()
+                    },
+                    'last_error': health.last_error,
+                }
+            return result
+
+
+# Create a singleton instance
+tts_health = TTSHealthRegistry(
+    failure_threshold=get_setting('TTS_BREAKER_FAILURES', 3),
+    cooldown=get_setting('TTS_BREAKER_COOLDOWN', 30),
+)
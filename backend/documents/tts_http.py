@@ -0,0 +1,227 @@
+"""
+Shared HTTP client for online TTS engines.
+
+All online engines go through one requests.Session, so connections to a
+provider are kept alive and reused instead of paying a TCP and TLS
+handshake per request. Every request has connect and read timeouts, the
+number of requests in flight is bounded, and rate limiting (429) and
+server errors (5xx) are retried with exponential backoff and full jitter,
+honouring Retry-After. Requests to a named provider also wait for its
+client-side rate limit (see tts_rate_limit) before each attempt.
+"""
+import time
+import random
+import logging
+import threading
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from documents.conf import get_setting
+from documents.tts_rate_limit import tts_rate_limiter, RateLimitTimeout
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TTSHttpError(Exception):
+    """An online TTS provider could not be reached or kept failing."""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class TTSHttpClient:
+    """
+    Keep-alive connection pool with timeouts, a concurrency bound and retries.
+    """
+
+    def __init__(self, pool_size=10, connect_timeout=5.0, read_timeout=30.0, max_concurrency=10,
+                 retries=3, backoff=0.5, max_backoff=8.0, acquire_timeout=30.0):
+        """
+        Initialize the client.
+
+        Args:
+            pool_size (int): Connections kept alive per host
+            connect_timeout (float): Seconds to establish a connection
+            read_timeout (float): Seconds to wait for each chunk of the response
+            max_concurrency (int): Requests in flight at once, across all providers
+            retries (int): Retries after a 429, 5xx, timeout or connection error
+            backoff (float): Base delay of the exponential backoff in seconds
+            max_backoff (float): Upper bound of a single backoff delay
+            acquire_timeout (float): Seconds to wait for a free request slot
+        """
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.acquire_timeout = acquire_timeout
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._session = None
+        self._session_lock = threading.Lock()
+
+        # Metrics
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.retried = 0
+        self.failures = 0
+        self.in_flight = 0
+
+    @property
+    def session(self):
+        with self._session_lock:
+            if self._session is None:
+                session = requests.Session()
+                # Retries are done here, so the adapter must not retry on its own
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size, max_retries=0)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self._session = session
+            return self._session
+
+    def _delay(self, attempt, response=None):
+        """Backoff before retry number `attempt` (0-based), using Retry-After when given."""
+        if response is not None:
+            retry_after = response.headers.get('Retry-After', '')
+            if retry_after.isdigit():
+                return min(float(retry_after), self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def _count(self, **deltas):
+        with self._stats_lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    @contextmanager
+    def stream(self, method, url, budget=None, provider=None, priority=None, **kwargs):
+        """
+        Send a request and stream the response body.
+
+        The request slot is held until the block exits, so the bound covers
+        reading the body too. Responses with a retryable status are retried;
+        other error statuses are returned for the caller to inspect.
+
+        Args:
+            method (str): HTTP method
+            url (str): Request URL
+            budget (float, optional): Seconds the whole exchange may take; timeouts
+                                      are shortened and retries stop to stay within it
+            provider (str, optional): Provider whose rate limit applies (e.g. 'voicerss')
+            priority (int, optional): Rate limit queue priority; the current
+                                      tts_rate_limit priority by default
+            **kwargs: Passed to requests.Session.request (params, data, headers, ...)
+
+        Yields:
+            requests.Response: The response, opened with stream=True
+
+        Raises:
+            TTSHttpError: If no slot became free, or every attempt failed
+        """
+        expires = None if budget is None else time.monotonic() + budget
+        # Queue for the provider's rate limit before taking a connection slot
+        self._wait_for_rate_limit(provider, priority, expires)
+        acquire_timeout = self.acquire_timeout if budget is None else min(self.acquire_timeout, budget)
+        if not self._slots.acquire(timeout=acquire_timeout):
+            raise TTSHttpError(f"No free HTTP slot for TTS after {acquire_timeout:.1f} s "
+                               f"({self.max_concurrency} requests in flight)")
+        self._count(in_flight=1)
+        try:
+            response = self._send(method, url, expires, provider, priority, **kwargs)
+            with response:
+                yield response
+        finally:
+            self._count(in_flight=-1)
+            self._slots.release()
+
+    def _wait_for_rate_limit(self, provider, priority, expires):
+        if provider is None:
+            return
+        try:
+            tts_rate_limiter.acquire(provider, priority,
+                                     None if expires is None else max(expires - time.monotonic(), 0.0))
+        except RateLimitTimeout as e:
+            self._count(failures=1)
+            raise TTSHttpError(str(e), status_code=429)
+
+    def _send(self, method, url, expires=None, provider=None, priority=None, **kwargs):
+        timeout = kwargs.pop('timeout', self.timeout)
+        if not isinstance(timeout, tuple):
+            timeout = (timeout, timeout)
+        last_error = None
+        status_code = None
+        for attempt in range(self.retries + 1):
+            if expires is not None:
+                remaining = expires - time.monotonic()
+                if remaining <= 0:
+                    last_error = f"{last_error}, no time left to retry" if last_error else "no time left"
+                    break
+                kwargs['timeout'] = tuple(min(t, remaining) for t in timeout)
+            else:
+                kwargs['timeout'] = timeout
+            if attempt:
+                self._count(retried=1)
+                self._wait_for_rate_limit(provider, priority, expires)
+            self._count(requests=1)
+            response = None
+            try:
+                response = self.session.request(method, url, stream=True, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                last_error = f"{type(e).__name__}: {str(e)}"
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    return response
+                status_code = response.status_code
+                last_error = f"status code {response.status_code}"
+                response.close()
+                if status_code == 429 and provider is not None:
+                    retry_after = response.headers.get('Retry-After', '')
+                    tts_rate_limiter.throttle(provider, float(retry_after) if retry_after.isdigit() else None)
+
+            if attempt < self.retries:
+                delay = self._delay(attempt, response)
+                if expires is not None and time.monotonic() + delay >= expires:
+                    break
+                logger.info(f"TTS request to {url} failed ({last_error}), retrying in {delay:.2f} s")
+                time.sleep(delay)
+
+        self._count(failures=1)
+        raise TTSHttpError(f"TTS request failed after {attempt + 1} attempts: {last_error}",
+                           status_code=status_code)
+
+    def close(self):
+        """Close all pooled connections."""
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def stats(self):
+        """
+        Get client metrics.
+
+        Returns:
+            dict: Requests sent, retries, failures and requests in flight
+        """
+        with self._stats_lock:
+            return {
+                'requests': self.requests,
+                'retried': self.retried,
+                'failures': self.failures,
+                'in_flight': self.in_flight,
+                'max_concurrency': self.max_concurrency,
+            }
+
+
+# Create a singleton instance
+tts_http = TTSHttpClient(
+    pool_size=get_setting('TTS_HTTP_POOL_SIZE', 10),
+    connect_timeout=get_setting('TTS_HTTP_CONNECT_TIMEOUT', 5),
+    read_timeout=get_setting('TTS_HTTP_READ_TIMEOUT', 30),
+    max_concurrency=get_setting('TTS_HTTP_MAX_CONCURRENCY', 10),
+    retries=get_setting('TTS_HTTP_RETRIES', 3),
+)
@@ -0,0 +1,295 @@
+"""
+Background TTS jobs.
+
+Submitting a job returns immediately with its id; synthesis runs on a pool
+of job threads (TTS_JOB_RUNNER='thread') or in separate `runttsjobs`
+worker processes (TTS_JOB_RUNNER='external'), so HTTP workers are not
+held for the length of a synthesis. The audio goes into the TTS audio
+cache, from which the job's result is downloaded; a request that is
+already cached completes at submission. Jobs left pending or running
+when a process stops are requeued (see start_runner and runttsjobs).
+"""
+import json
+import time
+import logging
+import threading
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import close_old_connections
+from django.utils import timezone
+
+from documents.conf import get_setting
+from documents.models import TTSJob
+from documents.tts_cache import tts_audio_cache, normalize_text
+from documents import tts_pipeline
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Ids of the jobs queued or running on this process's job threads
+_dispatched = set()
+
+# Signalled whenever a job of this process changes state
+_job_changed = threading.Condition()
+
+
+def _notify():
+    with _job_changed:
+        _job_changed.notify_all()
+
+
+def claim_job(job_id):
+    """
+    Mark a pending job as running; only one worker can succeed.
+
+    Returns:
+        bool: Whether this caller claimed the job
+    """
+    return TTSJob.objects.filter(pk=job_id, status=TTSJob.STATUS_PENDING).update(
+        status=TTSJob.STATUS_RUNNING, started_at=timezone.now(),
+    ) == 1
+
+
+def run_job(job_id):
+    """
+    Claim and synthesize a job, recording the outcome on the model.
+
+    Args:
+        job_id (int): Primary key of a pending job
+    """
+    if not claim_job(job_id):
+        return
+    _notify()
+    try:
+        job = TTSJob.objects.get(pk=job_id)
+        result = tts_pipeline.synthesize(job.text, job.language, job.prefer_offline, job.voice_name or None,
+                                        audio_format=job.audio_format or None)
+        result.file.close()
+        TTSJob.objects.filter(pk=job_id).update(
+            status=TTSJob.STATUS_COMPLETE,
+            cache_key=result.key,
+            content_type=result.content_type,
+            size=result.size,
+            cache_hit=result.cache_hit,
+            completed_at=timezone.now(),
+        )
+    except Exception as e:
+        logger.error(f"TTS job {job_id} failed: {str(e)}")
+        TTSJob.objects.filter(pk=job_id).update(
+            status=TTSJob.STATUS_FAILED, error=str(e), completed_at=timezone.now(),
+        )
+    finally:
+        _notify()
+
+
+def _run_in_thread(job_id):
+    close_old_connections()
+    try:
+        run_job(job_id)
+    finally:
+        close_old_connections()
+        with _executor_lock:
+            _dispatched.discard(job_id)
+
+
+def _submit(job_id):
+    """Queue a job on the job threads, unless this process already has it queued."""
+    with _executor_lock:
+        if job_id in _dispatched:
+            return
+        _dispatched.add(job_id)
+    _executor.submit(_run_in_thread, job_id)
+
+
+def requeue_stale_jobs(stale_after=None):
+    """
+    Return jobs left running by a worker that died (e.g. in a restart) to the queue.
+
+    Args:
+        stale_after (int, optional): Seconds a job may run before it is
+                                     considered lost (TTS_JOB_STALE_AFTER)
+
+    Returns:
+        int: Number of jobs requeued
+    """
+    if stale_after is None:
+        stale_after = get_setting('TTS_JOB_STALE_AFTER', 600)
+    stale = timezone.now() - timedelta(seconds=stale_after)
+    return TTSJob.objects.filter(status=TTSJob.STATUS_RUNNING, started_at__lt=stale) \
+        .update(status=TTSJob.STATUS_PENDING, started_at=None)
+
+
+def _recover_jobs():
+    """Requeue stale jobs and dispatch every pending one, e.g. those of a previous process."""
+    close_old_connections()
+    try:
+        requeued = requeue_stale_jobs()
+        if requeued:
+            logger.warning(f"Requeued {requeued} stale TTS jobs")
+        # run_job claims each job, so a job pending in another process too still runs once
+        for job_id in TTSJob.objects.filter(status=TTSJob.STATUS_PENDING) \
+                .order_by('created_at').values_list('id', flat=True):
+            _submit(job_id)
+    except Exception as e:
+        logger.error(f"Error recovering TTS jobs: {str(e)}")
+    finally:
+        close_old_connections()
+
+
+def _recovery_loop(interval):
+    while True:
+        _recover_jobs()
+        time.sleep(interval)
+
+
+def start_runner():
+    """
+    Start this process's job threads if TTS_JOB_RUNNER is 'thread'.
+
+    Starting the runner also starts a thread that, at once and then every
+    TTS_JOB_RECOVERY_INTERVAL seconds, requeues jobs left running by a dead
+    worker and dispatches pending jobs, so jobs queued before a restart are
+    not stuck. Server processes start it when the app is ready (see
+    DocumentsConfig.ready); otherwise the first submitted job does.
+    """
+    global _executor
+    if get_setting('TTS_JOB_RUNNER', 'thread') != 'thread':
+        return  # picked up by `manage.py runttsjobs`
+    with _executor_lock:
+        if _executor is not None:
+            return
+        _executor = ThreadPoolExecutor(
+            max_workers=get_setting('TTS_JOB_WORKERS', 4),
+            thread_name_prefix='tts-job',
+        )
+        threading.Thread(
+            target=_recovery_loop, args=(get_setting('TTS_JOB_RECOVERY_INTERVAL', 60),),
+            name='tts-job-recovery', daemon=True,
+        ).start()
+
+
+def _dispatch(job):
+    if get_setting('TTS_JOB_RUNNER', 'thread') != 'thread':
+        return  # picked up by `manage.py runttsjobs`
+    start_runner()
+    _submit(job.pk)
+
+
+def submit_job(user, document, text, language, prefer_offline=True, voice_name=None, audio_format=None):
+    """
+    Create a TTS job and queue it, or complete it at once if the audio is cached.
+
+    Args:
+        user (User): Owner of the job
+        document (Document): Document the text comes from
+        text (str): The text to convert to speech
+        language (str): Language code
+        prefer_offline (bool): Whether to prefer offline TTS engines
+        voice_name (str, optional): Specific voice id
+        audio_format (str, optional): Compact format to transcode to
+
+    Returns:
+        TTSJob: The job
+    """
+    text = normalize_text(text)
+    key = tts_pipeline.cache_key_for(text, language, prefer_offline, voice_name, audio_format=audio_format)
+    job = TTSJob(
+        user=user, document=document, text=text, language=language,
+        prefer_offline=prefer_offline, voice_name=voice_name or '', audio_format=audio_format or '',
+        cache_key=key,
+    )
+
+    cached = tts_audio_cache.open(key)
+    if cached is not None:
+        f, content_type, size = cached
+        f.close()
+        for listener in tts_pipeline.cache_hit_listeners:
+            listener(key)
+        job.status = TTSJob.STATUS_COMPLETE
+        job.content_type = content_type
+        job.size = size
+        job.cache_hit = True
+        job.completed_at = timezone.now()
+        job.save()
+        return job
+
+    job.save()
+    _dispatch(job)
+    return job
+
+
+def open_result(job):
+    """
+    Open the audio of a completed job.
+
+    Returns:
+        tuple: (open binary file, content type, size), or None if the audio
+               was evicted from the cache
+    """
+    return tts_audio_cache.open(job.cache_key, record=False)
+
+
+def job_state(job):
+    """The fields of a job reported to clients while it runs."""
+    return {
+        'id': job.pk,
+        'status': job.status,
+        'content_type': job.content_type,
+        'size': job.size,
+        'error': job.error,
+    }
+
+
+def wait_for_change(timeout):
+    """Wait until a job of this process changes state, or the timeout elapses."""
+    with _job_changed:
+        _job_changed.wait(timeout)
+
+
+def job_events(job, timeout=None, heartbeat=15.0, poll_interval=1.0):
+    """
+    Server-sent events following a job until it finishes.
+
+    A 'status' event is sent for every state change and a final 'complete'
+    or 'failed' event ends the stream. Jobs run by this process wake the
+    stream immediately; jobs of other worker processes are noticed by
+    re-reading the job every poll_interval seconds.
+
+    Args:
+        job (TTSJob): The job to follow
+        timeout (float, optional): Seconds before the stream gives up
+                                   (TTS_JOB_EVENTS_TIMEOUT)
+        heartbeat (float): Seconds between keep-alive comments
+
+    Yields:
+        str: Event stream chunks
+    """
+    if timeout is None:
+        timeout = get_setting('TTS_JOB_EVENTS_TIMEOUT', 300)
+    deadline = time.monotonic() + timeout
+    last_state = None
+    last_sent = time.monotonic()
+
+    while True:
+        state = job_state(job)
+        if state != last_state:
+            event = job.status if job.finished else 'status'
+            yield f"event: {event}\ndata: {json.dumps(state)}\n\n"
+            last_state = state
+            last_sent = time.monotonic()
+        if job.finished:
+            return
+
+        now = time.monotonic()
+        if now >= deadline:
+            yield f"event: timeout\ndata: {json.dumps(state)}\n\n"
+            return
+        if now - last_sent >= heartbeat:
+            yield ": keep-alive\n\n"
+            last_sent = now
+
+        wait_for_change(min(poll_interval, deadline - now))
+        job.refresh_from_db()
@@ -0,0 +1,195 @@
+"""
+Audio with a timing track for highlighting.
+
+The text is synthesized sentence by sentence (in parallel, through the
+cached pipeline) and the sentences are joined into one clip, so sentence
+boundaries in the audio are known exactly. None of the engines used here
+report word boundaries for audio rendered to a file, so word times are
+estimated by spreading each sentence's duration over its words in
+proportion to their length, with extra weight for the pause after
+punctuation.
+
+The timing track is stored as a JSON sidecar in the audio cache, next to
+the clip, and both are addressed by content, so clients can cache them
+indefinitely. Since the key is shared by everyone who synthesizes the same
+text, a track is only served with a token that ties its key to the user
+it was handed to (see marks_token).
+"""
+import re
+import json
+import hashlib
+import logging
+
+from django.utils.crypto import salted_hmac, constant_time_compare
+
+from documents import tts_pipeline
+from documents.conf import get_setting
+from documents.tts_cache import tts_audio_cache, make_cache_key
+from documents.audio_utils import AudioWriter
+from documents.text_segmentation import split_sentences
+from documents.tts_streaming import get_segment_executor
+
+logger = logging.getLogger(__name__)
+
+MARKS_VERSION = 1
+
+_WORD = re.compile(r'\S+')
+
+# Relative length of the pause after a word ending in these characters, in characters
+_PAUSE_WEIGHTS = {',': 2, ';': 3, ':': 3, '.': 4, '!': 4, '?': 4, '…': 4}
+
+
+def word_marks(text, start, end, time_start, time_end):
+    """
+    Estimate the timing of the words of a sentence.
+
+    Args:
+        text (str): Source text
+        start (int): Offset of the sentence in text
+        end (int): End offset of the sentence
+        time_start (float): Audio time at which the sentence starts
+        time_end (float): Audio time at which the sentence ends
+
+    Returns:
+        list: [char start, char end, time start, time end] per word
+    """
+    words = [(match.start(), match.end(), match.group())
+             for match in _WORD.finditer(text, start, end)]
+    if not words:
+        return []
+
+    weights = [len(word) + _PAUSE_WEIGHTS.get(word.rstrip('"\')]»”’')[-1:], 0) for _, _, word in words]
+    scale = (time_end - time_start) / sum(weights)
+    marks = []
+    t = time_start
+    for (word_start, word_end, word), weight in zip(words, weights):
+        # A word is spoken during its share minus its trailing pause
+        pause = weight - len(word)
+        marks.append([word_start, word_end, round(t, 3), round(t + (weight - pause) * scale, 3)])
+        t += weight * scale
+    return marks
+
+
+def marks_key_for(audio_key):
+    """Cache key of the timing track of a clip."""
+    return make_cache_key(audio_key, engine='marks', rate=MARKS_VERSION)
+
+
+def marks_token(marks_key, user_id):
+    """
+    Token authorizing a user to read a timing track.
+
+    Args:
+        marks_key (str): Cache key of the timing track
+        user_id (int): Primary key of the user
+
+    Returns:
+        str: Hex token
+    """
+    return salted_hmac('documents.tts_marks', f'{user_id}:{marks_key}', algorithm='sha256').hexdigest()
+
+
+def check_marks_token(marks_key, user_id, token):
+    """Whether a token was issued to the user for the timing track."""
+    return bool(token) and constant_time_compare(marks_token(marks_key, user_id), token)
+
+
+def _audio_key(text, language, prefer_offline, voice_name):
+    # Sentence-joined audio differs from a single synthesis of the same text, and
+    # the offsets depend on the exact text, not just its normalized form
+    layout = hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+    engine = f"{'offline' if prefer_offline else 'online'}+marks:{layout}"
+    return make_cache_key(text, engine=engine, voice=voice_name, language=language)
+
+
+def load_marks(marks_key):
+    """
+    Read a cached timing track.
+
+    Returns:
+        dict: The timing track, or None if it is not cached
+    """
+    cached = tts_audio_cache.open(marks_key, record=False)
+    if cached is None:
+        return None
+    with cached[0] as f:
+        return json.load(f)
+
+
+def _render(audio_key, marks_key, text, language, prefer_offline, voice_name):
+    """Synthesize the sentences of text into one cached clip and its cached timing track."""
+    if tts_audio_cache.contains(audio_key) and tts_audio_cache.contains(marks_key):
+        return
+
+    spans = split_sentences(text, get_setting('TTS_STREAM_SEGMENT_CHARS', 300))
+    if not spans:
+        raise Exception("No text provided for TTS conversion")
+
+    executor = get_segment_executor()
+    futures = [
+        executor.submit(tts_pipeline.synthesize_bytes, text[start:end], language, prefer_offline, voice_name)
+        for start, end in spans
+    ]
+    sentences = []
+    words = []
+    try:
+        with tts_audio_cache.writer(audio_key) as entry:
+            writer = AudioWriter(entry.file)
+            for (start, end), future in zip(spans, futures):
+                content_type, data, _ = future.result()
+                time_start = writer.duration
+                writer.append(content_type, data)
+                sentences.append([start, end, round(time_start, 3), round(writer.duration, 3)])
+                words.extend(word_marks(text, start, end, time_start, writer.duration))
+            writer.finish()
+            entry.extension = '.wav' if writer.content_type == 'audio/wav' else '.mp3'
+    finally:
+        for future in futures:
+            future.cancel()
+
+    marks = {
+        'version': MARKS_VERSION,
+        'content_type': writer.content_type,
+        'duration': round(writer.duration, 3),
+        'sentences': sentences,  # [char start, char end, time start, time end]
+        'words': words,
+        'word_timing': 'estimated',
+    }
+    tts_audio_cache.put_bytes(marks_key, json.dumps(marks).encode('utf-8'), '.json')
+
+
+def synthesize_with_marks(text, language, prefer_offline=True, voice_name=None):
+    """
+    Get one clip for a text together with its sentence and word timing.
+
+    Character offsets in the timing track refer to text exactly as given.
+
+    Args:
+        text (str): The text to convert to speech
+        language (str): Language code
+        prefer_offline (bool): Whether to prefer offline TTS engines
+        voice_name (str, optional): Specific voice id
+
+    Returns:
+        tuple: (SynthesisResult with an open file the caller must close,
+                cache key of the timing track)
+
+    Raises:
+        Exception: If synthesis fails
+    """
+    audio_key = _audio_key(text, language, prefer_offline, voice_name)
+    marks_key = marks_key_for(audio_key)
+
+    cached = tts_audio_cache.open(audio_key)
+    if cached is not None and tts_audio_cache.contains(marks_key):
+        return tts_pipeline.SynthesisResult(audio_key, *cached, cache_hit=True), marks_key
+    if cached is not None:
+        cached[0].close()
+
+    _, coalesced = tts_pipeline.synthesis_flights.do(
+        audio_key, _render, audio_key, marks_key, text, language, prefer_offline, voice_name)
+
+    cached = tts_audio_cache.open(audio_key, record=False)
+    if cached is None:
+        raise Exception("Generated audio file is empty or does not exist")
+    return tts_pipeline.SynthesisResult(audio_key, *cached, cache_hit=False, coalesced=coalesced), marks_key
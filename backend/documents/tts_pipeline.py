@@ -0,0 +1,191 @@
+"""
+Cached text-to-speech pipeline.
+
+Single entry point used by the views for synthesizing speech: the audio
+cache is consulted before any engine is invoked, and freshly synthesized
+audio is stored in the cache before it is served. Engines write their
+output directly into the new cache entry, which is then served with a
+FileResponse, so the hot path has no temporary files and never holds the
+whole audio in memory. Requests for a compact format (Opus, low bitrate
+MP3) are transcoded before caching. Identical requests arriving while one is being
+synthesized wait for it instead of synthesizing again. Playback speed
+variants are time-stretched from the cached normal-speed audio and cached
+in turn, so a speed change never runs an engine again.
+"""
+import shutil
+import logging
+import tempfile
+
+from documents.tts_cache import tts_audio_cache, make_cache_key, normalize_text, CONTENT_TYPES
+from documents.transcoding import transcode
+from documents.time_stretch import time_stretch
+from documents.enhanced_tts_service import enhanced_tts_service
+from documents.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Create a singleton instance
+synthesis_flights = SingleFlight()
+
+# Callables notified with the key of every cache hit served by synthesize()
+cache_hit_listeners = []
+
+
+class SynthesisResult:
+    """Audio produced (or found in the cache) for a TTS request."""
+
+    def __init__(self, key, file, content_type, size, cache_hit, coalesced=False, speed=None):
+        self.key = key
+        self.file = file
+        self.content_type = content_type
+        self.size = size
+        self.cache_hit = cache_hit
+        # Shared the synthesis of an identical request in flight
+        self.coalesced = coalesced
+        # Playback speed of the audio (None for normal speed)
+        self.speed = speed
+
+    @property
+    def extension(self):
+        return extension_for(self.content_type)
+
+
+def extension_for(content_type):
+    """File extension (without the dot) of cached audio of a content type."""
+    for ext, cached_type in CONTENT_TYPES.items():
+        if cached_type == content_type:
+            return ext[1:]
+    return 'wav'
+
+
+def write_uncached(fp, text, language, prefer_offline=True, voice_name=None):
+    """
+    Run the TTS engines for a request, bypassing the cache, writing the audio into fp.
+
+    Args:
+        fp: Writable, seekable binary file object
+
+    Returns:
+        str: File extension of the audio written ('.mp3' or '.wav')
+    """
+    # One routed engine chain (see EnhancedTTSService.write_speech) covers every engine
+    return enhanced_tts_service.write_speech(
+        fp,
+        text=text,
+        language=language,
+        prefer_offline=prefer_offline,
+        voice_name=voice_name
+    )
+
+
+def cache_key_for(text, language, prefer_offline=True, voice_name=None, rate=None, audio_format=None):
+    """Build the audio cache key of a request."""
+    engine = 'offline' if prefer_offline else 'online'
+    if audio_format:
+        engine += '/' + audio_format
+    return make_cache_key(text, engine=engine, voice=voice_name, language=language, rate=rate)
+
+
+def _synthesize_into_cache(key, text, language, prefer_offline, voice_name, audio_format=None):
+    """Synthesize a request into its cache entry, unless a just-finished flight stored it."""
+    if tts_audio_cache.contains(key):
+        return
+    with tts_audio_cache.writer(key) as entry:
+        if audio_format is None:
+            # Engines write straight into the new cache entry
+            entry.extension = write_uncached(entry.file, text, language, prefer_offline, voice_name)
+            return
+
+        # Transcode before caching, so the cache holds the compact audio only
+        with tempfile.TemporaryFile() as raw:
+            native_extension = write_uncached(raw, text, language, prefer_offline, voice_name)
+            raw.flush()
+            raw.seek(0)
+            try:
+                entry.extension = transcode(raw, entry.file, audio_format)
+            except Exception as e:
+                logger.warning(f"Transcoding TTS audio to {audio_format} failed: {str(e)}, caching it as is")
+                raw.seek(0)
+                entry.file.seek(0)
+                entry.file.truncate()
+                shutil.copyfileobj(raw, entry.file)
+                entry.extension = native_extension
+
+
+def _stretch_into_cache(key, text, language, prefer_offline, voice_name, audio_format, speed):
+    """
+    Derive a speed variant from the normal-speed audio (synthesized if not cached) into its cache entry.
+
+    Returns:
+        bool: False if the audio could not be stretched
+    """
+    if tts_audio_cache.contains(key):
+        return True
+    base = synthesize(text, language, prefer_offline, voice_name, audio_format)
+    with base.file as source:
+        try:
+            with tts_audio_cache.writer(key) as entry:
+                entry.extension = time_stretch(source, entry.file, base.content_type, speed)
+        except Exception as e:
+            logger.warning(f"Time-stretching TTS audio to {speed}x failed: {str(e)}")
+            return False
+    return True
+
+
+def synthesize(text, language, prefer_offline=True, voice_name=None, audio_format=None, speed=None):
+    """
+    Get audio for a TTS request, from the cache if possible.
+
+    Args:
+        text (str): The text to convert to speech
+        language (str): Language code
+        prefer_offline (bool): Whether to prefer offline TTS engines
+        voice_name (str, optional): Specific voice id
+        audio_format (str, optional): Compact format to transcode to (see
+                                      transcoding.FORMATS); None keeps the engine's format
+        speed (float, optional): Playback speed (see time_stretch.normalize_speed);
+                                 None for normal speed. If the audio can't be
+                                 stretched, it is returned at normal speed.
+
+    Returns:
+        SynthesisResult: The audio, with an open file the caller must close
+
+    Raises:
+        Exception: If all TTS engines fail
+    """
+    text = normalize_text(text)
+    key = cache_key_for(text, language, prefer_offline, voice_name, rate=speed, audio_format=audio_format)
+
+    cached = tts_audio_cache.open(key)
+    if cached is not None:
+        logger.info(f"TTS cache hit: {key}")
+        for listener in cache_hit_listeners:
+            listener(key)
+        return SynthesisResult(key, *cached, cache_hit=True, speed=speed)
+
+    # Identical concurrent requests wait for one synthesis and share its entry
+    if speed is None:
+        _, coalesced = synthesis_flights.do(key, _synthesize_into_cache, key, text, language,
+                                            prefer_offline, voice_name, audio_format)
+    else:
+        stretched, coalesced = synthesis_flights.do(key, _stretch_into_cache, key, text, language,
+                                                    prefer_offline, voice_name, audio_format, speed)
+        if not stretched:
+            return synthesize(text, language, prefer_offline, voice_name, audio_format)
+
+    cached = tts_audio_cache.open(key, record=False)
+    if cached is None:
+        raise Exception("Generated audio file is empty or does not exist")
+    return SynthesisResult(key, *cached, cache_hit=False, coalesced=coalesced, speed=speed)
+
+
+def synthesize_bytes(text, language, prefer_offline=True, voice_name=None, speed=None):
+    """
+    Get the audio of a TTS request as bytes, from the cache if possible.
+
+    Returns:
+        tuple: (content type, audio data, whether it came from the cache)
+    """
+    result = synthesize(text, language, prefer_offline, voice_name, speed=speed)
+    with result.file as f:
+        return result.content_type, f.read(), result.cache_hit
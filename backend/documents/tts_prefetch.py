@@ -0,0 +1,332 @@
+"""
+Speculative synthesis of the text a reader will ask for next.
+
+Readers almost always continue where the last TTS request ended. After a
+request for a passage of a document, the passage is located in the
+document's extracted text and the text that follows it is synthesized
+into the audio cache in the background, cut at sentence boundaries to
+about the same length (or sentence by sentence, for streamed requests,
+whose audio is cached per sentence). The next request then starts from a
+cache hit.
+
+Locating the passage and the speculation itself run on a small thread
+pool of their own, so they never delay requests, and are limited per
+user: a cap on pending prefetches and on characters synthesized per hour.
+The document texts and reading positions kept for locating passages are
+bounded LRU maps. Metrics report how many prefetched entries were then
+requested.
+"""
+import time
+import logging
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from documents import tts_pipeline
+from documents.conf import get_setting
+from documents.tts_cache import tts_audio_cache, normalize_text
+from documents.extraction_store import extraction_store
+from documents.pdf_utils import PAGE_MARKER
+from documents.text_segmentation import split_sentences
+from documents.tts_rate_limit import tts_priority, PRIORITY_PREFETCH
+
+logger = logging.getLogger(__name__)
+
+
+class TTSPrefetcher:
+    """
+    Predicts and pre-synthesizes the continuation of TTS requests.
+    """
+
+    def __init__(self, workers=1, lookahead=1, max_queue=32, user_pending=2,
+                 user_chars_per_hour=20000, tracked_keys=4096, cached_documents=8,
+                 cached_chars=4000000, tracked_positions=1024):
+        """
+        Initialize the prefetcher.
+
+        Args:
+            workers (int): Threads doing speculative synthesis
+            lookahead (int): Passages of the served length to prefetch after each request
+            max_queue (int): Prefetches waiting for a worker before new ones are dropped
+            user_pending (int): Prefetches a user may have queued or running
+            user_chars_per_hour (int): Characters a user may have prefetched per hour
+            tracked_keys (int): Prefetched entries remembered for the usage metrics
+            cached_documents (int): Normalized document texts kept in memory
+            cached_chars (int): Total characters of the document texts kept in memory
+            tracked_positions (int): Reading positions (user and document) remembered
+        """
+        self.workers = workers
+        self.lookahead = lookahead
+        self.max_queue = max_queue
+        self.user_pending = user_pending
+        self.user_chars_per_hour = user_chars_per_hour
+        self.tracked_keys = tracked_keys
+        self.cached_documents = cached_documents
+        self.cached_chars = cached_chars
+        self.tracked_positions = tracked_positions
+
+        self._lock = threading.Lock()
+        self._executor = None
+        self._queued = 0
+        self._pending = {}     # user id -> prefetches queued or running
+        self._usage = {}       # user id -> deque of (time, chars), users with usage in the last hour
+        self._usage_swept = 0.0
+        self._positions = OrderedDict()  # (user id, document id) -> end of the last request in the document
+        self._documents = OrderedDict()  # document id -> (fingerprint, normalized text)
+        self._document_chars = 0
+        self._prefetched = OrderedDict()  # cache key -> True, prefetched and not requested yet
+
+        # Metrics
+        self.requests = 0
+        self.located = 0
+        self.prefetched = 0
+        self.prefetched_chars = 0
+        self.already_cached = 0
+        self.dropped_budget = 0
+        self.dropped_queue = 0
+        self.failed = 0
+        self.used = 0
+
+    def _document_text(self, document_id):
+        """Normalized extracted text of a document, or None if it wasn't extracted."""
+        key = str(document_id)
+        meta = extraction_store.get_meta(key)
+        if meta is None:
+            return None
+        fingerprint = (meta.get('source'), meta.get('text_bytes'))
+        with self._lock:
+            entry = self._documents.get(document_id)
+            if entry is not None and entry[0] == fingerprint:
+                self._documents.move_to_end(document_id)
+                return entry[1]
+
+        text = extraction_store.read(key)
+        if text is None:
+            return None
+        # Page separators and the title line are not read aloud, so requests never contain them
+        text = PAGE_MARKER.sub(' ', text)
+        if text.startswith('Title:'):
+            text = text.partition('\n')[2]
+        text = normalize_text(text)
+        if len(text) > self.cached_chars:
+            return text
+        with self._lock:
+            previous = self._documents.pop(document_id, None)
+            if previous is not None:
+                self._document_chars -= len(previous[1])
+            self._documents[document_id] = (fingerprint, text)
+            self._document_chars += len(text)
+            while len(self._documents) > self.cached_documents or self._document_chars > self.cached_chars:
+                _, (_, evicted) = self._documents.popitem(last=False)
+                self._document_chars -= len(evicted)
+        return text
+
+    def predict(self, document_text, served_text, hint=0, per_sentence=False):
+        """
+        Predict the text of the next requests.
+
+        Args:
+            document_text (str): Normalized document text
+            served_text (str): Normalized text just served
+            hint (int): Where to start looking (the end of the previous request)
+            per_sentence (bool): Predict single sentences instead of passages
+
+        Returns:
+            tuple: (list of texts to prefetch, end offset of the served text or None)
+        """
+        position = document_text.find(served_text, hint)
+        if position < 0 and hint:
+            position = document_text.find(served_text)
+        if position < 0:
+            return [], None
+        end = position + len(served_text)
+
+        length = len(served_text) * self.lookahead
+        following = document_text[end:end + length + 1000]
+        spans = split_sentences(following, get_setting('TTS_STREAM_SEGMENT_CHARS', 300))
+
+        texts = []
+        if per_sentence:
+            for start, stop in spans:
+                texts.append(following[start:stop])
+                if stop >= length:
+                    break
+            return texts, end
+
+        # Whole passages of about the served length, ending at sentence boundaries
+        passage_start = None
+        for start, stop in spans:
+            if passage_start is None:
+                passage_start = start
+            if stop - passage_start >= len(served_text) * 0.8:
+                texts.append(following[passage_start:stop])
+                passage_start = None
+                if len(texts) == self.lookahead:
+                    break
+        return texts, end
+
+    def _within_budget(self, user_id, chars):
+        """Reserve hourly character budget for a prefetch. Caller holds the lock."""
+        now = time.time()
+        cutoff = now - 3600
+        if now - self._usage_swept > 60:
+            # Forget users with nothing left in the window, so the map doesn't keep every user seen
+            for other, usage in list(self._usage.items()):
+                while usage and usage[0][0] < cutoff:
+                    usage.popleft()
+                if not usage:
+                    del self._usage[other]
+            self._usage_swept = now
+
+        usage = self._usage.get(user_id) or deque()
+        while usage and usage[0][0] < cutoff:
+            usage.popleft()
+        if sum(n for _, n in usage) + chars > self.user_chars_per_hour:
+            if not usage:
+                self._usage.pop(user_id, None)
+            return False
+        usage.append((now, chars))
+        self._usage[user_id] = usage
+        return True
+
+    def after_request(self, user_id, document_id, text, language, prefer_offline=True, voice_name=None,
+                      audio_format=None, per_sentence=False):
+        """
+        Queue speculative synthesis of what follows a request in its document.
+
+        Only cheap checks run on the caller's thread; the document text is
+        read and the passage located by the prefetch task. Never raises;
+        prefetching is best effort.
+
+        Args:
+            user_id (int): User who made the request
+            document_id (int): Document the text was read from
+            text (str): Text of the request
+            language, prefer_offline, voice_name, audio_format: Synthesis parameters of the request
+            per_sentence (bool): The request was synthesized sentence by sentence
+                                 (streaming), so prefetch sentences
+
+        Returns:
+            bool: Whether a prefetch task was queued
+        """
+        try:
+            with self._lock:
+                self.requests += 1
+                if self._queued >= self.max_queue:
+                    self.dropped_queue += 1
+                    return False
+                if self._pending.get(user_id, 0) >= self.user_pending:
+                    self.dropped_budget += 1
+                    return False
+                self._queued += 1
+                self._pending[user_id] = self._pending.get(user_id, 0) + 1
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                        thread_name_prefix='tts-prefetch')
+            self._executor.submit(self._run, user_id, document_id, text, language, prefer_offline,
+                                  voice_name, audio_format, per_sentence)
+            return True
+        except Exception as e:
+            logger.warning(f"TTS prefetch failed: {str(e)}")
+            return False
+
+    def _run(self, user_id, document_id, text, language, prefer_offline, voice_name, audio_format, per_sentence):
+        try:
+            document_text = self._document_text(document_id)
+            if not document_text:
+                return
+
+            served = normalize_text(text)
+            with self._lock:
+                hint = self._positions.get((user_id, document_id), 0)
+            texts, end = self.predict(document_text, served, hint, per_sentence)
+            if end is None:
+                return
+            with self._lock:
+                self.located += 1
+                self._positions[(user_id, document_id)] = end
+                self._positions.move_to_end((user_id, document_id))
+                while len(self._positions) > self.tracked_positions:
+                    self._positions.popitem(last=False)
+
+            # Streamed and marked requests cache each sentence in the engine's format
+            next_format = None if per_sentence else audio_format
+            for next_text in texts:
+                key = tts_pipeline.cache_key_for(next_text, language, prefer_offline, voice_name,
+                                                 audio_format=next_format)
+                if tts_audio_cache.contains(key):
+                    with self._lock:
+                        self.already_cached += 1
+                    continue
+                with self._lock:
+                    if not self._within_budget(user_id, len(next_text)):
+                        self.dropped_budget += 1
+                        break
+                self._synthesize(key, next_text, language, prefer_offline, voice_name, next_format)
+        except Exception as e:
+            logger.warning(f"TTS prefetch failed: {str(e)}")
+        finally:
+            with self._lock:
+                self._queued -= 1
+                self._pending[user_id] -= 1
+                if not self._pending[user_id]:
+                    del self._pending[user_id]
+
+    def _synthesize(self, key, text, language, prefer_offline, voice_name, audio_format):
+        try:
+            # Online providers serve readers first
+            with tts_priority(PRIORITY_PREFETCH):
+                result = tts_pipeline.synthesize(text, language, prefer_offline, voice_name,
+                                                 audio_format=audio_format)
+            result.file.close()
+            with self._lock:
+                if result.cache_hit or result.coalesced:
+                    self.already_cached += 1
+                else:
+                    self.prefetched += 1
+                    self.prefetched_chars += len(text)
+                    self._prefetched[key] = True
+                    while len(self._prefetched) > self.tracked_keys:
+                        self._prefetched.popitem(last=False)
+        except Exception as e:
+            logger.info(f"Speculative TTS synthesis failed: {str(e)}")
+            with self._lock:
+                self.failed += 1
+
+    def record_hit(self, key):
+        """Count a cache hit on a prefetched entry as a use of the prefetch."""
+        with self._lock:
+            if self._prefetched.pop(key, None) is not None:
+                self.used += 1
+
+    def stats(self):
+        """
+        Get prefetch metrics.
+
+        Returns:
+            dict: Prefetches queued, dropped and completed, and the fraction used
+        """
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'located': self.located,
+                'prefetched': self.prefetched,
+                'prefetched_chars': self.prefetched_chars,
+                'used': self.used,
+                'hit_rate': self.used / self.prefetched if self.prefetched else 0.0,
+                'already_cached': self.already_cached,
+                'dropped_budget': self.dropped_budget,
+                'dropped_queue': self.dropped_queue,
+                'failed': self.failed,
+                'queued': self._queued,
+            }
+
+
+# Create a singleton instance
+tts_prefetcher = TTSPrefetcher(
+    workers=get_setting('TTS_PREFETCH_WORKERS', 1),
+    lookahead=get_setting('TTS_PREFETCH_LOOKAHEAD', 1),
+    user_pending=get_setting('TTS_PREFETCH_USER_PENDING', 2),
+    user_chars_per_hour=get_setting('TTS_PREFETCH_USER_CHARS_PER_HOUR', 20000),
+)
+tts_pipeline.cache_hit_listeners.append(tts_prefetcher.record_hit)
@@ -0,0 +1,263 @@
+"""
+Client-side rate limiting of online TTS providers.
+
+Each provider gets a token bucket sized to its quota (TTS_<PROVIDER>_RATE
+requests per second, bursts of TTS_<PROVIDER>_BURST). Requests that find
+the bucket empty queue for a token instead of being sent and answered
+with 429, so a burst turns into a short delay. The queue is ordered by
+priority: requests a reader is waiting for go before background work
+(audiobooks), which goes before speculative prefetching. A 429 that gets
+through anyway pauses the provider for its Retry-After.
+
+The priority of the current request is a context variable, set with
+`tts_priority()` around background synthesis.
+"""
+import time
+import heapq
+import logging
+import itertools
+import threading
+import contextvars
+from contextlib import contextmanager
+
+from documents.conf import get_setting
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+PRIORITY_PREFETCH = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: 'interactive',
+    PRIORITY_BACKGROUND: 'background',
+    PRIORITY_PREFETCH: 'prefetch',
+}
+
+_priority = contextvars.ContextVar('tts_priority', default=PRIORITY_INTERACTIVE)
+
+
+def current_priority():
+    """Priority of the TTS work running in this context."""
+    return _priority.get()
+
+
+@contextmanager
+def tts_priority(priority):
+    """Run the enclosed TTS work at a priority (one of the PRIORITY_* constants)."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class RateLimitTimeout(Exception):
+    """No token became available for a request in time."""
+
+
+class ProviderRateLimit:
+    """
+    Token bucket with a priority queue of waiting requests, for one provider.
+    """
+
+    def __init__(self, name, rate, burst=1, pause_after_429=1.0):
+        """
+        Initialize the bucket, full.
+
+        Args:
+            name (str): Provider name
+            rate (float): Requests per second; 0 disables the limit
+            burst (int): Requests that may be sent at once after an idle period
+            pause_after_429 (float): Pause when a 429 comes without Retry-After
+        """
+        self.name = name
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.pause_after_429 = pause_after_429
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._cond = threading.Condition()
+        self._waiters = []  # heap of (priority, sequence)
+        self._sequence = itertools.count()
+
+        # Metrics
+        self.granted = 0
+        self.delayed = 0
+        self.timeouts = 0
+        self.throttled = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, priority=PRIORITY_INTERACTIVE, timeout=None):
+        """
+        Wait for a token.
+
+        Waiting requests are served in priority order, then in arrival order.
+
+        Args:
+            priority (int): Priority of the request (lower goes first)
+            timeout (float, optional): Seconds to wait at most
+
+        Returns:
+            float: Seconds waited
+
+        Raises:
+            RateLimitTimeout: If no token became available within the timeout
+        """
+        unlimited = self.rate <= 0
+        # Without a rate only a 429 pause holds requests back
+        if unlimited and time.monotonic() >= self.paused_until:
+            return 0.0
+
+        start = time.monotonic()
+        entry = (priority, next(self._sequence))
+        with self._cond:
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    first = self._waiters[0] == entry
+                    if first and now >= self.paused_until and (unlimited or self.tokens >= 1):
+                        if not unlimited:
+                            self.tokens -= 1
+                        break
+
+                    # The first waiter sleeps until its token is due; the others until woken
+                    wait = None
+                    if first:
+                        token_due = 0.0 if unlimited else (1 - self.tokens) / self.rate
+                        wait = max(self.paused_until - now, token_due, 0.001)
+                    if timeout is not None:
+                        remaining = start + timeout - now
+                        if remaining <= 0:
+                            self.timeouts += 1
+                            raise RateLimitTimeout(
+                                f"{self.name} rate limit: no request slot within {timeout:.1f} s "
+                                f"({len(self._waiters)} requests queued)")
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self._cond.wait(wait)
+            finally:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                # The next waiter may be able to go now
+                self._cond.notify_all()
+
+            waited = time.monotonic() - start
+            self.granted += 1
+            if waited > 0.001:
+                self.delayed += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+        return waited
+
+    def throttle(self, retry_after=None):
+        """
+        Record a 429 from the provider: send nothing more until Retry-After has passed.
+
+        Args:
+            retry_after (float, optional): Seconds from the Retry-After header
+        """
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens = min(self.tokens, 0.0)
+            self.paused_until = max(self.paused_until, now + (retry_after or self.pause_after_429))
+            self.throttled += 1
+            self._cond.notify_all()
+        logger.warning(f"TTS provider {self.name} rate limited us; pausing for "
+                       f"{retry_after or self.pause_after_429:.1f} s")
+
+    def stats(self):
+        """
+        Get the bucket state and queue metrics.
+
+        Returns:
+            dict: Configured rate, tokens left, queue depth by priority and wait times
+        """
+        with self._cond:
+            now = time.monotonic()
+            if self.rate > 0:
+                self._refill(now)
+            queued = {name: 0 for name in PRIORITY_NAMES.values()}
+            for priority, _ in self._waiters:
+                name = PRIORITY_NAMES.get(priority, str(priority))
+                queued[name] = queued.get(name, 0) + 1
+            return {
+                'rate': self.rate,
+                'burst': self.burst,
+                'tokens': round(self.tokens, 2),
+                'paused_for': max(self.paused_until - now, 0.0),
+                'queue_depth': len(self._waiters),
+                'queued': queued,
+                'granted': self.granted,
+                'delayed': self.delayed,
+                'timeouts': self.timeouts,
+                'throttled': self.throttled,
+                'avg_wait_ms': self.total_wait / self.granted * 1000 if self.granted else 0.0,
+                'max_wait_ms': self.max_wait * 1000,
+            }
+
+
+class TTSRateLimiter:
+    """
+    The rate limits of all online providers, created from settings on first use.
+    """
+
+    def __init__(self, max_wait=30.0):
+        """
+        Args:
+            max_wait (float): Longest a request waits for a token, if it has no budget of its own
+        """
+        self.max_wait = max_wait
+        self._limits = {}
+        self._lock = threading.Lock()
+
+    def get(self, provider):
+        """Get the rate limit of a provider."""
+        with self._lock:
+            limit = self._limits.get(provider)
+            if limit is None:
+                prefix = f'TTS_{provider.upper()}'
+                limit = self._limits[provider] = ProviderRateLimit(
+                    provider,
+                    rate=get_setting(f'{prefix}_RATE', 0),
+                    burst=get_setting(f'{prefix}_BURST', 1),
+                )
+            return limit
+
+    def acquire(self, provider, priority=None, timeout=None):
+        """
+        Wait for a provider's token, at the current priority unless one is given.
+
+        Raises:
+            RateLimitTimeout: If no token became available in time
+        """
+        if priority is None:
+            priority = current_priority()
+        timeout = self.max_wait if timeout is None else min(timeout, self.max_wait)
+        return self.get(provider).acquire(priority, timeout)
+
+    def throttle(self, provider, retry_after=None):
+        self.get(provider).throttle(retry_after)
+
+    def stats(self):
+        """
+        Get per-provider rate limit metrics.
+
+        Returns:
+            dict: Provider name -> bucket and queue metrics
+        """
+        with self._lock:
+            limits = list(self._limits.values())
+        return {limit.name: limit.stats() for limit in limits}
+
+
+# Create a singleton instance
+tts_rate_limiter = TTSRateLimiter(max_wait=get_setting('TTS_RATE_LIMIT_MAX_WAIT', 30))
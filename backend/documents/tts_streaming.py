@@ -0,0 +1,189 @@
+"""
+Streaming text-to-speech.
+
+Long selections are split into sentences which are synthesized in order,
+with a few sentences of lookahead running in the background, and the
+audio of each sentence is sent to the client as soon as it is ready.
+Playback can start after the first sentence instead of after the whole
+selection. Every sentence goes through the cached pipeline, so sentences
+that were synthesized before are served from the audio cache.
+
+WAV segments are merged into a single stream (one header, then raw PCM);
+MP3 segments are concatenated frame by frame.
+"""
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from documents import tts_pipeline
+from documents.conf import get_setting
+from documents.audio_utils import parse_wav, wav_header, same_wav_format, strip_id3
+from documents.text_segmentation import split_sentences
+from documents.tts_cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_segment_executor():
+    """Get the thread pool that synthesizes segments for all streams in this process."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=get_setting('TTS_STREAM_WORKERS', 4),
+                thread_name_prefix='tts-stream',
+            )
+        return _executor
+
+
+class SpeechStream:
+    """
+    Iterable of audio chunks for a text, synthesized sentence by sentence.
+
+    Call start() before iterating: it waits for the first sentence, so the
+    content type of the stream is known before the response is created.
+    """
+
+    def __init__(self, text, language, prefer_offline=True, voice_name=None,
+                 lookahead=None, max_segment_chars=None, speed=None):
+        """
+        Initialize the stream.
+
+        Args:
+            text (str): The text to convert to speech
+            language (str): Language code
+            prefer_offline (bool): Whether to prefer offline TTS engines
+            voice_name (str, optional): Specific voice id
+            lookahead (int, optional): Number of sentences synthesized ahead of playback
+            max_segment_chars (int, optional): Maximum length of a segment
+            speed (float, optional): Playback speed; None for normal speed
+        """
+        self.text = normalize_text(text)
+        self.language = language
+        self.prefer_offline = prefer_offline
+        self.voice_name = voice_name
+        self.speed = speed
+        self.lookahead = lookahead if lookahead is not None else get_setting('TTS_STREAM_LOOKAHEAD', 2)
+        max_chars = max_segment_chars or get_setting('TTS_STREAM_SEGMENT_CHARS', 300)
+        self.segments = [self.text[start:end] for start, end in split_sentences(self.text, max_chars)]
+
+        self.content_type = None
+        self.time_to_first_audio = None
+        self.cache_hits = 0
+        self._futures = []
+        self._next = 0
+        self._first = None
+        self._started_at = None
+
+    def _submit_ahead(self, current):
+        """Keep the current segment and `lookahead` segments after it in flight."""
+        executor = get_segment_executor()
+        while self._next < len(self.segments) and self._next <= current + self.lookahead:
+            self._futures.append(executor.submit(
+                tts_pipeline.synthesize_bytes, self.segments[self._next],
+                self.language, self.prefer_offline, self.voice_name, self.speed,
+            ))
+            self._next += 1
+
+    def start(self):
+        """
+        Synthesize the first segment.
+
+        Returns:
+            SpeechStream: self
+
+        Raises:
+            Exception: If the text is empty or the first segment cannot be synthesized
+        """
+        if not self.segments:
+            raise Exception("No text to synthesize")
+
+        self._started_at = time.perf_counter()
+        self._submit_ahead(0)
+        try:
+            self._first = self._futures[0].result()
+        except Exception:
+            self.close()
+            raise
+        self.content_type = self._first[0]
+        self.time_to_first_audio = time.perf_counter() - self._started_at
+        logger.info(f"TTS stream: first audio after {self.time_to_first_audio * 1000:.0f} ms "
+                    f"({len(self.segments)} segments)")
+        return self
+
+    @property
+    def extension(self):
+        return 'mp3' if self.content_type == 'audio/mpeg' else 'wav'
+
+    def __iter__(self):
+        if self._first is None:
+            self.start()
+
+        wav_format = None
+        try:
+            for index in range(len(self.segments)):
+                self._submit_ahead(index)
+                if index == 0:
+                    content_type, data, cache_hit = self._first
+                    self._first = None
+                else:
+                    content_type, data, cache_hit = self._futures[index].result()
+                self._futures[index] = None  # release the audio once sent
+                self.cache_hits += int(cache_hit)
+
+                if content_type != self.content_type:
+                    # An engine fallback changed the audio format mid-stream
+                    logger.error(f"TTS stream: segment {index} is {content_type}, "
+                                 f"stream is {self.content_type}; stopping")
+                    return
+
+                if content_type == 'audio/wav':
+                    fmt, pcm = parse_wav(data)
+                    if wav_format is None:
+                        wav_format = fmt
+                        yield wav_header(fmt)
+                    elif not same_wav_format(fmt, wav_format):
+                        logger.error(f"TTS stream: segment {index} has a different WAV format; stopping")
+                        return
+                    yield pcm
+                else:
+                    yield data if index == 0 else strip_id3(data)
+
+            logger.info(f"TTS stream: {len(self.segments)} segments in "
+                        f"{(time.perf_counter() - self._started_at) * 1000:.0f} ms "
+                        f"({self.cache_hits} from cache)")
+        except Exception as e:
+            # Headers are already sent, so the only thing left to do is end the stream
+            logger.error(f"TTS stream failed: {str(e)}", exc_info=True)
+        finally:
+            self.close()
+
+    def close(self):
+        """Cancel segments that have not started synthesizing yet."""
+        for future in self._futures:
+            if future is not None:
+                future.cancel()
+
+
+def stream_speech(text, language, prefer_offline=True, voice_name=None, speed=None):
+    """
+    Start streaming speech for a text.
+
+    Args:
+        text (str): The text to convert to speech
+        language (str): Language code
+        prefer_offline (bool): Whether to prefer offline TTS engines
+        voice_name (str, optional): Specific voice id
+        speed (float, optional): Playback speed; None for normal speed
+
+    Returns:
+        SpeechStream: A started stream; iterate over it to get audio chunks
+
+    Raises:
+        Exception: If the first segment cannot be synthesized
+    """
+    return SpeechStream(text, language, prefer_offline, voice_name, speed=speed).start()
@@ -0,0 +1,161 @@
+"""
+Text of TTS requests that reference a document's stored text.
+
+Instead of posting the text to read, a client can name a range of the
+document's extracted text (see extraction_store):
+
+  - start_offset / end_offset: character offsets into the text returned
+    by the extract_text endpoint (end exclusive)
+  - page, with optional sentence_start / sentence_end: sentences of one
+    page (pages numbered from 1, sentences from 0, end exclusive)
+
+The text is read from the server's copy and normalized here, so every
+client reading the same range gets the same audio cache key, and no
+selection has to be uploaded.
+"""
+import logging
+
+from documents.conf import get_setting
+from documents.extraction_store import extraction_store
+from documents.pdf_utils import ensure_extracted_text, PAGE_MARKER, PAGE_HEADER
+from documents.text_segmentation import split_sentences
+from documents.tts_cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+REFERENCE_FIELDS = ('start_offset', 'end_offset', 'page', 'sentence_start', 'sentence_end')
+
+
+def has_text_reference(data):
+    """Check whether request data references stored text instead of posting it."""
+    return any(data.get(name) not in (None, '') for name in REFERENCE_FIELDS)
+
+
+def _get_int(data, name):
+    value = data.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be an integer")
+
+
+def read_range(key, start, end):
+    """
+    Read a range of stored text without loading the whole text.
+
+    Args:
+        key (str): Extraction store key
+        start (int): Start character offset
+        end (int): End character offset (exclusive)
+
+    Returns:
+        str: The text between the offsets
+
+    Raises:
+        ValueError: If the range is past the end of the text
+    """
+    with extraction_store.open(key) as f:
+        if len(f.read(start)) < start:
+            raise ValueError(f"start_offset {start} is past the end of the document text")
+        text = f.read(end - start)
+    if len(text) < end - start:
+        raise ValueError(f"end_offset {end} is past the end of the document text "
+                         f"({start + len(text)} characters)")
+    return text
+
+
+def find_page(key, page):
+    """
+    Locate a page in stored text.
+
+    Args:
+        key (str): Extraction store key
+        page (int): Page number (from 1)
+
+    Returns:
+        tuple: (page text, offset of the page text in the stored text)
+
+    Raises:
+        ValueError: If the document has no such page
+    """
+    offset = 0
+    page_start = None
+    lines = []
+    with extraction_store.open(key) as f:
+        for line in f:
+            header = PAGE_HEADER.fullmatch(line.rstrip('\r\n'))
+            if header:
+                if page_start is not None:
+                    break
+                if int(header.group(1)) == page:
+                    page_start = offset + len(line)
+            elif page_start is not None:
+                lines.append(line)
+            offset += len(line)
+    if page_start is None:
+        raise ValueError(f"The document has no page {page}")
+    return ''.join(lines), page_start
+
+
+def resolve_text_reference(document, data, max_chars=None):
+    """
+    Get the text of a TTS request that references the document's stored text.
+
+    Args:
+        document (Document): The document
+        data: Request data with start_offset/end_offset, or page and
+              optionally sentence_start/sentence_end
+        max_chars (int, optional): Longest range accepted.
+                                   Defaults to the TTS_REFERENCE_MAX_CHARS setting.
+
+    Returns:
+        tuple: (normalized text, start offset, end offset); the offsets locate
+               the text in the stored text
+
+    Raises:
+        ValueError: If the reference is invalid or the range has no text
+    """
+    max_chars = max_chars or get_setting('TTS_REFERENCE_MAX_CHARS', 50000)
+    start = _get_int(data, 'start_offset')
+    end = _get_int(data, 'end_offset')
+    page = _get_int(data, 'page')
+    sentence_start = _get_int(data, 'sentence_start')
+    sentence_end = _get_int(data, 'sentence_end')
+
+    key = str(document.id)
+    ensure_extracted_text(document.pdf_path, key)
+
+    if page is not None:
+        if start is not None or end is not None:
+            raise ValueError("Give either start_offset/end_offset or page, not both")
+        page_text, page_start = find_page(key, page)
+        spans = split_sentences(page_text, get_setting('TTS_STREAM_SEGMENT_CHARS', 300))
+        if not spans:
+            raise ValueError(f"Page {page} has no text")
+        first = 0 if sentence_start is None else sentence_start
+        last = len(spans) if sentence_end is None else sentence_end
+        if not 0 <= first < last <= len(spans):
+            raise ValueError(f"Invalid sentence range {first}-{last}: page {page} has {len(spans)} sentences")
+        start = page_start + spans[first][0]
+        end = page_start + spans[last - 1][1]
+        if end - start > max_chars:
+            raise ValueError(f"The referenced text is {end - start} characters, the limit is {max_chars}")
+        text = page_text[spans[first][0]:spans[last - 1][1]]
+    else:
+        if sentence_start is not None or sentence_end is not None:
+            raise ValueError("sentence_start and sentence_end need a page")
+        if start is None or end is None:
+            raise ValueError("Give both start_offset and end_offset")
+        if not 0 <= start < end:
+            raise ValueError(f"Invalid offset range {start}-{end}")
+        if end - start > max_chars:
+            raise ValueError(f"The referenced text is {end - start} characters, the limit is {max_chars}")
+        text = read_range(key, start, end)
+
+    text = normalize_text(PAGE_MARKER.sub(' ', text))
+    if not text:
+        raise ValueError("The referenced range has no text")
+    logger.debug(f"Resolved TTS text reference for document {document.id}: {start}-{end}, {len(text)} chars")
+    return text, start, end
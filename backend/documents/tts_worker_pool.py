@@ -0,0 +1,407 @@
+"""
+Pool of isolated pyttsx3 synthesis processes.
+
+A pyttsx3 engine can only run one synthesis at a time and the services
+used to share a single engine per Django process, so concurrent offline
+TTS requests were serialized (or failed with "run loop already started").
+The pool runs each engine in its own worker process: requests wait for an
+idle worker, a job that exceeds its timeout gets its worker killed and
+replaced, and workers are recycled after a number of jobs so leaks in the
+native speech drivers don't accumulate.
+"""
+import os
+import time
+import queue
+import atexit
+import logging
+import tempfile
+import threading
+import multiprocessing
+
+from documents.conf import get_setting
+
+logger = logging.getLogger(__name__)
+
+
+def _select_voice(engine, voice_ids, language=None, voice_name=None):
+    """
+    Pick a voice by id (callers resolve ids with the voice catalog), falling
+    back to a language code contained in a voice's id or name.
+    """
+    if voice_name in voice_ids:
+        engine.setProperty('voice', voice_name)
+        return
+    voices = engine.getProperty('voices')
+    if voice_name:
+        for voice in voices:
+            if voice.name == voice_name:
+                engine.setProperty('voice', voice.id)
+                return
+    if language:
+        for voice in voices:
+            if language.lower() in voice.id.lower() or language.lower() in voice.name.lower():
+                engine.setProperty('voice', voice.id)
+                return
+
+
+def _pyttsx3_worker(conn):
+    """
+    Worker process main loop: one pyttsx3 engine, jobs received over a pipe.
+
+    Jobs are (text, language, voice_name, rate, output_file) tuples, or
+    'voices' to list the installed voices; None stops the worker. Replies are
+    ('ok', output_file), ('ok', [(voice id, voice name), ...]) or ('error', message).
+    """
+    try:
+        import pyttsx3
+        engine = pyttsx3.init()
+        default_voice = engine.getProperty('voice')
+        voice_ids = {voice.id for voice in engine.getProperty('voices')}
+    except Exception as e:
+        conn.send(('error', f"Failed to initialize pyttsx3 engine: {str(e)}"))
+        return
+    conn.send(('ready', os.getpid()))
+
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            break
+        if job is None:
+            break
+        if job == 'voices':
+            try:
+                conn.send(('ok', [(voice.id, voice.name) for voice in engine.getProperty('voices')]))
+            except Exception as e:
+                conn.send(('error', str(e)))
+            continue
+
+        text, language, voice_name, rate, output_file = job
+        try:
+            engine.setProperty('voice', default_voice)
+            _select_voice(engine, voice_ids, language, voice_name)
+            engine.setProperty('rate', rate)
+            engine.save_to_file(text, output_file)
+            engine.runAndWait()
+            conn.send(('ok', output_file))
+        except Exception as e:
+            conn.send(('error', str(e)))
+
+
+class _Worker:
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        self.jobs = 0
+
+    def stop(self, timeout=2):
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class TTSWorkerPool:
+    """
+    Fixed-size pool of synthesis worker processes, started on demand.
+    """
+
+    def __init__(self, size=2, job_timeout=60, max_jobs_per_worker=200,
+                 acquire_timeout=120, startup_timeout=30, target=_pyttsx3_worker):
+        """
+        Initialize the pool.
+
+        Args:
+            size (int): Maximum number of worker processes
+            job_timeout (float): Seconds a job may run before its worker is killed
+            max_jobs_per_worker (int): Jobs after which a worker is replaced
+            acquire_timeout (float): Seconds to wait for an idle worker
+            startup_timeout (float): Seconds to wait for a new worker's engine to initialize
+            target (callable): Worker process main function
+        """
+        self.size = size
+        self.job_timeout = job_timeout
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.acquire_timeout = acquire_timeout
+        self.startup_timeout = startup_timeout
+        self._target = target
+        # spawn: forking a process that holds Django's DB connections and threads is unsafe
+        self._context = multiprocessing.get_context('spawn')
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._workers = 0
+        self._closed = False
+
+        # Metrics
+        self.jobs = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.crashes = 0
+        self.recycled = 0
+        self.busy = 0
+        self.total_wait = 0.0
+        self.total_job_time = 0.0
+
+    def _spawn(self):
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(target=self._target, args=(child_conn,), daemon=True)
+        process.start()
+        child_conn.close()
+        worker = _Worker(process, parent_conn)
+        if not parent_conn.poll(self.startup_timeout):
+            worker.kill()
+            raise Exception("TTS worker did not start in time")
+        try:
+            status, value = parent_conn.recv()
+        except (EOFError, OSError):
+            status, value = 'error', 'TTS worker exited during startup'
+        if status != 'ready':
+            worker.kill()
+            raise Exception(value)
+        logger.debug(f"Started TTS worker process {value}")
+        return worker
+
+    def _acquire(self, timeout=None):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._closed:
+                raise Exception("TTS worker pool is closed")
+            can_spawn = self._workers < self.size
+            if can_spawn:
+                self._workers += 1
+        if can_spawn:
+            try:
+                return self._spawn()
+            except Exception:
+                with self._lock:
+                    self._workers -= 1
+                raise
+
+        timeout = self.acquire_timeout if timeout is None else min(self.acquire_timeout, timeout)
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise Exception(f"No TTS worker became available within {timeout:.1f} s")
+
+    def _replace(self):
+        """Start a worker in place of a discarded one, so requests waiting for a worker are served."""
+        try:
+            worker = self._spawn()
+        except Exception as e:
+            logger.error(f"Could not start replacement TTS worker: {str(e)}")
+            with self._lock:
+                self._workers -= 1
+            return
+        if self._closed:
+            self._discard(worker, kill=False, replace=False)
+        else:
+            self._idle.put(worker)
+
+    def _discard(self, worker, kill=True, replace=True):
+        if kill:
+            worker.kill()
+        else:
+            worker.stop()
+        if replace and not self._closed:
+            # The slot stays counted; the replacement takes it over
+            threading.Thread(target=self._replace, daemon=True).start()
+        else:
+            with self._lock:
+                self._workers -= 1
+
+    def _release(self, worker):
+        worker.jobs += 1
+        if self._closed:
+            self._discard(worker, kill=False)
+        elif worker.jobs >= self.max_jobs_per_worker:
+            with self._lock:
+                self.recycled += 1
+            self._discard(worker, kill=False)
+        else:
+            self._idle.put(worker)
+
+    def synthesize(self, text, language=None, voice_name=None, rate=150, output_file=None, suffix='.wav',
+                   timeout=None):
+        """
+        Synthesize text in a worker process.
+
+        Args:
+            text (str): The text to convert to speech
+            language (str, optional): Language code used to pick a voice
+            voice_name (str, optional): Voice id or name
+            rate (int): Speech rate in words per minute
+            output_file (str, optional): Path to write the audio to. A temporary
+                                         file is created if not provided.
+            suffix (str): Suffix of the temporary file
+            timeout (float, optional): Seconds for the wait and the job together;
+                                       shortens acquire_timeout and job_timeout
+
+        Returns:
+            str: Path to the generated audio file
+
+        Raises:
+            Exception: If no worker is available, the job times out or synthesis fails
+        """
+        if output_file is None:
+            fd, output_file = tempfile.mkstemp(suffix=suffix)
+            os.close(fd)
+
+        waited = time.perf_counter()
+        try:
+            worker = self._acquire(timeout)
+        except Exception:
+            os.remove(output_file)
+            raise
+        started = time.perf_counter()
+        job_timeout = self.job_timeout
+        if timeout is not None:
+            job_timeout = min(job_timeout, timeout - (started - waited))
+            if job_timeout <= 0:
+                # The wait used the whole budget; the worker never got the job
+                self._release(worker)
+                os.remove(output_file)
+                raise Exception(f"No time left for the TTS job after waiting {started - waited:.1f} s for a worker")
+        with self._lock:
+            self.total_wait += started - waited
+            self.busy += 1
+
+        try:
+            try:
+                worker.conn.send((text, language, voice_name, rate, output_file))
+                if not worker.conn.poll(job_timeout):
+                    with self._lock:
+                        self.timeouts += 1
+                    self._discard(worker)
+                    worker = None
+                    raise Exception(f"TTS worker timed out after {job_timeout:.1f} s")
+                status, value = worker.conn.recv()
+            except (EOFError, OSError) as e:
+                with self._lock:
+                    self.crashes += 1
+                self._discard(worker)
+                worker = None
+                raise Exception(f"TTS worker crashed: {str(e) or type(e).__name__}")
+
+            if status != 'ok':
+                raise Exception(value)
+            if not os.path.exists(output_file) or os.path.getsize(output_file) == 0:
+                raise Exception("Generated audio file is empty or does not exist")
+            return output_file
+        except Exception:
+            with self._lock:
+                self.failures += 1
+            if os.path.exists(output_file):
+                os.remove(output_file)
+            raise
+        finally:
+            with self._lock:
+                self.busy -= 1
+                self.jobs += 1
+                self.total_job_time += time.perf_counter() - started
+            if worker is not None:
+                self._release(worker)
+
+    def list_voices(self, timeout=None):
+        """
+        List the voices installed for pyttsx3, from a worker process.
+
+        Args:
+            timeout (float, optional): Seconds to wait for a worker and its answer
+
+        Returns:
+            list: (voice id, voice name) tuples
+
+        Raises:
+            Exception: If no worker is available or the worker fails
+        """
+        worker = self._acquire(timeout)
+        try:
+            worker.conn.send('voices')
+            if not worker.conn.poll(self.job_timeout if timeout is None else timeout):
+                self._discard(worker)
+                worker = None
+                raise Exception("TTS worker timed out listing voices")
+            status, value = worker.conn.recv()
+        except (EOFError, OSError) as e:
+            self._discard(worker)
+            worker = None
+            raise Exception(f"TTS worker crashed: {str(e) or type(e).__name__}")
+        finally:
+            if worker is not None:
+                self._idle.put(worker)
+        if status != 'ok':
+            raise Exception(value)
+        return value
+
+    def close(self):
+        """Stop all idle workers; busy workers stop when their job completes."""
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(worker, kill=False)
+
+    def stats(self):
+        """
+        Get pool metrics.
+
+        Returns:
+            dict: Worker counts, job outcomes and average wait/job times
+        """
+        with self._lock:
+            return {
+                'size': self.size,
+                'workers': self._workers,
+                'busy': self.busy,
+                'idle': self._idle.qsize(),
+                'jobs': self.jobs,
+                'failures': self.failures,
+                'timeouts': self.timeouts,
+                'crashes': self.crashes,
+                'recycled': self.recycled,
+                'avg_wait_ms': self.total_wait / self.jobs * 1000 if self.jobs else 0.0,
+                'avg_job_ms': self.total_job_time / self.jobs * 1000 if self.jobs else 0.0,
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_worker_pool():
+    """
+    Get the process-wide worker pool.
+
+    Returns:
+        TTSWorkerPool: The pool, or None if disabled (TTS_WORKER_POOL_SIZE = 0)
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            size = get_setting('TTS_WORKER_POOL_SIZE', 2)
+            if size <= 0:
+                return None
+            _pool = TTSWorkerPool(
+                size=size,
+                job_timeout=get_setting('TTS_WORKER_JOB_TIMEOUT', 60),
+                max_jobs_per_worker=get_setting('TTS_WORKER_MAX_JOBS', 200),
+            )
+            atexit.register(_pool.close)
+        return _pool
@@ -0,0 +1,179 @@
+"""
+Catalog of installed TTS voices.
+
+Enumerating voices means initializing SAPI and pyttsx3 (in a worker
+process) and parsing every voice id, so the catalog is built once per
+process, on first use, and then served from memory, with an ETag so that
+clients can revalidate it for free. Voices are indexed by engine and id,
+name and language, so picking the voice for a synthesis request is a
+dictionary lookup instead of a scan over the engine's voices.
+"""
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+_LANGUAGE_CODE = re.compile(r'^[a-z]{2,3}(-[a-z0-9]{2,8})*$')
+
+
+def normalize_language(code):
+    """Normalize a language code for lookups ('en_US' -> 'en-us')."""
+    return (code or '').strip().lower().replace('_', '-')
+
+
+def guess_language(voice_id):
+    """Get the language code embedded in a voice id, or 'unknown'."""
+    if 'language=' in voice_id:
+        return normalize_language(voice_id.split('language=')[1].split(';')[0])
+    # e.g. espeak voices 'gmw/en-US' or 'roa/fr'
+    tail = normalize_language(re.split(r'[\\/]', voice_id)[-1])
+    if _LANGUAGE_CODE.match(tail):
+        return tail
+    return 'unknown'
+
+
+class VoiceCatalogSnapshot:
+    """An immutable, indexed view of the voices at one point in time."""
+
+    def __init__(self, voices):
+        self.voices = voices
+        self.built_at = time.time()
+        payload = json.dumps(voices, sort_keys=True, ensure_ascii=False).encode('utf-8')
+        self.etag = '"' + hashlib.sha256(payload).hexdigest()[:32] + '"'
+
+        self._by_id = {}        # (engine, id or name) -> voice
+        self._by_language = {}  # (engine, language or base language) -> first voice
+        for engine, engine_voices in voices.items():
+            for voice in engine_voices:
+                self._by_id.setdefault((engine, voice['id']), voice)
+                self._by_id.setdefault((engine, voice.get('name', '')), voice)
+                language = normalize_language(voice.get('language'))
+                if language and language != 'unknown':
+                    self._by_language.setdefault((engine, language), voice)
+                    self._by_language.setdefault((engine, language.split('-')[0]), voice)
+
+    def find(self, engine, language=None, voice_name=None):
+        """
+        Find the voice of an engine for a request.
+
+        Tries, in order: the voice id or name, the language code, its base
+        language (e.g. 'pt' for 'pt-br'), and finally a voice whose id
+        contains voice_name.
+
+        Args:
+            engine (str): Engine key, as in the catalog ('pyttsx3', 'windows_sapi', ...)
+            language (str, optional): Requested language code
+            voice_name (str, optional): Requested voice id or name
+
+        Returns:
+            dict: The voice, or None to use the engine's default
+        """
+        if voice_name:
+            voice = self._by_id.get((engine, voice_name))
+            if voice is not None:
+                return voice
+        if language:
+            language = normalize_language(language)
+            voice = self._by_language.get((engine, language)) or \
+                self._by_language.get((engine, language.split('-')[0]))
+            if voice is not None:
+                return voice
+        if voice_name:
+            needle = voice_name.lower()
+            for voice in self.voices.get(engine, []):
+                if needle in voice['id'].lower():
+                    return voice
+        return None
+
+    def engine_of(self, voice_name):
+        """
+        Find the engine a voice belongs to.
+
+        Args:
+            voice_name (str): Voice id or name, matched exactly
+
+        Returns:
+            str: Engine key ('online' for the voices of online engines), or None
+        """
+        for engine in self.voices:
+            if (engine, voice_name) in self._by_id:
+                return engine
+        return None
+
+
+class VoiceCatalog:
+    """
+    Lazily built, refreshable voice catalog.
+    """
+
+    def __init__(self, loader, ttl=3600):
+        """
+        Initialize the catalog.
+
+        Args:
+            loader (callable): Returns the voices as {engine: [voice dicts]}
+            ttl (float): Seconds after which the catalog is rebuilt in the
+                         background (the old one is served meanwhile); 0 keeps it forever
+        """
+        self.loader = loader
+        self.ttl = ttl
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def _build(self):
+        start = time.perf_counter()
+        snapshot = VoiceCatalogSnapshot(self.loader())
+        logger.info(f"Built voice catalog: "
+                    f"{sum(len(voices) for voices in snapshot.voices.values())} voices "
+                    f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return snapshot
+
+    def get(self):
+        """
+        Get the current catalog, building it on first use.
+
+        Returns:
+            VoiceCatalogSnapshot: The voices with their indexes and ETag
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = self._build()
+                snapshot = self._snapshot
+        elif self.ttl and time.time() - snapshot.built_at > self.ttl:
+            self.warm()
+        return snapshot
+
+    def refresh(self):
+        """Rebuild the catalog now (e.g. after installing voices)."""
+        snapshot = self._build()
+        with self._lock:
+            self._snapshot = snapshot
+        return snapshot
+
+    def warm(self):
+        """Rebuild the catalog in a background thread, unless a rebuild is running."""
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Error building voice catalog: {str(e)}")
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name='voice-catalog', daemon=True).start()
+
+    def find(self, engine, language=None, voice_name=None):
+        """Find the voice of an engine for a request (see VoiceCatalogSnapshot.find)."""
+        return self.get().find(engine, language, voice_name)
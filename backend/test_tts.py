@@ -12,7 +12,7 @@ logging.basicConfig(
 
 # Import the TTS service
 try:
-    from documents.tts_service import tts_service
+    from documents.enhanced_tts_service import enhanced_tts_service as tts_service
     print("TTS service imported successfully")
 except Exception as e:
     print(f"Error importing TTS service: {str(e)}")
@@ -83,12 +83,28 @@ export const documentService = {
     return api.get('documents/available_voices/');
   },
 
+  // `text` is either the text to read or a reference to the document's extracted text:
+  // { startOffset, endOffset } or { page, sentenceStart, sentenceEnd }
   convertToSpeech: (id, text, language = '', preferOffline = true, voiceName = null) => {
-    console.log(`TTS Request - Document: ${id}, Text length: ${text.length}, Language: ${language}, Prefer offline: ${preferOffline}, Voice: "${voiceName || 'default'}"`);
+    console.log(`TTS Request - Document: ${id}, Text: ${typeof text === 'string' ? `${text.length} chars` : JSON.stringify(text)}, Language: ${language}, Prefer offline: ${preferOffline}, Voice: "${voiceName || 'default'}"`);
 
     // Create a FormData object for multipart/form-data
     const formData = new FormData();
-    formData.append('text', text);
+    if (typeof text === 'string') {
+      formData.append('text', text);
+    } else {
+      // The server reads the referenced range from its stored copy of the text
+      const fields = {
+        start_offset: text.startOffset,
+        end_offset: text.endOffset,
+        page: text.page,
+        sentence_start: text.sentenceStart,
+        sentence_end: text.sentenceEnd,
+      };
+      Object.entries(fields)
+        .filter(([, value]) => value !== undefined && value !== null)
+        .forEach(([name, value]) => formData.append(name, value.toString()));
+    }
 
     // Add language if provided
     if (language) {